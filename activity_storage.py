@@ -9,6 +9,7 @@ import time
 import logging
 import requests
 
+import event_bus
 from logging_config import main_logger as logger
 
 ACTIVITY_DIR = '/app/data/activity'
@@ -92,6 +93,7 @@ def save_watch_event(series_id, series_title, season, episode, user):
     
     # Modified append with 7-day cleanup instead of max_entries
     _append_to_activity_log_with_cleanup(WATCHES_FILE, event, days=7)
+    event_bus.publish('activity', dict(event, kind='watch'))
     logger.info(f"📝 Logged watch event: {series_title} S{season}E{episode} by {user}")
 def save_request_event(request_data):
     """Save Jellyseerr request before file is deleted"""
@@ -109,6 +111,7 @@ def save_request_event(request_data):
         # Save as last_request.json
         with open(REQUESTS_FILE, 'w') as f:
             json.dump(request_data, f, indent=2)
+        event_bus.publish('activity', dict(request_data, kind='request'))
             
         logger.info(f"📝 Logged request: {request_data.get('title', 'Unknown')}")
         
@@ -134,6 +137,7 @@ def save_search_event(series_id, series_title, season, episode, episode_ids):
     
     # Modified append with 7-day cleanup instead of max_entries
     _append_to_activity_log_with_cleanup(SEARCHES_FILE, event, days=7)
+    event_bus.publish('activity', dict(event, kind='search'))
     logger.info(f"📝 Logged search event: {series_title} S{season}E{episode}")
 
 # ADD THIS NEW HELPER FUNCTION (after the existing _append_to_activity_log)
@@ -0,0 +1,187 @@
+"""
+Cleanup Audit - every cleanup decision and action as a queryable row
+
+Cleanup results used to exist only as free-text lines in cleanup.log, so
+"how much did grace_unwatched free last month, per rule" meant grepping
+multi-MB logs. The two delete choke points in media_processor.py record one
+row per batch instead:
+
+    queued     dry run (global or rule) - sent to the pending-deletions queue
+    deleted    episode files Sonarr deleted
+    failed     episode files Sonarr refused to delete
+
+with phase (dormant, grace_watched, grace_unwatched, keep, finale,
+approved), rule, series, episode ids, file bytes and how long the batch
+took. run_unified_cleanup wraps each phase in phase(), which adds a
+'completed' row with the phase's duration; rows from one run share a run id.
+
+Rows older than RETENTION_DAYS are pruned on insert. Like watch_trace.py,
+recording never raises: a database problem loses an audit row, not a
+deletion. cleanup.log is still written for humans.
+"""
+import json
+import os
+import sqlite3
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+import settings_db
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ('queued', 'deleted', 'failed', 'completed')
+RETENTION_DAYS = int(os.getenv('CLEANUP_AUDIT_RETENTION_DAYS', '180'))
+
+_run_id: ContextVar[Optional[str]] = ContextVar('cleanup_audit_run', default=None)
+
+
+def _connect():
+    return sqlite3.connect(settings_db.DB_PATH, timeout=10)
+
+
+def _instance() -> Optional[str]:
+    import sonarr_instances
+    return sonarr_instances.active_instance()
+
+
+def start_run() -> str:
+    """Start a cleanup run; rows recorded from here on carry its id."""
+    run_id = uuid.uuid4().hex[:16]
+    _run_id.set(run_id)
+    return run_id
+
+
+def current_run() -> Optional[str]:
+    return _run_id.get()
+
+
+def record(phase: str, outcome: str, rule: Optional[str] = None, series_id=None,
+           series_title: Optional[str] = None, episode_ids: Optional[Iterable[int]] = None,
+           bytes_: int = 0, dry_run: bool = False, reason: Optional[str] = None,
+           duration: Optional[float] = None) -> None:
+    """Store one audit row. Never raises."""
+    if outcome not in OUTCOMES:
+        raise ValueError(f"Unknown cleanup outcome: {outcome}")
+    episode_ids = [int(e) for e in episode_ids or [] if e is not None]
+    now = time.time()
+    try:
+        conn = _connect()
+        try:
+            conn.execute(
+                '''INSERT INTO cleanup_audit
+                   (at, run_id, instance, phase, outcome, dry_run, rule, series_id, series_title,
+                    episode_ids, episodes, bytes, reason, duration)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                (now, current_run(), _instance(), phase, outcome, int(bool(dry_run)), rule,
+                 series_id, series_title, json.dumps(episode_ids), len(episode_ids),
+                 int(bytes_ or 0), reason, duration)
+            )
+            conn.execute('DELETE FROM cleanup_audit WHERE at < ?', (now - RETENTION_DAYS * 86400,))
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.debug(f"Could not record cleanup audit row ({phase}/{outcome}): {e}")
+
+
+@contextmanager
+def phase(name: str):
+    """Time a cleanup phase and record it as 'completed' when it ends."""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        record(name, 'completed', duration=round(time.monotonic() - started, 3))
+
+
+# ── Queries ─────────────────────────────────────────────────────
+
+def _since(days: int) -> float:
+    return time.time() - days * 86400
+
+
+def recent(limit: int = 200, days: int = RETENTION_DAYS, phase_name: Optional[str] = None,
+           rule: Optional[str] = None, outcome: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Newest rows first, optionally filtered by phase, rule and outcome."""
+    clauses, params = ['at >= ?'], [_since(days)]
+    for column, value in (('phase', phase_name), ('rule', rule), ('outcome', outcome)):
+        if value:
+            clauses.append(f'{column} = ?')
+            params.append(value)
+    conn = _connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(
+            f'SELECT * FROM cleanup_audit WHERE {" AND ".join(clauses)} ORDER BY at DESC, id DESC LIMIT ?',
+            params + [limit]
+        ).fetchall()
+    finally:
+        conn.close()
+    result = []
+    for row in rows:
+        item = dict(row)
+        item['episode_ids'] = json.loads(item['episode_ids'] or '[]')
+        result.append(item)
+    return result
+
+
+def bytes_per_rule_per_day(days: int = 30, outcome: str = 'deleted') -> List[Dict[str, Any]]:
+    """[{day, rule, episodes, bytes}] for the given outcome ('queued' shows
+    what a dry run would have freed), oldest day first."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            '''SELECT date(at, 'unixepoch', 'localtime') AS day, COALESCE(rule, 'none'),
+                      SUM(episodes), SUM(bytes)
+               FROM cleanup_audit WHERE outcome = ? AND at >= ?
+               GROUP BY day, rule ORDER BY day, rule''',
+            (outcome, _since(days))
+        ).fetchall()
+    finally:
+        conn.close()
+    return [{'day': day, 'rule': rule, 'episodes': episodes, 'bytes': total}
+            for day, rule, episodes, total in rows]
+
+
+def deletions_per_phase(days: int = 30) -> Dict[str, Dict[str, Any]]:
+    """Per phase: episodes and bytes per outcome, plus how many times the
+    phase ran and its average / longest duration."""
+    since = _since(days)
+    conn = _connect()
+    try:
+        actions = conn.execute(
+            '''SELECT phase, outcome, COUNT(*), SUM(episodes), SUM(bytes) FROM cleanup_audit
+               WHERE at >= ? AND outcome != 'completed' GROUP BY phase, outcome''',
+            (since,)
+        ).fetchall()
+        runs = conn.execute(
+            '''SELECT phase, COUNT(*), AVG(duration), MAX(duration) FROM cleanup_audit
+               WHERE at >= ? AND outcome = 'completed' GROUP BY phase''',
+            (since,)
+        ).fetchall()
+    finally:
+        conn.close()
+    phases: Dict[str, Dict[str, Any]] = {}
+    for name, outcome, batches, episodes, total in actions:
+        phases.setdefault(name, {})[outcome] = {'batches': batches, 'episodes': episodes, 'bytes': total}
+    for name, count, avg, longest in runs:
+        phases.setdefault(name, {})['runs'] = {'count': count,
+                                               'avg_seconds': round(avg or 0, 1),
+                                               'max_seconds': round(longest or 0, 1)}
+    return dict(sorted(phases.items()))
+
+
+def summary(days: int = 30) -> Dict[str, Any]:
+    by_phase = deletions_per_phase(days)
+    return {
+        'days': days,
+        'deleted_bytes': sum(p.get('deleted', {}).get('bytes', 0) for p in by_phase.values()),
+        'deleted_episodes': sum(p.get('deleted', {}).get('episodes', 0) for p in by_phase.values()),
+        'queued_bytes': sum(p.get('queued', {}).get('bytes', 0) for p in by_phase.values()),
+        'by_phase': by_phase,
+        'bytes_per_rule_per_day': bytes_per_rule_per_day(days),
+    }
@@ -3,28 +3,32 @@ Episeerr Dashboard Module
 Unified media dashboard with calendar, stats, and activity feed
 """
 
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, Response, render_template, jsonify, request
 import requests
 import os
 import json
 from datetime import datetime, timedelta
 import logging
 from integrations import get_all_integrations
+from episeerr_utils import http
+import dashboard_data
+import event_bus
+import sonarr_instances
+import watch_trace
+import disk_forecast
 
 dashboard_bp = Blueprint('dashboard', __name__)
 from logging_config import main_logger as logger
 
 # Database-first configuration helpers
-def get_sonarr_config():
-    """Get Sonarr config from database or env"""
-    from settings_db import get_service
+def get_sonarr_config(name=None):
+    """Get Sonarr config from database or env (name: Sonarr instance,
+    default the one this process is bound to)"""
+    import settings_db
     from episeerr_utils import normalize_url
-    
-    service = get_service('sonarr', 'default')
-    if service:
-        return normalize_url(service['url']), service['api_key']
-    # Fallback to env
-    return os.getenv('SONARR_URL'), os.getenv('SONARR_API_KEY')
+
+    config = settings_db.get_sonarr_config(name)
+    return normalize_url(config.get('url')), config.get('api_key')
 
 def get_jellyfin_config():
     """Get Jellyfin config from database or env"""
@@ -58,7 +62,7 @@ def get_series_banners_bulk():
     """Fetch all series from Sonarr in one call and return {series_id: banner_url}."""
     try:
         headers = {'X-Api-Key': SONARR_API_KEY}
-        response = requests.get(f"{SONARR_URL}/api/v3/series", headers=headers, timeout=10)
+        response = http.get(f"{SONARR_URL}/api/v3/series", headers=headers, timeout=10)
         if response.ok:
             banner_map = {}
             for series in response.json():
@@ -110,7 +114,7 @@ def _enrich_watched_from_jellyfin(watched_episodes: set, recent_downloads: list)
         # GET /Users returns all users (requires an admin-scoped API key).
         user_uuid = None
         try:
-            users_resp = requests.get(f"{jf_url}/Users", headers=headers, timeout=5)
+            users_resp = http.get(f"{jf_url}/Users", headers=headers, timeout=5)
             if users_resp.ok:
                 users = users_resp.json()
                 if configured_user:
@@ -129,7 +133,7 @@ def _enrich_watched_from_jellyfin(watched_episodes: set, recent_downloads: list)
             return
 
         # Fetch all played episodes for this user (one request)
-        ep_resp = requests.get(
+        ep_resp = http.get(
             f"{jf_url}/Users/{user_uuid}/Items",
             headers=headers,
             params={
@@ -181,120 +185,128 @@ def dashboard():
     return render_template('dashboard.html')
 
 
-@dashboard_bp.route('/api/dashboard/calendar')
-def calendar_data():
-    """Get upcoming episodes + recent downloads (two separate lists)"""
-    try:
-        from datetime import datetime, timedelta
-        import os
-        import json
-        
-        # Check if Sonarr is configured
-        if not SONARR_URL or not SONARR_API_KEY:
-            return jsonify({
-                'success': False,
-                'error': 'Sonarr not configured',
-                'message': 'Please configure Sonarr in the setup page',
-                'configured': False,
-                'upcoming': [],
-                'downloaded': []
-            })
-        
-        today = datetime.now()
-        week_ahead = today + timedelta(days=7)
-        
-        logger.info(f"Calendar range: {today.strftime('%Y-%m-%d')} to {week_ahead.strftime('%Y-%m-%d')}")
-        
-        # ──────────────────────────────────────────────────────
-        # 1. GET UPCOMING FROM SONARR (next 7 days)
-        # ──────────────────────────────────────────────────────
-        headers = {'X-Api-Key': SONARR_API_KEY}
-        calendar_url = f"{SONARR_URL}/api/v3/calendar"
-        params = {
-            'start': today.strftime('%Y-%m-%d'),
-            'end': week_ahead.strftime('%Y-%m-%d'),
-            'includeSeries': 'true',
-            'includeUnmonitored': 'false'
+def _snapshot_response(name):
+    """Serve the last snapshot of a dashboard_data source right away, with its
+    age in seconds in the Age header (a rebuild runs in the background)."""
+    payload, age = dashboard_data.get(name)
+    response = jsonify(payload)
+    response.headers['Age'] = str(int(age))
+    return response
+
+
+def _build_calendar():
+    """Upcoming episodes + recent downloads (two separate lists).
+    Builder for the 'calendar' snapshot; raises if Sonarr can't be reached."""
+    # Check if Sonarr is configured
+    if not SONARR_URL or not SONARR_API_KEY:
+        return {
+            'success': False,
+            'error': 'Sonarr not configured',
+            'message': 'Please configure Sonarr in the setup page',
+            'configured': False,
+            'upcoming': [],
+            'downloaded': []
         }
-        
-        response = requests.get(calendar_url, headers=headers, params=params, timeout=10)
-        response.raise_for_status()
-        upcoming_episodes = response.json()
-        
-        logger.info(f"Sonarr returned {len(upcoming_episodes)} upcoming episodes")
-        
-        # ──────────────────────────────────────────────────────
-        # 2. GET RECENT DOWNLOADS (last 7 days)
-        # ──────────────────────────────────────────────────────
-        recent_downloads = []
-        downloads_file = os.path.join(os.getcwd(), 'data', 'recent_downloads.json')
-        
-        if os.path.exists(downloads_file):
-            try:
-                with open(downloads_file, 'r') as f:
-                    recent_downloads = json.load(f)
-                logger.info(f"Loaded {len(recent_downloads)} recent downloads")
-            except Exception as e:
-                logger.error(f"Error loading downloads: {e}")
-        
-        # ──────────────────────────────────────────────────────
-        # 2.5 LOAD WATCHED EPISODES TO FILTER OUT
-        # ──────────────────────────────────────────────────────
-        watched_episodes = set()
-        watched_file = os.path.join(os.getcwd(), 'data', 'activity', 'watched.json')
-
-        if os.path.exists(watched_file):
-            try:
-                with open(watched_file, 'r') as f:
-                    watched_data = json.load(f)
-                    for watch in watched_data:
-                        watched_episodes.add((
-                            watch.get('series_id'),
-                            watch.get('season'),
-                            watch.get('episode')
-                        ))
-                logger.info(f"Loaded {len(watched_episodes)} watched episodes to filter")
-            except Exception as e:
-                logger.error(f"Error loading watched episodes: {e}")
-
-        # Supplement watched_episodes with live Jellyfin played status.
-        # watched.json only records episodes processed via Episeerr's webhook path
-        # (series must have a rule).  Querying Jellyfin directly covers series
-        # without rules and any watches the integration missed.
-        _enrich_watched_from_jellyfin(watched_episodes, recent_downloads)
-
-        # ──────────────────────────────────────────────────────
-        # 3. LOAD EPISEERR CONFIG FOR RULES + BANNER CACHE
-        # ──────────────────────────────────────────────────────
-        from episeerr import load_config
-        config = load_config()
-
-        series_rules = {}
-        for rule_name, rule_data in config.get('rules', {}).items():
-            for series_id in rule_data.get('series', {}).keys():
-                series_rules[int(series_id)] = rule_name
-
-        # One bulk Sonarr call for all banners instead of one per episode
-        banner_map = get_series_banners_bulk()
-
-        # ──────────────────────────────────────────────────────
-        # 4. PROCESS UPCOMING EPISODES
-        # ──────────────────────────────────────────────────────
-        upcoming_events = []
-        now = datetime.now()
-        downloaded_ids = {(dl['series_id'], dl['season'], dl['episode']) for dl in recent_downloads}
-
-        for ep in upcoming_episodes:
+    
+    today = datetime.now()
+    week_ahead = today + timedelta(days=7)
+    
+    logger.debug(f"Calendar range: {today.strftime('%Y-%m-%d')} to {week_ahead.strftime('%Y-%m-%d')}")
+    
+    # ──────────────────────────────────────────────────────
+    # 1. GET UPCOMING FROM SONARR (next 7 days)
+    # ──────────────────────────────────────────────────────
+    headers = {'X-Api-Key': SONARR_API_KEY}
+    calendar_url = f"{SONARR_URL}/api/v3/calendar"
+    params = {
+        'start': today.strftime('%Y-%m-%d'),
+        'end': week_ahead.strftime('%Y-%m-%d'),
+        'includeSeries': 'true',
+        'includeUnmonitored': 'false'
+    }
+    
+    response = http.get(calendar_url, headers=headers, params=params, timeout=10)
+    response.raise_for_status()
+    upcoming_episodes = response.json()
+    
+    logger.debug(f"Sonarr returned {len(upcoming_episodes)} upcoming episodes")
+    
+    # ──────────────────────────────────────────────────────
+    # 2. GET RECENT DOWNLOADS (last 7 days)
+    # ──────────────────────────────────────────────────────
+    recent_downloads = []
+    downloads_file = os.path.join(os.getcwd(), 'data', 'recent_downloads.json')
+    
+    if os.path.exists(downloads_file):
+        try:
+            with open(downloads_file, 'r') as f:
+                recent_downloads = json.load(f)
+            logger.debug(f"Loaded {len(recent_downloads)} recent downloads")
+        except Exception as e:
+            logger.error(f"Error loading downloads: {e}")
+    
+    # ──────────────────────────────────────────────────────
+    # 2.5 LOAD WATCHED EPISODES TO FILTER OUT
+    # ──────────────────────────────────────────────────────
+    watched_episodes = set()
+    watched_file = os.path.join(os.getcwd(), 'data', 'activity', 'watched.json')
+
+    if os.path.exists(watched_file):
+        try:
+            with open(watched_file, 'r') as f:
+                watched_data = json.load(f)
+                for watch in watched_data:
+                    watched_episodes.add((
+                        watch.get('series_id'),
+                        watch.get('season'),
+                        watch.get('episode')
+                    ))
+            logger.debug(f"Loaded {len(watched_episodes)} watched episodes to filter")
+        except Exception as e:
+            logger.error(f"Error loading watched episodes: {e}")
+
+    # Supplement watched_episodes with live Jellyfin played status.
+    # watched.json only records episodes processed via Episeerr's webhook path
+    # (series must have a rule).  Querying Jellyfin directly covers series
+    # without rules and any watches the integration missed.
+    _enrich_watched_from_jellyfin(watched_episodes, recent_downloads)
+
+    # ──────────────────────────────────────────────────────
+    # 3. LOAD EPISEERR CONFIG FOR RULES + BANNER CACHE
+    # ──────────────────────────────────────────────────────
+    from episeerr import load_config
+    config = load_config()
+
+    series_rules = {}
+    for rule_name, rule_data in config.get('rules', {}).items():
+        for series_id in rule_data.get('series', {}).keys():
+            series_rules[int(series_id)] = rule_name
+
+    # One bulk Sonarr call for all banners instead of one per episode
+    banner_map = get_series_banners_bulk()
+
+    calendars = [('default', upcoming_episodes, series_rules, banner_map)]
+    calendars.extend(_other_instance_calendars(params))
+
+    # ──────────────────────────────────────────────────────
+    # 4. PROCESS UPCOMING EPISODES
+    # ──────────────────────────────────────────────────────
+    upcoming_events = []
+    now = datetime.now()
+    downloaded_ids = {(dl['series_id'], dl['season'], dl['episode']) for dl in recent_downloads}
+
+    for instance, instance_episodes, instance_rules, instance_banners in calendars:
+        for ep in instance_episodes:
             series_id = ep.get('seriesId')
             season = ep.get('seasonNumber')
             episode = ep.get('episodeNumber')
 
             # Skip if already in downloaded list
-            if (series_id, season, episode) in downloaded_ids:
+            if instance == 'default' and (series_id, season, episode) in downloaded_ids:
                 continue
 
-            has_rule = series_id in series_rules
-            rule_name = series_rules.get(series_id)
+            has_rule = series_id in instance_rules
+            rule_name = instance_rules.get(series_id)
             has_file = ep.get('hasFile', False)
             monitored = ep.get('monitored', False)
 
@@ -335,46 +347,85 @@ def calendar_data():
                 'rule_name': rule_name,
                 'status': status,
                 'color': color,
-                'banner': banner_map.get(series_id)
+                'banner': instance_banners.get(series_id),
+                'instance': instance
             })
+    if len(calendars) > 1:
+        upcoming_events.sort(key=lambda e: e['air_date'] or '')
+
+    # ──────────────────────────────────────────────────────
+    # 5. FORMAT RECENT DOWNLOADS (use grab timestamp)
+    # ──────────────────────────────────────────────────────
+    downloaded_events = []
+
+    for dl in recent_downloads:
+        # Skip if already watched
+        dl_key = (dl['series_id'], dl['season'], dl['episode'])
+        if dl_key in watched_episodes:
+            continue
+
+        has_rule = dl['series_id'] in series_rules
+
+        downloaded_events.append({
+            'series_id': dl['series_id'],
+            'series_title': dl['series_title'],
+            'episode_title': dl.get('episode_title', ''),
+            'season': dl['season'],
+            'episode': dl['episode'],
+            'grabbed_date': dl['timestamp'],
+            'has_rule': has_rule,
+            'rule_name': series_rules.get(dl['series_id']),
+            'status': 'ready',
+            'color': 'green',
+            'banner': banner_map.get(dl['series_id'])
+        })
+    # Sort by grab time (newest first)
+    downloaded_events.sort(key=lambda x: x['grabbed_date'], reverse=True)
 
-        # ──────────────────────────────────────────────────────
-        # 5. FORMAT RECENT DOWNLOADS (use grab timestamp)
-        # ──────────────────────────────────────────────────────
-        downloaded_events = []
-
-        for dl in recent_downloads:
-            # Skip if already watched
-            dl_key = (dl['series_id'], dl['season'], dl['episode'])
-            if dl_key in watched_episodes:
-                continue
+    return {
+        'success': True,
+        'upcoming': upcoming_events,
+        'downloaded': downloaded_events,
+        'upcoming_count': len(upcoming_events),
+        'downloaded_count': len(downloaded_events)
+    }
+
+
+def _other_instance_calendars(params):
+    """(instance, calendar episodes, series id -> rule, banners) for every
+    Sonarr instance but the default. Banners come from the calendar's own
+    series data; an unreachable instance is left out."""
+    calendars = []
+    for instance in sonarr_instances.list_instances()[1:]:
+        url, api_key = get_sonarr_config(instance)
+        if not url or not api_key:
+            continue
+        try:
+            response = http.get(f"{url}/api/v3/calendar", headers={'X-Api-Key': api_key},
+                                params=params, timeout=10)
+            response.raise_for_status()
+            episodes = response.json()
+        except Exception as e:
+            logger.warning(f"Calendar for Sonarr instance '{instance}' unavailable: {e}")
+            continue
+        rules = {}
+        for rule_name, rule_data in sonarr_instances.load_instance_config(instance).get('rules', {}).items():
+            for series_id in rule_data.get('series', {}):
+                rules[int(series_id)] = rule_name
+        banners = {}
+        for ep in episodes:
+            for image in ep.get('series', {}).get('images', []):
+                if image.get('coverType') == 'banner':
+                    banners[ep.get('seriesId')] = image.get('remoteUrl')
+        calendars.append((instance, episodes, rules, banners))
+    return calendars
 
-            has_rule = dl['series_id'] in series_rules
 
-            downloaded_events.append({
-                'series_id': dl['series_id'],
-                'series_title': dl['series_title'],
-                'episode_title': dl.get('episode_title', ''),
-                'season': dl['season'],
-                'episode': dl['episode'],
-                'grabbed_date': dl['timestamp'],
-                'has_rule': has_rule,
-                'rule_name': series_rules.get(dl['series_id']),
-                'status': 'ready',
-                'color': 'green',
-                'banner': banner_map.get(dl['series_id'])
-            })
-        # Sort by grab time (newest first)
-        downloaded_events.sort(key=lambda x: x['grabbed_date'], reverse=True)
-        
-        return jsonify({
-            'success': True,
-            'upcoming': upcoming_events,
-            'downloaded': downloaded_events,
-            'upcoming_count': len(upcoming_events),
-            'downloaded_count': len(downloaded_events)
-        })
-        
+@dashboard_bp.route('/api/dashboard/calendar')
+def calendar_data():
+    """Get upcoming episodes + recent downloads (two separate lists)"""
+    try:
+        return _snapshot_response('calendar')
     except Exception as e:
         logger.error(f"Error fetching calendar data: {str(e)}")
         return jsonify({
@@ -413,96 +464,133 @@ def dashboard_integrations():
         'integrations': integrations_data
     })
 
-@dashboard_bp.route('/api/dashboard/stats')
-def dashboard_stats():
-    """Get overall statistics for dashboard"""
+def _fetch_sonarr_stats(sonarr_url=None, sonarr_api_key=None):
+    """Library totals and queue size for the Sonarr stats card (of the
+    default instance unless a URL and key are given)."""
+    if sonarr_url is None:
+        sonarr_url, sonarr_api_key = SONARR_URL, SONARR_API_KEY
+    if not sonarr_url or not sonarr_api_key:
+        return {'configured': False}
     try:
-        stats = {}
+        headers = {'X-Api-Key': sonarr_api_key}
         
-        # Sonarr stats
-        if SONARR_URL and SONARR_API_KEY:
-            try:
-                headers = {'X-Api-Key': SONARR_API_KEY}
-                
-                # Get series count
-                series_response = requests.get(f"{SONARR_URL}/api/v3/series", headers=headers, timeout=10)
-                series_response.raise_for_status()
-                series_data = series_response.json()
-                
-                # Get queue
-                queue_response = requests.get(f"{SONARR_URL}/api/v3/queue", headers=headers, timeout=10)
-                queue_response.raise_for_status()
-                queue_data = queue_response.json()
-                
-                total_episodes = sum(s.get('statistics', {}).get('episodeFileCount', 0) for s in series_data)
-                total_size = sum(s.get('statistics', {}).get('sizeOnDisk', 0) for s in series_data)
-                
-                stats['sonarr'] = {
-                    'series_count': len(series_data),
-                    'episode_count': total_episodes,
-                    'size_on_disk': total_size,
-                    'size_gb': round(total_size / (1024**3), 2),
-                    'queue_count': queue_data.get('totalRecords', 0),
-                    'configured': True
-                }
-            except Exception as e:
-                if isinstance(e, requests.exceptions.ConnectionError):
-                    logger.warning(f"Error fetching Sonarr stats: {e}")
-                else:
-                    logger.error(f"Error fetching Sonarr stats: {e}")
-                stats['sonarr'] = {
-                    'configured': True,
-                    'error': True,
-                    'error_message': str(e)
-                }
-        else:
-            stats['sonarr'] = {'configured': False}
+        # Get series count
+        series_response = http.get(f"{sonarr_url}/api/v3/series", headers=headers, timeout=10)
+        series_response.raise_for_status()
+        series_data = series_response.json()
         
+        # Get queue
+        queue_response = http.get(f"{sonarr_url}/api/v3/queue", headers=headers, timeout=10)
+        queue_response.raise_for_status()
+        queue_data = queue_response.json()
         
+        total_episodes = sum(s.get('statistics', {}).get('episodeFileCount', 0) for s in series_data)
+        total_size = sum(s.get('statistics', {}).get('sizeOnDisk', 0) for s in series_data)
         
-        # Auto-collect stats from all integrations in parallel
-        from settings_db import get_service
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        return {
+            'series_count': len(series_data),
+            'episode_count': total_episodes,
+            'size_on_disk': total_size,
+            'size_gb': round(total_size / (1024**3), 2),
+            'queue_count': queue_data.get('totalRecords', 0),
+            'configured': True
+        }
+    except Exception as e:
+        if isinstance(e, requests.exceptions.ConnectionError):
+            logger.warning(f"Error fetching Sonarr stats: {e}")
+        else:
+            logger.error(f"Error fetching Sonarr stats: {e}")
+        return {
+            'configured': True,
+            'error': True,
+            'error_message': str(e)
+        }
 
-        integrations = get_all_integrations()
 
-        def _fetch_integration_stats(integration):
-            try:
-                config = get_service(integration.service_name, 'default')
-                if config:
-                    return integration.service_name, integration.get_dashboard_stats(
-                        config.get('url', ''), config.get('api_key', '')
-                    )
-                return integration.service_name, {'configured': False}
-            except Exception as e:
-                logger.error(f"Error fetching {integration.display_name} stats: {e}")
-                return integration.service_name, {'configured': True, 'error': True}
+_SONARR_TOTALS = ('series_count', 'episode_count', 'size_on_disk', 'queue_count')
 
-        with ThreadPoolExecutor(max_workers=8) as executor:
-            futures = {executor.submit(_fetch_integration_stats, i): i for i in integrations}
-            for future in as_completed(futures):
-                name, result = future.result()
-                stats[name] = result
 
-        
-        # Episeerr stats
-        from episeerr import load_config
-        config = load_config()
-        
-        total_series_in_rules = 0
-        for rule_data in config.get('rules', {}).values():
+def _combine_sonarr_stats(per_instance):
+    """One Sonarr card for several instances: totals over the ones that
+    answered, each instance's own stats under 'instances'."""
+    names = list(per_instance)
+    if len(names) == 1:
+        return per_instance[names[0]]
+    answered = [s for s in per_instance.values() if s.get('configured') and not s.get('error')]
+    combined = {key: sum(s.get(key, 0) for s in answered) for key in _SONARR_TOTALS}
+    combined['size_gb'] = round(combined['size_on_disk'] / (1024**3), 2)
+    combined['configured'] = any(s.get('configured') for s in per_instance.values())
+    if combined['configured'] and not answered:
+        combined['error'] = True
+        combined['error_message'] = 'No Sonarr instance reachable'
+    combined['instances'] = per_instance
+    return combined
+
+
+def _build_stats():
+    """Overall dashboard statistics. Builder for the 'stats' snapshot."""
+    from settings_db import get_service
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    stats = {}
+    integrations = get_all_integrations()
+
+    def _fetch_integration_stats(integration):
+        try:
+            config = get_service(integration.service_name, 'default')
+            if config:
+                return integration.service_name, integration.get_dashboard_stats(
+                    config.get('url', ''), config.get('api_key', '')
+                )
+            return integration.service_name, {'configured': False}
+        except Exception as e:
+            logger.error(f"Error fetching {integration.display_name} stats: {e}")
+            return integration.service_name, {'configured': True, 'error': True}
+
+    # Sonarr and every integration are fetched in parallel
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sonarr_futures = {'default': executor.submit(_fetch_sonarr_stats)}
+        for instance in sonarr_instances.list_instances()[1:]:
+            sonarr_futures[instance] = executor.submit(_fetch_sonarr_stats, *get_sonarr_config(instance))
+        futures = {executor.submit(_fetch_integration_stats, i): i for i in integrations}
+        for future in as_completed(futures):
+            name, result = future.result()
+            stats[name] = result
+        stats['sonarr'] = _combine_sonarr_stats({name: f.result() for name, f in sonarr_futures.items()})
+
+    # Episeerr stats
+    from episeerr import load_config
+    config = load_config()
+    
+    total_series_in_rules = 0
+    for rule_data in config.get('rules', {}).values():
+        total_series_in_rules += len(rule_data.get('series', {}))
+    for instance in sonarr_instances.list_instances()[1:]:
+        for rule_data in sonarr_instances.load_instance_config(instance).get('rules', {}).values():
             total_series_in_rules += len(rule_data.get('series', {}))
-        
-        stats['episeerr'] = {
-            'rule_count': len(config.get('rules', {})),
-            'series_managed': total_series_in_rules
-        }
-        
-        return jsonify({
-            'success': True,
-            'stats': stats
-        })
-        
+    
+    stats['episeerr'] = {
+        'rule_count': len(config.get('rules', {})),
+        'series_managed': total_series_in_rules
+    }
+    
+    return {
+        'success': True,
+        'stats': stats
+    }
+
+
+# Dashboard pages poll these every minute; rebuilding in the background on a
+# shorter interval means a poll never waits on Sonarr.
+dashboard_data.register('calendar', _build_calendar, interval=60)
+dashboard_data.register('stats', _build_stats, interval=30)
+
+
+@dashboard_bp.route('/api/dashboard/stats')
+def dashboard_stats():
+    """Get overall statistics for dashboard"""
+    try:
+        return _snapshot_response('stats')
     except Exception as e:
         logger.error(f"Error fetching dashboard stats: {str(e)}")
         return jsonify({
@@ -512,6 +600,67 @@ def dashboard_stats():
         }), 500
 
 
+@dashboard_bp.route('/api/dashboard/watch-latency')
+def watch_latency():
+    """p50/p95 time from a watch event to search, grab and import - overall,
+    per source and per rule (see watch_trace.py)"""
+    try:
+        days = min(max(request.args.get('days', watch_trace.RETENTION_DAYS, type=int), 1),
+                   watch_trace.RETENTION_DAYS)
+        return jsonify({'success': True, **watch_trace.latency_report(days)})
+    except Exception as e:
+        logger.error(f"Error building watch latency report: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@dashboard_bp.route('/api/dashboard/disk-forecast')
+def disk_forecast_history():
+    """Free-space samples for the last ?hours= and the latest forecast of
+    when the storage gate is crossed (see disk_forecast.py)"""
+    try:
+        hours = min(max(request.args.get('hours', disk_forecast.RATE_WINDOW_HOURS * 2, type=int), 1),
+                    disk_forecast.RETENTION_DAYS * 24)
+        return jsonify({'success': True, 'hours': hours,
+                        'samples': disk_forecast.get_samples(hours),
+                        'forecast': disk_forecast.latest_forecast()})
+    except Exception as e:
+        logger.error(f"Error building disk forecast: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@dashboard_bp.route('/api/events')
+def event_stream():
+    """Server-Sent Events: activity, pending, queue, polling and widget deltas
+    (see event_bus.py). ?topics=a,b limits the stream; a reconnecting browser
+    resumes from its Last-Event-ID."""
+    topics = [t for t in request.args.get('topics', '').split(',') if t in event_bus.TOPICS]
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    if not event_bus.acquire_stream():
+        # Every stream slot in this worker is taken - the page keeps polling
+        return jsonify({'success': False, 'error': 'Too many open event streams'}), 503
+
+    response = Response(event_bus.stream(last_event_id, topics or None), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(event_bus.release_stream)
+    return response
+
+
+@dashboard_bp.route('/api/events/status')
+def event_stream_status():
+    """Open streams in this worker and the retained event id range"""
+    try:
+        return jsonify({'success': True, **event_bus.status()})
+    except Exception as e:
+        logger.error(f"Error reading event bus status: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @dashboard_bp.route('/api/dashboard/activity')
 def activity_feed():
     """Get most recent activity from each service"""
@@ -0,0 +1,165 @@
+"""
+Dashboard Data - background-refreshed snapshots for the dashboard endpoints
+
+The dashboard calendar/stats endpoints and the Series page's Sonarr stats
+used to call Sonarr on every page load, so a slow Sonarr made every page
+slow. Each aggregate is now registered here as a named source with a builder
+and a refresh interval, and endpoints serve the last snapshot immediately
+(stale-while-revalidate):
+
+- The first request for a source builds it synchronously - there is nothing
+  to serve yet, and a failure is raised to the caller as before.
+- A request for a snapshot older than its interval returns it as-is and
+  starts a rebuild in the background.
+- A refresher thread keeps rebuilding sources that someone has asked for in
+  the last IDLE_SECONDS, so an open dashboard always finds a fresh snapshot.
+  Sources nobody is looking at are left alone instead of polling Sonarr.
+- A failed rebuild keeps the previous snapshot; its age keeps growing and is
+  what endpoints report in the Age header.
+
+Snapshots are per process. With several gunicorn workers each one keeps its
+own, which only costs one extra build per worker.
+"""
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How often the refresher thread looks for sources to rebuild
+TICK_SECONDS = 5
+# A source nobody has requested for this long stops being refreshed
+IDLE_SECONDS = 10 * 60
+# Builders running at once (each source only ever has one in flight)
+MAX_CONCURRENT_BUILDS = 4
+
+_MISSING = object()
+
+
+class _Source:
+    def __init__(self, name: str, builder: Callable[[], Any], interval: float):
+        self.name = name
+        self.builder = builder
+        self.interval = interval
+        self.value: Any = _MISSING
+        self.built_at = 0.0
+        self.last_requested = 0.0
+        self.refreshing = False
+        self.build_lock = threading.Lock()
+
+    def age(self, now: float) -> float:
+        return max(0.0, now - self.built_at)
+
+
+class DashboardDataService:
+    """Named snapshots, each rebuilt in the background by its builder."""
+
+    def __init__(self):
+        self._sources: Dict[str, _Source] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, builder: Callable[[], Any], interval: float) -> None:
+        """Register (or replace) a source. interval is the snapshot age in
+        seconds after which it is rebuilt."""
+        with self._lock:
+            self._sources[name] = _Source(name, builder, interval)
+
+    def get(self, name: str) -> Tuple[Any, float]:
+        """Return (snapshot, age_seconds). Builds synchronously only when no
+        snapshot exists yet; otherwise never waits on the builder."""
+        source = self._sources[name]
+        source.last_requested = time.time()
+        self._ensure_refresher()
+
+        if source.value is _MISSING:
+            with source.build_lock:
+                # Another request may have built it while we waited
+                if source.value is _MISSING:
+                    self._build(source)
+        elif source.age(time.time()) >= source.interval:
+            self._refresh_async(source)
+
+        return source.value, source.age(time.time())
+
+    def invalidate(self, name: str) -> None:
+        """Mark a snapshot stale: the next request still gets it, and
+        triggers a rebuild."""
+        source = self._sources.get(name)
+        if source is not None:
+            source.built_at = 0.0
+
+    def _build(self, source: _Source) -> None:
+        started = time.time()
+        value = source.builder()
+        source.value = value
+        source.built_at = time.time()
+        logger.debug(f"Dashboard snapshot '{source.name}' rebuilt in {source.built_at - started:.2f}s")
+
+    def _refresh_async(self, source: _Source) -> None:
+        with self._lock:
+            if source.refreshing:
+                return
+            source.refreshing = True
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=MAX_CONCURRENT_BUILDS, thread_name_prefix='dashboard-data'
+                )
+        self._executor.submit(self._refresh, source)
+
+    def _refresh(self, source: _Source) -> None:
+        try:
+            with source.build_lock:
+                self._build(source)
+        except Exception as e:
+            logger.warning(f"Dashboard snapshot '{source.name}' refresh failed, "
+                           f"serving previous data: {e}")
+        finally:
+            source.refreshing = False
+
+    def _ensure_refresher(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._refresher_loop, name='dashboard-data-refresher', daemon=True
+            )
+            self._thread.start()
+
+    def _refresher_loop(self) -> None:
+        while True:
+            time.sleep(TICK_SECONDS)
+            try:
+                self.refresh_due()
+            except Exception as e:
+                logger.error(f"Dashboard data refresher error: {e}")
+
+    def refresh_due(self) -> None:
+        """Start a background rebuild of every recently requested source
+        whose snapshot is older than its interval."""
+        now = time.time()
+        for source in list(self._sources.values()):
+            if source.value is _MISSING or now - source.last_requested > IDLE_SECONDS:
+                continue
+            if source.age(now) >= source.interval:
+                self._refresh_async(source)
+
+
+service = DashboardDataService()
+
+
+def register(name: str, builder: Callable[[], Any], interval: float) -> None:
+    service.register(name, builder, interval)
+
+
+def get(name: str) -> Tuple[Any, float]:
+    return service.get(name)
+
+
+def invalidate(name: str) -> None:
+    service.invalidate(name)
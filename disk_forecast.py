@@ -0,0 +1,200 @@
+"""
+Disk Forecast - free-space history, and storage-gated cleanup ahead of time
+
+The storage gate in run_unified_cleanup only looked at free space when the
+cleanup interval came round, so a season pack landing just after a cleanup
+could fill the disk hours before the next one.
+
+The disk_forecast job samples Sonarr's free space every SAMPLE_MINUTES, and
+again after Download (import) webhooks, into disk_samples: raw for
+RAW_HOURS, then thinned to one sample per hour, dropped after
+RETENTION_DAYS. Each sample is followed by a forecast:
+
+    ingest rate   free space lost over the last RATE_WINDOW_HOURS (drops
+                  only - the space cleanups free isn't negative ingest)
+    queued        what Sonarr's download queue still has to fetch
+    crossing      when free - queued - rate * t reaches global_storage_min_gb
+
+When the crossing falls before the next scheduled cleanup the job runs the
+cleanup now, and gate_threshold_gb() raises that run's gate by the space
+expected to go before the next cycle (queued + rate * interval), so the
+early run actually cleans instead of finding the gate closed.
+
+Samples are per Sonarr instance, but the job runs in the web app and
+forecasts the default instance; other instances keep the plain gate.
+"""
+import json
+import sqlite3
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+import settings_db
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_MINUTES = 15
+# Webhook-triggered samples closer together than this are skipped
+MIN_SAMPLE_GAP_SECONDS = 60
+RAW_HOURS = 48
+RETENTION_DAYS = 30
+RATE_WINDOW_HOURS = 24
+# A brought-forward cleanup isn't repeated within this long
+BRING_FORWARD_COOLDOWN_SECONDS = 3600
+# A stored forecast older than this no longer moves the gate
+FORECAST_MAX_AGE_SECONDS = 3 * SAMPLE_MINUTES * 60
+
+_FORECAST_SETTING = 'disk_forecast'
+
+
+def _connect():
+    return sqlite3.connect(settings_db.DB_PATH, timeout=10)
+
+
+def _instance(instance: Optional[str] = None) -> str:
+    if instance:
+        return instance
+    import sonarr_instances
+    return sonarr_instances.active_instance()
+
+
+# ── Samples ─────────────────────────────────────────────────────
+
+def record_sample(free_gb: float, total_gb: float, source: str = 'schedule',
+                  at: Optional[float] = None, instance: Optional[str] = None) -> None:
+    """Store a free-space sample, thinning and pruning old ones. Never raises."""
+    instance = _instance(instance)
+    at = at or time.time()
+    raw_cutoff = at - RAW_HOURS * 3600
+    try:
+        conn = _connect()
+        try:
+            conn.execute('INSERT INTO disk_samples (instance, at, free_gb, total_gb, source) VALUES (?, ?, ?, ?, ?)',
+                         (instance, at, free_gb, total_gb, source))
+            conn.execute('DELETE FROM disk_samples WHERE instance = ? AND at < ?',
+                         (instance, at - RETENTION_DAYS * 86400))
+            conn.execute(
+                '''DELETE FROM disk_samples WHERE instance = ? AND at < ? AND id NOT IN
+                   (SELECT MIN(id) FROM disk_samples WHERE instance = ? AND at < ?
+                    GROUP BY CAST(at / 3600 AS INTEGER))''',
+                (instance, raw_cutoff, instance, raw_cutoff)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.debug(f"Could not record disk sample: {e}")
+
+
+def get_samples(hours: float = RATE_WINDOW_HOURS, instance: Optional[str] = None,
+                now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Samples from the last `hours`, oldest first."""
+    since = (now or time.time()) - hours * 3600
+    conn = _connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute('SELECT at, free_gb, total_gb, source FROM disk_samples '
+                            'WHERE instance = ? AND at >= ? ORDER BY at', (_instance(instance), since)).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+
+def last_sample_at(instance: Optional[str] = None) -> Optional[float]:
+    conn = _connect()
+    try:
+        row = conn.execute('SELECT MAX(at) FROM disk_samples WHERE instance = ?', (_instance(instance),)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+# ── Forecast ────────────────────────────────────────────────────
+
+def ingest_rate(samples: List[Dict[str, Any]]) -> Optional[float]:
+    """GB of free space lost per hour across the samples, counting drops
+    only. None with less than an hour of history."""
+    if len(samples) < 2:
+        return None
+    span_hours = (samples[-1]['at'] - samples[0]['at']) / 3600
+    if span_hours < 1:
+        return None
+    lost = sum(max(0.0, a['free_gb'] - b['free_gb']) for a, b in zip(samples, samples[1:]))
+    return lost / span_hours
+
+
+def forecast(free_gb: float, min_gb: Optional[float], queued_gb: float = 0.0,
+             horizon_hours: float = 6, interval_hours: Optional[float] = None,
+             instance: Optional[str] = None, now: Optional[float] = None) -> Dict[str, Any]:
+    """When free space will cross min_gb, from the recent ingest rate and
+    the download queue. hours_to_threshold is 0 if queued downloads alone
+    take it below, None if it isn't heading there. horizon_hours is the
+    time to the next scheduled cleanup; interval_hours (default: the
+    horizon) the cycle an early run has to last."""
+    now = now or time.time()
+    rate = ingest_rate(get_samples(RATE_WINDOW_HOURS, instance, now))
+    result = {
+        'at': now,
+        'free_gb': free_gb,
+        'min_gb': min_gb,
+        'queued_gb': round(queued_gb, 2),
+        'rate_gb_per_hour': round(rate, 3) if rate is not None else None,
+        'horizon_hours': horizon_hours,
+        'hours_to_threshold': None,
+        'crosses_at': None,
+        'within_horizon': False,
+        # Space expected to go before the next cycle - what an early run cleans for
+        'headroom_gb': round(queued_gb + (rate or 0) * (interval_hours or horizon_hours), 2),
+    }
+    if not min_gb:
+        return result
+    remaining = free_gb - queued_gb - min_gb
+    if remaining <= 0:
+        hours = 0.0
+    elif rate:
+        hours = remaining / rate
+    else:
+        return result
+    result.update(hours_to_threshold=round(hours, 2), crosses_at=now + hours * 3600,
+                  within_horizon=hours <= horizon_hours)
+    return result
+
+
+def save_forecast(result: Dict[str, Any], instance: Optional[str] = None) -> None:
+    settings_db.set_setting(f"{_FORECAST_SETTING}:{_instance(instance)}", json.dumps(result), category='internal')
+
+
+def latest_forecast(instance: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    value = settings_db.get_setting(f"{_FORECAST_SETTING}:{_instance(instance)}")
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value
+
+
+def should_bring_forward(result: Dict[str, Any], last_cleanup_started: Optional[float],
+                         now: Optional[float] = None) -> bool:
+    """Run cleanup now: the crossing is before the next scheduled cleanup,
+    and no cleanup started within the cooldown."""
+    now = now or time.time()
+    if not result.get('within_horizon'):
+        return False
+    return not last_cleanup_started or now - last_cleanup_started >= BRING_FORWARD_COOLDOWN_SECONDS
+
+
+def gate_threshold_gb(storage_min_gb: Optional[float], instance: Optional[str] = None,
+                      now: Optional[float] = None) -> Optional[float]:
+    """The storage gate for a cleanup starting now: global_storage_min_gb,
+    raised by the forecast headroom while a fresh forecast has the crossing
+    within the horizon."""
+    if not storage_min_gb:
+        return storage_min_gb
+    try:
+        result = latest_forecast(instance)
+    except (sqlite3.Error, ValueError) as e:
+        logger.debug(f"Could not read disk forecast: {e}")
+        return storage_min_gb
+    now = now or time.time()
+    if (not result or not result.get('within_horizon') or result.get('min_gb') != storage_min_gb
+            or now - result.get('at', 0) > FORECAST_MAX_AGE_SECONDS):
+        return storage_min_gb
+    return storage_min_gb + result.get('headroom_gb', 0)
@@ -1,5 +1,8 @@
 __version__ = "3.8.7"
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, jsonify, session, g, Response
+import startup_timing
+import request_timing
+import webhook_capture
 import subprocess
 import os
 import atexit
@@ -21,15 +24,24 @@ import requests
 import episeerr_utils
 from episeerr_utils import EPISEERR_DEFAULT_TAG_ID, EPISEERR_SELECT_TAG_ID, normalize_url, http
 import pending_deletions
+import sonarr_instances
+import tag_sync
+import selection_prefetch
+import cleanup_audit
+import rule_stats
+import disk_forecast
 from dashboard import dashboard_bp
+import dashboard_data
 from webhooks import sonarr_webhooks_bp, radarr_webhooks_bp
 import media_processor
+from job_scheduler import scheduler as job_scheduler
+import shared_state
 from settings_db import (
     save_service, get_service, delete_service,
     update_service_test_result, get_all_services,
     set_setting, get_setting,
     add_pending_request, get_pending_request, get_all_pending_requests,
-    delete_pending_request, find_pending_request_by_series,
+    delete_pending_request, find_pending_request_by_series, get_last_job_run,
     find_pending_request_by_tmdb, migrate_pending_requests_from_files,
 )
 from logging_config import main_logger as logger
@@ -37,6 +49,9 @@ from logging_config import main_logger as logger
 from integrations import get_integration, get_all_integrations
 from integrations import register_integration_blueprints
 app = Flask(__name__)
+# Registered first so its timer wraps the auth gate and every blueprint
+request_timing.init_app(app)
+webhook_capture.init_app(app)
 
 register_integration_blueprints(app)
 app.register_blueprint(dashboard_bp)
@@ -46,8 +61,14 @@ app.register_blueprint(radarr_webhooks_bp)
 # Session / Auth configuration
 _secret = os.getenv('SECRET_KEY')
 if not _secret:
-    app.logger.warning("SECRET_KEY not set — sessions will not survive restarts. Set SECRET_KEY env var.")
-    _secret = os.urandom(24).hex()
+    # Persisted next to settings.db so every gunicorn worker (and restarts)
+    # share it; fall back to a per-process key if the data dir isn't writable
+    try:
+        _secret = shared_state.get_shared_secret()
+        app.logger.info("SECRET_KEY not set — using generated key from the data directory.")
+    except Exception:
+        app.logger.warning("SECRET_KEY not set — sessions will not survive restarts. Set SECRET_KEY env var.")
+        _secret = os.urandom(24).hex()
 app.config['SECRET_KEY'] = _secret
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SECURE'] = os.getenv('SESSION_SECURE', 'false').lower() == 'true'
@@ -64,7 +85,8 @@ BASE_DIR = os.getcwd()
 
 # Initialize settings database
 from settings_db import get_sonarr_config, get_radarr_config, init_settings_db
-init_settings_db()
+with startup_timing.phase('settings database'):
+    init_settings_db()
 
 # Sonarr variables (with DB support)
 sonarr_config = get_sonarr_config()
@@ -97,8 +119,10 @@ _AUTH_EXEMPT_ENDPOINTS = {
     'login',
     'logout',
     'static',
+    'health',
     # Sonarr + legacy Tautulli webhooks (Blueprint endpoints)
     'sonarr_webhooks.process_sonarr_webhook',
+    'sonarr_webhooks.process_instance_sonarr_webhook',
     'sonarr_webhooks.handle_server_webhook',
     # Radarr webhook
     'radarr_webhooks.process_radarr_webhook',
@@ -108,6 +132,7 @@ _AUTH_EXEMPT_ENDPOINTS = {
     'seerr_integration.seerr_webhook',
     'plex_integration.webhook',
     'tautulli_integration.tautulli_webhook',
+    'sonos_integration.notify',
 }
 
 
@@ -225,40 +250,47 @@ def get_smart_url_for_link(link, req):
 
 
 # ---------------------------------------------------------------------------
-# Container liveness filter (cached 30 s)
+# Container liveness filter - served from the Docker event-stream map when
+# it's live, else a running-only listing cached 30 s across workers
 # ---------------------------------------------------------------------------
-_container_cache: dict = {'data': None, 'ts': 0.0}
 _CONTAINER_CACHE_TTL = 30
+_container_cache = shared_state.SharedCache('containers', ttl=_CONTAINER_CACHE_TTL)
 
 
 def get_running_containers():
     """Return (running_names: set[str], running_ports: set[int]) or (None, None) if Docker unavailable."""
-    import time
-    global _container_cache
-    now = time.time()
-    if _container_cache['data'] is not None and now - _container_cache['ts'] < _CONTAINER_CACHE_TTL:
-        return _container_cache['data']
     try:
-        from integrations.docker import _docker_get
-        from settings_db import get_service as _gs
-        docker_svc = _gs('docker', 'default')
-        if not docker_svc:
+        from integrations.docker import container_monitor
+        container_monitor.ensure_started()
+        if container_monitor.is_live():
+            return _summarize_running(container_monitor.containers(running_only=True))
+    except Exception as e:
+        app.logger.debug(f'Docker event monitor unavailable: {e}')
+    return _container_cache.get(_fetch_running_containers)
+
+
+def _summarize_running(containers):
+    running_names, running_ports = set(), set()
+    for c in containers:
+        for n in c.get('Names', []):
+            running_names.add(n.lstrip('/').lower())
+        for p in c.get('Ports', []):
+            if p.get('PublicPort'):
+                running_ports.add(p['PublicPort'])
+    return running_names, running_ports
+
+
+def _fetch_running_containers():
+    try:
+        from integrations.docker import _docker_get, _configured_docker_host
+        host = _configured_docker_host()
+        if not host:
             raise RuntimeError('Docker not configured')
-        cfg = docker_svc.get('config') or {}
-        host = cfg.get('docker_host') or docker_svc.get('url') or 'unix:///var/run/docker.sock'
         containers = _docker_get(host, '/containers/json')  # no all=true → running only
-        running_names, running_ports = set(), set()
-        for c in containers:
-            for n in c.get('Names', []):
-                running_names.add(n.lstrip('/').lower())
-            for p in c.get('Ports', []):
-                if p.get('PublicPort'):
-                    running_ports.add(p['PublicPort'])
-        result = (running_names, running_ports)
+        result = _summarize_running(containers)
     except Exception as e:
         app.logger.debug(f'Container liveness check unavailable: {e}')
         result = (None, None)
-    _container_cache = {'data': result, 'ts': now}
     return result
 
 
@@ -965,6 +997,50 @@ def iframe_view(service_id):
     return render_template('iframe_view.html', service={**service, 'url': display_url})
 
 
+@app.route('/api/sonarr-instances', methods=['GET', 'POST'])
+def sonarr_instances_api():
+    """Sonarr instances (see sonarr_instances.py). GET lists them with their
+    webhook path and managed series count; POST {name, url, api_key} adds or
+    updates a named instance - the default one is set up on the Setup page."""
+    if request.method == 'GET':
+        instances = []
+        for name in sonarr_instances.list_instances():
+            sonarr_config = get_sonarr_config(name)
+            config = load_config() if name == sonarr_instances.DEFAULT else sonarr_instances.load_instance_config(name)
+            instances.append({
+                'name': name,
+                'url': sonarr_config.get('url'),
+                'configured': bool(sonarr_config.get('url') and sonarr_config.get('api_key')),
+                'webhook_path': f"/sonarr-webhook/{name}",
+                'series_managed': sum(len(rule.get('series', {})) for rule in config.get('rules', {}).values()),
+            })
+        return jsonify({'status': 'success', 'instances': instances})
+
+    data = request.json or {}
+    name = (data.get('name') or '').strip().lower()
+    url = normalize_url(data.get('url'))
+    api_key = (data.get('api_key') or '').strip()
+    if not sonarr_instances.valid_name(name) or name == sonarr_instances.DEFAULT:
+        return jsonify({'status': 'error',
+                        'message': "Name must be lowercase letters, digits, '-' or '_' (and not 'default')"}), 400
+    if not url or not api_key:
+        return jsonify({'status': 'error', 'message': 'URL and API key required'}), 400
+    save_service('sonarr', name, url, api_key)
+    sonarr_instances.ensure_instance_config(name)
+    return jsonify({'status': 'success', 'message': f"Sonarr instance '{name}' saved",
+                    'webhook_path': f"/sonarr-webhook/{name}"})
+
+
+@app.route('/api/sonarr-instances/<name>', methods=['DELETE'])
+def delete_sonarr_instance(name):
+    """Remove a named Sonarr instance. Its config file is kept, so adding it
+    again restores its rules and series."""
+    if name == sonarr_instances.DEFAULT:
+        return jsonify({'status': 'error', 'message': 'The default instance is managed on the Setup page'}), 400
+    delete_service('sonarr', name)
+    return jsonify({'status': 'success', 'message': f"Sonarr instance '{name}' removed"})
+
+
 @app.route('/api/services-sidebar')
 def services_sidebar():
     """Get all configured integrations for sidebar display"""
@@ -1121,12 +1197,12 @@ def delete_quick_link_route(link_id):
 @app.route('/api/invalidate-container-cache', methods=['POST'])
 def invalidate_container_cache():
     """Force next sidebar fetch to query Docker fresh (called after container start/stop)."""
-    global _container_cache
-    _container_cache['ts'] = 0.0
+    _container_cache.invalidate()
     return jsonify({'status': 'ok'})
 
-# Configuration management
-config_path = os.path.join(app.root_path, 'config', 'config.json')
+# Configuration management - config of the Sonarr instance this process is
+# bound to (config/config.json for the default one, see sonarr_instances.py)
+config_path = sonarr_instances.config_path()
 
 def get_tmdb_endpoint(endpoint, params=None):
     """Make a request to any TMDB endpoint with the given parameters."""
@@ -1188,8 +1264,13 @@ def get_tmdb_poster_path(tmdb_id):
         app.logger.error(f"Error fetching TMDB poster for ID {tmdb_id}: {e}")
         return None
     
-def get_sonarr_stats():
-    """Get comprehensive Sonarr statistics using existing sonarr_utils patterns."""
+def _build_sonarr_stats():
+    """Get comprehensive Sonarr statistics using existing sonarr_utils patterns.
+
+    The four stat groups are fetched concurrently; one that fails is left as
+    None without affecting the others."""
+    from concurrent.futures import ThreadPoolExecutor
+
     try:
         sonarr_preferences = sonarr_utils.load_preferences()
         headers = {
@@ -1198,29 +1279,21 @@ def get_sonarr_stats():
         }
         sonarr_url = sonarr_preferences['SONARR_URL']
         
-        stats = {
-            'disk_stats': None,
-            'queue_stats': None,
-            'missing_stats': None,
-            'recent_stats': None
-        }
-        
         # Get disk usage (reuse existing media_processor function)
-        try:
+        def _disk_stats():
             from media_processor import get_sonarr_disk_space
             disk_info = get_sonarr_disk_space()
             if disk_info:
-                stats['disk_stats'] = {
+                return {
                     'used_gb': round(disk_info['total_space_gb'] - disk_info['free_space_gb'], 1),
                     'free_gb': disk_info['free_space_gb'],
                     'total_gb': disk_info['total_space_gb'],
                     'usage_percent': round(((disk_info['total_space_gb'] - disk_info['free_space_gb']) / disk_info['total_space_gb']) * 100, 1)
                 }
-        except Exception as e:
-            app.logger.warning(f"Could not get disk stats: {str(e)}")
+            return None
         
         # Get queue statistics
-        try:
+        def _queue_stats():
             response = http.get(f"{sonarr_url}/api/v3/queue", headers=headers, timeout=5)
             if response.ok:
                 queue_data = response.json()
@@ -1229,28 +1302,25 @@ def get_sonarr_stats():
                 downloading = len([r for r in records if r.get('status') == 'downloading'])
                 queued = len([r for r in records if r.get('status') in ['queued', 'delay']])
                 
-                stats['queue_stats'] = {
+                return {
                     'downloading': downloading,
                     'queued': queued,
                     'total': len(records)
                 }
-        except Exception as e:
-            app.logger.warning(f"Could not get queue stats: {str(e)}")
+            return None
         
         # Get missing episodes count
-        try:
+        def _missing_stats():
             response = http.get(f"{sonarr_url}/api/v3/wanted/missing", headers=headers, timeout=5)
             if response.ok:
                 missing_data = response.json()
-                stats['missing_stats'] = {
+                return {
                     'count': missing_data.get('totalRecords', 0)
                 }
-        except Exception as e:
-            app.logger.warning(f"Could not get missing stats: {str(e)}")
+            return None
         
         # Get recent activity (imports from today)
-        try:
-            from datetime import datetime, timezone
+        def _recent_stats():
             today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
             
             response = http.get(
@@ -1271,11 +1341,26 @@ def get_sonarr_stats():
                         if record_date == today:
                             imported_today += 1
                 
-                stats['recent_stats'] = {
+                return {
                     'imported_today': imported_today
                 }
-        except Exception as e:
-            app.logger.warning(f"Could not get recent stats: {str(e)}")
+            return None
+        
+        fetchers = {
+            'disk_stats': _disk_stats,
+            'queue_stats': _queue_stats,
+            'missing_stats': _missing_stats,
+            'recent_stats': _recent_stats,
+        }
+        stats = {}
+        with ThreadPoolExecutor(max_workers=len(fetchers)) as executor:
+            futures = {key: executor.submit(fn) for key, fn in fetchers.items()}
+            for key, future in futures.items():
+                try:
+                    stats[key] = future.result()
+                except Exception as e:
+                    app.logger.warning(f"Could not get {key.replace('_', ' ')}: {str(e)}")
+                    stats[key] = None
         
         return stats
         
@@ -1287,13 +1372,31 @@ def get_sonarr_stats():
             'missing_stats': None,
             'recent_stats': None
         }
+
+
+# Served from a background-refreshed snapshot (see dashboard_data.py) so the
+# Series page doesn't wait on four Sonarr calls.
+dashboard_data.register('sonarr_stats', _build_sonarr_stats, interval=60)
+
+
+def get_sonarr_stats():
+    """Latest Sonarr statistics snapshot."""
+    stats, _ = dashboard_data.get('sonarr_stats')
+    return stats
 # Scheduler
+# Cleanup runs as a media_processor.py subprocess; a run still going after
+# this long is treated as hung and terminated.
+_CLEANUP_TIMEOUT_SECONDS = 4 * 3600
+_STARTUP_DELAY_SECONDS = 300  # let the app settle before the first cleanup
+
+
 class OCDarrScheduler:
+    """Registers Episeerr's core periodic jobs (cleanup, aired check) with the
+    shared job_scheduler and keeps the status shape the Scheduler page and
+    /api/scheduler-status already expect."""
+
     def __init__(self):
-        self.cleanup_thread = None
         self.running = False
-        self.last_cleanup = 0
-        self.last_aired_check = 0
         self.update_interval_from_settings()
 
     def update_interval_from_settings(self):
@@ -1305,101 +1408,175 @@ class OCDarrScheduler:
         except:
             self.cleanup_interval_hours = 6  # Fallback
 
+    def _cleanup_interval_seconds(self):
+        # Re-read every tick so a changed interval applies without a restart
+        self.update_interval_from_settings()
+        return self.cleanup_interval_hours * 3600
+
     def start_scheduler(self):
         if self.running:
             return
-        self.running = True
-        self.cleanup_thread = threading.Thread(target=self._scheduler_loop, daemon=True)
-        self.cleanup_thread.start()
 
-        # One-shot startup checks - no periodic interval for either.
+        def _watch_reconcile_interval_seconds():
+            import reconcile
+            return reconcile.interval_seconds()
+
+        job_scheduler.register(
+            'cleanup', self._run_cleanup,
+            interval=self._cleanup_interval_seconds,
+            jitter=60, timeout=_CLEANUP_TIMEOUT_SECONDS,
+            initial_delay=_STARTUP_DELAY_SECONDS,
+            description='Unified cleanup (grace, keep, dormant, movies)',
+        )
+        job_scheduler.register(
+            'rule_tag_sync', _run_rule_tag_sync,
+            interval=tag_sync.retry_interval_seconds, timeout=3600,
+            initial_delay=_STARTUP_DELAY_SECONDS,
+            description='Apply queued rule tag changes to Sonarr (series editor)',
+        )
+        job_scheduler.register(
+            'aired_check', lambda ctx: check_aired_not_downloaded(),
+            interval=24 * 3600, jitter=300, timeout=600,
+            initial_delay=_STARTUP_DELAY_SECONDS,
+            description='Aired-but-not-downloaded notification check',
+        )
+        job_scheduler.register(
+            'watch_reconcile', _run_watch_reconcile,
+            interval=_watch_reconcile_interval_seconds,
+            jitter=120, timeout=1800,
+            description='Missed watch-event sweep (Plex/Jellyfin/Emby/Tautulli history)',
+        )
+        job_scheduler.register(
+            'rule_stats_refresh', _run_rule_stats_refresh,
+            interval=rule_stats.FULL_REFRESH_SECONDS,
+            jitter=300, timeout=600, initial_delay=60,
+            description='Full rebuild of the per-rule statistics from Sonarr',
+        )
+        job_scheduler.register(
+            'disk_forecast', _run_disk_forecast,
+            interval=disk_forecast.SAMPLE_MINUTES * 60,
+            jitter=30, timeout=120, initial_delay=90,
+            description='Free-space sample and forecast; brings cleanup forward before the storage gate is crossed',
+        )
+        # Startup checks, run by the leader worker only, right after it
+        # starts the job runner.
         def _startup_reconcile_check():
             try:
                 import reconcile
-                # Missed watch events: inferred from history, so queued for
-                # human review (reconcile_enabled/automation_held gate this
-                # internally).
-                reconcile.check_for_missed_watch_events()
                 # episeerr_delay-tagged series: unambiguous "webhook never
                 # ran" signal, safe to act on directly (automation_held
-                # still gates this internally).
+                # still gates this internally). One-shot, no interval.
                 reconcile.check_delay_tagged_series()
+                # Missed watch events: inferred from history, so queued for
+                # human review (reconcile_enabled/automation_held gate this
+                # internally). Startup run of the periodic job, so the next
+                # one is an interval from now.
+                job_scheduler.run_now('watch_reconcile', trigger='startup')
             except Exception as e:
                 print(f"Startup reconcile check error: {e}")
-        threading.Thread(target=_startup_reconcile_check, daemon=True).start()
+
+        # Sonarr/Radarr warm-up goes first, in the same background thread,
+        # so startup doesn't hit Sonarr from two places at once.
+        def _leader_startup():
+            warm_up_episeerr()
+            _startup_reconcile_check()
+
+        def _on_leader():
+            import notification_queue
+            notification_queue.start_sender()
+            threading.Thread(target=_leader_startup, daemon=True, name='episeerr-warmup').start()
+
+        self.running = job_scheduler.start(on_leader=_on_leader)
 
         print(f"✓ Global storage gate scheduler started - cleanup every {self.cleanup_interval_hours} hours")
-    
-    def _scheduler_loop(self):
-        time.sleep(300)  # Wait 5 minutes after startup
-        while self.running:
-            try:
-                # Update interval from settings each loop
-                self.update_interval_from_settings()
-                
-                current_time = time.time()
-                hours_since_last = (current_time - self.last_cleanup) / 3600
-                
-                if hours_since_last >= self.cleanup_interval_hours:
-                    print("⏰ Starting scheduled global storage gate cleanup...")
-                    self._run_cleanup()
-                    self.last_cleanup = current_time
-
-                # Daily aired-but-not-downloaded notification check
-                hours_since_aired = (current_time - self.last_aired_check) / 3600
-                if hours_since_aired >= 24:
-                    try:
-                        check_aired_not_downloaded()
-                    except Exception as aired_err:
-                        print(f"Aired not downloaded check error: {aired_err}")
-                    self.last_aired_check = current_time
 
-                time.sleep(600)  # Check every 10 minutes
-            except Exception as e:
-                print(f"Scheduler error: {str(e)}")
-                time.sleep(300)
-    
-    def _run_cleanup(self):
-        try:
-            import media_processor
-            # Use subprocess to run the unified cleanup
-            result = subprocess.run(["python3", os.path.join(os.getcwd(), "media_processor.py")], capture_output=True, text=True)
-            
-            # FIXED: Check return code instead of stderr
-            if result.returncode != 0:
-                print(f"Cleanup failed with return code {result.returncode}")
-                if result.stderr:
-                    print(f"Cleanup errors: {result.stderr}")
-            # Remove the automatic stderr logging
-            
-            print("✓ Scheduled cleanup completed (unified 3-function cleanup)")
-            return result
-            
-        except Exception as e:
-            print(f"Cleanup failed: {str(e)}")
-            return None
+    def _run_cleanup(self, ctx=None):
+        """Run media_processor.py in cleanup mode - one subprocess per Sonarr
+        instance, in parallel (see sonarr_instances.py) - streaming log lines
+        into the job's progress message. Cancelling the job terminates the
+        subprocesses."""
+        instances = sonarr_instances.list_instances()
+        if len(instances) == 1:
+            returncode, tail = self._run_instance_cleanup(instances[0], ctx, prefix='')
+            results = {instances[0]: (returncode, tail)}
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            workers = sonarr_instances.CLEANUP_PARALLEL or len(instances)
+            with ThreadPoolExecutor(max_workers=min(workers, len(instances)),
+                                    thread_name_prefix='cleanup') as pool:
+                futures = {name: pool.submit(self._run_instance_cleanup, name, ctx, prefix=f"[{name}] ")
+                           for name in instances}
+                results = {name: future.result() for name, future in futures.items()}
+
+        if ctx is not None and ctx.cancelled:
+            print(f"Cleanup stopped ({ctx.cancel_reason})")
+            return f"Cleanup {ctx.cancel_reason}"
+
+        # Check return code instead of stderr
+        failed = [name for name, (returncode, _) in results.items() if returncode != 0]
+        for name in failed:
+            returncode, tail = results[name]
+            print(f"Cleanup for Sonarr instance '{name}' failed with return code {returncode}")
+            if tail:
+                print("Cleanup output (last lines):\n" + "\n".join(tail))
+        if failed:
+            raise RuntimeError(f"media_processor.py failed for: {', '.join(failed)}")
+
+        print("✓ Scheduled cleanup completed (unified 3-function cleanup)")
+        if len(instances) > 1:
+            return f"Cleanup completed for {len(instances)} Sonarr instances"
+        return "Cleanup completed"
+
+    def _run_instance_cleanup(self, instance, ctx, prefix):
+        """One instance's cleanup subprocess. Returns (return code, last lines)."""
+        if ctx is not None and ctx.cancelled:
+            return 0, []
+        proc = sonarr_instances.spawn_processor(
+            instance, [], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        if ctx is not None:
+            ctx.on_cancel(proc.terminate)
+
+        tail = []
+        for line in proc.stdout:
+            line = line.rstrip()
+            if not line:
+                continue
+            tail = (tail + [line])[-20:]
+            if ctx is not None:
+                ctx.progress(message=prefix + line)
+        return proc.wait(), tail
 
     def force_cleanup(self):
-        cleanup_thread = threading.Thread(target=self._run_cleanup, daemon=True)
-        cleanup_thread.start()
+        run_id = job_scheduler.run_now('cleanup', trigger='manual')
+        if run_id is None:
+            return "Cleanup already running"
         return "Unified cleanup started"
-    
+
     def get_status(self):
         if not self.running:
             return {"status": "stopped", "next_cleanup": None}
-        
-        if self.last_cleanup == 0:
-            next_cleanup = "5 minutes after startup"
+
+        job = job_scheduler.get_job_status('cleanup') or {}
+        last_run = job.get('last_run')
+        last_cleanup = last_run['started_at'] if last_run else 0
+        next_due = job.get('next_run')
+
+        if job.get('running'):
+            next_cleanup = "Running now"
+        elif next_due:
+            next_cleanup = datetime.fromtimestamp(next_due).strftime("%Y-%m-%d %H:%M:%S")
         else:
-            next_time = self.last_cleanup + (self.cleanup_interval_hours * 3600)
-            next_cleanup = datetime.fromtimestamp(next_time).strftime("%Y-%m-%d %H:%M:%S")
-            
+            next_cleanup = "Unknown"
+
         return {
             "status": "running",
             "type": "global_storage_gate",
             "interval_hours": self.cleanup_interval_hours,
-            "last_cleanup": datetime.fromtimestamp(self.last_cleanup).strftime("%Y-%m-%d %H:%M:%S") if self.last_cleanup else "Never",
-            "next_cleanup": next_cleanup
+            "last_cleanup": datetime.fromtimestamp(last_cleanup).strftime("%Y-%m-%d %H:%M:%S") if last_cleanup else "Never",
+            "last_cleanup_status": last_run['status'] if last_run else None,
+            "next_cleanup": next_cleanup,
+            "cleanup_running": bool(job.get('running')),
         }
 
 # Cleanup Logging
@@ -1451,16 +1628,22 @@ Add these routes to your Flask application to support the sidebar navigation.
 
 @app.route('/rules')
 def rules_page():
-    """Rules management page with series assignment interface."""
-    config = load_config()
+    """Rules management page with series assignment interface, for the
+    Sonarr instance picked with ?instance= (default otherwise)."""
+    instance = _rules_instance()
+    if instance is None:
+        return redirect(url_for('rules_page'))
+    config = _load_rules_config(instance)
     try:
-        all_series = get_sonarr_series()
+        all_series = get_sonarr_series(instance)
     except requests.exceptions.ConnectionError:
         all_series = []
     
     # Get SONARR_URL for template links
-    sonarr_preferences = sonarr_utils.load_preferences()
-    sonarr_url = sonarr_preferences['SONARR_URL']
+    if sonarr_instances.is_default(instance):
+        sonarr_url = sonarr_utils.load_preferences()['SONARR_URL']
+    else:
+        sonarr_url = normalize_url(get_sonarr_config(instance)['url'])
     
     # Map series to their assigned rules
     rules_mapping = {}
@@ -1477,23 +1660,34 @@ def rules_page():
     return render_template('rules.html', 
                          config=config,
                          all_series=all_series,
-                         SONARR_URL=sonarr_url)
+                         SONARR_URL=sonarr_url,
+                         instance=instance,
+                         instance_arg=_instance_arg(instance),
+                         instances=sonarr_instances.list_instances())
 # Add this route to provide rules list for the sidebar
 @app.route('/api/rules-list')
 def api_rules_list():
-    """Return formatted rules data for sidebar display"""
+    """Return formatted rules data for sidebar display (?instance= for a
+    Sonarr instance other than the default one - no disk stats for those)"""
+    instance = _rules_instance()
+    if instance is None:
+        return _unknown_instance_response()
     try:
-        config_data = load_config()
+        config_data = _load_rules_config(instance)
         default_rule = config_data.get('default_rule')
         rules = config_data.get('rules', {})
+        if sonarr_instances.is_default(instance):
+            _ensure_rule_stats()
+            stats = rule_stats.get_rule_stats()
+        else:
+            stats = {}
         
         rules_list = []
         
         # Process each rule
         for rule_name, rule_details in sorted(rules.items()):
             is_default = (rule_name == default_rule)
-            series_dict = rule_details.get('series', {})
-            series_count = len(series_dict)
+            rule_stat = stats.get(rule_name, {})
             
             # Create display name (title case with spaces)
             display_name = rule_name.replace('_', ' ').title()
@@ -1510,7 +1704,12 @@ def api_rules_list():
                 'name': rule_name,
                 'display_name': display_name,
                 'description': rule_details.get('description', ''),
-                'series_count': series_count,
+                'series_count': rule_stat.get('series_count', len(rule_details.get('series', {}))),
+                'episodes_on_disk': rule_stat.get('episodes_on_disk', 0),
+                'size_on_disk': rule_stat.get('bytes', 0),
+                'last_activity': rule_stat.get('last_activity'),
+                'past_grace': rule_stat.get('past_grace', 0),
+                'past_dormant': rule_stat.get('past_dormant', 0),
                 'is_default': is_default,
                 'keep_last_n_episodes': keep_count if keep_type == 'episodes' else None,
                 'keep_first_n_unwatched': get_count if get_type == 'episodes' else None,
@@ -1551,20 +1750,15 @@ def api_series_data_enhanced():
             return jsonify({'success': False, 'error': 'Failed to fetch from Sonarr'}), 500
         
         series_data = response.json()
-        config_data = load_config()
+        _ensure_rule_stats()
+        assignments = rule_stats.assignments()
         
         # Enhance each series with rule assignment and poster URL
         for series in series_data:
             series_id = series.get('id')
             
-            # Find assigned rule
-            assigned_rule = None
-            for rule_name, rule_details in config_data.get('rules', {}).items():
-                if series_id in rule_details.get('series', []):
-                    assigned_rule = rule_name
-                    break
-            
-            series['assigned_rule'] = assigned_rule
+            assigned_rule = assignments.get(str(series_id))
+            series['assigned_rule'] = None if assigned_rule in (None, 'None') else assigned_rule
             
             # Add poster URL - Sonarr provides this in images array
             # but we'll construct the direct URL for easier access
@@ -1590,6 +1784,8 @@ def api_sidebar_stats():
     """Return quick stats for sidebar badges"""
     try:
         config_data = load_config()
+        _ensure_rule_stats()
+        rule_stat = rule_stats.get_rule_stats()
         
         stats = {
             'total_rules': len(config_data.get('rules', {})),
@@ -1597,10 +1793,9 @@ def api_sidebar_stats():
             'rules': {}
         }
         
-        # Count series per rule
         for rule_name, rule_details in config_data.get('rules', {}).items():
             stats['rules'][rule_name] = {
-                'series_count': len(rule_details.get('series', [])),
+                'series_count': rule_stat.get(rule_name, {}).get('series_count', len(rule_details.get('series', {}))),
                 'is_default': (rule_name == config_data.get('default_rule'))
             }
         
@@ -2169,23 +2364,48 @@ def reject_pending_movie_deletions():
 # Add these routes to episeerr.py
 @app.route('/api/recent-cleanup-activity')
 def recent_cleanup_activity():
-    """Get recent cleanup activity for dashboard."""
+    """Get recent cleanup activity for dashboard (from the cleanup audit)."""
     try:
-        # Use the correct log path from environment or default
-        log_path = os.getenv('CLEANUP_LOG_PATH', '/app/logs/cleanup.log')
-        
-        if os.path.exists(log_path):
-            with open(log_path, 'r') as f:
-                lines = f.readlines()
-                # Get last 50 lines for context
-                recent_lines = lines[-50:] if len(lines) > 50 else lines
-                return jsonify({
-                    'success': True,
-                    'log_lines': [line.strip() for line in recent_lines]
-                })
-        return jsonify({'success': False, 'error': 'Log file not found'})
+        return jsonify({
+            'success': True,
+            'recentCleanups': [
+                {**row, 'timestamp': datetime.fromtimestamp(row['at']).strftime('%Y-%m-%d %H:%M')}
+                for row in cleanup_audit.recent(limit=50)
+            ]
+        })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
+
+
+def _audit_days():
+    return min(max(request.args.get('days', 30, type=int), 1), cleanup_audit.RETENTION_DAYS)
+
+
+@app.route('/api/cleanup-audit')
+def cleanup_audit_rows():
+    """Cleanup audit rows, newest first - filter with phase, rule, outcome, days, limit."""
+    try:
+        rows = cleanup_audit.recent(
+            limit=min(max(request.args.get('limit', 200, type=int), 1), 5000),
+            days=_audit_days(),
+            phase_name=request.args.get('phase'),
+            rule=request.args.get('rule'),
+            outcome=request.args.get('outcome'),
+        )
+        return jsonify({'success': True, 'rows': rows})
+    except Exception as e:
+        logger.error(f"Error reading cleanup audit: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/cleanup-audit/summary')
+def cleanup_audit_summary():
+    """Bytes freed per rule per day and deletions / durations per phase."""
+    try:
+        return jsonify({'success': True, **cleanup_audit.summary(_audit_days())})
+    except Exception as e:
+        logger.error(f"Error building cleanup audit summary: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
 ALLOWED_LOG_FILES = ['episeerr.log', 'cleanup.log', 'app.log']
 
 
@@ -2354,6 +2574,7 @@ def clear_old_logs():
 
 _config_cache = None
 _config_cache_time = 0
+_config_cache_mtime = None
 _CONFIG_CACHE_TTL = 30  # seconds
 
 def _invalidate_config_cache():
@@ -2361,11 +2582,21 @@ def _invalidate_config_cache():
     _config_cache = None
     _config_cache_time = 0
 
+def _config_file_mtime():
+    try:
+        return os.stat(config_path).st_mtime_ns
+    except OSError:
+        return None
+
 def load_config():
     """Load configuration with simplified migration."""
-    global _config_cache, _config_cache_time
+    global _config_cache, _config_cache_time, _config_cache_mtime
     now = time.time()
-    if _config_cache is not None and (now - _config_cache_time) < _CONFIG_CACHE_TTL:
+    # The file's mtime catches saves from other gunicorn workers and from
+    # media_processor.py subprocesses, which the in-process TTL alone misses
+    mtime = _config_file_mtime()
+    if (_config_cache is not None and (now - _config_cache_time) < _CONFIG_CACHE_TTL
+            and mtime == _config_cache_mtime):
         return _config_cache
     try:
         # REMOVED: Backup on every load (was causing spam)
@@ -2387,6 +2618,7 @@ def load_config():
 
         _config_cache = config
         _config_cache_time = time.time()
+        _config_cache_mtime = mtime
         return config
     except FileNotFoundError:
         default_config = {
@@ -2434,6 +2666,7 @@ def save_config(config):
             json.dump(config, file, indent=4)
         os.replace(tmp_path, config_path)
         app.logger.debug("Config saved successfully")
+        rule_stats.sync_config(config)
     except Exception as e:
         app.logger.error(f"Save failed: {str(e)}")
         raise
@@ -2478,11 +2711,11 @@ def check_aired_not_downloaded():
     """Query Sonarr calendar for the past 48 hours and notify about aired-but-not-downloaded episodes.
 
     Skips series with Sonarr status 'ended'. Only notifies once per episode
-    (tracked in /data/aired_notifications.json). Entries are auto-cleaned after 30 days.
+    (tracked in settings.db's aired_notifications). Entries are auto-cleaned after 30 days.
     """
     import media_processor
     from notification_storage import (
-        aired_notification_exists, store_aired_notification,
+        aired_notified, store_aired_notifications,
         cleanup_old_aired_notifications
     )
 
@@ -2522,19 +2755,14 @@ def check_aired_not_downloaded():
         app.logger.error(f"Failed to fetch Sonarr calendar for aired check: {e}")
         return
 
-    new_episodes = []
-    for ep in episodes:
-        if ep.get('hasFile', True):
-            continue
-        series_status = ep.get('series', {}).get('status', '').lower()
-        if series_status == 'ended':
-            continue
-        episode_id = ep.get('id')
-        if not episode_id:
-            continue
-        if aired_notification_exists(episode_id):
-            continue
-        new_episodes.append(ep)
+    candidates = [
+        ep for ep in episodes
+        if not ep.get('hasFile', True)
+        and ep.get('series', {}).get('status', '').lower() != 'ended'
+        and ep.get('id')
+    ]
+    already_notified = aired_notified([ep['id'] for ep in candidates])
+    new_episodes = [ep for ep in candidates if ep['id'] not in already_notified]
 
     if not new_episodes:
         app.logger.debug("No new aired-but-not-downloaded episodes to notify about")
@@ -2545,17 +2773,22 @@ def check_aired_not_downloaded():
     try:
         from notifications import send_notification
         send_notification('aired_not_downloaded', episodes=new_episodes)
-        for ep in new_episodes:
-            store_aired_notification(ep['id'])
+        store_aired_notifications([ep['id'] for ep in new_episodes])
         cleanup_old_aired_notifications()
     except Exception as e:
         app.logger.error(f"Failed to send aired-not-downloaded notification: {e}")
 
 
-def get_sonarr_series():
-    """Get series list from Sonarr, excluding series with 'watched' tag."""
+def get_sonarr_series(instance=None):
+    """Get series list from Sonarr (the named instance's, this process's by
+    default), excluding series with 'watched' tag."""
     try:
-        sonarr_preferences = sonarr_utils.load_preferences()
+        if instance and not sonarr_instances.is_default(instance):
+            instance_config = get_sonarr_config(instance)
+            sonarr_preferences = {'SONARR_URL': normalize_url(instance_config['url']),
+                                  'SONARR_API_KEY': instance_config['api_key']}
+        else:
+            sonarr_preferences = sonarr_utils.load_preferences()
         headers = {
             'X-Api-Key': sonarr_preferences['SONARR_API_KEY'],
             'Content-Type': 'application/json'
@@ -2661,11 +2894,13 @@ def series_management():  # Changed from index to avoid confusion
 def get_sonarr_stats_api():
     """Get Sonarr statistics via API."""
     try:
-        stats = get_sonarr_stats()
-        return jsonify({
+        stats, age = dashboard_data.get('sonarr_stats')
+        response = jsonify({
             'status': 'success',
             'stats': stats
         })
+        response.headers['Age'] = str(int(age))
+        return response
     except Exception as e:
         app.logger.error(f"Error in sonarr stats API: {str(e)}")
         return jsonify({
@@ -3086,6 +3321,7 @@ def sonarr_prepare_series():
             'sonarr_lookup': series_meta,
         }
         add_pending_request(pending)
+        selection_prefetch.prefetch_async(tmdb_id)
         app.logger.info(f"Prepared '{title}' (tmdb:{tmdb_id}) for selection — Sonarr add deferred")
         return jsonify({'success': True, 'tmdb_id': tmdb_id})
 
@@ -3722,14 +3958,11 @@ def unified_search():
 
     def _search_containers(query):
         try:
-            from integrations.docker import _docker_get
-            from settings_db import get_service as _gs
-            docker_svc = _gs('docker', 'default')
-            if not docker_svc:
+            from integrations.docker import list_containers, _configured_docker_host
+            host = _configured_docker_host()
+            if not host:
                 return []
-            cfg = docker_svc.get('config') or {}
-            host = cfg.get('docker_host') or docker_svc.get('url') or 'unix:///var/run/docker.sock'
-            raw = _docker_get(host, '/containers/json', {'all': 'true'})
+            raw = list_containers(host)
             out = []
             for c in raw:
                 name = (c.get('Names') or [''])[0].lstrip('/')
@@ -4169,6 +4402,61 @@ def _set_default_rule_on_edit(config, rule_name, want_default):
             config.pop('default_rule', None)
 
 
+def _requested_instance():
+    return (request.args.get('instance') or request.form.get('instance')
+            or (request.get_json(silent=True) or {}).get('instance') or sonarr_instances.DEFAULT)
+
+
+def _rules_instance():
+    """The Sonarr instance a rules page/API request is for: ?instance=<name>
+    (or 'instance' in the form / JSON body), 'default' when not given. None
+    if it names no enabled instance."""
+    name = _requested_instance()
+    return name if name in sonarr_instances.list_instances() else None
+
+
+def _instance_arg(instance):
+    """instance as a url_for() argument - left out for the default one."""
+    return None if sonarr_instances.is_default(instance) else instance
+
+
+def _load_rules_config(instance):
+    if sonarr_instances.is_default(instance):
+        return load_config()
+    sonarr_instances.ensure_instance_config(instance)
+    return sonarr_instances.load_instance_config(instance)
+
+
+def _save_rules_config(config, instance):
+    if sonarr_instances.is_default(instance):
+        save_config(config)
+    else:
+        sonarr_instances.save_instance_config(instance, config)
+
+
+def _ensure_rule_tag_for(instance, rule_name):
+    """_ensure_rule_tag against the instance's Sonarr - in a subprocess bound
+    to it for any instance but the default one."""
+    if sonarr_instances.is_default(instance):
+        _ensure_rule_tag(rule_name)
+    else:
+        sonarr_instances.dispatch_rule_tags(instance, {'ensure_rules': [rule_name]})
+
+
+def _cleanup_rule_tag_for(instance, rule_name):
+    """_cleanup_rule_tag_from_sonarr against the instance's Sonarr. None for
+    an instance other than the default one - its subprocess cleans up in the
+    background."""
+    if sonarr_instances.is_default(instance):
+        return _cleanup_rule_tag_from_sonarr(rule_name)
+    sonarr_instances.dispatch_rule_tags(instance, {'remove_rules': [rule_name]})
+    return None
+
+
+def _unknown_instance_response():
+    return jsonify({'success': False, 'error': f"Unknown Sonarr instance '{_requested_instance()}'"}), 404
+
+
 def _ensure_rule_tag(rule_name):
     """Create/verify the episeerr_<rule_name> Sonarr tag exists."""
     try:
@@ -4207,34 +4495,14 @@ def _cleanup_rule_tag_from_sonarr(rule_name):
         return tag_removed
 
     try:
-        headers = episeerr_utils.get_sonarr_headers()
-        series_response = http.get(f"{SONARR_URL}/api/v3/series", headers=headers)
-        if series_response.ok:
-            all_series = series_response.json()
-            removed_from_count = 0
-
-            for series in all_series:
-                tags = series.get('tags', [])
-                if tag_id in tags:
-                    tags.remove(tag_id)
-                    series['tags'] = tags
-                    update_resp = http.put(
-                        f"{SONARR_URL}/api/v3/series/{series['id']}",
-                        headers=headers,
-                        json=series
-                    )
-                    if update_resp.ok:
-                        removed_from_count += 1
-                        tag_removed = True
-                    else:
-                        app.logger.warning(f"Failed to remove tag from series {series['id']}")
-
-            if removed_from_count > 0:
-                app.logger.info(f"Removed deleted rule tag '{rule_name}' from {removed_from_count} series")
-            else:
-                app.logger.debug(f"No series had the tag for deleted rule '{rule_name}'")
+        removed_from_count = tag_sync.remove_tag_from_all_series(tag_id)
+        if removed_from_count > 0:
+            tag_removed = True
+            app.logger.info(f"Removed deleted rule tag '{rule_name}' from {removed_from_count} series")
         else:
-            app.logger.error("Failed to fetch series list for tag cleanup")
+            app.logger.debug(f"No series had the tag for deleted rule '{rule_name}'")
+    except requests.exceptions.HTTPError:
+        app.logger.error("Failed to fetch series list for tag cleanup")
     except Exception as e:
         app.logger.warning(f"Could not clean up tag for deleted rule '{rule_name}': {str(e)}")
 
@@ -4286,9 +4554,12 @@ _RULE_FIELD_NAMES = (
 
 @app.route('/create-rule', methods=['GET', 'POST'])
 def create_rule():
-    """Create a new rule."""
+    """Create a new rule (for the ?instance= Sonarr instance, default otherwise)."""
+    instance = _rules_instance()
+    if instance is None:
+        return redirect(url_for('rules_page'))
     if request.method == 'POST':
-        config = load_config()
+        config = _load_rules_config(instance)
         rule_name = request.form.get('rule_name', '').strip()
         if not rule_name:
             return redirect(url_for('index', message="Rule name is required"))
@@ -4304,18 +4575,21 @@ def create_rule():
         config['rules'][rule_name] = normalized
         _set_default_rule_on_create(config, rule_name, 'set_as_default' in request.form)
 
-        save_config(config)
-        _ensure_rule_tag(rule_name)
+        _save_rules_config(config, instance)
+        _ensure_rule_tag_for(instance, rule_name)
 
         # Always redirect to rules page after creating a rule
-        return redirect(url_for('rules_page'))
+        return redirect(url_for('rules_page', instance=_instance_arg(instance)))
     return render_template('create_rule.html')
 
 
 @app.route('/edit-rule/<rule_name>', methods=['GET', 'POST'])
 def edit_rule(rule_name):
-    """Edit an existing rule."""
-    config = load_config()
+    """Edit an existing rule (of the ?instance= Sonarr instance, default otherwise)."""
+    instance = _rules_instance()
+    if instance is None:
+        return redirect(url_for('rules_page'))
+    config = _load_rules_config(instance)
     app.logger.info(f"Edit rule request for: '{rule_name}'")
     app.logger.info(f"Available rules: {list(config['rules'].keys())}")
     if rule_name not in config['rules']:
@@ -4333,10 +4607,10 @@ def edit_rule(rule_name):
         existing.update(normalized)
         _set_default_rule_on_edit(config, rule_name, 'set_as_default' in request.form)
 
-        save_config(config)
-        _ensure_rule_tag(rule_name)
+        _save_rules_config(config, instance)
+        _ensure_rule_tag_for(instance, rule_name)
 
-        return redirect(url_for('rules_page'))
+        return redirect(url_for('rules_page', instance=_instance_arg(instance)))
 
     rule = config['rules'][rule_name]
     return render_template('edit_rule.html', rule_name=rule_name, rule=rule, config=config)
@@ -4345,22 +4619,28 @@ def edit_rule(rule_name):
 @app.route('/delete-rule/<rule_name>', methods=['POST'])
 def delete_rule(rule_name):
     """Delete a rule and clean up its tag from Sonarr and delay profile."""
-    config = load_config()
+    instance = _rules_instance()
+    if instance is None:
+        return redirect(url_for('rules_page'))
+    config = _load_rules_config(instance)
     error = _check_rule_deletable(config, rule_name)
     if error:
         return redirect(url_for('index', message=error))
 
     del config['rules'][rule_name]
-    save_config(config)
-    _cleanup_rule_tag_from_sonarr(rule_name)
+    _save_rules_config(config, instance)
+    _cleanup_rule_tag_for(instance, rule_name)
 
-    return redirect(url_for('rules_page'))
+    return redirect(url_for('rules_page', instance=_instance_arg(instance)))
 
 
 @app.route('/api/rules/<rule_name>', methods=['GET'])
 def api_get_rule(rule_name):
     """JSON: fetch a single rule's full editable field set (for a native client's edit screen)."""
-    config = load_config()
+    instance = _rules_instance()
+    if instance is None:
+        return _unknown_instance_response()
+    config = _load_rules_config(instance)
     if rule_name not in config['rules']:
         return jsonify({'success': False, 'error': f"Rule '{rule_name}' not found"}), 404
 
@@ -4374,8 +4654,11 @@ def api_get_rule(rule_name):
 
 @app.route('/api/rules', methods=['POST'])
 def api_create_rule():
-    """JSON: create a rule. Body: {rule_name, set_as_default, ...rule fields}."""
-    config = load_config()
+    """JSON: create a rule. Body: {rule_name, set_as_default, instance, ...rule fields}."""
+    instance = _rules_instance()
+    if instance is None:
+        return _unknown_instance_response()
+    config = _load_rules_config(instance)
     data = request.get_json(silent=True) or {}
     rule_name = str(data.get('rule_name', '')).strip()
     if not rule_name:
@@ -4391,8 +4674,8 @@ def api_create_rule():
     config['rules'][rule_name] = normalized
     _set_default_rule_on_create(config, rule_name, bool(data.get('set_as_default', False)))
 
-    save_config(config)
-    _ensure_rule_tag(rule_name)
+    _save_rules_config(config, instance)
+    _ensure_rule_tag_for(instance, rule_name)
 
     payload = {field: normalized.get(field) for field in _RULE_FIELD_NAMES}
     payload['name'] = rule_name
@@ -4402,8 +4685,11 @@ def api_create_rule():
 
 @app.route('/api/rules/<rule_name>', methods=['PUT'])
 def api_edit_rule(rule_name):
-    """JSON: update a rule. Body: {set_as_default, ...rule fields}."""
-    config = load_config()
+    """JSON: update a rule. Body: {set_as_default, instance, ...rule fields}."""
+    instance = _rules_instance()
+    if instance is None:
+        return _unknown_instance_response()
+    config = _load_rules_config(instance)
     if rule_name not in config['rules']:
         return jsonify({'success': False, 'error': f"Rule '{rule_name}' not found"}), 404
 
@@ -4416,8 +4702,8 @@ def api_edit_rule(rule_name):
     existing.update(normalized)
     _set_default_rule_on_edit(config, rule_name, bool(data.get('set_as_default', False)))
 
-    save_config(config)
-    _ensure_rule_tag(rule_name)
+    _save_rules_config(config, instance)
+    _ensure_rule_tag_for(instance, rule_name)
 
     payload = {field: existing.get(field) for field in _RULE_FIELD_NAMES}
     payload['name'] = rule_name
@@ -4427,26 +4713,33 @@ def api_edit_rule(rule_name):
 
 @app.route('/api/rules/<rule_name>', methods=['DELETE'])
 def api_delete_rule(rule_name):
-    """JSON: delete a rule and clean up its Sonarr tag."""
-    config = load_config()
+    """JSON: delete a rule and clean up its Sonarr tag (tag_cleaned_up is
+    null for another instance than the default one - cleaned up in the
+    background)."""
+    instance = _rules_instance()
+    if instance is None:
+        return _unknown_instance_response()
+    config = _load_rules_config(instance)
     error = _check_rule_deletable(config, rule_name)
     if error:
         status = 404 if 'not found' in error else 400
         return jsonify({'success': False, 'error': error}), status
 
     del config['rules'][rule_name]
-    save_config(config)
-    tag_removed = _cleanup_rule_tag_from_sonarr(rule_name)
+    _save_rules_config(config, instance)
+    tag_removed = _cleanup_rule_tag_for(instance, rule_name)
 
     return jsonify({'success': True, 'tag_cleaned_up': tag_removed})
 
 
-def _assign_series_ids_to_rule(config, rule_name, series_ids):
+def _assign_series_ids_to_rule(config, rule_name, series_ids, instance=sonarr_instances.DEFAULT):
     """
-    Move the given Sonarr series IDs (as strings) into rule_name: preserves
-    per-series activity data across the move, processes always_have
-    (additive only), and syncs the episeerr_<rule> tag to Sonarr for each.
-    Returns (preserved_count, tag_sync_success, tag_sync_failed).
+    Move the given Sonarr series IDs (as strings) into rule_name, preserving
+    per-series activity data across the move. Sonarr tags and always_have
+    (additive only) are applied by the rule_tag_sync job in the background -
+    for another instance than the default one, by a subprocess bound to it.
+    Returns (preserved_count, run_id) - run_id is None when a run already in
+    progress will pick these series up, and for other instances.
     """
     # STEP 1: Collect existing activity data BEFORE removing
     existing_activity = {}
@@ -4474,74 +4767,206 @@ def _assign_series_ids_to_rule(config, rule_name, series_ids):
         else:
             target_series_dict[series_id] = {'activity_date': None}
 
-    save_config(config)
+    _save_rules_config(config, instance)
 
-    # Process always_have for newly assigned series (additive only - never unmonitors)
-    rule_always_have = config['rules'][rule_name].get('always_have', '')
-    if rule_always_have:
-        for sid in series_ids:
-            try:
-                media_processor.process_always_have(int(sid), rule_always_have)
-            except Exception as e:
-                app.logger.error(f"always_have processing failed for series {sid}: {e}")
-
-    # Sync tags to Sonarr
-    tag_sync_success = 0
-    tag_sync_failed = 0
-    for series_id in series_ids:
+    # STEP 4: Tags + always_have in the background
+    if not sonarr_instances.is_default(instance):
+        if series_ids:
+            sonarr_instances.dispatch_rule_tags(instance, {
+                'assign': {series_id: rule_name for series_id in series_ids},
+                'always_have': list(series_ids),
+            })
+        return preserved_count, None
+    tag_sync.queue_series(series_ids, always_have=True)
+    run_id = job_scheduler.run_now('rule_tag_sync', trigger='assign')
+    return preserved_count, run_id
+
+
+def _run_always_have(assignments, config, ctx):
+    """process_always_have for newly assigned series, concurrently. A '+'
+    expression records held seasons in config.json, so those rules run one
+    series at a time to keep their saves from overwriting each other."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    by_rule = {}
+    for series_id, rule_name in assignments.items():
+        expression = config['rules'][rule_name].get('always_have', '')
+        if expression:
+            by_rule.setdefault(expression, []).append(series_id)
+
+    def _process(series_id, expression):
+        if ctx.cancelled:
+            return
         try:
-            success = episeerr_utils.sync_rule_tag_to_sonarr(int(series_id), rule_name)
-            if success:
-                tag_sync_success += 1
-            else:
-                tag_sync_failed += 1
-                app.logger.warning(f"Failed to sync tag for series {series_id}")
+            media_processor.process_always_have(series_id, expression)
         except Exception as e:
-            tag_sync_failed += 1
-            app.logger.error(f"Error syncing tag for series {series_id}: {str(e)}")
+            app.logger.error(f"always_have processing failed for series {series_id}: {e}")
+
+    for expression, ids in by_rule.items():
+        workers = 1 if media_processor.parse_always_have(expression)['has_plus'] else tag_sync.ALWAYS_HAVE_WORKERS
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for series_id in ids:
+                executor.submit(_process, series_id, expression)
+
+
+def _run_rule_tag_sync(ctx):
+    """rule_tag_sync job: drain tag_sync_queue - bulk tag changes through
+    Sonarr's series editor, with always_have for newly assigned series run
+    alongside. Series queued while it runs are picked up before it exits;
+    series whose sync failed stay queued for the next run."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    totals = [0, 0, 0]
+    failed_this_run = set()
+    while True:
+        ctx.check()
+        claimed_at = time.time()
+        work = {sid: flag for sid, flag in tag_sync.queued().items() if sid not in failed_this_run}
+        if not work:
+            break
+        config = load_config()
+        assignments = {
+            int(series_id): rule_name
+            for rule_name, details in config['rules'].items()
+            for series_id in details.get('series', {})
+            if series_id in work
+        }
+        newly_assigned = {sid: rule for sid, rule in assignments.items() if work[str(sid)]}
+        ctx.progress(0, f"Syncing tags for {len(assignments)} series")
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            always_have = executor.submit(_run_always_have, newly_assigned, config, ctx)
+            synced, failed, not_found = tag_sync.sync_rule_tags(
+                assignments,
+                progress=lambda done, total: ctx.progress(
+                    done * 100 / total, f"Sonarr series editor: {done}/{total} requests"),
+                check=ctx.check
+            )
+            if newly_assigned:
+                ctx.progress(message=f"always_have for {len(newly_assigned)} newly assigned series")
+            always_have.result()
+
+        # Series no longer in any rule have nothing to sync - drop them too
+        failed_ids = {str(sid) for sid in failed}
+        tag_sync.dequeue([sid for sid in work if sid not in failed_ids], claimed_at)
+        tag_sync.retry_later(failed_ids, claimed_at)
+        failed_this_run |= failed_ids
+        for i, ids in enumerate((synced, failed, not_found)):
+            totals[i] += len(ids)
+
+    return f"{totals[0]} synced, {totals[1]} failed, {totals[2]} not in Sonarr"
+
+
+def _run_watch_reconcile(ctx):
+    """watch_reconcile job: sweep Plex/Jellyfin/Emby/Tautulli history from
+    each source's mark for watches Episeerr missed (see reconcile.py)."""
+    import reconcile
+
+    summary = reconcile.check_for_missed_watch_events(ctx)
+    if not summary['ran']:
+        return "Skipped (disabled or automation held)"
+    swept = ', '.join(f"{label} {count}" for label, count in summary['swept'].items()) or 'no sources'
+    result = f"{summary['found']} pending from {swept} history event(s)"
+    if summary['errors']:
+        result += f"; failed: {'; '.join(summary['errors'])}"
+    return result
+
+
+def _run_rule_stats_refresh(ctx):
+    """rule_stats_refresh job: rebuild the per-rule statistics from one
+    Sonarr series list (see rule_stats.py)."""
+    series_list = get_sonarr_series()
+    ctx.check()
+    if not rule_stats.refresh(series_list, load_config()):
+        return "Skipped (no series from Sonarr)"
+    return f"{len(series_list)} series"
+
+
+def _run_disk_forecast(ctx):
+    """disk_forecast job: sample Sonarr's free space, forecast when it
+    crosses the storage gate, and run cleanup now if that's before the
+    next scheduled one (see disk_forecast.py)."""
+    if ctx.trigger != 'schedule':
+        last = disk_forecast.last_sample_at()
+        if last and time.time() - last < disk_forecast.MIN_SAMPLE_GAP_SECONDS:
+            return "Skipped (sampled moments ago)"
+    disk_info = media_processor.get_sonarr_disk_space()
+    if not disk_info:
+        return "Skipped (no disk space from Sonarr)"
+    disk_forecast.record_sample(disk_info['free_space_gb'], disk_info['total_space_gb'], source=ctx.trigger)
+    result = f"{disk_info['free_space_gb']:.1f}GB free"
+
+    global_settings = media_processor.load_global_settings()
+    storage_min_gb = global_settings.get('global_storage_min_gb')
+    if not storage_min_gb:
+        return result
+    ctx.check()
+    interval_hours = global_settings.get('cleanup_interval_hours', 6)
+    next_run = (job_scheduler.get_job_status('cleanup') or {}).get('next_run')
+    horizon_hours = max(0.0, (next_run - time.time()) / 3600) if next_run else interval_hours
+    fc = disk_forecast.forecast(disk_info['free_space_gb'], storage_min_gb,
+                                queued_gb=media_processor.get_sonarr_queue_size_gb(),
+                                horizon_hours=horizon_hours, interval_hours=interval_hours)
+    disk_forecast.save_forecast(fc)
+    if fc['hours_to_threshold'] is not None:
+        result += f", {storage_min_gb}GB gate in {fc['hours_to_threshold']:.1f}h"
+
+    last_cleanup = get_last_job_run('cleanup')
+    if (disk_forecast.should_bring_forward(fc, last_cleanup['started_at'] if last_cleanup else None)
+            and not job_scheduler.is_job_running('cleanup')):
+        job_scheduler.run_now('cleanup', trigger='forecast')
+        result += " - cleanup brought forward"
+    return result
+
 
-    return preserved_count, tag_sync_success, tag_sync_failed
+def _ensure_rule_stats():
+    """Build the rule statistics inline the first time they're needed
+    (before the scheduled refresh has run)."""
+    if rule_stats.refreshed_at() is None:
+        rule_stats.refresh(get_sonarr_series(), load_config())
 
 
 @app.route('/assign-rules', methods=['POST'])
 def assign_rules():
     """Assign series to rules while preserving activity data."""
-    config = load_config()
+    instance = _rules_instance()
+    if instance is None:
+        return redirect(url_for('rules_page'))
+    config = _load_rules_config(instance)
     rule_name = request.form.get('rule_name')
     series_ids = request.form.getlist('series_ids')
     if not rule_name or rule_name not in config['rules']:
         referer = request.referrer or ''
         if '/rules' in referer:
-            return redirect(url_for('rules_page'))
+            return redirect(url_for('rules_page', instance=_instance_arg(instance)))
         return redirect(url_for('index', message="Invalid rule selected"))
 
-    preserved_count, tag_sync_success, tag_sync_failed = _assign_series_ids_to_rule(
-        config, rule_name, series_ids
-    )
+    preserved_count, _ = _assign_series_ids_to_rule(config, rule_name, series_ids, instance)
 
     # Build result message
     message = f"Assigned {len(series_ids)} series to rule '{rule_name}'"
     if preserved_count > 0:
         message += f" (preserved activity data for {preserved_count} series)"
-
-    if tag_sync_success > 0:
-        message += f" - synced {tag_sync_success} tags to Sonarr"
-    if tag_sync_failed > 0:
-        message += f" ({tag_sync_failed} tag syncs failed)"
+    if series_ids:
+        message += " - Sonarr tags are syncing in the background"
 
     # Redirect back to where they came from
     referer = request.referrer or ''
     if '/rules' in referer:
-        return redirect(url_for('rules_page'))
+        return redirect(url_for('rules_page', instance=_instance_arg(instance)))
     return redirect(url_for('index', message=message))
 
 
 @app.route('/api/series-list')
 def api_series_list():
-    """JSON: all Sonarr series with poster + assigned rule, for a native client's series browser."""
+    """JSON: all Sonarr series with poster + assigned rule, for a native client's series browser
+    (?instance= for a Sonarr instance other than the default one)."""
+    instance = _rules_instance()
+    if instance is None:
+        return _unknown_instance_response()
     try:
-        config = load_config()
-        all_series = get_sonarr_series()
+        config = _load_rules_config(instance)
+        all_series = get_sonarr_series(instance)
 
         rules_mapping = {}
         for rule_name, details in config['rules'].items():
@@ -4573,7 +4998,11 @@ def api_series_list():
 
 @app.route('/api/rules/assign', methods=['POST'])
 def api_assign_rule():
-    """JSON: assign a single series to a rule (mirrors /assign-rules for one series)."""
+    """JSON: assign a single series to a rule (mirrors /assign-rules for one series).
+    Body: {series_id, rule_name, instance}."""
+    instance = _rules_instance()
+    if instance is None:
+        return _unknown_instance_response()
     data = request.get_json(silent=True) or {}
     series_id = data.get('series_id')
     rule_name = (data.get('rule_name') or '').strip()
@@ -4583,12 +5012,12 @@ def api_assign_rule():
     if not rule_name:
         return jsonify({'success': False, 'error': 'rule_name required'}), 400
 
-    config = load_config()
+    config = _load_rules_config(instance)
     if rule_name not in config['rules']:
         return jsonify({'success': False, 'error': f"Rule '{rule_name}' not found"}), 404
 
-    _assign_series_ids_to_rule(config, rule_name, [str(series_id)])
-    return jsonify({'success': True, 'assigned_rule': rule_name})
+    _, run_id = _assign_series_ids_to_rule(config, rule_name, [str(series_id)], instance)
+    return jsonify({'success': True, 'assigned_rule': rule_name, 'tag_sync_run_id': run_id})
 
 @app.context_processor
 def inject_service_urls():
@@ -4644,7 +5073,10 @@ def inject_service_urls():
 @app.route('/unassign-series', methods=['POST'])
 def unassign_series():
     """Unassign series from all rules."""
-    config = load_config()
+    instance = _rules_instance()
+    if instance is None:
+        return redirect(url_for('rules_page'))
+    config = _load_rules_config(instance)
     series_ids = request.form.getlist('series_ids')
     total_removed = 0
     
@@ -4657,13 +5089,20 @@ def unassign_series():
                 del series_dict[series_id]
         total_removed += original_count - len(details['series'])
     
-    save_config(config)
+    _save_rules_config(config, instance)
     
     # NEW: Remove episeerr tags from Sonarr
     tag_removal_success = 0
     tag_removal_failed = 0
     
-    for series_id in series_ids:
+    if not sonarr_instances.is_default(instance):
+        # Untagged in the background by a subprocess bound to the instance
+        if series_ids:
+            sonarr_instances.dispatch_rule_tags(instance, {'unassign': series_ids})
+        series_ids_to_untag = []
+    else:
+        series_ids_to_untag = series_ids
+    for series_id in series_ids_to_untag:
         try:
             success = episeerr_utils.remove_all_episeerr_tags(int(series_id))
             if success:
@@ -4682,7 +5121,7 @@ def unassign_series():
     
     referer = request.referrer or ''
     if '/rules' in referer:
-        return redirect(url_for('rules_page'))
+        return redirect(url_for('rules_page', instance=_instance_arg(instance)))
     return redirect(url_for('index', message=message))
 # ============================================================================
 # API ROUTES
@@ -4766,23 +5205,14 @@ def series_stats():
     """Get series statistics."""
     try:
         config = load_config()
-        all_series = get_sonarr_series()
-        all_series_ids = set(str(s['id']) for s in all_series)
-        rules_mapping = {}
-        for rule_name, details in config['rules'].items():
-            for series_id in details.get('series', {}):
-                if str(series_id) in all_series_ids:  # ignore stale config entries
-                    rules_mapping[str(series_id)] = rule_name
+        _ensure_rule_stats()
+        rule_stat = rule_stats.get_rule_stats()
         stats = {
-            'total_series': len(all_series),
-            'assigned_series': len(rules_mapping),
-            'unassigned_series': len(all_series) - len(rules_mapping),
+            **rule_stats.series_totals(),
             'total_rules': len(config['rules']),
-            'rule_breakdown': {}
+            'rule_breakdown': {rule_name: rule_stat.get(rule_name, {}).get('series_count', 0)
+                               for rule_name in config['rules']},
         }
-        for rule_name, details in config['rules'].items():
-            count = sum(1 for sid in details.get('series', {}) if str(sid) in all_series_ids)
-            stats['rule_breakdown'][rule_name] = count
         return jsonify(stats)
     except requests.exceptions.ConnectionError:
         return jsonify({
@@ -4976,6 +5406,43 @@ def scheduler_status():
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/scheduler/jobs')
+def scheduler_jobs():
+    """Every registered job with live progress and its last/next run."""
+    try:
+        return jsonify({"status": "success", "jobs": job_scheduler.get_status()})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/scheduler/jobs/<job_name>/history')
+def scheduler_job_history(job_name):
+    """Persisted run history for one job, newest first."""
+    try:
+        limit = min(int(request.args.get('limit', 20)), 200)
+        return jsonify({"status": "success", "runs": job_scheduler.get_history(job_name, limit=limit)})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/scheduler/jobs/<job_name>/run', methods=['POST'])
+def scheduler_run_job(job_name):
+    """Start a job now, outside its schedule."""
+    if not job_scheduler.is_registered(job_name):
+        return jsonify({"status": "error", "message": f"Unknown job: {job_name}"}), 404
+    run_id = job_scheduler.run_now(job_name, trigger='manual')
+    if run_id is None:
+        return jsonify({"status": "error", "message": f"{job_name} is already running"}), 409
+    return jsonify({"status": "success", "message": f"{job_name} started", "run_id": run_id})
+
+@app.route('/api/scheduler/jobs/<job_name>/cancel', methods=['POST'])
+def scheduler_cancel_job(job_name):
+    """Cancel the in-flight run(s) of a job."""
+    if not job_scheduler.is_registered(job_name):
+        return jsonify({"status": "error", "message": f"Unknown job: {job_name}"}), 404
+    if not job_scheduler.cancel(job_name):
+        return jsonify({"status": "error", "message": f"{job_name} is not running"}), 409
+    app.logger.info(f"Job '{job_name}' cancelled via API")
+    return jsonify({"status": "success", "message": f"Cancelling {job_name}"})
+
 @app.route('/api/global-settings')
 def get_global_settings():
     """Get global settings including storage gate."""
@@ -5017,6 +5484,7 @@ def update_global_settings():
         # Hold automation (vacation mode) + missed watch-event detection
         automation_held = data.get('automation_held', False)
         reconcile_enabled = data.get('reconcile_enabled', False)
+        reconcile_interval_minutes = data.get('reconcile_interval_minutes', 60)
 
         # Validate inputs
         if storage_min_gb is not None:
@@ -5036,6 +5504,7 @@ def update_global_settings():
 
             'automation_held': bool(automation_held),
             'reconcile_enabled': bool(reconcile_enabled),
+            'reconcile_interval_minutes': max(0, int(reconcile_interval_minutes or 0)),
         }
 
         media_processor.save_global_settings(settings)
@@ -5203,6 +5672,82 @@ def force_cleanup():
         print(f"Failed to start manual cleanup: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/health')
+def health():
+    """Liveness check for the Docker healthcheck - no upstream calls."""
+    timing = startup_timing.report()
+    return jsonify({
+        'status': 'ok',
+        'ready': timing['ready_seconds'] is not None,
+        'warmup_done': timing['warmup_done_seconds'] is not None,
+    })
+
+
+@app.route('/api/startup-report')
+def startup_report():
+    """Where startup time went, including the background warm-up."""
+    return jsonify({'status': 'success', **startup_timing.report()})
+
+
+@app.route('/api/request-timing')
+def request_timing_stats():
+    """Per-endpoint latency percentiles and upstream calls for this worker."""
+    return jsonify({
+        'status': 'success',
+        'pid': os.getpid(),
+        'slow_threshold_ms': request_timing.SLOW_REQUEST_MS,
+        'endpoints': request_timing.endpoint_stats(),
+    })
+
+
+def _is_admin_request():
+    """Logged-in users when auth is on; otherwise only requests from inside
+    the container (docker exec ... curl localhost)."""
+    if session.get('authenticated'):
+        return True
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+
+@app.route('/api/profile')
+def profile_threads():
+    """Sample every thread for ?seconds=N and download the collapsed stacks
+    (load into speedscope or flamegraph.pl)."""
+    if not _is_admin_request():
+        return jsonify({'status': 'error', 'message': 'Profiling is restricted to admins'}), 403
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval_ms', 10)) / 1000
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'seconds and interval_ms must be numbers'}), 400
+
+    g.skip_slow_log = True
+    try:
+        result = request_timing.sample_stacks(seconds, interval)
+    except request_timing.ProfilerBusy:
+        return jsonify({'status': 'error', 'message': 'A profile is already running'}), 409
+
+    logger.info(f"🔬 Profiled {len(result['stacks'])} distinct stacks over {result['seconds']}s "
+                f"({result['samples']} samples)")
+    filename = f"episeerr-profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.folded"
+    return Response(request_timing.collapsed(result['stacks']), mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
+@app.route('/api/webhook-capture', methods=['GET', 'POST'])
+def webhook_capture_api():
+    """Webhook capture for replay load tests (see webhook_capture.py). GET:
+    status, incl. running media_processor.py count; POST {"enabled": bool}
+    turns capture on or off for every worker."""
+    if request.method == 'POST':
+        if os.getenv('EPISEERR_WEBHOOK_CAPTURE'):
+            return jsonify({'status': 'error',
+                            'message': 'Capture is set by EPISEERR_WEBHOOK_CAPTURE'}), 409
+        enabled = bool((request.json or {}).get('enabled'))
+        path = webhook_capture.set_enabled(enabled)
+        logger.info(f"Webhook capture {'on: ' + path if path else 'off'}")
+    return jsonify({'status': 'success', **webhook_capture.status()})
+
+
 @app.route('/api/safety-status')
 def safety_status():
     """Get dry run safety status."""
@@ -5217,6 +5762,8 @@ def safety_status():
             "global_dry_run": global_dry_run,
             "rules_with_dry_run": rules_with_dry_run,
             "total_rules": len(config.get('rules', {})),
+            "circuit_breakers": episeerr_utils.get_circuit_states(),
+            "http_coalescing": http.coalescing_stats(),
             "status": "success"
         })
     except Exception as e:
@@ -5233,24 +5780,8 @@ def safety_status():
 def get_current_assignments():
     """Get current rule assignments for all series."""
     try:
-        config = load_config()
-        all_series = get_sonarr_series()
-        
-        assignments = {}
-        
-        # Build assignment mapping
-        for rule_name, details in config['rules'].items():
-            series_dict = details.get('series', {})
-            for series_id in series_dict.keys():
-                assignments[str(series_id)] = rule_name
-        
-        # Add series without assignments
-        for series in all_series:
-            series_id = str(series['id'])
-            if series_id not in assignments:
-                assignments[series_id] = 'None'
-        
-        return jsonify(assignments)
+        _ensure_rule_stats()
+        return jsonify(rule_stats.assignments())
         
     except Exception as e:
         app.logger.error(f"Error getting current assignments: {str(e)}")
@@ -5261,17 +5792,10 @@ def get_quick_stats():
     """Get quick stats for change detection."""
     try:
         config = load_config()
-        all_series = get_sonarr_series()
-        
-        # Count assigned series
-        assigned_count = 0
-        for rule_name, details in config['rules'].items():
-            assigned_count += len(details.get('series', {}))
+        _ensure_rule_stats()
         
         stats = {
-            'total_series': len(all_series),
-            'assigned_series': assigned_count,
-            'unassigned_series': len(all_series) - assigned_count,
+            **rule_stats.series_totals(),
             'total_rules': len(config['rules']),
             'timestamp': int(time.time())
         }
@@ -5326,25 +5850,15 @@ def dry_run_settings():
 
 @app.route('/cleanup-logs')
 def cleanup_logs():
-    """Display cleanup logs."""
+    """Display cleanup history from the cleanup audit."""
     try:
-        CLEANUP_LOG_PATH = os.getenv('CLEANUP_LOG_PATH', '/app/logs/cleanup.log')
-        if not os.path.exists(CLEANUP_LOG_PATH):
-            return render_simple_logs_page("No cleanup logs found yet.")
-        try:
-            with open(CLEANUP_LOG_PATH, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-        except Exception as e:
-            return render_simple_logs_page(f"Error reading log file: {str(e)}")
-        recent_lines = lines[-200:] if len(lines) > 200 else lines
-        recent_lines.reverse()
-        try:
-            return render_template('cleanup_logs.html', logs=recent_lines)
-        except:
-            return render_simple_logs_page(recent_lines)
+        days = _audit_days()
+        return render_template('cleanup_logs.html', rows=cleanup_audit.recent(limit=200, days=days),
+                               summary=cleanup_audit.summary(days))
     except Exception as e:
         current_app.logger.error(f"Error in cleanup logs route: {str(e)}")
-        return render_simple_logs_page(f"Error loading logs: {str(e)}")
+        return render_simple_logs_page(f"Error loading cleanup history: {str(e)}")
+
 
 def render_simple_logs_page(logs_or_message):
     """Render simple logs page fallback."""
@@ -5486,6 +6000,7 @@ def send_to_selection(series_id):
             "created_at": int(time.time())
         }
         add_pending_request(pending_request)
+        selection_prefetch.prefetch_async(tmdb_id)
 
         app.logger.info(f"✓ Created manual selection request for {series_title} (TMDB: {tmdb_id})")
 
@@ -5509,8 +6024,13 @@ def send_to_selection(series_id):
 def select_seasons(tmdb_id):
     """Show season selection page."""
     try:
-        # Get TV show details from TMDB
-        show_data = get_tmdb_endpoint(f"tv/{tmdb_id}")
+        # Show details prefetched with the request (selection_prefetch.py);
+        # start the season prefetch now if it never ran, so the episode
+        # page that follows has them
+        stored = selection_prefetch.cached(tmdb_id)
+        if len(stored) <= 1:
+            selection_prefetch.prefetch_async(tmdb_id)
+        show_data = stored.get(selection_prefetch.SHOW) or selection_prefetch.show_details(tmdb_id)
         
         if not show_data:
             return render_template('error.html', message="Failed to get show details from TMDB")
@@ -5832,8 +6352,10 @@ def select_episodes(tmdb_id):
 
         app.logger.info(f"Found matching request: series_id={series_id}, request_id={request_id}")
         
-        # Get TV show details from TMDB
-        show_data = get_tmdb_endpoint(f"tv/{tmdb_id}")
+        # Show and season details prefetched with the request; seasons not
+        # stored yet are fetched by the page through /api/tmdb/season
+        stored = selection_prefetch.cached(tmdb_id, selected_seasons)
+        show_data = stored.pop(selection_prefetch.SHOW, None) or selection_prefetch.show_details(tmdb_id)
         
         if not show_data:
             return render_template('error.html', message="Failed to get show details from TMDB")
@@ -5864,7 +6386,8 @@ def select_episodes(tmdb_id):
         request_id=request_id,
         series_id=series_id,
         selected_seasons=selected_seasons,
-        selected_rule=selected_rule)
+        selected_rule=selected_rule,
+        season_data=stored)
     
     except Exception as e:
         app.logger.error(f"Error in select_episodes: {str(e)}", exc_info=True)
@@ -5995,12 +6518,13 @@ def process_episode_selection():
 
 @app.route('/api/tmdb/season/<tmdb_id>/<season_number>')
 def get_tmdb_season(tmdb_id, season_number):
-    """Get season details including episodes from TMDB API."""
+    """Get season details including episodes - prefetched with the pending
+    request when there is one (selection_prefetch.py), else from TMDB."""
     try:
         if not TMDB_API_KEY:
             return jsonify({"error": "TMDB API key not configured"}), 500
         
-        season_data = get_tmdb_endpoint(f"tv/{tmdb_id}/season/{season_number}")
+        season_data = selection_prefetch.season_details(tmdb_id, int(season_number))
         
         if not season_data:
             return jsonify({"error": "Failed to get season data from TMDB"}), 500
@@ -6130,17 +6654,23 @@ def migrate_tags_endpoint():
     
 @app.route('/api/sync-all-tags', methods=['POST'])
 def sync_all_tags_endpoint():
-    """API endpoint to manually bulk sync tags for all existing series"""
+    """API endpoint to bulk sync tags for all existing series. Runs as the
+    rule_tag_sync job - follow it via /api/scheduler/jobs."""
     try:
-        synced, failed, not_found = sync_all_series_tags()
-        
+        config = load_config()
+        queued = tag_sync.queue_series(
+            series_id
+            for rule_details in config['rules'].values()
+            for series_id in rule_details.get('series', {})
+        )
+        run_id = job_scheduler.run_now('rule_tag_sync', trigger='manual')
+
         return jsonify({
             "status": "success",
-            "message": f"Bulk sync complete: {synced} synced, {failed} failed, {not_found} not in Sonarr",
-            "synced": synced,
-            "failed": failed,
-            "not_found": not_found
-        })
+            "message": f"Bulk sync started for {queued} series",
+            "queued": queued,
+            "run_id": run_id
+        }), 202
     except Exception as e:
         app.logger.error(f"Error in bulk tag sync: {str(e)}")
         return jsonify({
@@ -6274,39 +6804,17 @@ def sync_all_series_tags():
     """Bulk sync: Apply tags to all series currently in config"""
     try:
         config = load_config()
-        synced = 0
-        failed = 0
-        not_found = 0
-        
-        app.logger.info("=== Starting bulk tag sync for all series ===")
-        
-        for rule_name, rule_details in config['rules'].items():
-            series_dict = rule_details.get('series', {})
-            app.logger.info(f"Processing rule '{rule_name}' with {len(series_dict)} series")
-            
-            for series_id in series_dict.keys():
-                try:
-                    # Check if series exists in Sonarr first
-                    series_data = episeerr_utils.get_series_from_sonarr(int(series_id))
-                    if not series_data:
-                        not_found += 1
-                        app.logger.warning(f"✗ Series {series_id} not found in Sonarr (may have been deleted)")
-                        continue
-                    
-                    success = episeerr_utils.sync_rule_tag_to_sonarr(int(series_id), rule_name)
-                    if success:
-                        synced += 1
-                        app.logger.debug(f"✓ Synced series {series_id} ({series_data['title']}) to '{rule_name}'")
-                    else:
-                        failed += 1
-                        app.logger.warning(f"✗ Failed to sync series {series_id}")
-                except Exception as e:
-                    failed += 1
-                    app.logger.error(f"✗ Error syncing series {series_id}: {str(e)}")
-        
+        assignments = {
+            int(series_id): rule_name
+            for rule_name, rule_details in config['rules'].items()
+            for series_id in rule_details.get('series', {})
+        }
+
+        app.logger.info(f"=== Starting bulk tag sync for {len(assignments)} series ===")
+        synced, failed, not_found = (len(ids) for ids in tag_sync.sync_rule_tags(assignments))
         app.logger.info(f"=== Bulk sync complete: {synced} synced, {failed} failed, {not_found} not found ===")
         return synced, failed, not_found
-        
+
     except Exception as e:
         app.logger.error(f"Bulk sync failed: {str(e)}")
         return 0, 0, 0  
@@ -6316,118 +6824,140 @@ def sync_all_series_tags():
 # ============================================================================
 
 def initialize_episeerr():
-    """Initialize episeerr components."""
+    """Initialize episeerr components. Local work only - everything that
+    talks to Sonarr/Radarr is in warm_up_episeerr() so it can't hold up the
+    first request."""
     app.logger.debug("Entering initialize_episeerr()")
 
     # Migrate any pending request JSON files into SQLite (one-time, idempotent)
-    try:
-        migrated = migrate_pending_requests_from_files(REQUESTS_DIR)
+    with startup_timing.phase('migrate pending requests'):
+        try:
+            migrated = migrate_pending_requests_from_files(REQUESTS_DIR)
+            if migrated:
+                app.logger.info(f"✓ Migrated {migrated} pending request(s) from files to DB")
+        except Exception as e:
+            app.logger.error(f"Error migrating pending requests: {e}")
+
+    # Same for the notification bookkeeping JSON files
+    with startup_timing.phase('migrate notification storage'):
+        import notification_storage
+        migrated = notification_storage.migrate_from_files()
         if migrated:
-            app.logger.info(f"✓ Migrated {migrated} pending request(s) from files to DB")
-    except Exception as e:
-        app.logger.error(f"Error migrating pending requests: {e}")
+            app.logger.info(f"✓ Migrated {migrated} notification record(s) from files to DB")
 
+
+def warm_up_episeerr():
+    """Startup work that talks to Sonarr/Radarr. Runs in the background in
+    the leader worker once the app is already serving, then logs the startup
+    timing report."""
     # Existing code
-    try:
-        episeerr_utils.check_and_cancel_unmonitored_downloads()
-    except Exception as e:
-        app.logger.error(f"Error in initial download check: {str(e)}")
-    
+    with startup_timing.phase('unmonitored download check', background=True):
+        try:
+            episeerr_utils.check_and_cancel_unmonitored_downloads()
+        except Exception as e:
+            app.logger.error(f"Error in initial download check: {str(e)}")
+
     # NEW: Comprehensive tag reconciliation (create, migrate, drift, orphaned)
-    try:
-        app.logger.info("🏷️  Starting comprehensive tag reconciliation...")
+    with startup_timing.phase('tag reconciliation', background=True):
+        try:
+            app.logger.info("🏷️  Starting comprehensive tag reconciliation...")
         
-        config = load_config()
+            config = load_config()
         
-        # Step 1: Create/verify all rule tags exist in Sonarr
-        created, failed = migrate_create_rule_tags()
-        if created > 0 or failed > 0:
-            app.logger.info(f"  Tag creation: {created} verified, {failed} failed")
+            # Step 1: Create/verify all rule tags exist in Sonarr
+            created, failed = migrate_create_rule_tags()
+            if created > 0 or failed > 0:
+                app.logger.info(f"  Tag creation: {created} verified, {failed} failed")
         
-        # Step 2: One-time bulk sync (migrate existing series to have tags)
-        if not config.get('tag_migration_complete', False):
-            app.logger.info("  First-time migration - syncing all series tags...")
-            synced, failed, not_found = sync_all_series_tags()
-            app.logger.info(f"  Series tag sync: {synced} synced, {failed} failed, {not_found} not found")
+            # Step 2: One-time bulk sync (migrate existing series to have tags)
+            if not config.get('tag_migration_complete', False):
+                app.logger.info("  First-time migration - syncing all series tags...")
+                synced, failed, not_found = sync_all_series_tags()
+                app.logger.info(f"  Series tag sync: {synced} synced, {failed} failed, {not_found} not found")
             
-            # Mark migration as complete
-            config['tag_migration_complete'] = True
-            save_config(config)
-            app.logger.info("  ✓ Tag migration marked as complete")
-        
-        # Step 3: Drift detection + orphaned recovery for all series
-        all_series_ids = [
-            int(sid)
-            for rule_details in config['rules'].values()
-            for sid in list(rule_details.get('series', {}).keys())
-        ]
-        # Also check Sonarr series not in config (orphaned tag recovery)
-        all_sonarr_series = get_sonarr_series()
-        config_series_ids = {
-            sid
-            for rule_details in config['rules'].values()
-            for sid in rule_details.get('series', {}).keys()
-        }
-        orphaned_ids = [
-            s['id'] for s in all_sonarr_series
-            if str(s['id']) not in config_series_ids
-        ]
-
-        modified = False
-        reconciled = 0
-        for series_id in all_series_ids + orphaned_ids:
-            try:
-                _, changed = episeerr_utils.reconcile_series_drift(series_id, config)
-                if changed:
-                    modified = True
-                    reconciled += 1
-            except Exception as e:
-                app.logger.debug(f"Error reconciling series {series_id}: {e}")
+                # Mark migration as complete
+                config['tag_migration_complete'] = True
+                save_config(config)
+                app.logger.info("  ✓ Tag migration marked as complete")
+        
+            # Step 3: Drift detection + orphaned recovery for all series
+            all_series_ids = [
+                int(sid)
+                for rule_details in config['rules'].values()
+                for sid in list(rule_details.get('series', {}).keys())
+            ]
+            # Also check Sonarr series not in config (orphaned tag recovery)
+            all_sonarr_series = get_sonarr_series()
+            config_series_ids = {
+                sid
+                for rule_details in config['rules'].values()
+                for sid in rule_details.get('series', {}).keys()
+            }
+            orphaned_ids = [
+                s['id'] for s in all_sonarr_series
+                if str(s['id']) not in config_series_ids
+            ]
+
+            modified = False
+            reconciled = 0
+            for series_id in all_series_ids + orphaned_ids:
+                try:
+                    _, changed = episeerr_utils.reconcile_series_drift(series_id, config)
+                    if changed:
+                        modified = True
+                        reconciled += 1
+                except Exception as e:
+                    app.logger.debug(f"Error reconciling series {series_id}: {e}")
 
-        if modified:
-            save_config(config)
+            if modified:
+                save_config(config)
 
-        app.logger.info(f"✓ Tag reconciliation complete: {reconciled} corrections made")
+            app.logger.info(f"✓ Tag reconciliation complete: {reconciled} corrections made")
             
-    except requests.exceptions.ConnectionError:
-        app.logger.warning("Sonarr not ready - tags will be created when Sonarr becomes available")
-    except Exception as e:
-        app.logger.error(f"Error during tag reconciliation: {str(e)}")
+        except requests.exceptions.ConnectionError:
+            app.logger.warning("Sonarr not ready - tags will be created when Sonarr becomes available")
+        except Exception as e:
+            app.logger.error(f"Error during tag reconciliation: {str(e)}")
 
     # NEW: Ensure delay profile has control tags ONLY (select, delay)
-    try:
-        updated = episeerr_utils.update_delay_profile_with_control_tags()
-        if updated:
-            app.logger.info("✓ Delay profile updated with control tags (select, delay)")
-        else:
-            app.logger.warning("Delay profile update skipped or failed (check logs)")
-    except requests.exceptions.ConnectionError:
-        app.logger.warning("Sonarr not ready yet - will retry delay profile sync later")
-    except Exception as e:
-        app.logger.error(f"Error updating delay profile with control tags: {str(e)}")
+    with startup_timing.phase('delay profile control tags', background=True):
+        try:
+            updated = episeerr_utils.update_delay_profile_with_control_tags()
+            if updated:
+                app.logger.info("✓ Delay profile updated with control tags (select, delay)")
+            else:
+                app.logger.warning("Delay profile update skipped or failed (check logs)")
+        except requests.exceptions.ConnectionError:
+            app.logger.warning("Sonarr not ready yet - will retry delay profile sync later")
+        except Exception as e:
+            app.logger.error(f"Error updating delay profile with control tags: {str(e)}")
 
     # NEW: Create Radarr tags for movie rules
-    try:
-        from movie_processor import ensure_movie_rule_tags
-        config = load_config()
-        movie_rules = config.get('movie_rules', {})
-        if movie_rules:
-            tag_ids = ensure_movie_rule_tags(movie_rules)
-            app.logger.info(f"✓ Movie rule tags ensured in Radarr: {len(tag_ids)} tags")
-    except requests.exceptions.ConnectionError:
-        app.logger.warning("Radarr not ready — movie rule tags will be created when available")
-    except Exception as e:
-        app.logger.warning(f"Could not ensure movie rule tags: {e}")
-    
-    
+    with startup_timing.phase('movie rule tags', background=True):
+        try:
+            from movie_processor import ensure_movie_rule_tags
+            config = load_config()
+            movie_rules = config.get('movie_rules', {})
+            if movie_rules:
+                tag_ids = ensure_movie_rule_tags(movie_rules)
+                app.logger.info(f"✓ Movie rule tags ensured in Radarr: {len(tag_ids)} tags")
+        except requests.exceptions.ConnectionError:
+            app.logger.warning("Radarr not ready — movie rule tags will be created when available")
+        except Exception as e:
+            app.logger.warning(f"Could not ensure movie rule tags: {e}")
+
+    startup_timing.mark_warmup_done()
+    startup_timing.log_report(app.logger)
+
 
 # Run initialization (after function is defined!)
 initialize_episeerr()
 
 # Create scheduler instance
-cleanup_scheduler = OCDarrScheduler()
-app.logger.info("✓ OCDarrScheduler instantiated successfully")
-cleanup_scheduler.start_scheduler()
+with startup_timing.phase('scheduler start'):
+    cleanup_scheduler = OCDarrScheduler()
+    app.logger.info("✓ OCDarrScheduler instantiated successfully")
+    cleanup_scheduler.start_scheduler()
 
 # Initialize notification config 
 notification_config = get_notification_config()
@@ -6439,6 +6969,8 @@ EPISEERR_URL = notification_config['EPISEERR_URL']
 import notifications
 notifications.init_notifications(NOTIFICATIONS_ENABLED, DISCORD_WEBHOOK_URL, EPISEERR_URL, SONARR_URL)
 
+startup_timing.mark_ready()
+
 if __name__ == '__main__':
     cleanup_config_rules()
     app.logger.info("🚀 Enhanced Episeerr starting")
@@ -9,9 +9,11 @@ from urllib3.util.retry import Retry
 import logging
 import threading
 import re
+from urllib.parse import urlparse
 from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 from logging_config import main_logger as logger
+import shared_state
 # Load environment variables
 load_dotenv()
 
@@ -52,9 +54,297 @@ class TimeoutHTTPAdapter(HTTPAdapter):
             kwargs['timeout'] = self.DEFAULT_TIMEOUT
         return super().send(request, **kwargs)
 
-http = requests.Session()
-http.mount("http://",  TimeoutHTTPAdapter(max_retries=_retry))
-http.mount("https://", TimeoutHTTPAdapter(max_retries=_retry))
+# ── Per-host circuit breakers ─────────────────────────────────────────────────
+# A dead upstream (Tautulli, Plex, Jellyfin, TMDB...) otherwise costs every
+# caller the full timeout + retry backoff - across a cleanup cycle that asks
+# Tautulli about every series, one dead host can add hours. Each host gets a
+# breaker: after CIRCUIT_FAILURE_THRESHOLD consecutive failed requests it
+# opens and requests to that host fail immediately with CircuitOpenError. Once
+# the reset timeout passes, a single probe request is let through (half-open):
+# success closes the breaker, failure re-opens it with the timeout doubled (up
+# to CIRCUIT_MAX_RESET_SECONDS).
+#
+# A failure is a connection error/timeout, or a 502/503/504 after retries. Any
+# other response - including 4xx - proves the host is up. State is per process.
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_RESET_SECONDS = 30
+CIRCUIT_MAX_RESET_SECONDS = 300
+_CIRCUIT_FAILURE_STATUSES = (502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while the host's breaker is open.
+    A ConnectionError subclass, so existing "host unreachable" handling
+    applies unchanged."""
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, host, failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout=CIRCUIT_RESET_SECONDS, max_reset_timeout=CIRCUIT_MAX_RESET_SECONDS,
+                 clock=time.monotonic):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.reset_timeout = reset_timeout
+        self.opened_at = None
+        self.last_failure = None
+        self.last_error = None
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def _probe_due(self):
+        return self._clock() - self.opened_at >= self.reset_timeout
+
+    def allow_request(self):
+        """True if a request may be sent now. While open, lets exactly one
+        probe through once the reset timeout has passed."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._probe_due():
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def is_available(self):
+        """Would a request be sent right now? Doesn't claim the probe."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return self._probe_due()
+            return not self._probe_in_flight
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.host} closed - host is responding again")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.reset_timeout = self.base_reset_timeout
+            self.opened_at = None
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_failure = time.time()
+            self.last_error = str(error)
+            if self.state == self.HALF_OPEN:
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = self._clock()
+        self._probe_in_flight = False
+        logger.warning(
+            f"Circuit for {self.host} opened after {self.consecutive_failures} consecutive failures "
+            f"({self.last_error}) - failing fast for {self.reset_timeout}s"
+        )
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = max(0, round(self.reset_timeout - (self._clock() - self.opened_at)))
+            return {
+                'host': self.host,
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'last_failure': self.last_failure,
+                'last_error': self.last_error,
+                'rejected_requests': self.rejected,
+                'retry_in_seconds': retry_in,
+            }
+
+
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def _circuit_host(url):
+    return (urlparse(url).netloc or url or '').lower()
+
+
+def get_circuit_breaker(url):
+    """The breaker for a URL's host (host:port), created on first use."""
+    host = _circuit_host(url)
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(host)
+        if breaker is None:
+            breaker = _circuit_breakers[host] = CircuitBreaker(host)
+        return breaker
+
+
+def is_upstream_available(url):
+    """False while the breaker for this URL's host is open, so callers can
+    skip straight to a fallback instead of waiting for CircuitOpenError."""
+    if not url:
+        return False
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(_circuit_host(url))
+    return breaker is None or breaker.is_available()
+
+
+def get_circuit_states():
+    """Snapshot of every breaker that has seen traffic, for status pages."""
+    with _circuit_breakers_lock:
+        breakers = list(_circuit_breakers.values())
+    return sorted((b.snapshot() for b in breakers), key=lambda s: s['host'])
+
+
+class CircuitBreakerHTTPAdapter(TimeoutHTTPAdapter):
+    def send(self, request, **kwargs):
+        breaker = get_circuit_breaker(request.url)
+        if not breaker.allow_request():
+            raise CircuitOpenError(
+                f"Circuit open for {breaker.host} - skipping request", request=request
+            )
+        try:
+            response = super().send(request, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            breaker.record_failure(e)
+            raise
+        except Exception:
+            # Not evidence either way (bad URL, SSL config...) - free the probe
+            breaker.release_probe()
+            raise
+        if response.status_code in _CIRCUIT_FAILURE_STATUSES:
+            breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            breaker.record_success()
+        return response
+
+
+# ── GET coalescing (singleflight) ─────────────────────────────────────────────
+# Dashboard widgets, sidebar stats, search and webhook handlers often ask for
+# the same resource (typically Sonarr's /api/v3/series) at the same moment.
+# Identical concurrent GETs - same URL, params, headers, auth, timeout and
+# verify - share one in-flight request: the first caller sends it, the rest wait
+# for and receive the same Response. Errors are shared the same way. Since the
+# timeout is part of the key, no caller waits on a request with a longer one.
+#
+# With a micro-TTL (EPISEERR_HTTP_COALESCE_TTL seconds, default 0 = off, or
+# coalesce_ttl= per call) a successful response is also reused by identical
+# GETs for that long after it completes. Any non-GET through the session drops
+# those reused responses so a write is never followed by a stale read.
+#
+# Only plain GETs coalesce - anything with a body, stream=True, cookies or
+# hooks goes straight through, as does any call passing coalesce=False.
+HTTP_COALESCE_TTL_SECONDS = float(os.getenv('EPISEERR_HTTP_COALESCE_TTL', '0') or 0)
+_COALESCE_RECENT_MAX = 256
+
+
+class _InFlightRequest:
+    __slots__ = ('event', 'response', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class CoalescingSession(requests.Session):
+    _UNCOALESCED_KWARGS = ('data', 'json', 'files', 'stream', 'cookies', 'hooks')
+
+    def __init__(self, coalesce_ttl=HTTP_COALESCE_TTL_SECONDS):
+        super().__init__()
+        self.coalesce_ttl = coalesce_ttl
+        self._coalesce_lock = threading.Lock()
+        self._inflight = {}
+        self._recent = {}
+        self._coalesce_counts = {'get_requests': 0, 'shared_in_flight': 0, 'shared_recent': 0}
+
+    @staticmethod
+    def _freeze(value):
+        if isinstance(value, dict):
+            return repr(sorted((str(k), repr(v)) for k, v in value.items()))
+        return repr(value)
+
+    def _coalesce_key(self, method, url, args, kwargs):
+        if method.upper() != 'GET' or args:
+            return None
+        if any(kwargs.get(name) for name in self._UNCOALESCED_KWARGS):
+            return None
+        return (url, self._freeze(kwargs.get('params')), self._freeze(kwargs.get('headers')),
+                repr(kwargs.get('auth')), kwargs.get('allow_redirects', True),
+                repr(kwargs.get('timeout')), repr(kwargs.get('verify')))
+
+    def request(self, method, url, *args, coalesce=True, coalesce_ttl=None, **kwargs):
+        key = self._coalesce_key(method, url, args, kwargs) if coalesce else None
+        if key is None:
+            if method.upper() != 'GET' and self._recent:
+                with self._coalesce_lock:
+                    self._recent.clear()
+            return super().request(method, url, *args, **kwargs)
+
+        ttl = self.coalesce_ttl if coalesce_ttl is None else coalesce_ttl
+        with self._coalesce_lock:
+            self._coalesce_counts['get_requests'] += 1
+            if ttl > 0:
+                recent = self._recent.get(key)
+                if recent and recent[0] > time.monotonic():
+                    self._coalesce_counts['shared_recent'] += 1
+                    return recent[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlightRequest()
+            else:
+                self._coalesce_counts['shared_in_flight'] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.response
+
+        try:
+            flight.response = super().request(method, url, **kwargs)
+            return flight.response
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._coalesce_lock:
+                self._inflight.pop(key, None)
+                if ttl > 0 and flight.response is not None and flight.response.ok:
+                    now = time.monotonic()
+                    if len(self._recent) >= _COALESCE_RECENT_MAX:
+                        self._recent = {k: v for k, v in self._recent.items() if v[0] > now}
+                    self._recent[key] = (now + ttl, flight.response)
+            flight.event.set()
+
+    def coalescing_stats(self):
+        with self._coalesce_lock:
+            counts = dict(self._coalesce_counts)
+        counts['requests_saved'] = counts['shared_in_flight'] + counts['shared_recent']
+        counts['ttl_seconds'] = self.coalesce_ttl
+        return counts
+
+
+http = CoalescingSession()
+http.mount("http://",  CircuitBreakerHTTPAdapter(max_retries=_retry))
+http.mount("https://", CircuitBreakerHTTPAdapter(max_retries=_retry))
 # ─────────────────────────────────────────────────────────────────────────────
 
 # ============================================================
@@ -141,31 +431,30 @@ def get_sonarr_headers():
         'Content-Type': 'application/json'
     }
 
-_tags_cache = None
-_tags_cache_time = 0
+# Tag list is shared by every worker; creating a tag in one bumps the shared
+# generation so the others refetch instead of waiting out the TTL.
 _TAGS_CACHE_TTL = 60  # seconds
+_tags_cache = shared_state.SharedCache('sonarr_tags', ttl=_TAGS_CACHE_TTL)
+
+def _fetch_sonarr_tags():
+    headers = get_sonarr_headers()
+    resp = http.get(f"{SONARR_URL}/api/v3/tag", headers=headers, timeout=10)
+    if resp.ok:
+        return resp.json()
+    return None
 
 def get_sonarr_tags():
     """Fetch all Sonarr tags with a 60s in-memory cache."""
-    global _tags_cache, _tags_cache_time
-    now = time.time()
-    if _tags_cache is not None and (now - _tags_cache_time) < _TAGS_CACHE_TTL:
-        return _tags_cache
     try:
-        headers = get_sonarr_headers()
-        resp = http.get(f"{SONARR_URL}/api/v3/tag", headers=headers, timeout=10)
-        if resp.ok:
-            _tags_cache = resp.json()
-            _tags_cache_time = now
-            return _tags_cache
+        tags = _tags_cache.get(_fetch_sonarr_tags)
+        if tags is not None:
+            return tags
     except Exception as e:
         logger.warning(f"Could not fetch Sonarr tags: {e}")
-    return _tags_cache or []
+    return _tags_cache.peek() or []
 
 def invalidate_tags_cache():
-    global _tags_cache, _tags_cache_time
-    _tags_cache = None
-    _tags_cache_time = 0
+    _tags_cache.invalidate()
 
 def create_episeerr_default_tag():
     """Create a single 'episeerr_default' tag in Sonarr and return its ID."""
@@ -0,0 +1,112 @@
+"""
+Episode Table - compact, sorted per-series episode list for cleanup decisions
+
+Sonarr's /episode response carries overview, images, titles and more for
+every episode; keep-window and next-N logic only needs a handful of fields.
+EpisodeTable keeps those fields in __slots__ records, sorted once by
+(season, episode), with a parallel list of keys so position queries are
+bisect lookups instead of re-sorting and scanning the full list for every
+decision - which matters for daily shows with thousands of episodes.
+
+Records answer ep['seasonNumber'] / ep.get('hasFile') like the Sonarr dicts
+they replace, so the deletion and anchor-protection code that receives them
+doesn't change.
+"""
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+class EpisodeRecord:
+    __slots__ = ('id', 'seasonNumber', 'episodeNumber', 'episodeFileId', 'size',
+                 'airDateUtc', 'monitored', 'hasFile', 'title')
+
+    def __init__(self, episode: dict):
+        self.id = episode.get('id')
+        self.seasonNumber = episode.get('seasonNumber', 0) or 0
+        self.episodeNumber = episode.get('episodeNumber', 0) or 0
+        self.episodeFileId = episode.get('episodeFileId')
+        self.size = (episode.get('episodeFile') or {}).get('size', 0)
+        self.airDateUtc = episode.get('airDateUtc')
+        self.monitored = episode.get('monitored', False)
+        self.hasFile = bool(episode.get('hasFile'))
+        self.title = episode.get('title')
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if isinstance(key, str) else default
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"EpisodeRecord(S{self.seasonNumber}E{self.episodeNumber}, id={self.id}, hasFile={self.hasFile})"
+
+
+class EpisodeTable:
+    """One series' episodes, sorted by (season, episode)."""
+
+    __slots__ = ('records', 'keys')
+
+    def __init__(self, episodes: Iterable):
+        records = [ep if isinstance(ep, EpisodeRecord) else EpisodeRecord(ep) for ep in episodes or []]
+        records.sort(key=lambda r: (r.seasonNumber, r.episodeNumber))
+        self.records: List[EpisodeRecord] = records
+        self.keys: List[Tuple[int, int]] = [(r.seasonNumber, r.episodeNumber) for r in records]
+
+    @classmethod
+    def of(cls, episodes) -> 'EpisodeTable':
+        """Use an existing table as-is, or build one from Sonarr episode dicts."""
+        return episodes if isinstance(episodes, cls) else cls(episodes)
+
+    def __iter__(self) -> Iterator[EpisodeRecord]:
+        return iter(self.records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __bool__(self) -> bool:
+        return bool(self.records)
+
+    def index_of(self, season: int, episode: int) -> Optional[int]:
+        i = bisect_left(self.keys, (season, episode))
+        if i < len(self.keys) and self.keys[i] == (season, episode):
+            return i
+        return None
+
+    def find(self, season: int, episode: int) -> Optional[EpisodeRecord]:
+        i = self.index_of(season, episode)
+        return self.records[i] if i is not None else None
+
+    def _season_bounds(self, season: int) -> Tuple[int, int]:
+        # (season,) sorts before every (season, n) and after every (season - 1, n)
+        return bisect_left(self.keys, (season,)), bisect_left(self.keys, (season + 1,))
+
+    def season(self, season: int) -> List[EpisodeRecord]:
+        start, end = self._season_bounds(season)
+        return self.records[start:end]
+
+    def last_in_season(self, season: int) -> Optional[EpisodeRecord]:
+        start, end = self._season_bounds(season)
+        return self.records[end - 1] if end > start else None
+
+    def before_season(self, season: int) -> List[EpisodeRecord]:
+        return self.records[:bisect_left(self.keys, (season,))]
+
+    def from_season(self, season: int) -> List[EpisodeRecord]:
+        return self.records[bisect_left(self.keys, (season,)):]
+
+    def through(self, season: int, episode: int) -> List[EpisodeRecord]:
+        """Every episode up to and including SxEy."""
+        return self.records[:bisect_right(self.keys, (season, episode))]
+
+    def after(self, season: int, episode: int) -> List[EpisodeRecord]:
+        """Every episode strictly after SxEy."""
+        return self.records[bisect_right(self.keys, (season, episode)):]
@@ -0,0 +1,281 @@
+"""
+Event Bus - one push channel for dashboard deltas
+
+The dashboard, sidebar badge and widgets used to re-fetch everything on
+timers, whether or not anything had changed, once per open tab. Now the code
+that changes something publishes a small event and open pages get it over a
+single Server-Sent Events stream (/api/events):
+
+    activity   watch / search recorded (activity_storage)
+    pending    pending requests or deletions changed - carries the new counts
+    queue      Sonarr grabbed or imported an episode (webhooks)
+    polling    Plex / Jellyfin / Emby session polling progress and end
+    widget     an integration widget has new data (Sonos events, Docker)
+
+Publishers may be in any gunicorn worker or the media_processor subprocess,
+so events go through the event_log table in settings.db; its row id is the
+SSE event id, which lets a reconnecting browser resume with Last-Event-ID.
+Each process runs one pump thread - only while it has open streams - that
+reads new rows once per PUMP_INTERVAL (immediately for local publishes) and
+fans them out to its subscribers, so database work doesn't grow with tabs.
+
+gthread workers hold a thread per open stream, so at most MAX_STREAMS are
+served per process; beyond that /api/events answers 503 and the page keeps
+its timers. Publishing never raises: a lost event costs a refresh, nothing
+more.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import settings_db
+
+logger = logging.getLogger(__name__)
+
+TOPICS = ('activity', 'pending', 'queue', 'polling', 'widget')
+
+# Seconds between event_log reads while streams are open
+PUMP_INTERVAL = 1.0
+# Events older than this are pruned; a browser away longer gets 'resync'
+RETENTION_SECONDS = 15 * 60
+# Keep-alive comment interval, and how long one stream stays open before the
+# browser is asked to reconnect (recycles the worker thread)
+HEARTBEAT_SECONDS = 20
+STREAM_MAX_SECONDS = 30 * 60
+# Open streams per process (each holds one gthread worker thread)
+MAX_STREAMS = int(os.getenv('EPISEERR_MAX_EVENT_STREAMS', '4'))
+# A subscriber this far behind is dropped; its browser reconnects and resumes
+_SUBSCRIBER_BACKLOG = 500
+_PUMP_BATCH = 200
+
+
+def _connect():
+    return sqlite3.connect(settings_db.DB_PATH, timeout=10)
+
+
+# ── Publishing ──────────────────────────────────────────────────
+
+_last_prune = 0.0
+
+
+def publish(topic: str, data: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """Record an event for every open stream. Returns its id (None on error)."""
+    global _last_prune
+    if topic not in TOPICS:
+        raise ValueError(f"Unknown event topic: {topic}")
+    now = time.time()
+    try:
+        conn = _connect()
+        try:
+            cursor = conn.execute(
+                'INSERT INTO event_log (topic, data, created_at) VALUES (?, ?, ?)',
+                (topic, json.dumps(data or {}, default=str), now)
+            )
+            event_id = cursor.lastrowid
+            if now - _last_prune > 60:
+                _last_prune = now
+                conn.execute('DELETE FROM event_log WHERE created_at < ?', (now - RETENTION_SECONDS,))
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.debug(f"Event publish failed ({topic}): {e}")
+        return None
+    _pump.wake()
+    return event_id
+
+
+def publish_polling(source: str, session_key: Any, episode_info: Dict[str, Any], state: str,
+                    progress: Optional[float] = None) -> Optional[int]:
+    """Playback-poller update: state is 'polling', 'processed' or 'ended'."""
+    return publish('polling', {
+        'source': source,
+        'session': str(session_key),
+        'series_title': episode_info.get('series_name'),
+        'season': episode_info.get('season_number'),
+        'episode': episode_info.get('episode_number'),
+        'state': state,
+        'progress': round(progress, 1) if progress is not None else None,
+    })
+
+
+def events_since(last_id: int, limit: int = 200) -> List[Tuple[int, str, Dict[str, Any]]]:
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            'SELECT id, topic, data FROM event_log WHERE id > ? ORDER BY id LIMIT ?',
+            (last_id, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [(row[0], row[1], json.loads(row[2] or '{}')) for row in rows]
+
+
+def bounds() -> Tuple[int, int]:
+    """(oldest retained id, newest id); (0, 0) when the log is empty."""
+    conn = _connect()
+    try:
+        row = conn.execute('SELECT MIN(id), MAX(id) FROM event_log').fetchone()
+    finally:
+        conn.close()
+    return (row[0] or 0, row[1] or 0)
+
+
+# ── Per-process fan-out ─────────────────────────────────────────
+
+class _Pump:
+    """Reads event_log on behalf of every subscriber in this process."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._subscribers: Dict[int, queue.Queue] = {}
+        self._next_key = 0
+        self._last_id = None
+        self._woken = False
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self) -> Tuple[int, queue.Queue]:
+        with self._cond:
+            if self._last_id is None or not self._subscribers:
+                self._last_id = bounds()[1]
+            key = self._next_key
+            self._next_key += 1
+            q: queue.Queue = queue.Queue(maxsize=_SUBSCRIBER_BACKLOG)
+            self._subscribers[key] = q
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='event-bus', daemon=True)
+                self._thread.start()
+            return key, q
+
+    def unsubscribe(self, key: int) -> None:
+        with self._cond:
+            self._subscribers.pop(key, None)
+
+    def last_id(self) -> int:
+        with self._cond:
+            return self._last_id or 0
+
+    def wake(self) -> None:
+        with self._cond:
+            self._woken = True
+            self._cond.notify_all()
+
+    def subscriber_count(self) -> int:
+        with self._cond:
+            return len(self._subscribers)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+                if not self._woken:
+                    self._cond.wait(PUMP_INTERVAL)
+                self._woken = False
+                last_id = self._last_id or 0
+            try:
+                events = events_since(last_id, limit=_PUMP_BATCH)
+            except sqlite3.Error as e:
+                logger.debug(f"Event pump read failed: {e}")
+                time.sleep(PUMP_INTERVAL)
+                continue
+            if not events:
+                continue
+            with self._cond:
+                self._last_id = events[-1][0]
+                self._woken = self._woken or len(events) == _PUMP_BATCH   # more waiting
+                for key, q in list(self._subscribers.items()):
+                    for event in events:
+                        try:
+                            q.put_nowait(event)
+                        except queue.Full:
+                            # Too far behind - end its stream; the browser resumes by id
+                            self._subscribers.pop(key, None)
+                            with q.mutex:
+                                q.queue.clear()
+                            q.put_nowait(None)
+                            break
+
+
+_pump = _Pump()
+_stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+
+# ── SSE stream ──────────────────────────────────────────────────
+
+def _format(event_id: Optional[int], event: str, data: Any) -> str:
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def acquire_stream() -> bool:
+    """Reserve one of this process's stream slots (False when all are taken)."""
+    return _stream_slots.acquire(blocking=False)
+
+
+def release_stream() -> None:
+    _stream_slots.release()
+
+
+def stream(last_event_id: Optional[int] = None, topics: Optional[Iterable[str]] = None,
+           max_seconds: float = STREAM_MAX_SECONDS,
+           heartbeat: float = HEARTBEAT_SECONDS) -> Iterator[str]:
+    """
+    SSE text for one browser. Replays events after last_event_id first (or
+    sends 'resync' if they've been pruned), then live events until
+    max_seconds, with a comment line every `heartbeat` seconds. The caller
+    acquire_stream()s first and releases the slot when the response closes
+    (a generator that never starts never reaches its finally).
+    """
+    wanted = set(topics or TOPICS)
+    key, q = _pump.subscribe()
+    try:
+        yield 'retry: 5000\n\n'
+        cursor = _pump.last_id()
+        if last_event_id is not None:
+            oldest, _ = bounds()
+            if oldest and last_event_id < oldest - 1:
+                yield _format(cursor, 'resync', {})
+            else:
+                for event_id, topic, data in events_since(last_event_id, limit=_SUBSCRIBER_BACKLOG):
+                    if event_id > cursor:
+                        break
+                    if topic in wanted:
+                        yield _format(event_id, topic, data)
+        else:
+            yield _format(cursor, 'hello', {'topics': sorted(wanted)})
+
+        deadline = time.monotonic() + max_seconds
+        while time.monotonic() < deadline:
+            try:
+                event = q.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0.01)))
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+                continue
+            if event is None:
+                return
+            event_id, topic, data = event
+            if event_id <= cursor:
+                continue
+            if topic in wanted:
+                yield _format(event_id, topic, data)
+    finally:
+        _pump.unsubscribe(key)
+
+
+def status() -> Dict[str, Any]:
+    oldest, newest = bounds()
+    return {
+        'subscribers': _pump.subscriber_count(),
+        'max_streams': MAX_STREAMS,
+        'oldest_id': oldest,
+        'newest_id': newest,
+    }
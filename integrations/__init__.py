@@ -5,9 +5,12 @@ Integration discovery and auto-registration system
 import os
 import importlib
 import logging
+import time
 import traceback
 from typing import List, Optional
 
+import startup_timing
+
 logger = logging.getLogger(__name__)
 
 # Storage
@@ -41,6 +44,7 @@ def discover_integrations():
         
         logger.debug(f"Attempting to load: {module_name} ({full_path})")
         
+        started = time.monotonic()
         try:
             # Import the module
             module = importlib.import_module(f'integrations.{module_name}')
@@ -80,6 +84,8 @@ def discover_integrations():
         except Exception as e:
             logger.error(f"✗ Unexpected error loading {module_name}: {e}")
             traceback.print_exc()   # ← This shows the full stack trace!
+        finally:
+            startup_timing.record(f"integration {module_name}", time.monotonic() - started)
     
     logger.info(f"Final count: {_integrations and len(_integrations) or 0} integrations loaded")
     if _integrations:
@@ -0,0 +1,186 @@
+"""
+Live Docker container state from the /events stream.
+
+The sidebar liveness badges, quick-link filtering, the Docker widget and
+unified search all used to list /containers/json on a short TTL.
+ContainerStateMonitor does one full listing, then follows Docker's event
+stream and refreshes just the container an event names. Each stream is
+opened with an `until` RESYNC_SECONDS ahead, so Docker closes it on schedule
+and the loop does a fresh full listing - the safety net for anything missed
+while disconnected. Readers get the in-memory map with no Docker call.
+
+The subscriber thread starts on first use (ensure_started), so processes
+that never ask for container state - the media_processor subprocess - never
+open a stream. While the map isn't live (Docker unreachable, not configured,
+first sync pending) is_live() is False and callers fall back to listing.
+
+Not an integration: the leading underscore keeps discover_integrations()
+from loading it.
+"""
+import copy
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Full resync interval (and how long one event stream stays open)
+RESYNC_SECONDS = 300
+# Wait before reconnecting after an error, and between "is Docker configured?" checks
+RETRY_SECONDS = 30
+
+# Events that can change what /containers/json reports for a container
+CONTAINER_EVENTS = ['create', 'start', 'restart', 'stop', 'die', 'kill',
+                    'pause', 'unpause', 'rename', 'update', 'destroy']
+
+
+class ContainerStateMonitor:
+    """In-memory container map kept current from Docker's event stream.
+
+    host_provider() returns the configured Docker host (None = not
+    configured). list_containers(host, filters) returns /containers/json
+    (all=true) summaries; stream_events(host, params, timeout) yields
+    decoded event dicts until Docker closes the stream. on_change(event), if
+    given, is called after each container event has been applied.
+    """
+
+    def __init__(self, host_provider: Callable[[], Optional[str]],
+                 list_containers: Callable[[str, Optional[dict]], List[dict]],
+                 stream_events: Callable[[str, dict, float], Iterator[dict]],
+                 resync_seconds: float = RESYNC_SECONDS, retry_seconds: float = RETRY_SECONDS,
+                 on_change: Optional[Callable[[dict], None]] = None):
+        self._host_provider = host_provider
+        self._list_containers = list_containers
+        self._stream_events = stream_events
+        self.resync_seconds = resync_seconds
+        self.retry_seconds = retry_seconds
+        self._on_change = on_change
+        self._lock = threading.Lock()
+        self._containers: Dict[str, dict] = {}
+        self._host: Optional[str] = None
+        self._synced_at: Optional[float] = None
+        self._events_applied = 0
+        self._resyncs = 0
+        self._last_error: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # -- lifecycle ----------------------------------------------------------
+
+    def ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='docker-events', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                host = self._host_provider()
+            except Exception as e:
+                host = None
+                logger.debug(f"Docker host lookup failed: {e}")
+            if not host:
+                self._mark_stale(None)
+                self._stop.wait(self.retry_seconds)
+                continue
+            try:
+                since = self.resync(host)
+                params = {
+                    'since': int(since),
+                    'until': int(since + self.resync_seconds),
+                    'filters': json.dumps({'type': ['container'], 'event': CONTAINER_EVENTS}),
+                }
+                for event in self._stream_events(host, params, self.resync_seconds + 30):
+                    if self._stop.is_set():
+                        return
+                    self.apply_event(host, event)
+            except Exception as e:
+                self._mark_stale(str(e))
+                logger.debug(f"Docker event stream error ({host}): {e}")
+                self._stop.wait(self.retry_seconds)
+
+    def _mark_stale(self, error: Optional[str]) -> None:
+        with self._lock:
+            self._synced_at = None
+            self._last_error = error
+
+    # -- state updates ------------------------------------------------------
+
+    def resync(self, host: str) -> float:
+        """Replace the map with a full listing. Returns the listing time, which
+        the next event stream starts from so nothing in between is missed."""
+        started = time.time()
+        containers = self._list_containers(host, None)
+        with self._lock:
+            self._containers = {c.get('Id'): c for c in containers if c.get('Id')}
+            self._host = host
+            self._synced_at = time.monotonic()
+            self._resyncs += 1
+            self._last_error = None
+        return started
+
+    def apply_event(self, host: str, event: Dict[str, Any]) -> None:
+        if (event.get('Type') or 'container') != 'container':
+            return
+        container_id = (event.get('Actor') or {}).get('ID') or event.get('id')
+        if not container_id:
+            return
+        action = (event.get('Action') or event.get('status') or '').split(':')[0]
+        if action == 'destroy':
+            fresh = []
+        else:
+            fresh = self._list_containers(host, {'id': [container_id]})
+        with self._lock:
+            if fresh:
+                self._containers[fresh[0].get('Id', container_id)] = fresh[0]
+            else:
+                self._containers.pop(container_id, None)
+            self._events_applied += 1
+        if self._on_change:
+            try:
+                self._on_change(event)
+            except Exception as e:
+                logger.debug(f"Docker on_change callback failed: {e}")
+
+    # -- readers ------------------------------------------------------------
+
+    def is_live(self, host: Optional[str] = None) -> bool:
+        """True when the map reflects Docker right now (optionally: for host)."""
+        with self._lock:
+            live = (
+                self._synced_at is not None
+                and time.monotonic() - self._synced_at < self.resync_seconds * 2 + self.retry_seconds
+                and self._thread is not None and self._thread.is_alive()
+            )
+            return live and (host is None or host == self._host)
+
+    def containers(self, running_only: bool = False) -> List[dict]:
+        """/containers/json-shaped summaries (copies) from the live map."""
+        with self._lock:
+            values = list(self._containers.values())
+        if running_only:
+            values = [c for c in values if c.get('State') == 'running']
+        return copy.deepcopy(values)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'live': self._synced_at is not None,
+                'host': self._host,
+                'containers': len(self._containers),
+                'seconds_since_resync': (round(time.monotonic() - self._synced_at, 1)
+                                         if self._synced_at is not None else None),
+                'resyncs': self._resyncs,
+                'events_applied': self._events_applied,
+                'last_error': self._last_error,
+            }
@@ -0,0 +1,128 @@
+"""
+Library index for the Plex / Trakt watchlist syncs.
+
+The syncs used to check every watchlist item against Sonarr/Radarr one at a
+time, each check downloading the whole /series or /movie list. LibraryIndex
+fetches each list once per sync and answers "is this tmdb/tvdb id already
+in the library?" and "which Episeerr rule manages this series?" from dicts.
+
+It also memoizes the per-add lookups (quality profiles, root folders, the
+episeerr_select tag) so concurrent adds in one sync share a single fetch.
+
+Not an integration: the leading underscore keeps discover_integrations()
+from loading it.
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from episeerr_utils import http
+
+logger = logging.getLogger(__name__)
+
+# Adds sent to Sonarr/Radarr at once during a watchlist sync
+ADD_CONCURRENCY = 4
+
+
+def _get_sonarr_connection():
+    import sonarr_utils
+    prefs = sonarr_utils.load_preferences()
+    return prefs.get('SONARR_URL'), prefs.get('SONARR_API_KEY')
+
+
+def _get_radarr_connection():
+    from settings_db import get_service
+    radarr_config = get_service('radarr') or {}
+    return radarr_config.get('url', '').rstrip('/'), radarr_config.get('api_key', '')
+
+
+class LibraryIndex:
+    """tmdb/tvdb -> Sonarr series and tmdb -> Radarr movie, plus
+    Sonarr series id -> Episeerr rule name."""
+
+    def __init__(self, series: Optional[List[dict]] = None, movies: Optional[List[dict]] = None,
+                 rules: Optional[Dict[str, dict]] = None):
+        self.series_by_tmdb: Dict[str, dict] = {}
+        self.series_by_tvdb: Dict[str, dict] = {}
+        self.movies_by_tmdb: Dict[str, dict] = {}
+        self.rule_by_series: Dict[str, str] = {}
+        self._memo: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        for s in series or []:
+            self.add_series(s)
+        for m in movies or []:
+            self.add_movie(m)
+        for rule_name, rule_data in (rules or {}).items():
+            for series_id in rule_data.get('series', {}):
+                self.rule_by_series.setdefault(str(series_id), rule_name)
+
+    @classmethod
+    def build(cls, series: bool = True, movies: bool = True, rules: bool = True) -> 'LibraryIndex':
+        """One /series fetch, one /movie fetch and one config read. A source
+        that can't be reached is logged and left empty, like the old per-item
+        checks that returned None on error."""
+        series_list, movie_list, rule_map = [], [], {}
+        if series:
+            try:
+                url, key = _get_sonarr_connection()
+                resp = http.get(f"{url}/api/v3/series", headers={'X-Api-Key': key}, timeout=30)
+                resp.raise_for_status()
+                series_list = resp.json()
+            except Exception as e:
+                logger.error(f"Error loading Sonarr series for library index: {e}")
+        if movies:
+            try:
+                url, key = _get_radarr_connection()
+                if url and key:
+                    resp = http.get(f"{url}/api/v3/movie", headers={'X-Api-Key': key}, timeout=30)
+                    resp.raise_for_status()
+                    movie_list = resp.json()
+            except Exception as e:
+                logger.error(f"Error loading Radarr movies for library index: {e}")
+        if rules:
+            try:
+                from episeerr import load_config as load_episeerr_config
+                rule_map = load_episeerr_config().get('rules', {})
+            except Exception as e:
+                logger.debug(f"Could not load Episeerr rules for library index: {e}")
+        return cls(series_list, movie_list, rule_map)
+
+    def add_series(self, series: dict) -> None:
+        if series.get('tmdbId'):
+            self.series_by_tmdb[str(series['tmdbId'])] = series
+        if series.get('tvdbId'):
+            self.series_by_tvdb[str(series['tvdbId'])] = series
+
+    def add_movie(self, movie: dict) -> None:
+        if movie.get('tmdbId'):
+            self.movies_by_tmdb[str(movie['tmdbId'])] = movie
+
+    def find_series(self, tmdb_id=None, tvdb_id=None) -> Optional[dict]:
+        if tmdb_id and str(tmdb_id) in self.series_by_tmdb:
+            return self.series_by_tmdb[str(tmdb_id)]
+        if tvdb_id and str(tvdb_id) in self.series_by_tvdb:
+            return self.series_by_tvdb[str(tvdb_id)]
+        return None
+
+    def find_movie(self, tmdb_id) -> Optional[dict]:
+        if not tmdb_id:
+            return None
+        return self.movies_by_tmdb.get(str(tmdb_id))
+
+    def rule_for_series(self, series_id) -> Optional[str]:
+        return self.rule_by_series.get(str(series_id))
+
+    def memo(self, key: str, loader: Callable[[], Any]) -> Any:
+        """loader() once per index for `key`; concurrent callers wait for
+        the first one rather than all fetching."""
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+            value = loader()
+            self._memo[key] = value
+            return value
+
+
+def memo(index: Optional[LibraryIndex], key: str, loader: Callable[[], Any]) -> Any:
+    """index.memo() when syncing with an index, a plain call otherwise."""
+    return index.memo(key, loader) if index is not None else loader()
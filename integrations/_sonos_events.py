@@ -0,0 +1,315 @@
+"""
+Sonos UPnP eventing (GENA) - speakers push topology and playback changes
+
+Instead of asking every zone coordinator for its transport state on each
+widget refresh, Episeerr SUBSCRIBEs to the speakers' event services with a
+callback URL the speakers can reach (the Sonos integration's
+event_callback_url setting). Speakers then NOTIFY that URL:
+
+    ZoneGroupTopology  grouping changed   -> topology cache is invalidated
+    AVTransport        play/pause/track   -> stored transport state updated
+
+Subscriptions and the event-fed transport state live in settings.db, so a
+NOTIFY can land on any gunicorn worker. Subscriptions last
+SUBSCRIPTION_SECONDS and are renewed by the next widget refresh inside
+RENEW_BEFORE_SECONDS of expiry; one that can't be made is retried after
+RETRY_SECONDS and the widget polls in the meantime.
+
+Not an integration: the leading underscore keeps discover_integrations()
+from loading it.
+"""
+import json
+import sqlite3
+import threading
+import time
+import logging
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+import settings_db
+
+logger = logging.getLogger(__name__)
+
+TOPOLOGY_EVENT_PATH  = '/ZoneGroupTopology/Event'
+TRANSPORT_EVENT_PATH = '/MediaRenderer/AVTransport/Event'
+SUBSCRIPTION_SECONDS = 1800
+RENEW_BEFORE_SECONDS = 300
+RETRY_SECONDS        = 300
+
+_UPNP_EVENT_NS = 'urn:schemas-upnp-org:event-1-0'
+_AVT_EVENT_NS  = 'urn:schemas-upnp-org:metadata-1-0/AVT/'
+_DC_NS         = 'http://purl.org/dc/elements/1.1/'
+_UPNP_NS       = 'urn:schemas-upnp-org:metadata-1-0/upnp/'
+
+_EVENT_PATHS = {'topology': TOPOLOGY_EVENT_PATH, 'transport': TRANSPORT_EVENT_PATH}
+
+# (service, speaker) -> time of the last failed SUBSCRIBE, per process
+_failed_at: Dict[Tuple[str, str], float] = {}
+_failed_lock = threading.Lock()
+
+
+def _connect():
+    return sqlite3.connect(settings_db.DB_PATH, timeout=10)
+
+
+# ---------------------------------------------------------------------------
+# Event payload parsing
+# ---------------------------------------------------------------------------
+
+def parse_track_metadata(meta_text: Optional[str], base: str) -> Dict[str, Any]:
+    """DIDL-Lite track metadata -> {track, artist, album, album_art_url}.
+    Empty dict when there's nothing usable."""
+    if not meta_text or meta_text.strip() in ('', 'NOT_IMPLEMENTED'):
+        return {}
+    try:
+        meta = ET.fromstring(meta_text)
+    except ET.ParseError as pe:
+        logger.debug(f"TrackMetaData parse error: {pe}")
+        return {}
+    art = (meta.findtext(f'.//{{{_UPNP_NS}}}albumArtURI') or '').strip()
+    return {
+        'track':         meta.findtext(f'.//{{{_DC_NS}}}title'),
+        'artist':        meta.findtext(f'.//{{{_DC_NS}}}creator'),
+        'album':         meta.findtext(f'.//{{{_UPNP_NS}}}album'),
+        'album_art_url': (art if art.startswith('http') else f"{base}{art}") if art else None,
+    }
+
+
+def _properties(body: bytes) -> Dict[str, str]:
+    """<e:propertyset> NOTIFY body -> {property name: text}."""
+    root = ET.fromstring(body)
+    props = {}
+    for prop in root.findall(f'{{{_UPNP_EVENT_NS}}}property'):
+        for child in prop:
+            props[child.tag.split('}')[-1]] = child.text or ''
+    return props
+
+
+def parse_last_change(body: bytes, base: str) -> Dict[str, Any]:
+    """AVTransport NOTIFY body -> the transport fields it changes."""
+    last_change = _properties(body).get('LastChange')
+    if not last_change:
+        return {}
+    instance = ET.fromstring(last_change).find(f'{{{_AVT_EVENT_NS}}}InstanceID')
+    if instance is None:
+        return {}
+    changes: Dict[str, Any] = {}
+    state = instance.find(f'{{{_AVT_EVENT_NS}}}TransportState')
+    if state is not None:
+        changes['is_playing'] = state.get('val') == 'PLAYING'
+    meta = instance.find(f'{{{_AVT_EVENT_NS}}}CurrentTrackMetaData')
+    if meta is not None:
+        changes.update({'track': None, 'artist': None, 'album': None, 'album_art_url': None})
+        changes.update(parse_track_metadata(meta.get('val'), base))
+    return changes
+
+
+# ---------------------------------------------------------------------------
+# Subscriptions
+# ---------------------------------------------------------------------------
+
+def _timeout_seconds(header: Optional[str]) -> int:
+    try:
+        return int((header or '').split('-', 1)[1])
+    except (IndexError, ValueError):
+        return SUBSCRIPTION_SECONDS
+
+
+def _subscribe(speaker: str, service: str, callback_url: str,
+               sid: Optional[str] = None) -> Optional[Tuple[str, int]]:
+    """SUBSCRIBE (or renew `sid`). Returns (sid, seconds) or None."""
+    headers = {'TIMEOUT': f'Second-{SUBSCRIPTION_SECONDS}'}
+    if sid:
+        headers['SID'] = sid
+    else:
+        headers.update({'CALLBACK': f'<{callback_url}>', 'NT': 'upnp:event'})
+    try:
+        resp = requests.request('SUBSCRIBE', f"{speaker}{_EVENT_PATHS[service]}",
+                                headers=headers, timeout=3)
+        if resp.status_code == 200 and resp.headers.get('SID'):
+            return resp.headers['SID'], _timeout_seconds(resp.headers.get('TIMEOUT'))
+        logger.debug(f"Sonos SUBSCRIBE {service} @ {speaker} returned {resp.status_code}")
+    except Exception as e:
+        logger.debug(f"Sonos SUBSCRIBE {service} @ {speaker} failed: {e}")
+    return None
+
+
+def _recently_failed(key: Tuple[str, str], now: float) -> bool:
+    with _failed_lock:
+        failed = _failed_at.get(key)
+        return failed is not None and now - failed < RETRY_SECONDS
+
+
+def ensure_subscriptions(speaker: str, coordinators: Iterable[str], callback_url: str) -> bool:
+    """
+    Make sure this speaker's topology events and each coordinator's transport
+    events are subscribed to callback_url, renewing any close to expiry.
+    Returns True when every subscription is live. Nothing is sent while they
+    are all comfortably current - the common case is one SELECT.
+    """
+    wanted = [('topology', speaker)] + [('transport', c) for c in dict.fromkeys(coordinators)]
+    now = time.time()
+    conn = _connect()
+    try:
+        rows = {
+            (r[0], r[1]): r[2:]
+            for r in conn.execute(
+                'SELECT service, speaker, sid, callback_url, expires_at FROM sonos_subscriptions'
+            )
+        }
+        live = True
+        for key in wanted:
+            sid, callback, expires_at = rows.get(key, (None, None, 0))
+            if sid and callback == callback_url and expires_at - now > RENEW_BEFORE_SECONDS:
+                continue
+            if _recently_failed(key, now):
+                live = live and bool(sid and callback == callback_url and expires_at > now)
+                continue
+            service, target = key
+            result = None
+            if sid and callback == callback_url and expires_at > now:
+                result = _subscribe(target, service, callback_url, sid=sid)
+            if result is None:
+                result = _subscribe(target, service, callback_url)
+            if result is None:
+                with _failed_lock:
+                    _failed_at[key] = now
+                conn.execute('DELETE FROM sonos_subscriptions WHERE service = ? AND speaker = ?', key)
+                live = False
+                continue
+            new_sid, seconds = result
+            conn.execute(
+                '''INSERT INTO sonos_subscriptions (service, speaker, sid, callback_url, expires_at)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(service, speaker) DO UPDATE SET
+                       sid = excluded.sid, callback_url = excluded.callback_url,
+                       expires_at = excluded.expires_at''',
+                (service, target, new_sid, callback_url, now + seconds)
+            )
+            if new_sid != sid:
+                # New subscription: state from an old one can't be trusted
+                conn.execute('DELETE FROM sonos_transport WHERE speaker = ?', (target,))
+        conn.commit()
+        return live
+    except sqlite3.Error as e:
+        logger.warning(f"Sonos subscription bookkeeping failed: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def is_subscribed(service: str, speaker: str) -> bool:
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute(
+                'SELECT expires_at FROM sonos_subscriptions WHERE service = ? AND speaker = ?',
+                (service, speaker)
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    return bool(row and row[0] > time.time())
+
+
+def subscriptions() -> List[Dict[str, Any]]:
+    conn = _connect()
+    try:
+        conn.row_factory = sqlite3.Row
+        now = time.time()
+        return [
+            dict(row, expires_in=round(row['expires_at'] - now))
+            for row in conn.execute(
+                'SELECT service, speaker, sid, callback_url, expires_at FROM sonos_subscriptions '
+                'ORDER BY service, speaker'
+            )
+        ]
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# NOTIFY handling + event-fed transport state
+# ---------------------------------------------------------------------------
+
+def handle_notify(sid: Optional[str], body: bytes) -> Optional[str]:
+    """
+    Apply one NOTIFY. Returns the service it was for ('topology' /
+    'transport'), or None if the SID isn't one we hold. The speaker sends its
+    first NOTIFY straight after answering SUBSCRIBE - possibly before the SID
+    is stored - so unknown SIDs are ignored rather than refused; the next
+    refresh polls that coordinator and seeds its state instead.
+    """
+    if not sid:
+        return None
+    conn = _connect()
+    try:
+        row = conn.execute(
+            'SELECT service, speaker FROM sonos_subscriptions WHERE sid = ?', (sid,)
+        ).fetchone()
+        if not row:
+            return None
+        service, speaker = row
+        if service == 'transport':
+            try:
+                changes = parse_last_change(body, speaker)
+            except ET.ParseError as e:
+                logger.debug(f"Sonos NOTIFY from {speaker} unparseable: {e}")
+                changes = {}
+            if changes:
+                _merge_transport(conn, speaker, changes)
+                conn.commit()
+        return service
+    finally:
+        conn.close()
+
+
+def _merge_transport(conn, speaker: str, changes: Dict[str, Any]) -> None:
+    row = conn.execute('SELECT state FROM sonos_transport WHERE speaker = ?', (speaker,)).fetchone()
+    state = json.loads(row[0]) if row else {}
+    state.update(changes)
+    conn.execute(
+        '''INSERT INTO sonos_transport (speaker, state, updated_at) VALUES (?, ?, ?)
+           ON CONFLICT(speaker) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at''',
+        (speaker, json.dumps(state), time.time())
+    )
+
+
+def seed_transport(speaker: str, info: Dict[str, Any]) -> None:
+    """Store a polled state for a subscribed coordinator whose events haven't
+    filled it in yet; later NOTIFYs update it from there."""
+    try:
+        conn = _connect()
+        try:
+            _merge_transport(conn, speaker, info)
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.debug(f"Sonos transport seed failed for {speaker}: {e}")
+
+
+def get_transport(speaker: str) -> Optional[Dict[str, Any]]:
+    """Event-fed transport state for a coordinator, or None if it isn't
+    subscribed or nothing has been recorded for it yet."""
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute(
+                '''SELECT t.state FROM sonos_transport t
+                   JOIN sonos_subscriptions s ON s.service = 'transport' AND s.speaker = t.speaker
+                   WHERE t.speaker = ? AND s.expires_at > ?''',
+                (speaker, time.time())
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    if not row:
+        return None
+    state = {'is_playing': False, 'track': None, 'artist': None, 'album': None, 'album_art_url': None}
+    state.update(json.loads(row[0]))
+    return state
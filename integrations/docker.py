@@ -7,14 +7,18 @@ No extra dependencies — uses requests (already installed) to talk
 to the Docker socket or TCP host directly via HTTP.
 """
 
+import http.client
+import json
 import logging
 import requests
 import requests.adapters
 import socket
 import urllib.parse
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Iterator, Optional, List, Tuple
 from flask import Blueprint, jsonify
 from integrations.base import ServiceIntegration
+from integrations._docker_events import ContainerStateMonitor
+import event_bus
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +35,21 @@ DEFAULT_MEDIA_NAMES = [
 # Unix socket adapter for requests
 # ---------------------------------------------------------------------------
 
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """http.client connection over a Unix domain socket."""
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__('localhost', timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self):
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            s.settimeout(self.timeout)
+        s.connect(self._socket_path)
+        self.sock = s
+
+
 class UnixSocketAdapter(requests.adapters.HTTPAdapter):
     """Lets requests talk to a Unix domain socket."""
 
@@ -39,19 +58,6 @@ class UnixSocketAdapter(requests.adapters.HTTPAdapter):
         super().__init__(**kwargs)
 
     def send(self, request, **kwargs):
-        # Build a session that connects via the Unix socket
-        import http.client
-
-        class UnixHTTPConnection(http.client.HTTPConnection):
-            def __init__(self, socket_path):
-                super().__init__('localhost')
-                self._socket_path = socket_path
-
-            def connect(self):
-                s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-                s.connect(self._socket_path)
-                self.sock = s
-
         parsed = urllib.parse.urlparse(request.url)
         path = parsed.path
         if parsed.query:
@@ -116,6 +122,68 @@ def _docker_post(host: str, path: str) -> int:
     return resp.status_code
 
 
+def _docker_stream_events(host: str, params: dict, timeout: float) -> Iterator[dict]:
+    """
+    Follow GET /events, yielding one decoded event per line until Docker
+    closes the stream (the `until` param) or the socket times out.
+    Uses http.client directly: UnixSocketAdapter reads whole bodies.
+    """
+    path = '/events?' + urllib.parse.urlencode(params)
+    if host.startswith('unix://'):
+        conn = UnixHTTPConnection(host[len('unix://'):], timeout=timeout)
+    else:
+        parsed = urllib.parse.urlparse(host.replace('tcp://', 'http://'))
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 2375, timeout=timeout)
+    try:
+        conn.request('GET', path)
+        raw = conn.getresponse()
+        if raw.status != 200:
+            raise RuntimeError(f'Docker /events returned {raw.status}')
+        for line in iter(raw.readline, b''):
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    finally:
+        conn.close()
+
+
+def _list_all_containers(host: str, filters: Optional[dict] = None) -> list:
+    params = {'all': 'true'}
+    if filters:
+        params['filters'] = json.dumps(filters)
+    return _docker_get(host, '/containers/json', params)
+
+
+def _configured_docker_host() -> Optional[str]:
+    """Docker host from the saved service row, or None if Docker isn't set up."""
+    from settings_db import get_service
+    svc = get_service('docker', 'default')
+    if not svc:
+        return None
+    config = svc.get('config') or {}
+    return config.get('docker_host') or svc.get('url') or 'unix:///var/run/docker.sock'
+
+
+def _publish_container_change(event: dict) -> None:
+    event_bus.publish('widget', {'service': 'docker', 'action': event.get('Action')})
+
+
+# Live container map fed by Docker's event stream (see _docker_events)
+container_monitor = ContainerStateMonitor(_configured_docker_host, _list_all_containers, _docker_stream_events,
+                                          on_change=_publish_container_change)
+
+
+def list_containers(host: str) -> list:
+    """
+    All containers (/containers/json?all=true) for host - from the live event
+    map when it's in sync with that host, otherwise a direct listing.
+    """
+    container_monitor.ensure_started()
+    if container_monitor.is_live(host):
+        return container_monitor.containers()
+    return _list_all_containers(host)
+
+
 # ---------------------------------------------------------------------------
 # Integration class
 # ---------------------------------------------------------------------------
@@ -217,7 +285,7 @@ class DockerIntegration(ServiceIntegration):
     def get_dashboard_stats(self, url: str, api_key: str) -> Dict[str, Any]:
         host = url or 'unix:///var/run/docker.sock'
         try:
-            containers = _docker_get(host, '/containers/json', {'all': 'true'})
+            containers = list_containers(host)
             stack, filter_str = self._get_filter_config()
             media = self._filter_containers(containers, stack, filter_str)
             running = sum(1 for c in media if c.get('State') == 'running')
@@ -256,7 +324,7 @@ class DockerIntegration(ServiceIntegration):
                 })
 
             try:
-                raw = _docker_get(host, '/containers/json', {'all': 'true'})
+                raw = list_containers(host)
                 media = integration._filter_containers(raw, stack, filter_str)
 
                 result = []
@@ -277,6 +345,10 @@ class DockerIntegration(ServiceIntegration):
                 logger.error(f'Docker list error: {e}')
                 return jsonify({'available': False, 'containers': [], 'error': str(e)})
 
+        @bp.route('/api/docker/event-monitor')
+        def event_monitor():
+            return jsonify(container_monitor.status())
+
         @bp.route('/api/docker/container/<container_id>/<action>', methods=['POST'])
         def container_action(container_id, action):
             if action not in ('start', 'stop', 'restart'):
@@ -15,6 +15,9 @@ from typing import Dict, Any, Optional, List
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 from integrations.base import ServiceIntegration
+import shared_state
+import watch_trace
+import event_bus
 
 logger = logging.getLogger(__name__)
 
@@ -270,8 +273,10 @@ class EmbyIntegration(ServiceIntegration):
         """Check if progress meets trigger threshold"""
         return progress >= float(threshold)
 
-    def poll_session(self, session_id: str, initial_episode_info: Dict):
-        """Poll a specific Emby session until trigger percentage or session ends"""
+    def poll_session(self, session_id: str, initial_episode_info: Dict, claim: Optional[str] = None):
+        """Poll a specific Emby session until trigger percentage or session ends.
+        `claim` is the shared_state token from start_polling(); polling stops
+        once that claim is released (PlaybackStop may land on another worker)."""
         config = self.get_config()
         if not config:
             return
@@ -287,7 +292,7 @@ class EmbyIntegration(ServiceIntegration):
             processed = False
             poll_count = 0
 
-            while session_id in active_emby_sessions and not processed:
+            while shared_state.is_session_active('emby', session_id, claim) and not processed:
                 poll_count += 1
 
                 # Get current session state
@@ -315,6 +320,7 @@ class EmbyIntegration(ServiceIntegration):
                 is_paused = current_episode_info['is_paused']
 
                 logger.info(f"📊 Poll #{poll_count}: {current_progress:.1f}% {'(PAUSED)' if is_paused else ''}")
+                event_bus.publish_polling('emby', session_id, initial_episode_info, 'polling', current_progress)
 
                 # Check if we should trigger processing
                 if self.should_trigger(current_progress, trigger_percentage):
@@ -323,6 +329,7 @@ class EmbyIntegration(ServiceIntegration):
                     success = self.process_episode(current_episode_info)
                     if success:
                         processed = True
+                        event_bus.publish_polling('emby', session_id, initial_episode_info, 'processed', current_progress)
                         logger.info(f"✅ Successfully processed - stopping polling for session {session_id}")
                     else:
                         logger.warning(f"⚠️ Processing failed - continuing polling")
@@ -331,7 +338,7 @@ class EmbyIntegration(ServiceIntegration):
                 if not processed:
                     time.sleep(poll_interval)
 
-            if not processed and session_id not in active_emby_sessions:
+            if not processed and not shared_state.is_session_active('emby', session_id, claim):
                 logger.info(f"🔄 Polling stopped for session {session_id} - session ended before trigger")
 
         except Exception as e:
@@ -340,18 +347,22 @@ class EmbyIntegration(ServiceIntegration):
         finally:
             # Clean up
             with emby_polling_lock:
-                if session_id in active_emby_sessions:
-                    del active_emby_sessions[session_id]
-                if session_id in emby_polling_threads:
+                # Only drop local entries that still belong to this thread - the
+                # session id may already be polled again for the next episode
+                if emby_polling_threads.get(session_id) is threading.current_thread():
+                    active_emby_sessions.pop(session_id, None)
                     del emby_polling_threads[session_id]
+            shared_state.release_session('emby', session_id, claim)
+            event_bus.publish_polling('emby', session_id, initial_episode_info, 'ended')
 
             logger.info(f"🧹 Cleaned up polling for session {session_id}")
 
     def start_polling(self, session_id: str, episode_info: Dict) -> bool:
         """Start polling for a specific Emby session"""
         with emby_polling_lock:
-            # Don't start if already polling this session
-            if session_id in active_emby_sessions:
+            # Don't start if any worker is already polling this session
+            claim = shared_state.claim_session('emby', session_id, episode_info)
+            if claim is None:
                 logger.info(f"⏭️ Already polling session {session_id} - skipping")
                 return False
 
@@ -365,7 +376,7 @@ class EmbyIntegration(ServiceIntegration):
             # Start polling thread
             thread = threading.Thread(
                 target=self.poll_session,
-                args=(session_id, episode_info),
+                args=(session_id, episode_info, claim),
                 daemon=True,
                 name=f"EmbyPoll-{session_id[:8]}"
             )
@@ -377,9 +388,9 @@ class EmbyIntegration(ServiceIntegration):
     def stop_polling(self, session_id: str) -> bool:
         """Stop polling for a specific session"""
         with emby_polling_lock:
-            if session_id in active_emby_sessions:
+            active_emby_sessions.pop(session_id, None)
+            if shared_state.release_session('emby', session_id):
                 logger.info(f"🛑 Stopping Emby polling for session {session_id}")
-                del active_emby_sessions[session_id]
                 return True
             return False
 
@@ -406,6 +417,7 @@ class EmbyIntegration(ServiceIntegration):
             processed_jellyfin_episodes.add(tracking_key)
 
             logger.info(f"🎯 Processing Emby episode at {progress:.1f}%")
+            trace_id = watch_trace.start_trace('emby', series_name, season, episode, user_name)
 
             # Get Sonarr series ID
             from media_processor import get_series_id
@@ -434,7 +446,8 @@ class EmbyIntegration(ServiceIntegration):
                 'sonarr_series_id': series_id,
                 'rule': final_rule,
                 'source': 'emby',
-                'user': user_name
+                'user': user_name,
+                'trace_id': trace_id,
             }
 
             temp_file_path = os.path.join(temp_dir, f'data_from_server_{os.urandom(4).hex()}.json')
@@ -760,8 +773,8 @@ class EmbyIntegration(ServiceIntegration):
             """Get current Emby polling status for debugging"""
             try:
                 with emby_polling_lock:
-                    active_sessions = list(active_emby_sessions.keys())
-                    thread_count = len(emby_polling_threads)
+                    active_sessions = list(shared_state.get_sessions('emby').keys())  # all workers
+                    thread_count = len(emby_polling_threads)  # this worker
 
                     config = integration.get_config()
                     trigger_percentage = float(config.get('trigger_percentage', 50.0)) if config else 50.0
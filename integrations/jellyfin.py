@@ -15,6 +15,9 @@ from typing import Dict, Any, Optional, List
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 from integrations.base import ServiceIntegration
+import shared_state
+import watch_trace
+import event_bus
 
 logger = logging.getLogger(__name__)
 
@@ -292,8 +295,10 @@ class JellyfinIntegration(ServiceIntegration):
         """Check if progress meets trigger threshold"""
         return progress >= float(threshold) 
     
-    def poll_session(self, session_id: str, initial_episode_info: Dict):
-        """Poll a specific Jellyfin session until trigger percentage or session ends"""
+    def poll_session(self, session_id: str, initial_episode_info: Dict, claim: Optional[str] = None):
+        """Poll a specific Jellyfin session until trigger percentage or session ends.
+        `claim` is the shared_state token from start_polling(); polling stops
+        once that claim is released (PlaybackStop may land on another worker)."""
         config = self.get_config()
         if not config:
             return
@@ -309,7 +314,7 @@ class JellyfinIntegration(ServiceIntegration):
             processed = False
             poll_count = 0
             
-            while session_id in active_jellyfin_sessions and not processed:
+            while shared_state.is_session_active('jellyfin', session_id, claim) and not processed:
                 poll_count += 1
                 
                 # Get current session state
@@ -337,6 +342,7 @@ class JellyfinIntegration(ServiceIntegration):
                 is_paused = current_episode_info['is_paused']
                 
                 logger.info(f"📊 Poll #{poll_count}: {current_progress:.1f}% {'(PAUSED)' if is_paused else ''}")
+                event_bus.publish_polling('jellyfin', session_id, initial_episode_info, 'polling', current_progress)
                 
                 # Check if we should trigger processing
                 if self.should_trigger(current_progress, trigger_percentage):
@@ -345,6 +351,7 @@ class JellyfinIntegration(ServiceIntegration):
                     success = self.process_episode(current_episode_info)
                     if success:
                         processed = True
+                        event_bus.publish_polling('jellyfin', session_id, initial_episode_info, 'processed', current_progress)
                         logger.info(f"✅ Successfully processed - stopping polling for session {session_id}")
                     else:
                         logger.warning(f"⚠️ Processing failed - continuing polling")
@@ -353,7 +360,7 @@ class JellyfinIntegration(ServiceIntegration):
                 if not processed:
                     time.sleep(poll_interval)
             
-            if not processed and session_id not in active_jellyfin_sessions:
+            if not processed and not shared_state.is_session_active('jellyfin', session_id, claim):
                 logger.info(f"🔄 Polling stopped for session {session_id} - session ended before trigger")
             
         except Exception as e:
@@ -362,18 +369,22 @@ class JellyfinIntegration(ServiceIntegration):
         finally:
             # Clean up
             with jellyfin_polling_lock:
-                if session_id in active_jellyfin_sessions:
-                    del active_jellyfin_sessions[session_id]
-                if session_id in jellyfin_polling_threads:
+                # Only drop local entries that still belong to this thread - the
+                # session id may already be polled again for the next episode
+                if jellyfin_polling_threads.get(session_id) is threading.current_thread():
+                    active_jellyfin_sessions.pop(session_id, None)
                     del jellyfin_polling_threads[session_id]
+            shared_state.release_session('jellyfin', session_id, claim)
+            event_bus.publish_polling('jellyfin', session_id, initial_episode_info, 'ended')
             
             logger.info(f"🧹 Cleaned up polling for session {session_id}")
     
     def start_polling(self, session_id: str, episode_info: Dict) -> bool:
         """Start polling for a specific Jellyfin session"""
         with jellyfin_polling_lock:
-            # Don't start if already polling this session
-            if session_id in active_jellyfin_sessions:
+            # Don't start if any worker is already polling this session
+            claim = shared_state.claim_session('jellyfin', session_id, episode_info)
+            if claim is None:
                 logger.info(f"⏭️ Already polling session {session_id} - skipping")
                 return False
             
@@ -387,7 +398,7 @@ class JellyfinIntegration(ServiceIntegration):
             # Start polling thread
             thread = threading.Thread(
                 target=self.poll_session,
-                args=(session_id, episode_info),
+                args=(session_id, episode_info, claim),
                 daemon=True,
                 name=f"JellyfinPoll-{session_id[:8]}"
             )
@@ -399,9 +410,9 @@ class JellyfinIntegration(ServiceIntegration):
     def stop_polling(self, session_id: str) -> bool:
         """Stop polling for a specific session"""
         with jellyfin_polling_lock:
-            if session_id in active_jellyfin_sessions:
+            active_jellyfin_sessions.pop(session_id, None)
+            if shared_state.release_session('jellyfin', session_id):
                 logger.info(f"🛑 Stopping Jellyfin polling for session {session_id}")
-                del active_jellyfin_sessions[session_id]
                 return True
             return False
     # ==========================================
@@ -418,6 +429,7 @@ class JellyfinIntegration(ServiceIntegration):
             progress = episode_info.get('progress_percent', 0)
             
             logger.info(f"🎯 Processing Jellyfin episode: {series_name} S{season}E{episode} at {progress:.1f}%")
+            trace_id = watch_trace.start_trace('jellyfin', series_name, season, episode, user_name)
 
             # Get Sonarr series ID
             from media_processor import get_series_id
@@ -451,7 +463,8 @@ class JellyfinIntegration(ServiceIntegration):
                 'sonarr_series_id': series_id,
                 'rule': final_rule,
                 'source': 'jellyfin',
-                'user': user_name
+                'user': user_name,
+                'trace_id': trace_id,
             }
             
             temp_file_path = os.path.join(temp_dir, f'data_from_server_{os.urandom(4).hex()}.json')
@@ -861,8 +874,8 @@ class JellyfinIntegration(ServiceIntegration):
             """Get current Jellyfin polling status for debugging"""
             try:
                 with jellyfin_polling_lock:
-                    active_sessions = list(active_jellyfin_sessions.keys())
-                    thread_count = len(jellyfin_polling_threads)
+                    active_sessions = list(shared_state.get_sessions('jellyfin').keys())  # all workers
+                    thread_count = len(jellyfin_polling_threads)  # this worker
                     
                     config = integration.get_config()
                     trigger_percentage = config.get('trigger_percentage', 50.0) if config else 50.0
@@ -12,10 +12,15 @@ import logging
 import threading
 import time
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List, Tuple
 from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime, timedelta
 from integrations.base import ServiceIntegration
+from integrations._library_index import LibraryIndex, ADD_CONCURRENCY, memo as library_memo
+import shared_state
+import watch_trace
+import event_bus
 
 logger = logging.getLogger(__name__)
 
@@ -42,9 +47,9 @@ _plex_poll_threads: Dict[str, threading.Thread] = {}
 
 # Dedup tracking for stop_threshold mode: prevents scrobble safety-net
 # from double-processing an episode already handled by media.stop.
-# Key: "SeriesName:SxEy"  Value: unix timestamp of processing
-_processed_lock: threading.Lock = threading.Lock()
-_recently_processed: Dict[str, float] = {}
+# Key: "SeriesName:SxEy". Kept in shared_state so it holds when media.stop
+# and the scrobble land on different gunicorn workers.
+_PROCESSED_NAMESPACE = 'plex_episode'
 _RECENT_TTL = 7200  # 2 hours — enough to span a stop → scrobble gap
 
 
@@ -53,20 +58,11 @@ def _ep_key(series_name: str, season, episode) -> str:
 
 
 def _mark_episode_processed(key: str) -> None:
-    import time
-    with _processed_lock:
-        _recently_processed[key] = time.time()
+    shared_state.mark_processed(_PROCESSED_NAMESPACE, key)
 
 
 def _was_episode_processed(key: str) -> bool:
-    import time
-    with _processed_lock:
-        ts = _recently_processed.get(key)
-        if ts and (time.time() - ts) < _RECENT_TTL:
-            return True
-        if ts:
-            del _recently_processed[key]  # expired — clean up
-        return False
+    return shared_state.was_processed(_PROCESSED_NAMESPACE, key, _RECENT_TTL)
 
 
 def _get_plex_detection_cfg() -> Dict:
@@ -190,10 +186,13 @@ def save_sync_data(data: dict):
         logger.error(f"Error saving sync data: {e}")
 
 
+# Job name for the watchlist sync in job_scheduler
+PLEX_SYNC_JOB = 'plex_watchlist_sync'
+
+
 class PlexIntegration(ServiceIntegration):
     """Plex integration handler"""
     
-    _sync_thread = None
     _sync_running = False
     
     # ==========================================
@@ -750,7 +749,8 @@ class PlexIntegration(ServiceIntegration):
             logger.error(f"Error checking Radarr: {e}")
             return None
     
-    def add_tv_to_sonarr(self, item: dict, sync_config: dict) -> dict:
+    def add_tv_to_sonarr(self, item: dict, sync_config: dict,
+                         index: Optional[LibraryIndex] = None) -> dict:
         """Add a TV show to Sonarr with episeerr_select tag.
         
         Watchlist TV shows always use episeerr_select so the user gets
@@ -758,6 +758,9 @@ class PlexIntegration(ServiceIntegration):
         The sonarr_webhook detects episeerr_select → creates a pending
         selection request → sends notification → user decides.
         
+        index: the sync's LibraryIndex - existence check and the profile /
+        root folder / tag lookups come from it instead of fresh requests.
+        
         Returns: {'success': bool, 'status': str, 'series_id': int or None, 'message': str}
         """
         try:
@@ -774,7 +777,10 @@ class PlexIntegration(ServiceIntegration):
                         'message': f"No TVDB/TMDB ID for {item.get('title')}"}
             
             # Check if already exists FIRST
-            existing = self.check_exists_in_sonarr(tmdb_id=tmdb_id, tvdb_id=tvdb_id)
+            if index is not None:
+                existing = index.find_series(tmdb_id=tmdb_id, tvdb_id=tvdb_id)
+            else:
+                existing = self.check_exists_in_sonarr(tmdb_id=tmdb_id, tvdb_id=tvdb_id)
             if existing:
                 return {'success': True, 'status': 'already_exists', 'series_id': existing.get('id'),
                         'message': f"{item.get('title')} already in Sonarr"}
@@ -797,35 +803,46 @@ class PlexIntegration(ServiceIntegration):
             root_folder = sync_config.get('tv_root_folder')
 
             # Get defaults if not specified
-            if not quality_profile:
+            def _default_quality_profile():
                 profiles_resp = http.get(f"{sonarr_url}/api/v3/qualityprofile", headers=headers, timeout=10)
                 if profiles_resp.ok and profiles_resp.json():
                     from settings_db import get_preferred_quality_profile
-                    quality_profile = get_preferred_quality_profile('sonarr', profiles_resp.json())
-            
-            if not root_folder:
+                    return get_preferred_quality_profile('sonarr', profiles_resp.json())
+                return None
+
+            def _default_root_folder():
                 folders_resp = http.get(f"{sonarr_url}/api/v3/rootfolder", headers=headers, timeout=10)
                 if folders_resp.ok and folders_resp.json():
-                    root_folder = folders_resp.json()[0]['path']
+                    return folders_resp.json()[0]['path']
+                return None
+
+            if not quality_profile:
+                quality_profile = library_memo(index, 'sonarr_quality_profile', _default_quality_profile)
+            
+            if not root_folder:
+                root_folder = library_memo(index, 'sonarr_root_folder', _default_root_folder)
             
             # Get episeerr_select tag ID
-            tags = []
-            try:
-                tag_resp = http.get(f"{sonarr_url}/api/v3/tag", headers=headers, timeout=10)
-                if tag_resp.ok:
-                    existing_tags = {t['label'].lower(): t['id'] for t in tag_resp.json()}
-                    if 'episeerr_select' in existing_tags:
-                        tags.append(existing_tags['episeerr_select'])
-                    else:
+            def _select_tag_id():
+                try:
+                    tag_resp = http.get(f"{sonarr_url}/api/v3/tag", headers=headers, timeout=10)
+                    if tag_resp.ok:
+                        existing_tags = {t['label'].lower(): t['id'] for t in tag_resp.json()}
+                        if 'episeerr_select' in existing_tags:
+                            return existing_tags['episeerr_select']
                         # Create it
                         create_resp = http.post(f"{sonarr_url}/api/v3/tag",
                                                     headers=headers,
                                                     json={'label': 'episeerr_select'},
                                                     timeout=10)
                         if create_resp.ok:
-                            tags.append(create_resp.json()['id'])
-            except Exception as tag_err:
-                logger.warning(f"Error setting episeerr_select tag: {tag_err}")
+                            return create_resp.json()['id']
+                except Exception as tag_err:
+                    logger.warning(f"Error setting episeerr_select tag: {tag_err}")
+                return None
+
+            select_tag = library_memo(index, 'sonarr_select_tag', _select_tag_id)
+            tags = [select_tag] if select_tag is not None else []
             
             add_payload = {
                 'tvdbId': series_data.get('tvdbId'),
@@ -861,9 +878,13 @@ class PlexIntegration(ServiceIntegration):
             logger.error(f"Error adding TV to Sonarr: {e}")
             return {'success': False, 'status': 'error', 'series_id': None, 'message': str(e)}
     
-    def add_movie_to_radarr(self, item: dict, sync_config: dict) -> dict:
+    def add_movie_to_radarr(self, item: dict, sync_config: dict,
+                            index: Optional[LibraryIndex] = None) -> dict:
         """Add a movie to Radarr directly
         
+        index: the sync's LibraryIndex - shares the profile / root folder
+        lookups across every add in the sync.
+        
         Returns: {'success': bool, 'status': str, 'movie_id': int or None, 'message': str}
         """
         try:
@@ -897,16 +918,24 @@ class PlexIntegration(ServiceIntegration):
             root_folder = sync_config.get('movie_root_folder')
 
             # Get defaults if not specified
-            if not quality_profile:
+            def _default_quality_profile():
                 profiles_resp = http.get(f"{radarr_url}/api/v3/qualityprofile", headers=headers, timeout=10)
                 if profiles_resp.ok and profiles_resp.json():
                     from settings_db import get_preferred_quality_profile
-                    quality_profile = get_preferred_quality_profile('radarr', profiles_resp.json())
-            
-            if not root_folder:
+                    return get_preferred_quality_profile('radarr', profiles_resp.json())
+                return None
+
+            def _default_root_folder():
                 folders_resp = http.get(f"{radarr_url}/api/v3/rootfolder", headers=headers, timeout=10)
                 if folders_resp.ok and folders_resp.json():
-                    root_folder = folders_resp.json()[0]['path']
+                    return folders_resp.json()[0]['path']
+                return None
+
+            if not quality_profile:
+                quality_profile = library_memo(index, 'radarr_quality_profile', _default_quality_profile)
+            
+            if not root_folder:
+                root_folder = library_memo(index, 'radarr_root_folder', _default_root_folder)
             
             add_payload = {
                 'tmdbId': int(tmdb_id),
@@ -971,6 +1000,11 @@ class PlexIntegration(ServiceIntegration):
                 'items': []
             }
             
+            # One /series + /movie fetch and one config read for the whole
+            # sync; every item below is then an O(1) lookup
+            index = LibraryIndex.build()
+            to_add = []  # (item, item_key) — sent concurrently after the scan
+            
             for item in watchlist_items:
                 item_key = f"{item['type']}_{item.get('tmdb_id') or item.get('rating_key')}"
                 
@@ -987,22 +1021,13 @@ class PlexIntegration(ServiceIntegration):
                 # ── TV Shows ──────────────────────────────────────────
                 if item.get('type') == 'show':
                     # Always check Sonarr first — if it's there, don't touch it
-                    existing_series = self.check_exists_in_sonarr(
+                    existing_series = index.find_series(
                         tmdb_id=item.get('tmdb_id'), tvdb_id=item.get('tvdb_id'))
                     
                     if existing_series:
                         # Also check if it's already in an Episeerr rule
                         sonarr_id = existing_series.get('id')
-                        in_episeerr = False
-                        try:
-                            from episeerr import load_config as load_episeerr_config
-                            ep_config = load_episeerr_config()
-                            for rule_name, rule_data in ep_config.get('rules', {}).items():
-                                if str(sonarr_id) in rule_data.get('series', {}):
-                                    in_episeerr = True
-                                    break
-                        except Exception:
-                            pass
+                        in_episeerr = index.rule_for_series(sonarr_id) is not None
                         
                         sync_data['synced_items'][item_key] = {
                             'tmdb_id': item.get('tmdb_id'),
@@ -1052,33 +1077,12 @@ class PlexIntegration(ServiceIntegration):
                         continue
                     
                     # Not in Sonarr — add it
-                    result = self.add_tv_to_sonarr(item, sync_config)
-                    sync_data['synced_items'][item_key] = {
-                        'tmdb_id': item.get('tmdb_id'),
-                        'tvdb_id': item.get('tvdb_id'),
-                        'title': item['title'],
-                        'type': 'tv',
-                        'rating_key': item.get('rating_key'),
-                        'synced_at': datetime.now().isoformat(),
-                        'source': 'watchlist_sync',
-                        'status': 'added_to_sonarr' if result['success'] else result.get('status', 'error'),
-                        'sonarr_series_id': result.get('series_id'),
-                    }
-                    if result['success'] and result.get('status') != 'already_exists':
-                        results['added_tv'] += 1
-                        sync_data['stats']['total_synced_tv'] += 1
-                    elif result.get('status') == 'already_exists':
-                        results['already_exists'] += 1
-                    else:
-                        results['errors'] += 1
+                    to_add.append((item, item_key))
                 
                 # ── Movies ────────────────────────────────────────────
                 elif item.get('type') == 'movie':
                     # Always check Radarr first
-                    if item.get('tmdb_id'):
-                        existing_movie = self.check_exists_in_radarr(item['tmdb_id'])
-                    else:
-                        existing_movie = None
+                    existing_movie = index.find_movie(item.get('tmdb_id'))
                     
                     if existing_movie:
                         sync_data['synced_items'][item_key] = {
@@ -1101,7 +1105,42 @@ class PlexIntegration(ServiceIntegration):
                         continue
                     
                     # Not in Radarr — add it
-                    result = self.add_movie_to_radarr(item, sync_config)
+                    to_add.append((item, item_key))
+                
+                else:
+                    # Unknown type, skip
+                    results['skipped'] += 1
+            
+            def _add(entry):
+                item, _ = entry
+                if item.get('type') == 'show':
+                    return self.add_tv_to_sonarr(item, sync_config, index)
+                return self.add_movie_to_radarr(item, sync_config, index)
+            
+            with ThreadPoolExecutor(max_workers=ADD_CONCURRENCY) as executor:
+                add_results = list(executor.map(_add, to_add))
+            
+            for (item, item_key), result in zip(to_add, add_results):
+                if item.get('type') == 'show':
+                    sync_data['synced_items'][item_key] = {
+                        'tmdb_id': item.get('tmdb_id'),
+                        'tvdb_id': item.get('tvdb_id'),
+                        'title': item['title'],
+                        'type': 'tv',
+                        'rating_key': item.get('rating_key'),
+                        'synced_at': datetime.now().isoformat(),
+                        'source': 'watchlist_sync',
+                        'status': 'added_to_sonarr' if result['success'] else result.get('status', 'error'),
+                        'sonarr_series_id': result.get('series_id'),
+                    }
+                    if result['success'] and result.get('status') != 'already_exists':
+                        results['added_tv'] += 1
+                        sync_data['stats']['total_synced_tv'] += 1
+                    elif result.get('status') == 'already_exists':
+                        results['already_exists'] += 1
+                    else:
+                        results['errors'] += 1
+                else:
                     sync_data['synced_items'][item_key] = {
                         'tmdb_id': item.get('tmdb_id'),
                         'title': item['title'],
@@ -1121,11 +1160,6 @@ class PlexIntegration(ServiceIntegration):
                     else:
                         results['errors'] += 1
                 
-                else:
-                    # Unknown type, skip
-                    results['skipped'] += 1
-                    continue
-                
                 results['processed'] += 1
                 results['items'].append({
                     'title': item['title'],
@@ -1270,59 +1304,58 @@ class PlexIntegration(ServiceIntegration):
     # ==========================================
     
     def start_sync_scheduler(self):
-        """Start background watchlist sync thread.
-        
-        Call this from initialize_episeerr() with:
-            plex_config = get_service('plex') or {}
-            sync_cfg = plex_config.get('watchlist_sync', {})
-            if sync_cfg.get('enabled') and plex_config.get('api_key'):
-                from integrations.plex import integration as plex_integration
-                plex_integration.start_sync_scheduler()
+        """Register the watchlist sync as a job with the shared scheduler.
+
+        Registered at module load even while sync is disabled (the job then
+        just has no interval), so that enabling sync through any gunicorn
+        worker is picked up by the leader worker that runs the scheduler.
         """
         if self._sync_running:
             logger.info("Watchlist sync scheduler already running")
             return
         
         sync_config = self.get_sync_config()
-        if not sync_config.get('enabled'):
-            logger.info("Watchlist sync disabled - scheduler not started")
-            return
-        
         interval = sync_config.get('interval_minutes', 120)
         
-        def sync_loop():
-            self._sync_running = True
-            # Initial delay to let the app fully start
-            time.sleep(30)
+        def _interval_seconds():
+            # Re-read each tick in case it changed. None while sync is
+            # disabled, so a disable saved through another gunicorn worker
+            # also stops the leader worker that actually runs the job.
+            fresh = self.get_sync_config()
+            if not fresh.get('enabled'):
+                return None
+            return fresh.get('interval_minutes', 120) * 60
+        
+        def sync_job(ctx):
+            ctx.progress(message="Syncing watchlist")
+            self.sync_watchlist()
+            ctx.check()
             
-            while self._sync_running:
-                try:
-                    logger.info("⏰ Running scheduled watchlist sync...")
-                    self.sync_watchlist()
-                    
-                    # Also run movie cleanup if enabled
-                    cleanup_result = self.cleanup_watched_movies()
-                    if cleanup_result['cleaned'] > 0:
-                        logger.info(f"Movie cleanup: {cleanup_result['cleaned']} removed")
-                    
-                except Exception as e:
-                    logger.error(f"Scheduled sync error: {e}", exc_info=True)
-                
-                # Re-read interval in case it changed
-                try:
-                    current_config = self.get_sync_config()
-                    interval = current_config.get('interval_minutes', 120)
-                except:
-                    pass
-                
-                time.sleep(interval * 60)
+            # Also run movie cleanup if enabled
+            ctx.progress(message="Cleaning up watched movies")
+            cleanup_result = self.cleanup_watched_movies()
+            if cleanup_result['cleaned'] > 0:
+                logger.info(f"Movie cleanup: {cleanup_result['cleaned']} removed")
         
-        self._sync_thread = threading.Thread(target=sync_loop, daemon=True, name='plex-watchlist-sync')
-        self._sync_thread.start()
+        from job_scheduler import scheduler
+        if not scheduler.is_registered(PLEX_SYNC_JOB):
+            scheduler.register(
+                PLEX_SYNC_JOB, sync_job, interval=_interval_seconds,
+                jitter=60, timeout=1800,
+                initial_delay=30,  # Initial delay to let the app fully start
+                description='Plex watchlist sync + watched-movie cleanup',
+            )
+        if not sync_config.get('enabled'):
+            logger.info("Watchlist sync disabled - job registered but idle")
+            return
+        self._sync_running = True
         logger.info(f"✅ Plex watchlist sync scheduler started (every {interval} minutes)")
     
     def stop_sync_scheduler(self):
-        """Stop the background sync thread"""
+        """Cancel a sync run in progress. The job stays registered but its
+        interval is None while sync is disabled, so it won't run again."""
+        from job_scheduler import scheduler
+        scheduler.cancel(PLEX_SYNC_JOB)
         self._sync_running = False
         logger.info("Plex watchlist sync scheduler stopped")
     
@@ -1577,6 +1610,7 @@ class PlexIntegration(ServiceIntegration):
         episode     = episode_info.get('episode_number')
         user        = episode_info.get('user_name', 'Unknown')
         progress    = episode_info.get('progress_percent', 0)
+        trace_id    = watch_trace.start_trace('plex', series_name, season, episode, user)
 
         try:
             series_id = get_series_id(series_name)
@@ -1601,6 +1635,7 @@ class PlexIntegration(ServiceIntegration):
                 'rule':             final_rule,
                 'source':           'plex',
                 'user':             user,
+                'trace_id':         trace_id,
             }
 
             temp_path = os.path.join(temp_dir, f'data_from_server_{os.urandom(4).hex()}.json')
@@ -1644,8 +1679,10 @@ class PlexIntegration(ServiceIntegration):
             logger.error(f"[Plex] process_episode error: {exc}", exc_info=True)
             return False
 
-    def poll_plex_session(self, session_key: str, episode_info: Dict):
-        """Background thread: poll /status/sessions until threshold or session ends."""
+    def poll_plex_session(self, session_key: str, episode_info: Dict, claim: Optional[str] = None):
+        """Background thread: poll /status/sessions until threshold or session ends.
+        Stops once the shared_state `claim` is released, whichever worker got
+        the media.stop webhook."""
         cfg              = _get_plex_detection_cfg()
         url              = cfg['url']
         api_key          = cfg['api_key']
@@ -1662,7 +1699,7 @@ class PlexIntegration(ServiceIntegration):
             processed  = False
             poll_count = 0
 
-            while session_key in _active_plex_sessions and not processed:
+            while shared_state.is_session_active('plex', session_key, claim) and not processed:
                 poll_count += 1
                 current_progress = 0.0
 
@@ -1701,6 +1738,7 @@ class PlexIntegration(ServiceIntegration):
                     logger.warning(f"[Plex] Poll error for {session_key}: {poll_err}")
 
                 logger.info(f"[Plex] Poll #{poll_count}: {current_progress:.1f}% (threshold {threshold}%)")
+                event_bus.publish_polling('plex', session_key, episode_info, 'polling', current_progress)
 
                 if current_progress >= threshold:
                     logger.info(f"[Plex] Threshold reached — processing episode")
@@ -1708,6 +1746,7 @@ class PlexIntegration(ServiceIntegration):
                     success = self.process_episode(ep_info)
                     if success:
                         processed = True
+                        event_bus.publish_polling('plex', session_key, episode_info, 'processed', current_progress)
 
                 if not processed:
                     time.sleep(interval_seconds)
@@ -1716,33 +1755,37 @@ class PlexIntegration(ServiceIntegration):
             logger.error(f"[Plex] poll_plex_session error for {session_key}: {exc}", exc_info=True)
         finally:
             with _plex_poll_lock:
-                _active_plex_sessions.pop(session_key, None)
-                _plex_poll_threads.pop(session_key, None)
+                # Plex reuses session keys - leave a newer poller's entries alone
+                if _plex_poll_threads.get(session_key) is threading.current_thread():
+                    _active_plex_sessions.pop(session_key, None)
+                    del _plex_poll_threads[session_key]
+            shared_state.release_session('plex', session_key, claim)
+            event_bus.publish_polling('plex', session_key, episode_info, 'ended')
             logger.info(f"[Plex] Polling cleaned up for session {session_key}")
 
     def start_polling(self, session_key: str, episode_info: Dict) -> bool:
         with _plex_poll_lock:
-            if session_key in _active_plex_sessions:
+            claim = shared_state.claim_session('plex', session_key, episode_info)
+            if claim is None:
                 logger.info(f"[Plex] Already polling session {session_key} — skipping")
                 return False
             _active_plex_sessions[session_key] = episode_info
 
-        thread = threading.Thread(
-            target=self.poll_plex_session,
-            args=(session_key, episode_info),
-            daemon=True,
-            name=f"PlexPoll-{session_key[:8]}",
-        )
-        thread.start()
-        with _plex_poll_lock:
+            thread = threading.Thread(
+                target=self.poll_plex_session,
+                args=(session_key, episode_info, claim),
+                daemon=True,
+                name=f"PlexPoll-{session_key[:8]}",
+            )
+            thread.start()
             _plex_poll_threads[session_key] = thread
         return True
 
     def stop_polling(self, session_key: str) -> bool:
         with _plex_poll_lock:
-            if session_key in _active_plex_sessions:
+            _active_plex_sessions.pop(session_key, None)
+            if shared_state.release_session('plex', session_key):
                 logger.info(f"[Plex] Stopping polling for session {session_key}")
-                del _active_plex_sessions[session_key]
                 return True
         return False
 
@@ -2678,4 +2721,14 @@ class PlexIntegration(ServiceIntegration):
         return bp
 
 # Export integration instance
-integration = PlexIntegration()
\ No newline at end of file
+integration = PlexIntegration()
+
+# Register the sync job on module load (survives container restarts), same as
+# Trakt. discover_integrations() imports this module at Flask startup, so the
+# DB is already accessible here. Registered even while disabled - see
+# start_sync_scheduler().
+try:
+    if not integration._sync_running:
+        integration.start_sync_scheduler()
+except Exception as _e:
+    logger.warning(f"Could not auto-start Plex watchlist sync on startup: {_e}")
@@ -7,17 +7,30 @@ Uses the Sonos local UPnP/SOAP API (no library required).
 Discovers zones via /status/topology; falls back to polling the configured
 speaker directly if topology is unavailable.
 
+Zone topology is cached (shared across workers) until a ZoneGroupTopology
+event or its TTL says otherwise. With an event callback URL configured,
+playback state arrives by UPnP event subscription (see _sonos_events);
+without one - or while a subscription can't be made - zone coordinators are
+polled concurrently.
+
 Setup:
   - URL: IP or hostname of any Sonos speaker (e.g. http://192.168.1.10)
   - API Key: leave blank (Sonos local API requires no auth)
+  - Event callback URL (optional): Episeerr's address as the speakers can
+    reach it (e.g. http://192.168.1.5:5002), enables event subscriptions
 """
 
 from integrations.base import ServiceIntegration
-from typing import Dict, Any, Optional, Tuple
+from integrations import _sonos_events
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, jsonify, request
 import requests
 from episeerr_utils import http
 import logging
+import os
+import shared_state
+import event_bus
 import xml.etree.ElementTree as ET
 from urllib.parse import urlparse
 
@@ -29,6 +42,16 @@ _DEVICE_PATH     = '/xml/device_description.xml'
 _ZONE_PATH       = '/status/topology'          # deprecated in S2 firmware ≥ 14.x
 _AVT_NS          = 'urn:schemas-upnp-org:service:AVTransport:1'
 _ZGT_NS          = 'urn:schemas-upnp-org:service:ZoneGroupTopology:1'
+_SONOS_PORT      = 1400
+
+# Topology cache lifetime: long while ZoneGroupTopology events will
+# invalidate it, short when only polling notices regrouping
+TOPOLOGY_EVENT_TTL = 3600
+TOPOLOGY_POLL_TTL  = 60
+_topology_cache = shared_state.SharedCache('sonos_topology', ttl=TOPOLOGY_POLL_TTL)
+
+# Upper bound on concurrent coordinator polls
+_POLL_WORKERS = 8
 
 
 # ---------------------------------------------------------------------------
@@ -42,7 +65,7 @@ def _base_url(raw_url: str) -> str:
         url = 'http://' + url
     parsed = urlparse(url)
     host = parsed.hostname or parsed.netloc or url
-    return f"http://{host}:1400"
+    return f"http://{host}:{_SONOS_PORT}"
 
 
 def _soap(base: str, action: str, body_inner: str, timeout: int = 5) -> Optional[ET.Element]:
@@ -110,22 +133,7 @@ def _transport_info(base: str) -> Dict[str, Any]:
     if root2 is not None:
         meta_text = (root2.findtext(f'.//{{{_AVT_NS}}}TrackMetaData')
                      or root2.findtext('.//TrackMetaData'))
-        if meta_text and meta_text.strip() not in ('', 'NOT_IMPLEMENTED'):
-            try:
-                meta = ET.fromstring(meta_text)
-                dc   = 'http://purl.org/dc/elements/1.1/'
-                upnp = 'urn:schemas-upnp-org:metadata-1-0/upnp/'
-
-                result['track']  = meta.findtext(f'.//{{{dc}}}title')
-                result['artist'] = meta.findtext(f'.//{{{dc}}}creator')
-                result['album']  = meta.findtext(f'.//{{{upnp}}}album')
-
-                art = meta.findtext(f'.//{{{upnp}}}albumArtURI') or ''
-                art = art.strip()
-                if art:
-                    result['album_art_url'] = art if art.startswith('http') else f"{base}{art}"
-            except ET.ParseError as pe:
-                logger.debug(f"TrackMetaData parse error: {pe}")
+        result.update(_sonos_events.parse_track_metadata(meta_text, base))
 
     return result
 
@@ -150,7 +158,7 @@ def _parse_zone_groups(root: ET.Element, base: str) -> list:
 
             if location:
                 p  = urlparse(location)
-                mb = f"http://{p.hostname}:1400"
+                mb = f"http://{p.hostname}:{_SONOS_PORT}"
             else:
                 mb = base
 
@@ -248,6 +256,73 @@ def _get_zones(base: str) -> list:
     }]
 
 
+def _event_callback_url() -> Optional[str]:
+    """Where speakers should NOTIFY, or None when event subscriptions are off."""
+    base = os.getenv('SONOS_EVENT_CALLBACK_URL', '')
+    try:
+        from settings_db import get_service
+        config = (get_service('sonos', 'default') or {}).get('config') or {}
+        base = config.get('event_callback_url') or base
+    except Exception:
+        pass
+    base = (base or '').strip().rstrip('/')
+    if not base:
+        return None
+    if not base.startswith(('http://', 'https://')):
+        base = 'http://' + base
+    return f"{base}/api/integration/sonos/notify"
+
+
+def _cached_zones(base: str) -> list:
+    """
+    _get_zones(base) through the shared topology cache. The single-speaker
+    fallback isn't cached, so discovery is retried on the next refresh.
+    """
+    _topology_cache.ttl = (TOPOLOGY_EVENT_TTL if _sonos_events.is_subscribed('topology', base)
+                           else TOPOLOGY_POLL_TTL)
+    discovered = {}
+
+    def load():
+        zones = _get_zones(base)
+        discovered['zones'] = zones
+        if zones and zones[0].get('topology_source') == 'fallback':
+            return None
+        return {'base': base, 'zones': zones}
+
+    cached = _topology_cache.get(load)
+    if cached is not None and cached['base'] != base:
+        # Cached for a different speaker (URL changed) - start over
+        _topology_cache.invalidate()
+        cached = _topology_cache.get(load)
+    return cached['zones'] if cached is not None else discovered['zones']
+
+
+def _zone_transports(base: str, zones: list) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Transport state for each zone's coordinator, in zone order, plus the mode
+    used: 'events' when every coordinator's state came from subscriptions,
+    otherwise 'polling'. Coordinators without event-fed state are polled
+    concurrently; a subscribed one's polled state seeds the event store.
+    """
+    coordinators = [z['coordinator_url'] for z in zones]
+    callback_url = _event_callback_url()
+    subscribed = bool(callback_url) and _sonos_events.ensure_subscriptions(base, coordinators, callback_url)
+
+    states: Dict[str, Optional[Dict[str, Any]]] = {
+        c: (_sonos_events.get_transport(c) if subscribed else None) for c in coordinators
+    }
+    missing = [c for c, state in states.items() if state is None]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(_POLL_WORKERS, len(missing))) as pool:
+            for coordinator, info in zip(missing, pool.map(_transport_info, missing)):
+                states[coordinator] = info
+                if subscribed:
+                    _sonos_events.seed_transport(coordinator, info)
+
+    mode = 'events' if subscribed and not missing else 'polling'
+    return [states[c] for c in coordinators], mode
+
+
 # ---------------------------------------------------------------------------
 # Integration class
 # ---------------------------------------------------------------------------
@@ -297,13 +372,13 @@ class SonosIntegration(ServiceIntegration):
     def get_dashboard_stats(self, url: str, api_key: str) -> Dict[str, Any]:
         try:
             base  = _base_url(url)
-            zones = _get_zones(base)
+            zones = _cached_zones(base)
+            infos, state_source = _zone_transports(base, zones)
 
             zone_data    = []
             active_zone  = None
 
-            for zone in zones:
-                info = _transport_info(zone['coordinator_url'])
+            for zone, info in zip(zones, infos):
                 z = {
                     'name':          zone['name'],
                     'is_playing':    info['is_playing'],
@@ -326,6 +401,7 @@ class SonosIntegration(ServiceIntegration):
                 'playing_count':   playing_count,
                 'total_zones':     len(zone_data),
                 'topology_source': topology_source,
+                'state_source':    state_source,
             }
 
         except Exception as e:
@@ -595,12 +671,28 @@ class SonosIntegration(ServiceIntegration):
                     'legacy_topology_text': topo_text,
                     'transport_soap_ok':   soap_ok,
                     'transport_state':     soap_state,
+                    'event_callback_url':  _event_callback_url(),
+                    'subscriptions':       _sonos_events.subscriptions(),
                     'stats':               stats,
                 })
 
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
 
+        @bp.route('/api/integration/sonos/notify', methods=['NOTIFY'])
+        def notify():
+            """UPnP GENA event callback - speakers push topology/transport changes here."""
+            try:
+                service = _sonos_events.handle_notify(request.headers.get('SID'), request.get_data())
+            except Exception as e:
+                logger.debug(f"Sonos NOTIFY handling failed: {e}")
+                return ('', 200)
+            if service == 'topology':
+                _topology_cache.invalidate()
+            if service:
+                event_bus.publish('widget', {'service': 'sonos', 'change': service})
+            return ('', 200)
+
         @bp.route('/api/integration/sonos/zones')
         def zones():
             """Raw zone/playback JSON."""
@@ -659,6 +751,13 @@ class SonosIntegration(ServiceIntegration):
                 'placeholder': '',
                 'help_text':   'Sonos local API needs no authentication — leave blank',
             },
+            {
+                'name':        'event_callback_url',
+                'label':       'Event Callback URL (optional)',
+                'type':        'text',
+                'placeholder': 'http://192.168.1.5:5002',
+                'help_text':   'Episeerr address the speakers can reach — enables push updates instead of polling every zone',
+            },
         ]
 
 
@@ -22,6 +22,7 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from flask import Blueprint, jsonify, request
 from integrations.base import ServiceIntegration
+import watch_trace
 
 logger = logging.getLogger(__name__)
 
@@ -137,6 +138,9 @@ def process_watch_event(data: dict) -> dict:
                 )
             return {'status': 'success'}
 
+        trace_id = watch_trace.start_trace('tautulli', series_title, season_number, episode_number,
+                                           data.get('user'), prefetch_only=prefetch_only)
+
         from media_processor import get_series_id
         series_id = get_series_id(series_title, thetvdb_id, themoviedb_id)
         final_rule = None
@@ -165,6 +169,7 @@ def process_watch_event(data: dict) -> dict:
             "rule":            final_rule,
             "source":          "tautulli",
             "prefetch_only":   prefetch_only,
+            "trace_id":        trace_id,
         }
 
         temp_path = os.path.join(temp_dir, f'data_from_server_{os.urandom(4).hex()}.json')
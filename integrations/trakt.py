@@ -11,12 +11,13 @@ import os
 import json
 import logging
 import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify, current_app
 from episeerr_utils import http
 from integrations.base import ServiceIntegration
+from integrations._library_index import LibraryIndex, ADD_CONCURRENCY, memo as library_memo
 
 logger = logging.getLogger(__name__)
 
@@ -56,9 +57,12 @@ def _save_sync_data(data: dict) -> None:
 #  Integration class
 # ──────────────────────────────────────────────────────────────────
 
+# Job name for the watchlist sync in job_scheduler
+TRAKT_SYNC_JOB = 'trakt_watchlist_sync'
+
+
 class TraktIntegration(ServiceIntegration):
 
-    _sync_thread: Optional[threading.Thread] = None
     _sync_running: bool = False
     _refresh_lock: threading.Lock = threading.Lock()
 
@@ -632,7 +636,7 @@ class TraktIntegration(ServiceIntegration):
             logger.error(f"[Trakt] Radarr check error: {exc}")
         return None
 
-    def _add_tv_to_sonarr(self, item: dict) -> dict:
+    def _add_tv_to_sonarr(self, item: dict, index: Optional[LibraryIndex] = None) -> dict:
         try:
             import sonarr_utils
             prefs = sonarr_utils.load_preferences()
@@ -645,7 +649,8 @@ class TraktIntegration(ServiceIntegration):
                 return {'success': False, 'status': 'missing_id',
                         'message': f"No TMDB/TVDB ID for {item.get('title')}"}
 
-            if self._check_sonarr(tmdb_id):
+            exists = index.find_series(tmdb_id=tmdb_id) if index is not None else self._check_sonarr(tmdb_id)
+            if exists:
                 return {'success': True, 'status': 'already_exists',
                         'message': f"{item.get('title')} already in Sonarr"}
 
@@ -658,25 +663,32 @@ class TraktIntegration(ServiceIntegration):
 
             series_data = resp.json()[0] if isinstance(resp.json(), list) else resp.json()
 
-            qp_resp = http.get(f"{sonarr_url}/api/v3/qualityprofile", headers=headers, timeout=10)
-            from settings_db import get_preferred_quality_profile
-            quality_profile = get_preferred_quality_profile('sonarr', qp_resp.json()) \
-                if qp_resp.ok and qp_resp.json() else 1
-
-            rf_resp = http.get(f"{sonarr_url}/api/v3/rootfolder", headers=headers, timeout=10)
-            root_folder = rf_resp.json()[0]['path'] if rf_resp.ok and rf_resp.json() else '/tv'
-
-            tags = []
-            tag_resp = http.get(f"{sonarr_url}/api/v3/tag", headers=headers, timeout=10)
-            if tag_resp.ok:
-                existing_tags = {t['label'].lower(): t['id'] for t in tag_resp.json()}
-                if 'episeerr_select' in existing_tags:
-                    tags.append(existing_tags['episeerr_select'])
-                else:
+            def _quality_profile():
+                qp_resp = http.get(f"{sonarr_url}/api/v3/qualityprofile", headers=headers, timeout=10)
+                from settings_db import get_preferred_quality_profile
+                return get_preferred_quality_profile('sonarr', qp_resp.json()) \
+                    if qp_resp.ok and qp_resp.json() else 1
+
+            def _root_folder():
+                rf_resp = http.get(f"{sonarr_url}/api/v3/rootfolder", headers=headers, timeout=10)
+                return rf_resp.json()[0]['path'] if rf_resp.ok and rf_resp.json() else '/tv'
+
+            def _select_tag_id():
+                tag_resp = http.get(f"{sonarr_url}/api/v3/tag", headers=headers, timeout=10)
+                if tag_resp.ok:
+                    existing_tags = {t['label'].lower(): t['id'] for t in tag_resp.json()}
+                    if 'episeerr_select' in existing_tags:
+                        return existing_tags['episeerr_select']
                     cr = http.post(f"{sonarr_url}/api/v3/tag", headers=headers,
                                    json={'label': 'episeerr_select'}, timeout=10)
                     if cr.ok:
-                        tags.append(cr.json()['id'])
+                        return cr.json()['id']
+                return None
+
+            quality_profile = library_memo(index, 'sonarr_quality_profile', _quality_profile)
+            root_folder = library_memo(index, 'sonarr_root_folder', _root_folder)
+            select_tag = library_memo(index, 'sonarr_select_tag', _select_tag_id)
+            tags = [select_tag] if select_tag is not None else []
 
             add_resp = http.post(f"{sonarr_url}/api/v3/series", headers=headers, timeout=15, json={
                 'tvdbId': series_data.get('tvdbId'),
@@ -703,7 +715,7 @@ class TraktIntegration(ServiceIntegration):
             logger.error(f"[Trakt] _add_tv_to_sonarr error: {exc}")
             return {'success': False, 'status': 'error', 'message': str(exc)}
 
-    def _add_movie_to_radarr(self, item: dict) -> dict:
+    def _add_movie_to_radarr(self, item: dict, index: Optional[LibraryIndex] = None) -> dict:
         try:
             from settings_db import get_service
             rc = get_service('radarr') or {}
@@ -719,7 +731,8 @@ class TraktIntegration(ServiceIntegration):
                 return {'success': False, 'status': 'missing_id',
                         'message': f"No TMDB ID for {item.get('title')}"}
 
-            if self._check_radarr(tmdb_id):
+            exists = index.find_movie(tmdb_id) if index is not None else self._check_radarr(tmdb_id)
+            if exists:
                 return {'success': True, 'status': 'already_exists',
                         'message': f"{item.get('title')} already in Radarr"}
 
@@ -731,13 +744,18 @@ class TraktIntegration(ServiceIntegration):
 
             movie_data = lkp.json()
 
-            qp_resp = http.get(f"{radarr_url}/api/v3/qualityprofile", headers=headers, timeout=10)
-            from settings_db import get_preferred_quality_profile
-            quality_profile = get_preferred_quality_profile('radarr', qp_resp.json()) \
-                if qp_resp.ok and qp_resp.json() else 1
+            def _quality_profile():
+                qp_resp = http.get(f"{radarr_url}/api/v3/qualityprofile", headers=headers, timeout=10)
+                from settings_db import get_preferred_quality_profile
+                return get_preferred_quality_profile('radarr', qp_resp.json()) \
+                    if qp_resp.ok and qp_resp.json() else 1
+
+            def _root_folder():
+                rf_resp = http.get(f"{radarr_url}/api/v3/rootfolder", headers=headers, timeout=10)
+                return rf_resp.json()[0]['path'] if rf_resp.ok and rf_resp.json() else '/movies'
 
-            rf_resp = http.get(f"{radarr_url}/api/v3/rootfolder", headers=headers, timeout=10)
-            root_folder = rf_resp.json()[0]['path'] if rf_resp.ok and rf_resp.json() else '/movies'
+            quality_profile = library_memo(index, 'radarr_quality_profile', _quality_profile)
+            root_folder = library_memo(index, 'radarr_root_folder', _root_folder)
 
             add_resp = http.post(f"{radarr_url}/api/v3/movie", headers=headers, timeout=15, json={
                 'tmdbId': int(tmdb_id),
@@ -783,7 +801,15 @@ class TraktIntegration(ServiceIntegration):
             'errors': 0, 'items': []
         }
 
-        for item in all_items:
+        # One /series + /movie fetch for the whole sync; each item is then
+        # an O(1) lookup and the adds go out concurrently
+        index = LibraryIndex.build(rules=False)
+        to_add = []
+        # Watchlist position -> result row, so items are reported in
+        # watchlist order whether they existed or were added concurrently
+        ordered_items = {}
+
+        for position, item in enumerate(all_items):
             tmdb_id = item.get('tmdb_id')
             media_type = item.get('media_type', 'show')
             item_key = f"{media_type}_{tmdb_id}"
@@ -795,19 +821,39 @@ class TraktIntegration(ServiceIntegration):
                 continue
 
             if media_type == 'show':
-                if self._check_sonarr(tmdb_id):
-                    sync_data['synced_items'][item_key] = {
-                        'tmdb_id': tmdb_id, 'title': item.get('title'), 'type': 'tv',
-                        'synced_at': datetime.now().isoformat(), 'source': 'trakt',
-                        'status': 'already_exists'
-                    }
-                    results['already_exists'] += 1
-                    results['processed'] += 1
-                    results['items'].append({'title': item.get('title'), 'type': 'show',
-                                             'status': 'already_exists'})
-                    continue
-
-                result = self._add_tv_to_sonarr(item)
+                found = index.find_series(tmdb_id=tmdb_id, tvdb_id=item.get('tvdb_id'))
+            elif media_type == 'movie':
+                found = index.find_movie(tmdb_id)
+            else:
+                continue
+
+            if found:
+                sync_data['synced_items'][item_key] = {
+                    'tmdb_id': tmdb_id, 'title': item.get('title'),
+                    'type': 'tv' if media_type == 'show' else 'movie',
+                    'synced_at': datetime.now().isoformat(), 'source': 'trakt',
+                    'status': 'already_exists'
+                }
+                results['already_exists'] += 1
+                results['processed'] += 1
+                ordered_items[position] = {'title': item.get('title'), 'type': media_type,
+                                           'status': 'already_exists'}
+                continue
+
+            to_add.append((position, item, item_key))
+
+        def _add(entry):
+            _, item, _ = entry
+            if item.get('media_type', 'show') == 'show':
+                return self._add_tv_to_sonarr(item, index)
+            return self._add_movie_to_radarr(item, index)
+
+        with ThreadPoolExecutor(max_workers=ADD_CONCURRENCY) as executor:
+            add_results = list(executor.map(_add, to_add))
+
+        for (position, item, item_key), result in zip(to_add, add_results):
+            tmdb_id = item.get('tmdb_id')
+            if item.get('media_type', 'show') == 'show':
                 status = 'added_to_sonarr' if result['success'] and result['status'] == 'added' \
                     else result['status']
                 sync_data['synced_items'][item_key] = {
@@ -820,23 +866,9 @@ class TraktIntegration(ServiceIntegration):
                 else:
                     results['errors'] += 1
                 results['processed'] += 1
-                results['items'].append({'title': item.get('title'), 'type': 'show',
-                                         'status': status, 'message': result.get('message')})
-
-            elif media_type == 'movie':
-                if self._check_radarr(tmdb_id):
-                    sync_data['synced_items'][item_key] = {
-                        'tmdb_id': tmdb_id, 'title': item.get('title'), 'type': 'movie',
-                        'synced_at': datetime.now().isoformat(), 'source': 'trakt',
-                        'status': 'already_exists'
-                    }
-                    results['already_exists'] += 1
-                    results['processed'] += 1
-                    results['items'].append({'title': item.get('title'), 'type': 'movie',
-                                             'status': 'already_exists'})
-                    continue
-
-                result = self._add_movie_to_radarr(item)
+                ordered_items[position] = {'title': item.get('title'), 'type': 'show',
+                                           'status': status, 'message': result.get('message')}
+            else:
                 status = 'added_to_radarr' if result['success'] and result['status'] == 'added' \
                     else result['status']
                 sync_data['synced_items'][item_key] = {
@@ -849,8 +881,10 @@ class TraktIntegration(ServiceIntegration):
                 else:
                     results['errors'] += 1
                 results['processed'] += 1
-                results['items'].append({'title': item.get('title'), 'type': 'movie',
-                                         'status': status, 'message': result.get('message')})
+                ordered_items[position] = {'title': item.get('title'), 'type': 'movie',
+                                           'status': status, 'message': result.get('message')}
+
+        results['items'] = [ordered_items[position] for position in sorted(ordered_items)]
 
         sync_data['last_full_sync'] = datetime.now().isoformat()
         sync_data['stats']['total_synced_tv'] += results['added_tv']
@@ -867,32 +901,41 @@ class TraktIntegration(ServiceIntegration):
     # ── Scheduler ─────────────────────────────────────────────────
 
     def start_sync_scheduler(self) -> None:
+        """Register the watchlist sync as a job with the shared scheduler.
+        Registered at startup even while sync is disabled (no interval), so
+        enabling it through any gunicorn worker reaches the leader worker."""
         if self._sync_running:
             return
         cfg = self._get_trakt_config()
         interval = (cfg or {}).get('sync_interval_minutes', 60)
 
-        def _loop():
-            self._sync_running = True
-            time.sleep(30)
-            while self._sync_running:
-                try:
-                    logger.info("[Trakt] Running scheduled watchlist sync ...")
-                    self.sync_watchlist()
-                except Exception as exc:
-                    logger.error(f"[Trakt] Scheduled sync error: {exc}", exc_info=True)
-                try:
-                    fresh = self._get_trakt_config()
-                    interval = (fresh or {}).get('sync_interval_minutes', 60)
-                except Exception:
-                    pass
-                time.sleep(interval * 60)
-
-        self._sync_thread = threading.Thread(target=_loop, daemon=True, name='trakt-sync')
-        self._sync_thread.start()
+        def _interval_seconds():
+            # None while sync is disabled, so a disable saved through another
+            # gunicorn worker also stops the leader worker that runs the job
+            fresh = self._get_trakt_config() or {}
+            if not fresh.get('sync_enabled'):
+                return None
+            return fresh.get('sync_interval_minutes', 60) * 60
+
+        def _job(ctx):
+            ctx.progress(message="Syncing Trakt watchlist")
+            self.sync_watchlist()
+
+        from job_scheduler import scheduler
+        if not scheduler.is_registered(TRAKT_SYNC_JOB):
+            scheduler.register(
+                TRAKT_SYNC_JOB, _job, interval=_interval_seconds,
+                jitter=60, timeout=1800, initial_delay=30,
+                description='Trakt watchlist sync',
+            )
+        if not (cfg or {}).get('sync_enabled'):
+            return
+        self._sync_running = True
         logger.info(f"[Trakt] Sync scheduler started (every {interval} min)")
 
     def stop_sync_scheduler(self) -> None:
+        from job_scheduler import scheduler
+        scheduler.cancel(TRAKT_SYNC_JOB)  # stays registered; interval is None while disabled
         self._sync_running = False
         logger.info("[Trakt] Sync scheduler stopped")
 
@@ -920,6 +963,7 @@ class TraktIntegration(ServiceIntegration):
         movies = self.fetch_watchlist_movies()
         all_items = shows + movies
         sync_data = _load_sync_data()
+        index = LibraryIndex.build(rules=False)
 
         enriched = []
         for item in all_items:
@@ -932,16 +976,16 @@ class TraktIntegration(ServiceIntegration):
                 status = synced.get('status', 'on_watchlist')
                 # Promote "added" → "available" once the file actually lands
                 if status == 'added_to_radarr' and tmdb_id:
-                    movie = self._check_radarr(tmdb_id)
+                    movie = index.find_movie(tmdb_id)
                     if movie and movie.get('hasFile'):
                         status = 'available'
                 elif status == 'added_to_sonarr' and tmdb_id:
-                    series = self._check_sonarr(tmdb_id)
+                    series = index.find_series(tmdb_id=tmdb_id)
                     if series and series.get('statistics', {}).get('episodeFileCount', 0) > 0:
                         status = 'available'
-            elif media_type == 'show' and self._check_sonarr(tmdb_id):
+            elif media_type == 'show' and index.find_series(tmdb_id=tmdb_id):
                 status = 'available'
-            elif media_type == 'movie' and self._check_radarr(tmdb_id):
+            elif media_type == 'movie' and index.find_movie(tmdb_id):
                 status = 'available'
             else:
                 status = 'on_watchlist'
@@ -1275,8 +1319,7 @@ integration = TraktIntegration()
 # already accessible here. Without this, the scheduler only starts when the
 # user re-saves the Trakt config after each container restart.
 try:
-    _startup_cfg = integration._get_trakt_config()
-    if _startup_cfg and _startup_cfg.get('sync_enabled') and not integration._sync_running:
+    if not integration._sync_running:
         integration.start_sync_scheduler()
 except Exception as _e:
     logger.warning(f"[Trakt] Could not auto-start scheduler on startup: {_e}")
@@ -0,0 +1,484 @@
+"""
+Job Scheduler - one in-process scheduler for every periodic job
+
+Replaces the ad-hoc sleep loops that used to live in OCDarrScheduler and the
+Plex/Trakt watchlist-sync threads. Every job is registered once with an
+interval, jitter, timeout and an overlap rule; the runner thread wakes every
+few seconds and launches whatever is due, each run on its own thread so a
+long cleanup never delays a watchlist sync.
+
+Run history (start, finish, duration, status) is persisted in settings.db's
+job_runs table, so "last run" survives restarts and an interval that was
+half-way through before a container restart picks up where it left off
+instead of starting over.
+
+Jobs are called with a JobContext. Long-running jobs should call
+ctx.progress() to report what they're doing (shown live on the Scheduler
+page) and check ctx.cancelled / ctx.check() between units of work -
+cancellation and timeouts are cooperative, except for anything registered
+through ctx.on_cancel() (e.g. terminating a subprocess).
+
+With several gunicorn workers every worker registers the same jobs, but only
+the leader (see shared_state.run_as_leader) runs the runner thread. Other
+workers queue manual runs and cancel requests in job_runs; the leader picks
+them up on its next tick. Progress is written back to job_runs so every
+worker can show it.
+"""
+import os
+import sys
+import random
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Optional, Union
+
+import settings_db
+import shared_state
+
+logger = logging.getLogger(__name__)
+
+# How often the runner thread looks for due jobs, queued manual runs and
+# cancel requests from other workers. Job intervals are minutes to hours, so
+# this only bounds how late a run (or cross-worker cancel) takes effect.
+TICK_SECONDS = 5
+
+# Minimum gap between progress writes to job_runs for one run.
+PROGRESS_PERSIST_SECONDS = 2
+
+# Run history rows kept per job.
+HISTORY_KEEP = 200
+
+
+class JobCancelled(Exception):
+    """Raised by JobContext.check() once a run has been cancelled or timed out."""
+
+
+class JobContext:
+    """Handle passed to a running job: progress reporting + cancellation."""
+
+    def __init__(self, job_name: str, run_id: int, trigger: str):
+        self.job_name = job_name
+        self.run_id = run_id
+        self.trigger = trigger
+        self.started_at = time.time()
+        self.progress_percent: Optional[float] = None
+        self.progress_message = ''
+        self.cancel_reason: Optional[str] = None
+        self._cancel_event = threading.Event()
+        self._cancel_callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self._progress_saved_at = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self, reason: str = 'cancelled') -> None:
+        """Flag the run as cancelled and fire any on_cancel callbacks once."""
+        with self._lock:
+            if self._cancel_event.is_set():
+                return
+            self.cancel_reason = reason
+            self._cancel_event.set()
+            callbacks = list(self._cancel_callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"[{self.job_name}] on_cancel callback failed: {e}")
+
+    def on_cancel(self, callback: Callable[[], None]) -> None:
+        """Register a hook that runs when the job is cancelled or times out
+        (fires immediately if that already happened)."""
+        with self._lock:
+            already = self._cancel_event.is_set()
+            if not already:
+                self._cancel_callbacks.append(callback)
+        if already:
+            callback()
+
+    def check(self) -> None:
+        """Raise JobCancelled if the run should stop."""
+        if self.cancelled:
+            raise JobCancelled(self.cancel_reason or 'cancelled')
+
+    def sleep(self, seconds: float) -> bool:
+        """Interruptible sleep. Returns True if the run was cancelled."""
+        return self._cancel_event.wait(seconds)
+
+    def progress(self, percent: Optional[float] = None, message: Optional[str] = None) -> None:
+        if percent is not None:
+            self.progress_percent = max(0.0, min(100.0, float(percent)))
+        if message is not None:
+            self.progress_message = message[:300]
+        now = time.time()
+        if now - self._progress_saved_at >= PROGRESS_PERSIST_SECONDS:
+            self._progress_saved_at = now
+            try:
+                settings_db.update_job_progress(self.run_id, self.progress_percent,
+                                                self.progress_message)
+            except Exception as e:
+                logger.debug(f"[{self.job_name}] Could not persist progress: {e}")
+
+    def to_dict(self) -> Dict:
+        return {
+            'run_id': self.run_id,
+            'trigger': self.trigger,
+            'started_at': self.started_at,
+            'elapsed': round(time.time() - self.started_at, 1),
+            'progress_percent': self.progress_percent,
+            'progress_message': self.progress_message,
+            'cancelling': self.cancelled,
+        }
+
+
+class Job:
+    """A registered periodic job.
+
+    interval: seconds between run starts, or a callable returning that (so
+              settings changes apply without re-registering). None or 0 means
+              the job only runs when triggered manually.
+    jitter:   up to this many extra seconds, re-rolled after every run, so
+              jobs sharing an interval don't all hit upstreams at once.
+    timeout:  seconds after which the run is cancelled with reason 'timeout'.
+    allow_overlap: when False (default) a due or manual run is skipped while
+              another run of the same job is still going.
+    initial_delay: seconds after startup before the first scheduled run.
+    """
+
+    def __init__(self, name: str, func: Callable[[JobContext], object],
+                 interval: Union[float, Callable[[], Optional[float]], None],
+                 jitter: float = 0, timeout: Optional[float] = None,
+                 allow_overlap: bool = False, initial_delay: float = 0,
+                 description: str = ''):
+        self.name = name
+        self.func = func
+        self._interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.allow_overlap = allow_overlap
+        self.initial_delay = initial_delay
+        self.description = description
+        self.not_before = time.time() + initial_delay
+        self.last_started: Optional[float] = None
+        self.jitter_offset = random.uniform(0, jitter) if jitter else 0
+
+    def get_interval(self) -> Optional[float]:
+        try:
+            value = self._interval() if callable(self._interval) else self._interval
+            return float(value) if value else None
+        except Exception as e:
+            logger.warning(f"[{self.name}] Could not resolve interval: {e}")
+            return None
+
+    def next_due(self) -> Optional[float]:
+        interval = self.get_interval()
+        if not interval:
+            return None
+        if self.last_started is None:
+            return self.not_before + self.jitter_offset
+        return max(self.last_started + interval + self.jitter_offset, self.not_before)
+
+
+def _is_worker_subprocess() -> bool:
+    """True inside a media_processor.py subprocess. media_processor imports
+    episeerr (and through it every integration) for shared helpers, which
+    would otherwise start a second copy of every scheduled job inside each
+    webhook/cleanup subprocess."""
+    return os.path.basename(sys.argv[0] if sys.argv else '') == 'media_processor.py'
+
+
+class Scheduler:
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[str, List[JobContext]] = {}
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        # True while another worker holds the leader lock and runs the jobs
+        self._follower = False
+
+    # ── Registration ──────────────────────────────────────────────
+
+    def register(self, name: str, func: Callable[[JobContext], object],
+                 interval, **kwargs) -> Job:
+        """Register (or replace) a job. Last-run time is restored from
+        job_runs so the first scheduled run honours the persisted history."""
+        job = Job(name, func, interval, **kwargs)
+        try:
+            last = settings_db.get_last_job_run(name)
+            if last:
+                job.last_started = last['started_at']
+        except Exception as e:
+            logger.warning(f"[{name}] Could not load run history: {e}")
+        with self._lock:
+            self._jobs[name] = job
+        self._wake.set()
+        logger.info(f"Registered job '{name}' (interval={job.get_interval()}s)")
+        return job
+
+    def unregister(self, name: str, cancel_running: bool = True) -> bool:
+        with self._lock:
+            job = self._jobs.pop(name, None)
+            active = list(self._active.get(name, []))
+        if cancel_running:
+            for ctx in active:
+                ctx.cancel('cancelled')
+        return job is not None
+
+    def is_registered(self, name: str) -> bool:
+        with self._lock:
+            return name in self._jobs
+
+    # ── Runner ────────────────────────────────────────────────────
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self, on_leader: Optional[Callable[[], None]] = None) -> bool:
+        """Start the runner thread in whichever worker holds the leader lock
+        - now, or later if the current leader exits. on_leader runs once in
+        that worker right after the runner starts (startup one-shots).
+
+        Returns False only inside a media_processor.py subprocess, where
+        nothing is scheduled; True means jobs are being run by some worker."""
+        if _is_worker_subprocess():
+            logger.debug("Job scheduler not started inside media_processor subprocess")
+            return False
+
+        def _become_runner():
+            self._start_runner()
+            if on_leader:
+                on_leader()
+
+        self._follower = not shared_state.run_as_leader(_become_runner)
+        return True
+
+    def _start_runner(self) -> None:
+        self._follower = False
+        if self._running:
+            return
+        try:
+            fixed = settings_db.mark_interrupted_job_runs()
+            if fixed:
+                logger.info(f"Marked {fixed} job run(s) from a previous process as interrupted")
+        except Exception as e:
+            logger.warning(f"Could not tidy stale job runs: {e}")
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True, name='job-scheduler')
+        self._thread.start()
+        logger.info("Job scheduler started")
+        return True
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake.set()
+
+    def _loop(self):
+        while self._running:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Job scheduler tick error: {e}", exc_info=True)
+            self._wake.wait(TICK_SECONDS)
+            self._wake.clear()
+
+    def tick(self, now: Optional[float] = None) -> List[str]:
+        """Apply cancel requests and queued runs from other workers, then
+        launch every job that is due. Returns the names launched."""
+        now = now or time.time()
+        self._apply_cancel_requests()
+        launched = self._launch_queued()
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            due = job.next_due()
+            if due is None or due > now:
+                continue
+            if self._launch(job, 'schedule') is not None:
+                launched.append(job.name)
+            else:
+                # Skipped (overlap): push the next attempt out a full interval
+                # rather than retrying every tick.
+                job.last_started = now
+        return launched
+
+    def _apply_cancel_requests(self) -> None:
+        with self._lock:
+            active = [ctx for runs in self._active.values() for ctx in runs]
+        if not active:
+            return
+        requested = set(settings_db.get_cancel_requested_run_ids([c.run_id for c in active]))
+        for ctx in active:
+            if ctx.run_id in requested:
+                ctx.cancel('cancelled')
+
+    def _launch_queued(self) -> List[str]:
+        launched = []
+        for row in settings_db.claim_queued_job_runs():
+            with self._lock:
+                job = self._jobs.get(row['job_name'])
+            if not job:
+                settings_db.record_job_finish(row['id'], 'failed', 'Job not registered in leader worker')
+                continue
+            if self._launch(job, row['trigger'] or 'manual', run_id=row['id']) is not None:
+                launched.append(job.name)
+            else:
+                settings_db.record_job_finish(row['id'], 'skipped', 'Previous run still in progress')
+        return launched
+
+    def run_now(self, name: str, trigger: str = 'manual') -> Optional[int]:
+        """Start a job immediately. Returns the run id, or None if the job is
+        unknown or already running and doesn't allow overlap.
+
+        In a follower worker the run is queued in job_runs and started by the
+        leader on its next tick."""
+        with self._lock:
+            job = self._jobs.get(name)
+        if not job:
+            return None
+        if not self._follower:
+            ctx = self._launch(job, trigger)
+            return ctx.run_id if ctx else None
+        if not job.allow_overlap and settings_db.get_active_job_runs(name):
+            return None
+        return settings_db.queue_job_run(name, trigger)
+
+    def _launch(self, job: Job, trigger: str, run_id: Optional[int] = None) -> Optional[JobContext]:
+        with self._lock:
+            active = self._active.setdefault(job.name, [])
+            if active and not job.allow_overlap:
+                logger.info(f"[{job.name}] Previous run still in progress - skipping {trigger} run")
+                return None
+            started = time.time()
+            if run_id is None:
+                run_id = settings_db.record_job_start(job.name, trigger, started)
+            ctx = JobContext(job.name, run_id, trigger)
+            ctx.started_at = started
+            active.append(ctx)
+            job.last_started = started
+            job.jitter_offset = random.uniform(0, job.jitter) if job.jitter else 0
+
+        timer = None
+        if job.timeout:
+            timer = threading.Timer(job.timeout, ctx.cancel, args=('timeout',))
+            timer.daemon = True
+            timer.start()
+
+        threading.Thread(
+            target=self._execute, args=(job, ctx, timer),
+            daemon=True, name=f'job-{job.name}'
+        ).start()
+        return ctx
+
+    def _execute(self, job: Job, ctx: JobContext, timer: Optional[threading.Timer]):
+        status, message = 'success', None
+        try:
+            result = job.func(ctx)
+            if ctx.cancelled:
+                status = ctx.cancel_reason or 'cancelled'
+            if isinstance(result, str):
+                message = result
+        except JobCancelled:
+            status = ctx.cancel_reason or 'cancelled'
+        except Exception as e:
+            status, message = 'failed', str(e)
+            logger.error(f"[{job.name}] Job failed: {e}", exc_info=True)
+        finally:
+            if timer:
+                timer.cancel()
+            with self._lock:
+                active = self._active.get(job.name, [])
+                if ctx in active:
+                    active.remove(ctx)
+            try:
+                settings_db.record_job_finish(ctx.run_id, status, message)
+                settings_db.prune_job_runs(job.name, keep=HISTORY_KEEP)
+            except Exception as e:
+                logger.warning(f"[{job.name}] Could not record run result: {e}")
+        duration = time.time() - ctx.started_at
+        logger.info(f"[{job.name}] Run finished: {status} in {duration:.1f}s")
+
+    # ── Control / status ──────────────────────────────────────────
+
+    def cancel(self, name: str) -> bool:
+        """Cancel every queued or in-flight run of a job, in whichever worker
+        it runs. Returns True if any were queued or running."""
+        with self._lock:
+            active = list(self._active.get(name, []))
+        for ctx in active:
+            ctx.cancel('cancelled')
+        try:
+            flagged = settings_db.request_job_cancel(name)
+        except Exception as e:
+            logger.warning(f"[{name}] Could not record cancel request: {e}")
+            flagged = 0
+        return bool(active) or flagged > 0
+
+    def is_job_running(self, name: str) -> bool:
+        with self._lock:
+            if self._active.get(name):
+                return True
+        if not self._follower:
+            return False
+        return bool(settings_db.get_active_job_runs(name))
+
+    @staticmethod
+    def _row_to_active(row: Dict) -> Dict:
+        # Same shape as JobContext.to_dict(), for runs owned by another worker
+        return {
+            'run_id': row['id'],
+            'trigger': row['trigger'],
+            'started_at': row['started_at'],
+            'elapsed': round(time.time() - row['started_at'], 1),
+            'progress_percent': row.get('progress_percent'),
+            'progress_message': row.get('progress_message') or ('Queued' if row['status'] == 'queued' else ''),
+            'cancelling': bool(row.get('cancel_requested')),
+        }
+
+    def get_job_status(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(name)
+            active = [ctx.to_dict() for ctx in self._active.get(name, [])]
+        if not job:
+            return None
+        if self._follower:
+            try:
+                active = [self._row_to_active(r) for r in settings_db.get_active_job_runs(name)]
+            except Exception:
+                active = []
+        try:
+            recent = settings_db.get_job_runs(name, limit=len(active) + 1)
+        except Exception:
+            recent = []
+        if recent and self._follower:
+            # The leader updates last_started as it runs; mirror it here so
+            # next_run is right when this worker answers the status request
+            job.last_started = recent[0]['started_at']
+        # last_run is the most recent *finished* run; in-flight ones are in active_runs
+        last = next((r for r in recent if r['status'] not in ('running', 'queued')), None)
+        return {
+            'name': job.name,
+            'description': job.description,
+            'interval_seconds': job.get_interval(),
+            'timeout_seconds': job.timeout,
+            'allow_overlap': job.allow_overlap,
+            'running': bool(active),
+            'active_runs': active,
+            'last_run': last,
+            'next_run': job.next_due(),
+        }
+
+    def get_status(self) -> List[Dict]:
+        with self._lock:
+            names = sorted(self._jobs)
+        return [s for s in (self.get_job_status(n) for n in names) if s]
+
+    def get_history(self, name: str, limit: int = 20) -> List[Dict]:
+        return settings_db.get_job_runs(name, limit=limit)
+
+
+# Module-level instance shared by episeerr.py and the integrations.
+scheduler = Scheduler()
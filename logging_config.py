@@ -32,4 +32,21 @@ def setup_main_logger(name='episeerr'):
     logger.propagate = False
     return logger
 
-main_logger = setup_main_logger()
\ No newline at end of file
+main_logger = setup_main_logger()
+
+SLOW_REQUEST_LOG = os.path.join(LOG_DIR, 'slow_requests.log')
+
+def setup_slow_request_logger(name='episeerr.slow_requests'):
+    """Dedicated file for requests over the slow threshold (see request_timing.py)."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.handlers.clear()
+
+    file_handler = RotatingFileHandler(SLOW_REQUEST_LOG, maxBytes=5*1024*1024, backupCount=3, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+
+    logger.addHandler(file_handler)
+    logger.propagate = False
+    return logger
+
+slow_request_logger = setup_slow_request_logger()
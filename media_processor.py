@@ -11,9 +11,17 @@ from dotenv import load_dotenv
 from datetime import datetime, timezone
 import threading
 import subprocess
+from functools import lru_cache
 import pending_deletions
+import shared_state
+import sonarr_instances
+import watch_trace
+import cleanup_audit
+import rule_stats
+import disk_forecast
+from episode_table import EpisodeTable
 from episeerr import normalize_url
-from episeerr_utils import reconcile_series_drift, http
+from episeerr_utils import reconcile_series_drift, http, is_upstream_available
 from logging_config import main_logger as logger
 # Load environment variables
 load_dotenv()
@@ -38,8 +46,10 @@ def get_tautulli_settings():
     # Fallback to env
     return normalize_url(os.getenv('TAUTULLI_URL')), os.getenv('TAUTULLI_API_KEY')
 
-# Track processed episodes to prevent duplicates
-processed_jellyfin_episodes = set()
+# Track processed episodes to prevent duplicates (Jellyfin/Emby). Shared
+# across gunicorn workers, since progress webhooks for one playback can land
+# on any of them; a day is plenty to cover one viewing.
+processed_jellyfin_episodes = shared_state.ProcessedSet('jellyfin_episode', ttl=24 * 3600)
 
 # Define log paths
 LOG_PATH = os.getenv('LOG_PATH', '/app/logs/app.log')
@@ -197,6 +207,7 @@ def save_config(config):
     # Save the config
     with open(config_path, 'w') as file:
         json.dump(config, file, indent=4)
+    rule_stats.sync_config(config)
 
 def move_series_in_config(series_id, from_rule, to_rule):
     """
@@ -434,7 +445,9 @@ def get_activity_date_with_hierarchy(series_id, series_title=None, return_comple
         # jellyfin_url, jellyfin_api_key removed - integration handles this
         
         # Prefer Tautulli if both are configured (since it's more accurate for watch tracking)
-        if tautulli_url and tautulli_api_key:
+        if tautulli_url and tautulli_api_key and not is_upstream_available(tautulli_url):
+            logger.info(f"⚠️  Tautulli circuit open - skipping to Sonarr file dates for series {series_id}")
+        elif tautulli_url and tautulli_api_key:
             logger.info(f"🔍 Checking Tautulli for '{series_title}'")
             
             # Use enhanced Tautulli function
@@ -499,6 +512,8 @@ def get_server_activity(filepath=None):
         # Playback-start events set this: stage the next episode, but leave
         # every completion-triggered step to the later watched event.
         prefetch_only = bool(data.get('prefetch_only', False))
+        # Carry the ingest trace through this run (see watch_trace.py)
+        watch_trace.set_current(data.get('trace_id'))
 
         if all([series_title, season_number, episode_number]):
             return (series_title, int(season_number), int(episode_number),
@@ -624,6 +639,7 @@ def monitor_or_search_episodes(episode_ids, action_option, series_id=None, serie
         return
         
     monitor_episodes(episode_ids, True)
+    watch_trace.link_episodes(episode_ids)
     if action_option == "search":
         trigger_episode_search_in_sonarr(episode_ids, series_id, series_title, get_type)
 
@@ -705,6 +721,7 @@ def trigger_episode_search_in_sonarr(episode_ids, series_id=None, series_title=N
     if response.ok:
         search_type = "Season pack search" if get_type == 'seasons' else "Episode search"
         logger.info(f"{search_type} command sent to Sonarr successfully.")
+        watch_trace.mark_stage('searched')
 
         # Log search event
         if series_id and series_title and episode_ids:
@@ -741,7 +758,8 @@ def trigger_episode_search_in_sonarr(episode_ids, series_id=None, series_title=N
                     season=season_number,
                     episode=episode_number,
                     air_date=episode_details.get('airDateUtc'),
-                    series_id=series_id
+                    series_id=series_id,
+                    episode_id=episode_ids[0]
                 )
         except Exception as e:
             logger.debug(f"Could not send pending notification: {str(e)}")
@@ -753,10 +771,12 @@ def unmonitor_episodes(episode_ids):
     if episode_ids:
         monitor_episodes(episode_ids, False)
 
-def fetch_next_episodes_dropdown(series_id, season_number, episode_number, get_type, get_count):
+def fetch_next_episodes_dropdown(series_id, season_number, episode_number, get_type, get_count,
+                                 episodes=None):
     """
     Fetch next episodes using dropdown system (get_type + get_count).
-    Assumes linear watching only.
+    Assumes linear watching only. Pass the series' EpisodeTable as `episodes`
+    to reuse it; otherwise the series is fetched once.
     """
     # get_count=0 means don't fetch anything
     if get_count == 0 and get_type != 'all':
@@ -765,82 +785,67 @@ def fetch_next_episodes_dropdown(series_id, season_number, episode_number, get_t
     next_episode_ids = []
 
     try:
+        table = EpisodeTable.of(episodes if episodes is not None else fetch_all_episodes(series_id))
+
         if get_type == "all":
             # Get all episodes from current position forward
-            all_episodes = fetch_all_episodes(series_id)
-            sorted_episodes = sorted(all_episodes, key=lambda ep: (ep['seasonNumber'], ep['episodeNumber']))
-            
-            # Find current position and get everything after
-            for ep in sorted_episodes:
-                if (ep['seasonNumber'] > season_number or 
-                    (ep['seasonNumber'] == season_number and ep['episodeNumber'] > episode_number)):
-                    next_episode_ids.append(ep['id'])
-            return next_episode_ids
+            return [ep.id for ep in table.after(season_number, episode_number)]
             
         elif get_type == 'seasons':
             # Get X full seasons starting from remaining current season
-            current_season_episodes = get_episode_details(series_id, season_number)
-            remaining_current = [ep['id'] for ep in current_season_episodes if ep['episodeNumber'] > episode_number]
+            remaining_current = [ep.id for ep in table.season(season_number)
+                                 if ep.episodeNumber > episode_number]
             next_episode_ids.extend(remaining_current)
             
             # Get additional full seasons if needed
             seasons_to_get = get_count if get_count is not None else 1
             if not remaining_current:
                 # Current season finished, get next X seasons
-                for season_offset in range(1, seasons_to_get + 1):
-                    season_episodes = get_episode_details(series_id, season_number + season_offset)
-                    next_episode_ids.extend([ep['id'] for ep in season_episodes])
-            elif seasons_to_get > 1:
+                extra_seasons = range(1, seasons_to_get + 1)
+            else:
                 # Get additional seasons beyond current
-                for season_offset in range(1, seasons_to_get):
-                    season_episodes = get_episode_details(series_id, season_number + season_offset)
-                    next_episode_ids.extend([ep['id'] for ep in season_episodes])
+                extra_seasons = range(1, seasons_to_get)
+            for season_offset in extra_seasons:
+                next_episode_ids.extend(ep.id for ep in table.season(season_number + season_offset))
                     
             logger.info(f"Dropdown seasons mode: Found {len(next_episode_ids)} episodes across {seasons_to_get} seasons")
             return next_episode_ids
             
         else:  # episodes
-            # Get specific number of episodes in linear order
+            # Get specific number of episodes in linear order: the rest of the
+            # current season, then following seasons until a season is missing
+            # or 10 seasons ahead
             num_episodes = get_count if get_count is not None else 1
-            
-            # Get remaining episodes in current season first
-            current_season_episodes = get_episode_details(series_id, season_number)
-            remaining_episodes = [ep['id'] for ep in current_season_episodes if ep['episodeNumber'] > episode_number]
-            next_episode_ids.extend(remaining_episodes)
-
-            # If we need more episodes, get from subsequent seasons
-            current_season_num = season_number + 1
-            while len(next_episode_ids) < num_episodes:
-                next_season_episodes = get_episode_details(series_id, current_season_num)
-                if not next_season_episodes:
-                    logger.info(f"No more episodes available after season {current_season_num - 1}")
+            last_season = season_number
+            for ep in table.after(season_number, episode_number):
+                if len(next_episode_ids) >= num_episodes:
                     break
-                    
-                remaining_needed = num_episodes - len(next_episode_ids)
-                next_episode_ids.extend([ep['id'] for ep in next_season_episodes[:remaining_needed]])
-                current_season_num += 1
-                
-                # Prevent infinite loops
-                if current_season_num > season_number + 10:
+                if ep.seasonNumber > last_season + 1:
+                    logger.info(f"No more episodes available after season {last_season}")
+                    break
+                if ep.seasonNumber > season_number + 10:
                     logger.warning(f"Stopping after checking 10 seasons ahead")
                     break
+                last_season = ep.seasonNumber
+                next_episode_ids.append(ep.id)
 
             logger.info(f"Dropdown episodes mode: Found {len(next_episode_ids)} out of {num_episodes} requested")
-            return next_episode_ids[:num_episodes]
+            return next_episode_ids
             
     except Exception as e:
         logger.error(f"Error in dropdown fetch_next_episodes: {str(e)}")
         return []
 
 def fetch_all_episodes(series_id):
-    """Fetch all episodes for a series from Sonarr."""
+    """Fetch all episodes for a series from Sonarr as a compact EpisodeTable
+    (sorted by season/episode, only the fields cleanup uses)."""
     url = f"{SONARR_URL}/api/v3/episode?seriesId={series_id}"
     headers = {'X-Api-Key': SONARR_API_KEY}
     response = http.get(url, headers=headers)
     if response.ok:
-        return response.json()
+        return EpisodeTable(response.json())
     logger.error("Failed to fetch all episodes.")
-    return []
+    return EpisodeTable([])
 
 def get_tautulli_last_watched(series_title, return_complete=False):
     """
@@ -1107,53 +1112,31 @@ def find_episodes_leaving_keep_block(all_episodes, keep_type, keep_count, last_w
     """
     Find episodes that are leaving the keep block using dropdown system.
     These episodes should be deleted immediately (real-time cleanup).
+    `all_episodes` is an EpisodeTable or a list of Sonarr episode dicts.
     """
-    episodes_leaving = []
-    
     try:
         if keep_type == "all":
             # Keep everything, nothing leaves
             return []
-            
-        elif keep_type == "seasons":
+
+        table = EpisodeTable.of(all_episodes)
+
+        if keep_type == "seasons":
             # Keep X seasons, episodes from older seasons leave
             seasons_to_keep = keep_count if keep_count else 1
             cutoff_season = last_watched_season - seasons_to_keep + 1
-            
-            episodes_leaving = [
-                ep for ep in all_episodes 
-                if ep['seasonNumber'] < cutoff_season and ep.get('hasFile')
-            ]
-            
-        else:  # episodes
-            # Keep X episodes, older episodes leave the keep block
-            episodes_to_keep = keep_count if keep_count else 1
-            
-            # Sort episodes by season/episode number
-            sorted_episodes = sorted(all_episodes, key=lambda ep: (ep['seasonNumber'], ep['episodeNumber']))
-            
-            # Find the last watched episode index
-            last_watched_index = None
-            for i, ep in enumerate(sorted_episodes):
-                if (ep['seasonNumber'] == last_watched_season and 
-                    ep['episodeNumber'] == last_watched_episode):
-                    last_watched_index = i
-                    break
-            
-            if last_watched_index is not None:
-                # Keep block: episodes_to_keep episodes ending with the one just watched
-                keep_start_index = max(0, last_watched_index - keep_count + 1)
-                
-                # Episodes before the keep block are leaving
-                episodes_with_files = [ep for ep in sorted_episodes if ep.get('hasFile')]
-                
-                for ep in episodes_with_files:
-                    ep_index = next((i for i, se in enumerate(sorted_episodes) if se['id'] == ep['id']), None)
-                    if ep_index is not None and ep_index < keep_start_index:
-                        episodes_leaving.append(ep)
-                
-                logger.info(f"Keep block: episodes {keep_start_index} to {last_watched_index}, {len(episodes_leaving)} episodes leaving")
-        
+            return [ep for ep in table.before_season(cutoff_season) if ep.hasFile]
+
+        # episodes: keep X episodes, older episodes leave the keep block
+        last_watched_index = table.index_of(last_watched_season, last_watched_episode)
+        if last_watched_index is None:
+            return []
+
+        # Keep block: keep_count episodes ending with the one just watched;
+        # episodes before the keep block are leaving
+        keep_start_index = max(0, last_watched_index - keep_count + 1)
+        episodes_leaving = [ep for ep in table.records[:keep_start_index] if ep.hasFile]
+        logger.info(f"Keep block: episodes {keep_start_index} to {last_watched_index}, {len(episodes_leaving)} episodes leaving")
         return episodes_leaving
         
     except Exception as e:
@@ -1163,13 +1146,10 @@ def find_episodes_leaving_keep_block(all_episodes, keep_type, keep_count, last_w
 def _has_next_season_available(all_episodes, current_season):
     """Returns True if any next-season episode exists that hasn't aired yet (future or unscheduled)."""
     now = datetime.now(timezone.utc)
-    for ep in all_episodes:
-        s = ep.get('seasonNumber', 0)
-        if s <= current_season or s == 0:
+    for ep in EpisodeTable.of(all_episodes).from_season(current_season + 1):
+        if ep.seasonNumber == 0 or ep.hasFile:
             continue
-        if ep.get('hasFile'):
-            continue
-        air_date = ep.get('airDateUtc')
+        air_date = ep.airDateUtc
         if not air_date:
             return True  # unscheduled episode means next season is coming
         try:
@@ -1183,23 +1163,19 @@ def _has_next_season_available(all_episodes, current_season):
 
 def _find_episodes_in_keep_window(all_episodes, keep_type, keep_count, last_watched_season, last_watched_episode):
     """Return episodes currently protected by the keep block (have files, not slated for deletion)."""
+    table = EpisodeTable.of(all_episodes)
     if keep_type == "all":
-        return [ep for ep in all_episodes if ep.get('hasFile') and ep['seasonNumber'] > 0]
+        return [ep for ep in table.from_season(1) if ep.hasFile]
 
     leaving_ids = {
-        ep['id'] for ep in find_episodes_leaving_keep_block(
-            all_episodes, keep_type, keep_count, last_watched_season, last_watched_episode
+        ep.id for ep in find_episodes_leaving_keep_block(
+            table, keep_type, keep_count, last_watched_season, last_watched_episode
         )
     }
 
     return [
-        ep for ep in all_episodes
-        if ep.get('hasFile')
-        and ep['seasonNumber'] > 0
-        and ep['id'] not in leaving_ids
-        and (ep['seasonNumber'] < last_watched_season
-             or (ep['seasonNumber'] == last_watched_season
-                 and ep['episodeNumber'] <= last_watched_episode))
+        ep for ep in table.through(last_watched_season, last_watched_episode)
+        if ep.hasFile and ep.seasonNumber > 0 and ep.id not in leaving_ids
     ]
 
 
@@ -1279,12 +1255,10 @@ def process_episodes_for_webhook(series_id, season_number, episode_number, rule,
 
         # Get all episodes once (used for current-ep lookup, keep block, and
         # optional sequential finale check)
-        all_episodes = fetch_all_episodes(series_id)
-        current_episode = next(
-            (ep for ep in all_episodes
-             if ep['seasonNumber'] == season_number and ep['episodeNumber'] == episode_number),
-            None
-        )
+        all_episodes = EpisodeTable.of(fetch_all_episodes(series_id))
+        current_episode = all_episodes.find(season_number, episode_number)
+        # Compiled after the activation gate above, which may have released this season
+        protection = get_anchor_protection(series_id)
 
         if not current_episode:
             logger.error(f"Could not find current episode S{season_number}E{episode_number}")
@@ -1298,7 +1272,8 @@ def process_episodes_for_webhook(series_id, season_number, episode_number, rule,
         if not skip_rule_processing:
             # GET NEXT EPISODES using dropdown system
             next_episode_ids = fetch_next_episodes_dropdown(
-                series_id, season_number, episode_number, get_type, get_count
+                series_id, season_number, episode_number, get_type, get_count,
+                episodes=all_episodes
             )
 
             if next_episode_ids:
@@ -1323,7 +1298,7 @@ def process_episodes_for_webhook(series_id, season_number, episode_number, rule,
             if episodes_leaving_keep_block:
                 episodes_to_delete = [
                     ep for ep in episodes_leaving_keep_block
-                    if not is_anchor_episode(ep, series_id)
+                    if not is_anchor_episode(ep, series_id, protection=protection)
                 ]
 
                 if episodes_to_delete:
@@ -1348,7 +1323,7 @@ def process_episodes_for_webhook(series_id, season_number, episode_number, rule,
 
                 protected_anchors = [
                     ep for ep in episodes_leaving_keep_block
-                    if is_anchor_episode(ep, series_id)
+                    if is_anchor_episode(ep, series_id, protection=protection)
                 ]
                 for ep in protected_anchors:
                     logger.info(
@@ -1358,12 +1333,8 @@ def process_episodes_for_webhook(series_id, season_number, episode_number, rule,
 
         # ── Season finale: release keep protection when no next season exists ─
         if rule.get('release_keep_on_finale', False) and not skip_rule_processing and not prefetch_only:
-            season_eps = sorted(
-                [ep for ep in all_episodes
-                 if ep['seasonNumber'] == season_number and ep['seasonNumber'] > 0],
-                key=lambda e: e['episodeNumber']
-            )
-            is_finale = bool(season_eps and episode_number == season_eps[-1]['episodeNumber'])
+            season_finale = all_episodes.last_in_season(season_number) if season_number > 0 else None
+            is_finale = bool(season_finale and episode_number == season_finale.episodeNumber)
 
             if is_finale:
                 if _has_next_season_available(all_episodes, season_number):
@@ -1375,7 +1346,7 @@ def process_episodes_for_webhook(series_id, season_number, episode_number, rule,
                     kept = _find_episodes_in_keep_window(
                         all_episodes, keep_type, keep_count, season_number, episode_number
                     )
-                    releasable = [ep for ep in kept if not is_anchor_episode(ep, series_id)]
+                    releasable = [ep for ep in kept if not is_anchor_episode(ep, series_id, protection=protection)]
                     title = series_title or f"Series {series_id}"
                     ep_list = ', '.join(
                         f"S{ep['seasonNumber']:02d}E{ep['episodeNumber']:02d}"
@@ -1402,7 +1373,8 @@ def process_episodes_for_webhook(series_id, season_number, episode_number, rule,
                                     releasable_with_files, series_id, title,
                                     reason=f"Season finale, no next season (released from keep)",
                                     rule_dry_run=rule.get('dry_run', False),
-                                    rule_name=finale_rule_name
+                                    rule_name=finale_rule_name,
+                                    phase='finale'
                                 )
                                 logger.info(
                                     f"🏁 {title} S{season_number} finale — no next season: "
@@ -1443,12 +1415,9 @@ def _advance_sequential_if_finale(series_id, season_number, episode_number, rule
     """
     try:
         # Determine if this episode is the season finale
-        season_eps = sorted(
-            [ep for ep in all_episodes
-             if ep['seasonNumber'] == season_number and ep['seasonNumber'] > 0],
-            key=lambda e: e['episodeNumber']
-        )
-        if not season_eps or episode_number != season_eps[-1]['episodeNumber']:
+        all_episodes = EpisodeTable.of(all_episodes)
+        season_finale = all_episodes.last_in_season(season_number) if season_number > 0 else None
+        if not season_finale or episode_number != season_finale.episodeNumber:
             return  # Not the finale
 
         # Check if series is ended
@@ -1470,11 +1439,7 @@ def _advance_sequential_if_finale(series_id, season_number, episode_number, rule
             return
 
         next_season = season_number + 1
-        target_ep = next(
-            (ep for ep in all_episodes
-             if ep['seasonNumber'] == next_season and ep['episodeNumber'] == activation_ep),
-            None
-        )
+        target_ep = all_episodes.find(next_season, activation_ep)
         if not target_ep:
             logger.info(
                 f"Sequential advance: no S{next_season}E{activation_ep} found for series {series_id}"
@@ -1613,6 +1578,12 @@ def load_global_settings():
                 save_global_settings(settings)
                 logger.info("✓ Migrated global_settings.json - added automation_held/reconcile settings")
 
+            # MIGRATION: periodic missed watch-event sweep (default: hourly)
+            if 'reconcile_interval_minutes' not in settings:
+                settings['reconcile_interval_minutes'] = 60
+                save_global_settings(settings)
+                logger.info("✓ Migrated global_settings.json - added reconcile_interval_minutes")
+
             return settings
         else:
             # Default settings (already has dry_run_mode: True - good!)
@@ -1627,7 +1598,8 @@ def load_global_settings():
                 'episeerr_url': 'http://localhost:5002',
 
                 'automation_held': False,
-                'reconcile_enabled': False
+                'reconcile_enabled': False,
+                'reconcile_interval_minutes': 60
             }
             save_global_settings(default_settings)
             return default_settings
@@ -1642,7 +1614,8 @@ def load_global_settings():
             'discord_webhook_url': '',
             'episeerr_url': 'http://localhost:5002',
             'automation_held': False,
-            'reconcile_enabled': False
+            'reconcile_enabled': False,
+            'reconcile_interval_minutes': 60
         }
 
 def save_global_settings(settings):
@@ -1671,7 +1644,8 @@ def check_global_storage_gate():
     """Check if global storage gate allows cleanup to proceed."""
     try:
         global_settings = load_global_settings()
-        storage_min_gb = global_settings.get('global_storage_min_gb')
+        # Raised ahead of a forecast crossing (disk_forecast.py)
+        storage_min_gb = disk_forecast.gate_threshold_gb(global_settings.get('global_storage_min_gb'))
         
         if not storage_min_gb:
             # No storage gate configured - always allow cleanup
@@ -1871,6 +1845,99 @@ def is_held_activation_episode(series_name, season_number, episode_number):
     return True, series_id
 
 
+class AlwaysHaveMatcher:
+    """
+    An always_have expression compiled once, so checking an episode doesn't
+    re-parse the expression.
+
+    Ranges are kept as inclusive (start, end) bounds rather than expanded,
+    so s1e1-1000000000 costs no more than s1e1-5: whole_seasons holds
+    season ranges, season_episodes maps a season to its episode ranges.
+    eN and s*eN both match episode N in every season.
+    """
+
+    __slots__ = ('all', 'whole_seasons', 'any_season_episodes', 'season_episodes')
+
+    def __init__(self, base):
+        self.all = False
+        self.whole_seasons = []
+        self.any_season_episodes = set()
+        self.season_episodes = {}
+
+        for part in base.split(','):
+            part = part.strip()
+            if not part:
+                continue
+
+            # Strip trailing modifiers before structural matching
+            part, _, _ = _strip_modifiers(part)
+            if not part:
+                continue
+
+            if part == 'all':
+                self.all = True
+                continue
+
+            # eN without season prefix: matches episode N in any season (sequential base)
+            if re.match(r'^e\d+$', part):
+                self.any_season_episodes.add(int(part[1:]))
+                continue
+
+            if not part.startswith('s'):
+                continue
+
+            # Wildcard season: s*eN
+            if part.startswith('s*'):
+                remainder = part[2:]
+                if remainder.startswith('e'):
+                    try:
+                        self.any_season_episodes.add(int(remainder[1:]))
+                    except ValueError:
+                        pass
+                continue
+
+            rest = part[1:]  # strip leading 's'
+
+            try:
+                if 'e' in rest:
+                    # s<season>e<ep> or s<season>e<ep_start>-<ep_end>
+                    e_idx = rest.index('e')
+                    target_season = int(rest[:e_idx])
+                    ep_part = rest[e_idx + 1:]
+                    if '-' in ep_part:
+                        first, last = ep_part.split('-', 1)
+                        episodes = (int(first), int(last))
+                    else:
+                        episodes = (int(ep_part), int(ep_part))
+                    self.season_episodes.setdefault(target_season, []).append(episodes)
+                elif '-' in rest:
+                    # s<start>-<end>: season range, all episodes
+                    first, last = rest.split('-', 1)
+                    self.whole_seasons.append((int(first), int(last)))
+                else:
+                    # s<N>: entire season
+                    self.whole_seasons.append((int(rest), int(rest)))
+            except ValueError:
+                continue
+
+    def matches(self, season_num, episode_num):
+        return (self.all
+                or episode_num in self.any_season_episodes
+                or any(start <= season_num <= end for start, end in self.whole_seasons)
+                or any(start <= episode_num <= end
+                       for start, end in self.season_episodes.get(season_num, ())))
+
+
+@lru_cache(maxsize=256)
+def compile_always_have(expression):
+    """Compile an always_have expression (modifiers and pilot alias allowed)
+    into an AlwaysHaveMatcher. Cached per expression string."""
+    expression = (expression or '').strip().lower()
+    # Normalize pilot alias
+    expression = re.sub(r'\bpilot\b', 'e1', expression)
+    return AlwaysHaveMatcher(expression)
+
+
 def is_protected_by_expression(season_num, episode_num, expression, total_seasons=None):
     """
     Check if a season/episode matches an always_have expression.
@@ -1888,91 +1955,7 @@ def is_protected_by_expression(season_num, episode_num, expression, total_season
     """
     if not expression:
         return False
-
-    expression = expression.strip().lower()
-    # Normalize pilot alias
-    expression = re.sub(r'\bpilot\b', 'e1', expression)
-    if not expression:
-        return False
-
-    for part in expression.split(','):
-        part = part.strip()
-        if not part:
-            continue
-
-        # Strip trailing modifiers before structural matching
-        part, _, _ = _strip_modifiers(part)
-        if not part:
-            continue
-
-        if part == 'all':
-            return True
-
-        # eN without season prefix: matches episode N in any season (sequential base)
-        if re.match(r'^e\d+$', part):
-            try:
-                if episode_num == int(part[1:]):
-                    return True
-            except ValueError:
-                pass
-            continue
-
-        if not part.startswith('s'):
-            continue
-
-        # Wildcard season: s*eN
-        if part.startswith('s*'):
-            remainder = part[2:]
-            if remainder.startswith('e'):
-                try:
-                    if episode_num == int(remainder[1:]):
-                        return True
-                except ValueError:
-                    pass
-            continue
-
-        rest = part[1:]  # strip leading 's'
-
-        if 'e' in rest:
-            # s<season>e<ep> or s<season>e<ep_start>-<ep_end>
-            e_idx = rest.index('e')
-            try:
-                target_season = int(rest[:e_idx])
-            except ValueError:
-                continue
-            if season_num != target_season:
-                continue
-            ep_part = rest[e_idx + 1:]
-            if '-' in ep_part:
-                bounds = ep_part.split('-', 1)
-                try:
-                    if int(bounds[0]) <= episode_num <= int(bounds[1]):
-                        return True
-                except ValueError:
-                    pass
-            else:
-                try:
-                    if episode_num == int(ep_part):
-                        return True
-                except ValueError:
-                    pass
-        elif '-' in rest:
-            # s<start>-<end>: season range, all episodes
-            bounds = rest.split('-', 1)
-            try:
-                if int(bounds[0]) <= season_num <= int(bounds[1]):
-                    return True
-            except ValueError:
-                pass
-        else:
-            # s<N>: entire season
-            try:
-                if season_num == int(rest):
-                    return True
-            except ValueError:
-                pass
-
-    return False
+    return compile_always_have(expression).matches(season_num, episode_num)
 
 
 def process_always_have(series_id, expression, starting_season=None):
@@ -2108,7 +2091,104 @@ def process_always_have(series_id, expression, starting_season=None):
         logger.error(f"process_always_have: error for series {series_id}: {e}", exc_info=True)
 
 
-def is_anchor_episode(episode, series_id=None, check_always_have=True):
+class AnchorProtection:
+    """
+    Which episodes of one series are anchors, compiled from its rule's
+    keep_pilot / always_have settings and the series' activation_seasons.
+    is_anchor() is O(1) and needs no config read.
+    """
+
+    __slots__ = ('keep_pilot', 'matcher', 'sequential_ep', 'seasons')
+
+    def __init__(self, keep_pilot, matcher=None, sequential_ep=None, seasons=None):
+        self.keep_pilot = keep_pilot
+        self.matcher = matcher              # AlwaysHaveMatcher, or None for no always_have protection
+        self.sequential_ep = sequential_ep  # sequential mode: the activation episode number
+        self.seasons = seasons              # None = every season, else only these season numbers
+
+    def is_anchor(self, episode):
+        season = episode.get('seasonNumber')
+        episode_num = episode.get('episodeNumber')
+
+        # keep_pilot: protect S01E01
+        if self.keep_pilot and season == 1 and episode_num == 1:
+            return True
+
+        if self.seasons is not None and season not in self.seasons:
+            return False
+        if self.sequential_ep is not None:
+            return episode_num == self.sequential_ep
+        return self.matcher is not None and self.matcher.matches(season, episode_num)
+
+
+_NO_PROTECTION = AnchorProtection(keep_pilot=False)
+
+
+@lru_cache(maxsize=1024)
+def _compile_anchor_protection(keep_pilot, always_have, activation_states, check_always_have):
+    """AnchorProtection for one (rule settings, activation state) combination.
+    activation_states is a sorted tuple of (season, state) pairs."""
+    if not check_always_have or not always_have:
+        return AnchorProtection(keep_pilot)
+
+    parsed = parse_always_have(always_have)
+    has_plus = parsed['has_plus']
+    has_minus = parsed['has_minus']
+
+    # - only modifier: never anchor regardless of expression match
+    if has_minus and not has_plus:
+        return AnchorProtection(keep_pilot)
+
+    seasons = None
+    if has_plus and has_minus:
+        # +- : anchor only while season is in held state
+        seasons = frozenset(season for season, state in activation_states if state == 'held')
+
+    if parsed['is_sequential'] and parsed['activation_ep'] is not None:
+        # Sequential mode: anchor the activation ep of every season that
+        # appears in activation_seasons (was grabbed)
+        grabbed = frozenset(season for season, state in activation_states if state is not None)
+        seasons = grabbed if seasons is None else seasons & grabbed
+        return AnchorProtection(keep_pilot, sequential_ep=parsed['activation_ep'], seasons=seasons)
+
+    return AnchorProtection(keep_pilot, matcher=compile_always_have(parsed['base']), seasons=seasons)
+
+
+def get_anchor_protection(series_id, config=None, check_always_have=True):
+    """
+    Compile the anchor rules for one series. Pass `config` when the caller
+    already has it loaded. Compiled protections are cached per rule settings
+    and activation state, so this is cheap to call once per series.
+    """
+    if config is None:
+        config = load_config()
+    series_id_str = str(series_id)
+    rule = next(
+        (rule_data for rule_data in config.get('rules', {}).values()
+         if series_id_str in rule_data.get('series', {})),
+        None
+    )
+    if not rule:
+        return _NO_PROTECTION
+
+    series_data = rule.get('series', {}).get(series_id_str) or {}
+    activation_seasons = series_data.get('activation_seasons', {}) if isinstance(series_data, dict) else {}
+    activation_states = []
+    for season, state in activation_seasons.items():
+        try:
+            activation_states.append((int(season), state))
+        except (TypeError, ValueError):
+            continue
+
+    return _compile_anchor_protection(
+        bool(rule.get('keep_pilot', False)),
+        rule.get('always_have', '') or '',
+        tuple(sorted(activation_states)),
+        check_always_have,
+    )
+
+
+def is_anchor_episode(episode, series_id=None, check_always_have=True, protection=None):
     """
     Check if an episode is an "anchor" that should never be deleted.
 
@@ -2133,65 +2213,16 @@ def is_anchor_episode(episode, series_id=None, check_always_have=True):
 
     For sequential mode (eN+ without s prefix) the matching is done against
     the activation_seasons state rather than is_protected_by_expression.
-    """
-    season = episode.get('seasonNumber')
-    episode_num = episode.get('episodeNumber')
-
-    is_pilot = (season == 1 and episode_num == 1)
 
-    if series_id is not None:
-        config = load_config()
-        series_id_str = str(series_id)
-        rule = next(
-            (rule_data for rule_data in config.get('rules', {}).values()
-             if series_id_str in rule_data.get('series', {})),
-            None
-        )
-
-        if rule:
-            # keep_pilot: protect S01E01
-            if is_pilot and rule.get('keep_pilot', False):
-                return True
-
-            # always_have expression (skipped for dormant cleanup)
-            if check_always_have:
-                always_have = rule.get('always_have', '')
-                if not always_have:
-                    return False
-
-                parsed = parse_always_have(always_have)
-                has_plus = parsed['has_plus']
-                has_minus = parsed['has_minus']
-                is_sequential = parsed['is_sequential']
-                activation_ep = parsed['activation_ep']
-                base = parsed['base']
-
-                # - only modifier: never anchor regardless of expression match
-                if has_minus and not has_plus:
-                    return False
-
-                # Get activation state for this season
-                series_data = rule.get('series', {}).get(series_id_str, {})
-                activation_seasons = series_data.get('activation_seasons', {})
-                season_state = activation_seasons.get(str(season))
-
-                if has_plus and has_minus:
-                    # +- : anchor only while season is in held state
-                    if season_state != 'held':
-                        return False
-                    # Falls through to expression check below
-
-                # Check if this episode matches the expression
-                if is_sequential and activation_ep is not None:
-                    # Sequential mode: anchor if this is the activation ep
-                    # AND the season appears in activation_seasons (was grabbed)
-                    if episode_num == activation_ep and season_state is not None:
-                        return True
-                else:
-                    if is_protected_by_expression(season, episode_num, base):
-                        return True
-
-    return False
+    Cleanup loops that check many episodes of one series should get the
+    series' AnchorProtection once with get_anchor_protection() and pass it as
+    `protection`; otherwise every call re-reads config.json.
+    """
+    if protection is None:
+        if series_id is None:
+            return False
+        protection = get_anchor_protection(series_id, check_always_have=check_always_have)
+    return protection.is_anchor(episode)
 
 
 def _get_episode_file_sizes(series_id):
@@ -2210,7 +2241,59 @@ def _get_episode_file_sizes(series_id):
         return {}
 
 
-def delete_episodes_immediately(episodes, series_id, series_title, reason="Keep Rule", rule_dry_run=False, rule_name=None, force=False):
+def _episode_sizes(episodes, series_id):
+    """File sizes keyed by episodeFileId - from the episodes themselves when
+    they carry one (EpisodeTable records do), else one bulk Sonarr fetch."""
+    sizes = {ep.get('episodeFileId'): ep.get('size') for ep in episodes if ep.get('size')}
+    if all(ep.get('episodeFileId') in sizes for ep in episodes if ep.get('episodeFileId')):
+        return sizes
+    return _get_episode_file_sizes(series_id)
+
+
+def _files_bytes(episodes, sizes):
+    """Total size of the episodes' files. A multi-episode file (S01E01-E02)
+    shares one episodeFileId across its episodes, so each file counts once."""
+    file_ids = {ep.get('episodeFileId') for ep in episodes}
+    return sum(sizes.get(file_id) or 0 for file_id in file_ids)
+
+
+def _delete_episode_files(episodes, log):
+    """DELETE each episode's file in Sonarr. Returns (deleted, failed) episode lists."""
+    headers = {'X-Api-Key': SONARR_API_KEY}
+    deleted, failed = [], []
+    for ep in episodes:
+        episode_file_id = ep.get('episodeFileId')
+        if not episode_file_id:
+            continue
+        try:
+            url = f"{SONARR_URL}/api/v3/episodeFile/{episode_file_id}"
+            response = http.delete(url, headers=headers)
+            response.raise_for_status()
+            deleted.append(ep)
+            log.info(f"✅ Deleted episode file ID: {episode_file_id}")
+        except Exception as err:
+            failed.append(ep)
+            log.error(f"❌ Failed to delete episode file {episode_file_id}: {err}")
+    return deleted, failed
+
+
+def _audit_deletion(phase, episodes, series_id, series_title, rule_name, reason, started,
+                    sizes, dry_run=False, deleted=None, failed=None):
+    """Record a delete batch in the cleanup audit: one 'queued' row on dry
+    run, else a 'deleted' row and a 'failed' row for whatever failed."""
+    duration = round(time.monotonic() - started, 3)
+    batches = [('queued', episodes)] if dry_run else [('deleted', deleted or []), ('failed', failed or [])]
+    for outcome, eps in batches:
+        if eps:
+            cleanup_audit.record(
+                phase, outcome, rule=rule_name, series_id=series_id, series_title=series_title,
+                episode_ids=[ep.get('id') for ep in eps],
+                bytes_=_files_bytes(eps, sizes),
+                dry_run=dry_run, reason=reason, duration=duration
+            )
+
+
+def delete_episodes_immediately(episodes, series_id, series_title, reason="Keep Rule", rule_dry_run=False, rule_name=None, force=False, phase='keep'):
     """
     Direct deletion for Keep rule - real-time webhook cleanup.
     Respects BOTH global dry_run_mode AND rule-level dry_run (either triggers queue),
@@ -2224,9 +2307,12 @@ def delete_episodes_immediately(episodes, series_id, series_title, reason="Keep
     Passing these through directly (instead of re-deriving them from Sonarr's
     episodefile.episodeIds, which isn't reliably populated) is what makes dry-run
     queueing actually work.
+
+    `phase` labels the batch in the cleanup audit ('keep', 'finale', 'approved').
     """
     if not episodes:
         return
+    started = time.monotonic()
 
     if force:
         is_dry_run = False
@@ -2245,7 +2331,7 @@ def delete_episodes_immediately(episodes, series_id, series_title, reason="Keep
 
         from pending_deletions import queue_deletion
 
-        file_sizes = _get_episode_file_sizes(series_id)
+        file_sizes = _episode_sizes(episodes, series_id)
 
         for ep in episodes:
             episode_file_id = ep.get('episodeFileId')
@@ -2270,30 +2356,26 @@ def delete_episodes_immediately(episodes, series_id, series_title, reason="Keep
                 logger.error(f"Error queueing episode file {episode_file_id}: {str(e)}")
 
         logger.info(f"✅ Queued {len(episodes)} episodes for approval (Keep Rule dry run)")
+        _audit_deletion(phase, episodes, series_id, series_title, rule_name, reason, started,
+                        file_sizes, dry_run=True)
         return
 
     # LIVE DELETION (both global and rule dry_run are False)
     episode_file_ids = [ep['episodeFileId'] for ep in episodes if ep.get('episodeFileId')]
     logger.info(f"🗑️ KEEP RULE: Deleting {len(episode_file_ids)} episodes from {series_title} - {reason}")
 
-    headers = {'X-Api-Key': SONARR_API_KEY}
-    successful_deletes = 0
-    failed_deletes = []
+    file_sizes = _episode_sizes(episodes, series_id)
+    deleted, failed = _delete_episode_files(episodes, logger)
+
+    logger.info(f"📊 Keep rule deletion: {len(deleted)} successful, {len(failed)} failed")
+    if failed:
+        logger.error(f"❌ Failed deletes: {[ep['episodeFileId'] for ep in failed]}")
+    _audit_deletion(phase, episodes, series_id, series_title, rule_name, reason, started,
+                    file_sizes, deleted=deleted, failed=failed)
+    rule_stats.adjust_files(series_id, episodes=-len(deleted),
+                            bytes_=-_files_bytes(deleted, file_sizes))
 
-    for episode_file_id in episode_file_ids:
-        try:
-            url = f"{SONARR_URL}/api/v3/episodeFile/{episode_file_id}"
-            response = http.delete(url, headers=headers)
-            response.raise_for_status()
-            successful_deletes += 1
-            logger.info(f"✅ Deleted episode file ID: {episode_file_id}")
-        except Exception as err:
-            failed_deletes.append(episode_file_id)
-            logger.error(f"❌ Failed to delete episode file {episode_file_id}: {err}")
 
-    logger.info(f"📊 Keep rule deletion: {successful_deletes} successful, {len(failed_deletes)} failed")
-    if failed_deletes:
-        logger.error(f"❌ Failed deletes: {failed_deletes}")
 def delete_episodes_in_sonarr_with_logging(
     episodes,
     series_id,
@@ -2302,7 +2384,8 @@ def delete_episodes_in_sonarr_with_logging(
     reason=None,
     date_source=None,
     date_value=None,
-    rule_name=None):
+    rule_name=None,
+    phase='cleanup'):
     """
     Delete episodes with approval queue for Grace/Dormant cleanup.
     Respects BOTH global dry_run_mode AND rule-level dry_run (either triggers queue).
@@ -2319,9 +2402,11 @@ def delete_episodes_in_sonarr_with_logging(
         date_source: Where the date came from (e.g., "Tautulli", "Sonarr")
         date_value: The date used in decision (e.g., "2025-06-21")
         rule_name: Name of the rule triggering deletion
+        phase: Cleanup phase for the audit ('dormant', 'grace_watched', 'grace_unwatched')
     """
     if not episodes:
         return
+    started = time.monotonic()
 
     # Check BOTH global dry_run_mode AND rule-level dry_run
     global_settings = load_global_settings()
@@ -2341,7 +2426,7 @@ def delete_episodes_in_sonarr_with_logging(
         # Import here to avoid circular imports
         from pending_deletions import queue_deletion
 
-        file_sizes = _get_episode_file_sizes(series_id)
+        file_sizes = _episode_sizes(episodes, series_id)
 
         for ep in episodes:
             episode_file_id = ep.get('episodeFileId')
@@ -2366,30 +2451,24 @@ def delete_episodes_in_sonarr_with_logging(
                 cleanup_logger.error(f"Error queueing episode file {episode_file_id}: {str(e)}")
 
         cleanup_logger.info(f"✅ Queued {len(episodes)} episodes for approval")
+        _audit_deletion(phase, episodes, series_id, series_title, rule_name, reason, started,
+                        file_sizes, dry_run=True)
         return
 
     # LIVE DELETION (both global and rule dry_run are False)
     episode_file_ids = [ep['episodeFileId'] for ep in episodes if ep.get('episodeFileId')]
     cleanup_logger.info(f"🗑️  DELETING: {len(episode_file_ids)} episode files from {series_title}")
 
-    headers = {'X-Api-Key': SONARR_API_KEY}
-    successful_deletes = 0
-    failed_deletes = []
+    file_sizes = _episode_sizes(episodes, series_id)
+    deleted, failed = _delete_episode_files(episodes, cleanup_logger)
 
-    for episode_file_id in episode_file_ids:
-        try:
-            url = f"{SONARR_URL}/api/v3/episodeFile/{episode_file_id}"
-            response = http.delete(url, headers=headers)
-            response.raise_for_status()
-            successful_deletes += 1
-            cleanup_logger.info(f"✅ Deleted episode file ID: {episode_file_id}")
-        except Exception as err:
-            failed_deletes.append(episode_file_id)
-            cleanup_logger.error(f"❌ Failed to delete episode file {episode_file_id}: {err}")
-
-    cleanup_logger.info(f"📊 Deletion summary: {successful_deletes} successful, {len(failed_deletes)} failed")
-    if failed_deletes:
-        cleanup_logger.error(f"❌ Failed deletes: {failed_deletes}")
+    cleanup_logger.info(f"📊 Deletion summary: {len(deleted)} successful, {len(failed)} failed")
+    if failed:
+        cleanup_logger.error(f"❌ Failed deletes: {[ep['episodeFileId'] for ep in failed]}")
+    _audit_deletion(phase, episodes, series_id, series_title, rule_name, reason, started,
+                    file_sizes, deleted=deleted, failed=failed)
+    rule_stats.adjust_files(series_id, episodes=-len(deleted),
+                            bytes_=-_files_bytes(deleted, file_sizes))
 
 
 
@@ -2519,7 +2598,7 @@ def run_grace_watched_cleanup(series_lookup=None):
         if global_dry_run:
             cleanup_logger.info("🛡️ Global dry run mode ENABLED - all deletions will be queued for approval")
 
-        storage_min_gb = global_settings.get('global_storage_min_gb')
+        storage_min_gb = disk_forecast.gate_threshold_gb(global_settings.get('global_storage_min_gb'))
 
         total_deleted = 0
         if series_lookup is None:
@@ -2556,20 +2635,8 @@ def run_grace_watched_cleanup(series_lookup=None):
             # Get all episodes
             all_episodes = fetch_all_episodes(series_id)
 
-            # Find watched episodes
-            watched_episodes = []
-            for episode in all_episodes:
-                if not episode.get('hasFile'):
-                    continue
-                season_num = episode.get('seasonNumber', 0)
-                episode_num = episode.get('episodeNumber', 0)
-
-                if (season_num < last_season or
-                        (season_num == last_season and episode_num <= last_episode)):
-                    watched_episodes.append(episode)
-
-            # Sort by season/episode
-            watched_episodes.sort(key=lambda ep: (ep['seasonNumber'], ep['episodeNumber']))
+            # Find watched episodes (already sorted by season/episode)
+            watched_episodes = [ep for ep in all_episodes.through(last_season, last_episode) if ep.hasFile]
 
             if len(watched_episodes) > 1:
                 # Keep last watched, delete rest
@@ -2577,7 +2644,8 @@ def run_grace_watched_cleanup(series_lookup=None):
                 delete_episodes = watched_episodes[:-1]
 
                 # Filter out anchor episodes (S01E01)
-                delete_episodes = [ep for ep in delete_episodes if not is_anchor_episode(ep, series_id)]
+                protection = get_anchor_protection(series_id, config)
+                delete_episodes = [ep for ep in delete_episodes if not is_anchor_episode(ep, series_id, protection=protection)]
 
                 episodes_with_files = [ep for ep in delete_episodes if ep.get('episodeFileId')]
 
@@ -2596,7 +2664,8 @@ def run_grace_watched_cleanup(series_lookup=None):
                         reason=f"Grace Watched ({grace_watched_days}d) - Keep Last Watched",
                         date_source="Last Activity",
                         date_value=activity_date_str,
-                        rule_name=rule_name
+                        rule_name=rule_name,
+                        phase='grace_watched'
                     )
                     total_deleted += len(episodes_with_files)
             elif len(watched_episodes) == 1:
@@ -2648,7 +2717,7 @@ def run_grace_unwatched_cleanup(series_lookup=None):
         if global_dry_run:
             cleanup_logger.info("🛡️ Global dry run mode ENABLED - all deletions will be queued for approval")
 
-        storage_min_gb = global_settings.get('global_storage_min_gb')
+        storage_min_gb = disk_forecast.gate_threshold_gb(global_settings.get('global_storage_min_gb'))
 
         total_deleted = 0
         if series_lookup is None:
@@ -2686,20 +2755,8 @@ def run_grace_unwatched_cleanup(series_lookup=None):
             # Get all episodes
             all_episodes = fetch_all_episodes(series_id)
 
-            # Find unwatched episodes (AFTER last watched)
-            unwatched_episodes = []
-            for episode in all_episodes:
-                if not episode.get('hasFile'):
-                    continue
-                season_num = episode.get('seasonNumber', 0)
-                episode_num = episode.get('episodeNumber', 0)
-
-                if (season_num > last_season or
-                        (season_num == last_season and episode_num > last_episode)):
-                    unwatched_episodes.append(episode)
-
-            # Sort by season/episode
-            unwatched_episodes.sort(key=lambda ep: (ep['seasonNumber'], ep['episodeNumber']))
+            # Find unwatched episodes AFTER last watched (already sorted by season/episode)
+            unwatched_episodes = [ep for ep in all_episodes.after(last_season, last_episode) if ep.hasFile]
 
             if len(unwatched_episodes) > 1:
                 # Keep first unwatched, delete rest
@@ -2707,7 +2764,8 @@ def run_grace_unwatched_cleanup(series_lookup=None):
                 delete_episodes = unwatched_episodes[1:]
 
                 # Filter out anchor episodes (S01E01)
-                delete_episodes = [ep for ep in delete_episodes if not is_anchor_episode(ep, series_id)]
+                protection = get_anchor_protection(series_id, config)
+                delete_episodes = [ep for ep in delete_episodes if not is_anchor_episode(ep, series_id, protection=protection)]
 
                 episodes_with_files = [ep for ep in delete_episodes if ep.get('episodeFileId')]
 
@@ -2726,7 +2784,8 @@ def run_grace_unwatched_cleanup(series_lookup=None):
                         reason=f"Grace Unwatched ({grace_unwatched_days}d) - Keep First Unwatched",
                         date_source="Last Activity",
                         date_value=activity_date_str,
-                        rule_name=rule_name
+                        rule_name=rule_name,
+                        phase='grace_unwatched'
                     )
                     total_deleted += len(episodes_with_files)
 
@@ -2788,7 +2847,7 @@ def run_dormant_cleanup(series_lookup=None):
             cleanup_logger.info("🛡️ Global dry run mode ENABLED - all deletions will be queued for approval")
         
         # Check storage gate
-        storage_min_gb = global_settings.get('global_storage_min_gb')
+        storage_min_gb = disk_forecast.gate_threshold_gb(global_settings.get('global_storage_min_gb'))
         if storage_min_gb:
             gate_open, _, gate_reason = check_global_storage_gate()
             if not gate_open:
@@ -2847,7 +2906,8 @@ def run_dormant_cleanup(series_lookup=None):
                     if days_since_activity > dormant_days:
                         all_episodes = fetch_all_episodes(series_id)
                         # Dormant cleanup bypasses always_have but still respects keep_pilot
-                        deletable_episodes = [ep for ep in all_episodes if ep.get('hasFile') and ep.get('episodeFileId') and not is_anchor_episode(ep, series_id, check_always_have=False)]
+                        protection = get_anchor_protection(series_id, config, check_always_have=False)
+                        deletable_episodes = [ep for ep in all_episodes if ep.get('hasFile') and ep.get('episodeFileId') and not is_anchor_episode(ep, series_id, protection=protection)]
 
                         if deletable_episodes:
                             candidates.append({
@@ -2894,7 +2954,8 @@ def run_dormant_cleanup(series_lookup=None):
                 reason=f"Dormant Series ({candidate['days_since_activity']:.1f} days inactive)",
                 date_source=date_source,
                 date_value=activity_date,
-                rule_name=candidate.get('rule_name', 'dormant')
+                rule_name=candidate.get('rule_name', 'dormant'),
+                phase='dormant'
             )
             processed_count += 1
         
@@ -2907,6 +2968,20 @@ def run_dormant_cleanup(series_lookup=None):
 
 
 
+def get_sonarr_queue_size_gb():
+    """GB Sonarr's download queue still has to fetch (0 if unknown)."""
+    try:
+        headers = {'X-Api-Key': SONARR_API_KEY}
+        response = http.get(f"{SONARR_URL}/api/v3/queue", headers=headers,
+                            params={'page': 1, 'pageSize': 500})
+        if response.ok:
+            records = response.json().get('records', [])
+            return round(sum(r.get('sizeleft') or 0 for r in records) / (1024**3), 2)
+        return 0.0
+    except Exception as e:
+        logger.error(f"Error getting download queue size: {str(e)}")
+        return 0.0
+
 def get_sonarr_disk_space():
     """Get disk space information from Sonarr."""
     try:
@@ -3137,9 +3212,16 @@ def run_unified_cleanup():
     try:
         cleanup_logger.info("=" * 80)
         cleanup_logger.info("🚀 STARTING UNIFIED CLEANUP")
+        cleanup_audit.start_run()
         
         global_settings = load_global_settings()
         storage_min_gb = global_settings.get('global_storage_min_gb')
+        if storage_min_gb:
+            forecast_min_gb = disk_forecast.gate_threshold_gb(storage_min_gb)
+            if forecast_min_gb > storage_min_gb:
+                cleanup_logger.info(f"📈 Disk forecast: threshold crossed before the next cleanup - "
+                                    f"gate raised {storage_min_gb}GB → {forecast_min_gb:.1f}GB")
+                storage_min_gb = forecast_min_gb
         
         # Check storage gate
         if storage_min_gb:
@@ -3220,7 +3302,8 @@ def run_unified_cleanup():
 
         # PRIORITY 1: DORMANT (oldest, most aggressive)
         cleanup_logger.info("🔴 Phase 1: Dormant cleanup (delete ALL episodes from abandoned series)")
-        dormant_count = run_dormant_cleanup(series_lookup=series_lookup)
+        with cleanup_audit.phase('dormant'):
+            dormant_count = run_dormant_cleanup(series_lookup=series_lookup)
         total_processed += dormant_count
         cleanup_logger.info(f"🔴 Dormant result: {dormant_count} operations")
         
@@ -3234,7 +3317,8 @@ def run_unified_cleanup():
         
         # PRIORITY 2: GRACE WATCHED (delete watched episodes from inactive series)
         cleanup_logger.info("🟡 Phase 2: Grace watched cleanup (delete watched episodes from inactive series)")
-        watched_count = run_grace_watched_cleanup(series_lookup=series_lookup)
+        with cleanup_audit.phase('grace_watched'):
+            watched_count = run_grace_watched_cleanup(series_lookup=series_lookup)
         total_processed += watched_count
         cleanup_logger.info(f"🟡 Grace watched result: {watched_count} operations")
         
@@ -3248,18 +3332,22 @@ def run_unified_cleanup():
         
         # PRIORITY 3: GRACE UNWATCHED (delete unwatched episodes past deadline)
         cleanup_logger.info("⏰ Phase 3: Grace unwatched cleanup (delete unwatched episodes past deadline)")
-        unwatched_count = run_grace_unwatched_cleanup(series_lookup=series_lookup)
+        with cleanup_audit.phase('grace_unwatched'):
+            unwatched_count = run_grace_unwatched_cleanup(series_lookup=series_lookup)
         total_processed += unwatched_count
         cleanup_logger.info(f"⏰ Grace unwatched result: {unwatched_count} operations")
         
-        # PRIORITY 4: MOVIE CLEANUP
-        cleanup_logger.info("🎬 Phase 4: Movie cleanup (Radarr movie rules)")
-        try:
-            from movie_processor import run_movie_cleanup
-            movie_count = run_movie_cleanup()
-        except Exception as e:
-            cleanup_logger.error(f"❌ Error in movie cleanup: {str(e)}")
-            movie_count = 0
+        # PRIORITY 4: MOVIE CLEANUP (once - in the default Sonarr instance's run)
+        movie_count = 0
+        if sonarr_instances.is_default():
+            cleanup_logger.info("🎬 Phase 4: Movie cleanup (Radarr movie rules)")
+            try:
+                from movie_processor import run_movie_cleanup
+                with cleanup_audit.phase('movie'):
+                    movie_count = run_movie_cleanup()
+            except Exception as e:
+                cleanup_logger.error(f"❌ Error in movie cleanup: {str(e)}")
+                movie_count = 0
         total_processed += movie_count
         cleanup_logger.info(f"🎬 Movie cleanup result: {movie_count} operations")
 
@@ -3296,8 +3384,129 @@ def should_trigger_processing(current_progress, trigger_percentage):
     return current_progress >= trigger_percentage
 
 
+def replay_sonarr_webhook(payload_file):
+    """Handle a Sonarr webhook another process handed over (a Sonarr instance
+    other than the default one, see sonarr_instances.dispatch_webhook) with
+    the same handler as /sonarr-webhook."""
+    try:
+        with open(payload_file, 'r') as f:
+            payload = json.load(f)
+    finally:
+        try:
+            os.remove(payload_file)
+        except OSError:
+            pass
+    from episeerr import app
+    import webhooks
+    with app.test_request_context('/sonarr-webhook', method='POST', json=payload):
+        response = webhooks.process_sonarr_webhook()
+    status = response[1] if isinstance(response, tuple) else 200
+    logger.info(f"Sonarr webhook for instance '{sonarr_instances.active_instance()}' "
+                f"({payload.get('eventType')}) handled: {status}")
+    return status < 400
+
+
+def apply_rule_tags(payload_file):
+    """Rule tag work for this instance handed over by the web app (rules
+    changed for a Sonarr instance other than the default one, see
+    sonarr_instances.dispatch_rule_tags) - the same helpers the default
+    instance runs in-process, against this instance's Sonarr."""
+    try:
+        with open(payload_file, 'r') as f:
+            work = json.load(f)
+    finally:
+        try:
+            os.remove(payload_file)
+        except OSError:
+            pass
+    import episeerr
+    import episeerr_utils
+    import tag_sync
+
+    for rule_name in work.get('ensure_rules', []):
+        episeerr._ensure_rule_tag(rule_name)
+    for rule_name in work.get('remove_rules', []):
+        episeerr._cleanup_rule_tag_from_sonarr(rule_name)
+    for series_id in work.get('unassign', []):
+        episeerr_utils.remove_all_episeerr_tags(int(series_id))
+
+    assignments = {int(series_id): rule_name for series_id, rule_name in work.get('assign', {}).items()}
+    failed = []
+    if assignments:
+        _, failed, _ = tag_sync.sync_rule_tags(assignments)
+    # One series at a time - a '+' expression records held seasons in the config
+    config = load_config()
+    for series_id in work.get('always_have', []):
+        rule_name = assignments.get(int(series_id))
+        expression = config['rules'].get(rule_name, {}).get('always_have') if rule_name else None
+        if expression:
+            try:
+                process_always_have(int(series_id), expression)
+            except Exception as e:
+                logger.error(f"always_have processing failed for series {series_id}: {e}")
+    logger.info(f"Rule tags for instance '{sonarr_instances.active_instance()}' applied "
+                f"({len(assignments) - len(failed)}/{len(assignments)} series synced)")
+    return not failed
+
+
+def process_watch_event(webhook_file):
+    """Process the watch (or playback-start) event in an integration's temp
+    file for this instance, then replay it against the other Sonarr
+    instances. Returns True if the series was found."""
+    series_name, season_number, episode_number, thetvdb_id, themoviedb_id, prefetch_only = get_server_activity(webhook_file)
+    if not series_name:
+        return False
+
+    series_id = get_series_id(series_name, thetvdb_id, themoviedb_id)
+    if series_id:
+        config = load_config()
+        config_rule, modified = reconcile_series_drift(series_id, config)
+        if modified:
+            save_config(config)
+        watch_trace.mark_stage('processed', series_id=series_id, rule=config_rule)
+
+        if config_rule:
+            rule = config['rules'][config_rule]
+            process_episodes_for_webhook(series_id, season_number, episode_number, rule, series_name,
+                                         prefetch_only=prefetch_only)
+        else:
+            update_activity_date(series_id, season_number, episode_number)
+    # The same show may live in other Sonarr instances (1080p / 4K)
+    sonarr_instances.replay_watch_event(webhook_file)
+    return bool(series_id)
+
+
 def main():
     """Main entry point - FIXED webhook vs cleanup logic"""
+    # Sonarr webhook for this instance - not automation, same as the in-process
+    # /sonarr-webhook route, so it isn't held below
+    if len(sys.argv) > 2 and sys.argv[1] == '--sonarr-webhook':
+        return replay_sonarr_webhook(sys.argv[2])
+
+    # Rule tag changes for this instance - config management, like the
+    # in-process rule_tag_sync job, so it isn't held below either
+    if len(sys.argv) > 2 and sys.argv[1] == '--rule-tags':
+        return apply_rule_tags(sys.argv[2])
+
+    # Watch event replayed from the default instance
+    # (sonarr_instances.replay_watch_event) - a watch event however long it
+    # waited to start, never a cleanup run. The file is this process's copy.
+    if len(sys.argv) > 2 and sys.argv[1] == '--watch-event':
+        watch_event_file = sys.argv[2]
+        try:
+            if not os.path.exists(watch_event_file):
+                logger.error(f"Watch event file {watch_event_file} is missing")
+                return False
+            if load_global_settings().get('automation_held', False):
+                logger.info("⏸️ Automation held - skipping replayed watch event")
+                return False
+            return process_watch_event(watch_event_file)
+        finally:
+            try:
+                os.remove(watch_event_file)
+            except OSError:
+                pass
+
     # Single choke point for every webhook AND every cleanup run (scheduled,
     # manual, movie) - held automation means nothing downloads, unmonitors,
     # or deletes anything, without needing a separate check in each caller.
@@ -3313,7 +3522,7 @@ def main():
     webhook_file = sys.argv[1] if len(sys.argv) > 1 else '/app/temp/data_from_server.json'
 
     # Check if this is a webhook call (has recent webhook data)
-    series_name, season_number, episode_number, thetvdb_id, themoviedb_id, prefetch_only = get_server_activity(webhook_file)
+    series_name = get_server_activity(webhook_file)[0]
 
     try:
         # Check if webhook file is recent (within last few minutes)
@@ -3328,20 +3537,7 @@ def main():
     if series_name and is_recent_webhook:
         # Webhook mode - process the episode that was just watched
         # (or just started, when the integration flagged it prefetch-only)
-        series_id = get_series_id(series_name, thetvdb_id, themoviedb_id)
-        if series_id:
-            config = load_config()
-            config_rule, modified = reconcile_series_drift(series_id, config)
-            if modified:
-                save_config(config)
-
-            if config_rule:
-                rule = config['rules'][config_rule]
-                process_episodes_for_webhook(series_id, season_number, episode_number, rule, series_name,
-                                             prefetch_only=prefetch_only)
-            else:
-                update_activity_date(series_id, season_number, episode_number)
-            return True
+        return process_watch_event(webhook_file)
     else:
         # Cleanup mode - run unified cleanup (manual or scheduled)
         run_unified_cleanup()
@@ -8,6 +8,8 @@ import re
 import time
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 import requests
@@ -140,105 +142,126 @@ def _norm_title(t):
     return ' '.join(t.split())
 
 
-def _build_plex_watch_cache():
-    """Build {tmdb_id_str: unix_ts} from all Plex movie libraries."""
+def _build_plex_watch_cache(since=None):
+    """Build {tmdb_id_str: unix_ts} from all Plex movie libraries.
+
+    since: only fetch movies with lastViewedAt at or after this unix time
+    (incremental refresh). Returns None if Plex isn't configured; raises if
+    the library listing or any movie section fails, so the caller keeps its
+    previous entries rather than storing a partial cache.
+    """
     url, token = get_plex_settings()
     if not url or not token:
-        return {}
+        return None
     headers = {'Accept': 'application/json', 'X-Plex-Token': token}
     cache = {}
-    try:
-        sections_resp = http.get(f"{url}/library/sections", headers=headers, timeout=10)
-        if not sections_resp.ok:
-            return {}
-        sections = sections_resp.json().get('MediaContainer', {}).get('Directory', [])
-        movie_sections = [s['key'] for s in sections if s.get('type') == 'movie']
-        for section_key in movie_sections:
-            items_resp = http.get(
-                f"{url}/library/sections/{section_key}/all",
-                params={'type': 1, 'includeGuids': 1},
-                headers=headers,
-                timeout=30
-            )
-            if not items_resp.ok:
+    sections_resp = http.get(f"{url}/library/sections", headers=headers, timeout=10)
+    sections_resp.raise_for_status()
+    sections = sections_resp.json().get('MediaContainer', {}).get('Directory', [])
+    movie_sections = [s['key'] for s in sections if s.get('type') == 'movie']
+    params = {'type': 1, 'includeGuids': 1}
+    if since:
+        params['lastViewedAt>>'] = int(since)  # Plex filter syntax: lastViewedAt>>=<ts>
+    for section_key in movie_sections:
+        items_resp = http.get(
+            f"{url}/library/sections/{section_key}/all",
+            params=params,
+            headers=headers,
+            timeout=30
+        )
+        items_resp.raise_for_status()
+        for item in items_resp.json().get('MediaContainer', {}).get('Metadata', []):
+            last_viewed = item.get('lastViewedAt')
+            if not last_viewed:
                 continue
-            for item in items_resp.json().get('MediaContainer', {}).get('Metadata', []):
-                last_viewed = item.get('lastViewedAt')
-                if not last_viewed:
-                    continue
-                for guid in item.get('Guid', []):
-                    gid = guid.get('id', '')
-                    if gid.startswith('tmdb://'):
-                        tmdb_id = gid[7:]
-                        if int(last_viewed) > cache.get(tmdb_id, 0):
-                            cache[tmdb_id] = int(last_viewed)
-    except Exception as e:
-        logger.warning(f"Plex watch cache error: {e}")
+            for guid in item.get('Guid', []):
+                gid = guid.get('id', '')
+                if gid.startswith('tmdb://'):
+                    tmdb_id = gid[7:]
+                    if int(last_viewed) > cache.get(tmdb_id, 0):
+                        cache[tmdb_id] = int(last_viewed)
     return cache
 
 
-def _build_jellyfin_emby_watch_cache(is_emby=False):
-    """Build {tmdb_id_str: unix_ts} from Jellyfin or Emby."""
-    server_name = 'Emby' if is_emby else 'Jellyfin'
+def _jellyfin_played_ts(item):
+    last_played = item.get('UserData', {}).get('LastPlayedDate')
+    if not last_played:
+        return None
+    try:
+        return int(datetime.fromisoformat(last_played.rstrip('Z')[:26]).replace(tzinfo=timezone.utc).timestamp())
+    except Exception:
+        return None
+
+
+def _build_jellyfin_emby_watch_cache(is_emby=False, since=None):
+    """Build {tmdb_id_str: unix_ts} from Jellyfin or Emby.
+
+    since: only fetch movies played at or after this unix time - pages
+    through the library sorted by DatePlayed (newest first) and stops at the
+    first older item. Returns None if the server isn't configured.
+    """
     url, api_key, user_id = get_emby_settings() if is_emby else get_jellyfin_settings()
     if not url or not api_key or not user_id:
-        return {}
+        return None
     headers = {'X-Emby-Token': api_key}
+    params = {'IncludeItemTypes': 'Movie', 'Recursive': 'true', 'Fields': 'UserData,ProviderIds'}
+    if since:
+        params.update({'SortBy': 'DatePlayed', 'SortOrder': 'Descending', 'Limit': 200})
+    else:
+        params['Limit'] = 10000
     cache = {}
-    try:
+    start_index = 0
+    while True:
         resp = http.get(
             f"{url}/Users/{user_id}/Items",
-            params={'IncludeItemTypes': 'Movie', 'Recursive': 'true', 'Fields': 'UserData,ProviderIds', 'Limit': 10000},
+            params={**params, 'StartIndex': start_index},
             headers=headers,
             timeout=30
         )
-        if not resp.ok:
-            return {}
-        for item in resp.json().get('Items', []):
-            last_played = item.get('UserData', {}).get('LastPlayedDate')
-            if not last_played:
+        resp.raise_for_status()
+        items = resp.json().get('Items', [])
+        reached_older = False
+        for item in items:
+            ts = _jellyfin_played_ts(item)
+            if ts is None or (since and ts < since):
+                reached_older = bool(since)
+                if reached_older:
+                    break
                 continue
             tmdb_id = str(item.get('ProviderIds', {}).get('Tmdb', ''))
-            if not tmdb_id:
-                continue
-            try:
-                ts = int(datetime.fromisoformat(last_played.rstrip('Z')).replace(tzinfo=timezone.utc).timestamp())
-                if ts > cache.get(tmdb_id, 0):
-                    cache[tmdb_id] = ts
-            except Exception:
-                pass
-    except Exception as e:
-        logger.warning(f"{server_name} watch cache error: {e}")
-    return cache
+            if tmdb_id and ts > cache.get(tmdb_id, 0):
+                cache[tmdb_id] = ts
+        if not since or reached_older or len(items) < params['Limit']:
+            return cache
+        start_index += len(items)
+
 
+def _build_tautulli_watch_cache(since=None):
+    """Build {norm_title: unix_ts} from Tautulli movie history.
 
-def _build_tautulli_watch_cache():
-    """Build {norm_title: unix_ts} from full Tautulli movie history."""
+    since: only fetch history from that day onwards (Tautulli's `after`
+    filter has day granularity). Returns None if Tautulli isn't configured.
+    """
     tautulli_url, api_key = get_tautulli_settings()
     if not tautulli_url or not api_key:
-        return {}
+        return None
+    params = {'apikey': api_key, 'cmd': 'get_history', 'media_type': 'movie', 'length': 10000, 'start': 0}
+    if since:
+        params['after'] = datetime.fromtimestamp(since - 86400, tz=timezone.utc).strftime('%Y-%m-%d')
+    resp = http.get(f"{tautulli_url}/api/v2", params=params, timeout=30)
+    resp.raise_for_status()
+    data = resp.json()
+    if data.get('response', {}).get('result') != 'success':
+        raise RuntimeError(data.get('response', {}).get('message') or 'get_history failed')
     cache = {}
-    try:
-        resp = http.get(
-            f"{tautulli_url}/api/v2",
-            params={'apikey': api_key, 'cmd': 'get_history', 'media_type': 'movie', 'length': 10000, 'start': 0},
-            timeout=30
-        )
-        if not resp.ok:
-            return {}
-        data = resp.json()
-        if data.get('response', {}).get('result') != 'success':
-            return {}
-        for entry in data.get('response', {}).get('data', {}).get('data', []):
-            title = entry.get('title', '')
-            ts = entry.get('date')
-            if not title or not ts:
-                continue
-            norm = _norm_title(title)
-            if int(ts) > cache.get(norm, 0):
-                cache[norm] = int(ts)
-    except Exception as e:
-        logger.warning(f"Tautulli watch cache error: {e}")
+    for entry in data.get('response', {}).get('data', {}).get('data', []):
+        title = entry.get('title', '')
+        ts = entry.get('date')
+        if not title or not ts:
+            continue
+        norm = _norm_title(title)
+        if int(ts) > cache.get(norm, 0):
+            cache[norm] = int(ts)
     return cache
 
 
@@ -280,29 +303,131 @@ def _build_webhook_watch_cache() -> dict:
         return {}
 
 
-def build_movie_watch_cache():
+# Per-source watch cache persisted between cleanup runs. Each source keeps its
+# entries plus a high-water mark (newest watch timestamp seen); later runs
+# only ask the server for watches since then. A full rebuild every
+# movie_watch_full_rebuild_hours (global setting, default 24) picks up
+# anything incremental fetches can't see - unwatched or removed items.
+MOVIE_WATCH_CACHE_FILE = os.path.join(os.getcwd(), 'data', 'movie_watch_cache.json')
+MOVIE_WATCH_FULL_REBUILD_HOURS = 24
+# Incremental fetches start this far behind the high-water mark so a watch
+# reported late (slow scrobble, clock skew between servers) isn't skipped.
+_HIGH_WATER_OVERLAP = 3600
+_watch_cache_lock = threading.Lock()
+
+
+def _load_watch_cache_state() -> dict:
+    try:
+        with open(MOVIE_WATCH_CACHE_FILE, 'r') as f:
+            state = json.load(f)
+        if isinstance(state.get('sources'), dict):
+            return state
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"[movie] watch cache load error - rebuilding: {e}")
+    return {'sources': {}}
+
+
+def _save_watch_cache_state(state: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(MOVIE_WATCH_CACHE_FILE), exist_ok=True)
+        tmp_path = MOVIE_WATCH_CACHE_FILE + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, MOVIE_WATCH_CACHE_FILE)
+    except Exception as e:
+        logger.warning(f"[movie] watch cache save error: {e}")
+
+
+def _refresh_watch_source(label, build_fn, source_state, full, now):
+    """Run one source's builder and fold the result into its persisted state.
+    Returns the new state, or None if the source is no longer configured."""
+    since = None if full else max(0, source_state.get('high_water', 0) - _HIGH_WATER_OVERLAP)
+    started = time.time()
+    try:
+        part = build_fn(since)
+    except Exception as e:
+        logger.warning(f"{label} watch cache error: {e}")
+        return source_state or None  # keep what we had
+    if part is None:
+        return None
+
+    if full:
+        entries = dict(part)
+        source_state = {'full_built_at': now}
+    else:
+        entries = dict(source_state.get('entries', {}))
+        for k, v in part.items():
+            if v > entries.get(k, 0):
+                entries[k] = v
+    source_state.update({
+        'entries': entries,
+        'high_water': max(entries.values(), default=0),
+        'updated_at': now,
+    })
+    logger.info(
+        f"[movie] {label} watch cache: {'full' if full else 'incremental'} refresh, "
+        f"{len(part)} fetched, {len(entries)} total ({time.time() - started:.1f}s)"
+    )
+    return source_state
+
+
+def build_movie_watch_cache(full_rebuild=False):
     """
     Build unified watch cache. Returns (tmdb_cache, title_cache, sources).
     Priority: Webhook events → Plex → Jellyfin → Emby → Tautulli (title fallback).
     Webhook events come first so real-time watch detection beats polling.
+
+    The four media-server sources are refreshed concurrently, each
+    incrementally from its persisted high-water mark unless it is due a
+    full rebuild (or full_rebuild=True).
     """
+    builders = [
+        ('Plex', _build_plex_watch_cache),
+        ('Jellyfin', lambda since: _build_jellyfin_emby_watch_cache(False, since)),
+        ('Emby', lambda since: _build_jellyfin_emby_watch_cache(True, since)),
+        ('Tautulli', _build_tautulli_watch_cache),
+    ]
+    try:
+        rebuild_hours = float(load_global_settings().get(
+            'movie_watch_full_rebuild_hours', MOVIE_WATCH_FULL_REBUILD_HOURS))
+    except Exception:
+        rebuild_hours = MOVIE_WATCH_FULL_REBUILD_HOURS
+
+    with _watch_cache_lock:
+        state = _load_watch_cache_state()
+        previous = dict(state['sources'])
+        now = int(time.time())
+
+        def _refresh(item):
+            label, build_fn = item
+            source_state = dict(previous.get(label) or {})
+            full = (full_rebuild or not source_state.get('full_built_at')
+                    or now - source_state['full_built_at'] >= rebuild_hours * 3600)
+            return label, _refresh_watch_source(label, build_fn, source_state, full, now)
+
+        with ThreadPoolExecutor(max_workers=len(builders)) as executor:
+            for label, source_state in executor.map(_refresh, builders):
+                if source_state is None:
+                    state['sources'].pop(label, None)
+                else:
+                    state['sources'][label] = source_state
+        _save_watch_cache_state(state)
+
     tmdb_cache = {}
     title_cache = {}
     sources = []
 
-    for build_fn, label in [
-        (_build_plex_watch_cache, 'Plex'),
-        (lambda: _build_jellyfin_emby_watch_cache(False), 'Jellyfin'),
-        (lambda: _build_jellyfin_emby_watch_cache(True), 'Emby'),
-    ]:
-        part = build_fn()
+    for label in ('Plex', 'Jellyfin', 'Emby'):
+        part = state['sources'].get(label, {}).get('entries')
         if part:
             for k, v in part.items():
                 if v > tmdb_cache.get(k, 0):
                     tmdb_cache[k] = v
             sources.append(label)
 
-    title_cache = _build_tautulli_watch_cache()
+    title_cache = state['sources'].get('Tautulli', {}).get('entries') or {}
     if title_cache:
         sources.append('Tautulli')
 
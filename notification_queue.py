@@ -0,0 +1,340 @@
+"""
+Notification Queue - Discord sends off the request path
+
+send_notification() used to POST to the Discord webhook (?wait=true, 10s
+timeout) inline - from webhook handling and the media_processor
+subprocess - so a slow Discord or a 429 held up the episode processing
+behind it, and a burst of search-pending notifications went out one
+request at a time.
+
+Posts and message deletes are now rows in settings.db's
+notification_queue table: any process can enqueue, and pending sends
+survive a restart. One sender thread in the leader worker delivers them:
+
+    coalescing   a post waits COALESCE_SECONDS; every post of the same type
+                 queued by then (up to DIGEST_MAX) goes out as one digest
+                 (notifications.build_digest)
+    rate limits  X-RateLimit-Remaining / X-RateLimit-Reset-After hold the
+                 next request back; a 429 waits out Retry-After without
+                 using up an attempt
+    failures     retried with backoff, dropped after MAX_ATTEMPTS; rows
+                 older than MAX_AGE_SECONDS are dropped unsent
+    deletes      due immediately. A search-pending post still in the queue
+                 is cancelled instead (cancel_post)
+
+When a search-pending post goes out, its Discord message id is stored per
+episode (notification_storage.store_notifications) for the grab webhook to
+delete it by. Enqueueing never raises: a database problem loses a
+notification, not the webhook that triggered it.
+"""
+import json
+import sqlite3
+import threading
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+import settings_db
+from episeerr_utils import http
+
+logger = logging.getLogger(__name__)
+
+COALESCE_SECONDS = 5
+# Discord allows 10 embeds per message; digests list at most this many
+DIGEST_MAX = 10
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 10
+MAX_AGE_SECONDS = 24 * 3600
+# How often the sender looks for rows queued by other processes
+POLL_SECONDS = 2
+REQUEST_TIMEOUT = 10
+
+_cond = threading.Condition()
+_woken = False
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+# Not before this time - from Discord's rate-limit headers
+_blocked_until = 0.0
+
+
+def _connect():
+    return sqlite3.connect(settings_db.DB_PATH, timeout=10)
+
+
+def _wake() -> None:
+    global _woken
+    with _cond:
+        _woken = True
+        _cond.notify_all()
+
+
+# ── Enqueue ─────────────────────────────────────────────────────
+
+def enqueue_post(notification_type: str, message: Dict[str, Any], data: Optional[Dict[str, Any]] = None,
+                 episode_id: Optional[int] = None) -> Optional[int]:
+    """Queue a Discord message. Returns the queue row id, None on error."""
+    now = time.time()
+    try:
+        conn = _connect()
+        try:
+            cursor = conn.execute(
+                '''INSERT INTO notification_queue
+                   (kind, notification_type, message, data, episode_id, created_at, next_attempt_at)
+                   VALUES ('post', ?, ?, ?, ?, ?, ?)''',
+                (notification_type, json.dumps(message), json.dumps(data or {}, default=str),
+                 episode_id, now, now + COALESCE_SECONDS)
+            )
+            conn.commit()
+            row_id = cursor.lastrowid
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Could not queue {notification_type} notification: {e}")
+        return None
+    _wake()
+    return row_id
+
+
+def enqueue_delete(message_id: str) -> Optional[int]:
+    """Queue the deletion of a Discord message sent through the webhook."""
+    now = time.time()
+    try:
+        conn = _connect()
+        try:
+            cursor = conn.execute(
+                '''INSERT INTO notification_queue (kind, message_id, created_at, next_attempt_at)
+                   VALUES ('delete', ?, ?, ?)''',
+                (str(message_id), now, now)
+            )
+            conn.commit()
+            row_id = cursor.lastrowid
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Could not queue deletion of Discord message {message_id}: {e}")
+        return None
+    _wake()
+    return row_id
+
+
+def cancel_post(episode_id) -> bool:
+    """Drop an episode's post that hasn't gone out yet. True if there was one."""
+    try:
+        conn = _connect()
+        try:
+            cursor = conn.execute("DELETE FROM notification_queue WHERE kind = 'post' AND episode_id = ?",
+                                  (int(episode_id),))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        logger.debug(f"Could not cancel queued notification for episode {episode_id}: {e}")
+        return False
+
+
+def pending(limit: int = 100) -> List[Dict[str, Any]]:
+    """Queued rows, oldest first (without message bodies)."""
+    conn = _connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(
+            '''SELECT id, kind, notification_type, episode_id, message_id, created_at,
+                      next_attempt_at, attempts, last_error
+               FROM notification_queue ORDER BY id LIMIT ?''', (limit,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+
+# ── Delivery ────────────────────────────────────────────────────
+
+def _webhook_url() -> str:
+    import notifications
+    return notifications.DISCORD_WEBHOOK_URL
+
+
+def _message_url(webhook_url: str, message_id: str) -> str:
+    return f"{webhook_url.split('?')[0].rstrip('/')}/messages/{message_id}"
+
+
+def _note_rate_limit(response) -> None:
+    """Hold further requests back per Discord's rate-limit headers."""
+    global _blocked_until
+    now = time.time()
+    try:
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.json().get('retry_after'))
+            except (ValueError, TypeError, AttributeError):
+                retry_after = float(response.headers.get('Retry-After', 1))
+            _blocked_until = max(_blocked_until, now + retry_after)
+        elif response.headers.get('X-RateLimit-Remaining') == '0':
+            _blocked_until = max(_blocked_until,
+                                 now + float(response.headers.get('X-RateLimit-Reset-After', 1)))
+    except (TypeError, ValueError):
+        pass
+
+
+def _due_batch(conn, now: float) -> List[sqlite3.Row]:
+    """The next request's rows: a delete on its own, or a post together with
+    the posts of the same type queued within the coalescing window."""
+    first = conn.execute('SELECT * FROM notification_queue WHERE next_attempt_at <= ? '
+                         'ORDER BY next_attempt_at, id LIMIT 1', (now,)).fetchone()
+    if first is None or first['kind'] == 'delete':
+        return [first] if first else []
+    return conn.execute(
+        '''SELECT * FROM notification_queue
+           WHERE kind = 'post' AND notification_type = ? AND next_attempt_at <= ?
+           ORDER BY id LIMIT ?''',
+        (first['notification_type'], now + COALESCE_SECONDS, DIGEST_MAX)
+    ).fetchall()
+
+
+def _message_for(rows: List[sqlite3.Row]) -> Dict[str, Any]:
+    if len(rows) == 1:
+        return json.loads(rows[0]['message'])
+    import notifications
+    return notifications.build_digest(
+        rows[0]['notification_type'],
+        [{'data': json.loads(row['data'] or '{}'), 'message': json.loads(row['message'])} for row in rows]
+    )
+
+
+def _retry_later(conn, rows: List[sqlite3.Row], error: str, now: float) -> None:
+    for row in rows:
+        attempts = row['attempts'] + 1
+        if attempts >= MAX_ATTEMPTS:
+            logger.error(f"Dropping {row['kind']} notification {row['id']} after {attempts} attempts: {error}")
+            conn.execute('DELETE FROM notification_queue WHERE id = ?', (row['id'],))
+        else:
+            conn.execute('UPDATE notification_queue SET attempts = ?, last_error = ?, next_attempt_at = ? '
+                         'WHERE id = ?',
+                         (attempts, error[:500], now + RETRY_BASE_SECONDS * 2 ** (attempts - 1), row['id']))
+
+
+def _sent(conn, rows: List[sqlite3.Row], message_id: Optional[str]) -> None:
+    """Remove delivered rows and store the message id for their episodes.
+    A post cancelled while it was being sent has its message deleted."""
+    ids = [row['id'] for row in rows]
+    marks = ','.join('?' * len(ids))
+    remaining = conn.execute(f'SELECT episode_id FROM notification_queue WHERE id IN ({marks})', ids).fetchall()
+    conn.execute(f'DELETE FROM notification_queue WHERE id IN ({marks})', ids)
+    conn.commit()
+    if not message_id or not any(row['episode_id'] for row in rows):
+        return
+    if not remaining:
+        enqueue_delete(message_id)
+        return
+    from notification_storage import store_notifications
+    store_notifications([episode_id for (episode_id,) in remaining if episode_id], message_id)
+
+
+def _deliver(conn, rows: List[sqlite3.Row], webhook_url: str) -> None:
+    now = time.time()
+    row = rows[0]
+    try:
+        if row['kind'] == 'delete':
+            response = http.delete(_message_url(webhook_url, row['message_id']), timeout=REQUEST_TIMEOUT)
+        else:
+            separator = '&' if '?' in webhook_url else '?'
+            response = http.post(f"{webhook_url}{separator}wait=true", json=_message_for(rows),
+                                 timeout=REQUEST_TIMEOUT)
+    except Exception as e:
+        _retry_later(conn, rows, str(e), now)
+        conn.commit()
+        return
+
+    _note_rate_limit(response)
+    if response.status_code == 429:
+        conn.executemany('UPDATE notification_queue SET next_attempt_at = ? WHERE id = ?',
+                         [(_blocked_until, r['id']) for r in rows])
+        conn.commit()
+        logger.info(f"Discord rate limit - holding {len(rows)} notification(s) for {_blocked_until - now:.1f}s")
+        return
+    if row['kind'] == 'delete' and response.status_code in (200, 204, 404):
+        # 404: already deleted in Discord
+        conn.execute('DELETE FROM notification_queue WHERE id = ?', (row['id'],))
+        conn.commit()
+        logger.info(f"🗑️ Deleted Discord message {row['message_id']}")
+        return
+    if row['kind'] == 'post' and response.ok:
+        try:
+            message_id = response.json().get('id')
+        except ValueError:
+            message_id = None
+        _sent(conn, rows, message_id)
+        logger.info(f"📤 Sent {row['notification_type']} notification "
+                    f"({len(rows)} queued, message_id: {message_id})")
+        return
+    _retry_later(conn, rows, f"HTTP {response.status_code}: {response.text[:200]}", now)
+    conn.commit()
+
+
+def process_due() -> int:
+    """Deliver everything that's due, until the queue is empty for now or
+    Discord's rate limit says wait. Returns the number of rows handled."""
+    webhook_url = _webhook_url()
+    if not webhook_url:
+        return 0
+    handled = 0
+    conn = _connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        expired = conn.execute('DELETE FROM notification_queue WHERE created_at < ?',
+                               (time.time() - MAX_AGE_SECONDS,)).rowcount
+        conn.commit()
+        if expired:
+            logger.warning(f"Dropped {expired} notification(s) queued over {MAX_AGE_SECONDS // 3600}h")
+        while time.time() >= _blocked_until:
+            rows = _due_batch(conn, time.time())
+            if not rows:
+                break
+            _deliver(conn, rows, webhook_url)
+            handled += len(rows)
+    finally:
+        conn.close()
+    return handled
+
+
+def _run() -> None:
+    global _woken
+    while not _stop.is_set():
+        try:
+            process_due()
+        except Exception as e:
+            logger.error(f"Notification sender error: {e}")
+        with _cond:
+            if not _woken:
+                _cond.wait(max(POLL_SECONDS, min(_blocked_until - time.time(), 60)))
+            _woken = False
+
+
+def start_sender() -> None:
+    """Start the sender thread (leader worker only - see episeerr.py)."""
+    global _thread
+    with _cond:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, daemon=True, name='notification-sender')
+            _thread.start()
+
+
+def stop_sender(timeout: float = 5) -> None:
+    """Stop the sender thread; queued rows stay for the next start."""
+    global _thread
+    with _cond:
+        thread = _thread
+    _stop.set()
+    _wake()
+    if thread:
+        thread.join(timeout)
+        if thread.is_alive():
+            # Still mid-request: leave it flagged to stop, and known to
+            # start_sender() so a second thread isn't started beside it
+            logger.warning(f"Notification sender did not stop within {timeout}s")
+            return
+    with _cond:
+        if _thread is thread:
+            _thread = None
+    _stop.clear()
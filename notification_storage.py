@@ -1,154 +1,266 @@
 """
 Notification storage helpers
-Manages pending search notifications in a simple JSON file
+Tracks which Discord message belongs to which pending episode search, and
+which episodes the aired-but-not-downloaded check has already notified.
+
+Both live in indexed settings.db tables (search_notifications,
+aired_notifications) keyed by Sonarr episode id, with batch calls for the
+loops that used to reload and rewrite a whole JSON file per episode.
+migrate_from_files() imports the old JSON files once.
 """
 
 import os
 import json
+import sqlite3
+import time
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 
+import settings_db
 from logging_config import main_logger as logger
 
+# Pre-SQLite storage, imported by migrate_from_files()
 NOTIFICATION_STORAGE = '/config/pending_notifications.json'
 AIRED_NOTIFICATION_STORAGE = '/data/aired_notifications.json'
 
+AIRED_RETENTION_DAYS = 30
+# A search that was never grabbed leaves its row behind; dropped after this
+SEARCH_RETENTION_DAYS = 30
 
-def store_notification(episode_id, message_id):
+
+def _connect():
+    return sqlite3.connect(settings_db.DB_PATH, timeout=10)
+
+
+def _ids(episode_ids):
+    return [int(e) for e in episode_ids if e is not None]
+
+
+def _in_batches(episode_ids, size=500):
+    """Stay under SQLite's bound-parameter limit."""
+    for i in range(0, len(episode_ids), size):
+        yield episode_ids[i:i + size]
+
+
+# --- Search-pending Discord messages ---
+
+def store_notifications(episode_ids, message_id):
     """
-    Store Discord message ID for an episode search
-    
+    Store one Discord message ID for several episode searches (a digest),
+    pruning rows past SEARCH_RETENTION_DAYS
+
     Args:
-        episode_id: Sonarr episode ID
+        episode_ids: Sonarr episode IDs
         message_id: Discord message ID
     """
+    episode_ids = _ids(episode_ids)
+    now = time.time()
     try:
-        notifications = {}
-        if os.path.exists(NOTIFICATION_STORAGE):
-            with open(NOTIFICATION_STORAGE, 'r') as f:
-                notifications = json.load(f)
-        
-        notifications[str(episode_id)] = {
-            'message_id': message_id,
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        
-        os.makedirs(os.path.dirname(NOTIFICATION_STORAGE), exist_ok=True)
-        with open(NOTIFICATION_STORAGE, 'w') as f:
-            json.dump(notifications, f, indent=2)
-            
-        logger.info(f"💾 Stored notification for episode {episode_id}: {message_id}")
-        
+        conn = _connect()
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO search_notifications (episode_id, message_id, created_at) VALUES (?, ?, ?)',
+                [(episode_id, str(message_id), now) for episode_id in episode_ids]
+            )
+            conn.execute('DELETE FROM search_notifications WHERE created_at < ?',
+                         (now - SEARCH_RETENTION_DAYS * 86400,))
+            conn.commit()
+        finally:
+            conn.close()
+        logger.info(f"💾 Stored notification for episode(s) {episode_ids}: {message_id}")
+
     except Exception as e:
         logger.error(f"Failed to store notification: {e}")
 
 
+def store_notification(episode_id, message_id):
+    """Store Discord message ID for an episode search"""
+    store_notifications([episode_id], message_id)
+
+
+def pop_notifications(episode_ids):
+    """
+    Get and remove the notifications for several episodes
+
+    Returns:
+        {episode_id: Discord message ID} for the episodes that had one
+    """
+    found = {}
+    try:
+        conn = _connect()
+        try:
+            for batch in _in_batches(_ids(episode_ids)):
+                marks = ','.join('?' * len(batch))
+                found.update(conn.execute(
+                    f'SELECT episode_id, message_id FROM search_notifications WHERE episode_id IN ({marks})',
+                    batch
+                ).fetchall())
+                conn.execute(f'DELETE FROM search_notifications WHERE episode_id IN ({marks})', batch)
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.error(f"Failed to get notification: {e}")
+        return {}
+
+    if found:
+        logger.info(f"📋 Retrieved notification(s) for episode(s) {sorted(found)}")
+    return found
+
+
 def get_and_remove_notification(episode_id):
     """
     Get and remove notification for an episode
-    
+
     Args:
         episode_id: Sonarr episode ID
-        
+
     Returns:
         Discord message ID if found, None otherwise
     """
     try:
-        if not os.path.exists(NOTIFICATION_STORAGE):
-            return None
-            
-        with open(NOTIFICATION_STORAGE, 'r') as f:
-            notifications = json.load(f)
-        
-        notification = notifications.pop(str(episode_id), None)
-        
-        with open(NOTIFICATION_STORAGE, 'w') as f:
-            json.dump(notifications, f, indent=2)
-        
-        if notification:
-            message_id = notification.get('message_id')
-            logger.info(f"📋 Retrieved notification for episode {episode_id}: {message_id}")
-            return message_id
-        
-        return None
-        
-    except Exception as e:
-        logger.error(f"Failed to get notification: {e}")
+        return pop_notifications([episode_id]).get(int(episode_id))
+    except (TypeError, ValueError):
         return None
+
+
 def notification_exists(episode_id):
     """Check if a notification already exists for an episode"""
     try:
-        if not os.path.exists(NOTIFICATION_STORAGE):
-            return False
+        conn = _connect()
+        try:
+            return conn.execute('SELECT 1 FROM search_notifications WHERE episode_id = ?',
+                                (int(episode_id),)).fetchone() is not None
+        finally:
+            conn.close()
+
+    except Exception as e:
+        logger.error(f"Failed to check notification existence: {e}")
+        return False
 
-        with open(NOTIFICATION_STORAGE, 'r') as f:
-            notifications = json.load(f)
 
-        return str(episode_id) in notifications
+def message_in_use(message_id):
+    """Check if any episode still has this Discord message (a digest) stored"""
+    try:
+        conn = _connect()
+        try:
+            return conn.execute('SELECT 1 FROM search_notifications WHERE message_id = ? LIMIT 1',
+                                (str(message_id),)).fetchone() is not None
+        finally:
+            conn.close()
 
     except Exception as e:
-        logger.error(f"Failed to check notification existence: {e}")
+        logger.error(f"Failed to check notification message: {e}")
         return False
 
 
 # --- Aired-but-not-downloaded notification tracking ---
 
+def aired_notified(episode_ids):
+    """Which of these episodes have already had an aired-not-downloaded
+    notification. Returns a set of episode IDs."""
+    notified = set()
+    try:
+        conn = _connect()
+        try:
+            for batch in _in_batches(_ids(episode_ids)):
+                marks = ','.join('?' * len(batch))
+                notified.update(row[0] for row in conn.execute(
+                    f'SELECT episode_id FROM aired_notifications WHERE episode_id IN ({marks})', batch))
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.error(f"Failed to check aired notification existence: {e}")
+    return notified
+
+
 def aired_notification_exists(episode_id):
     """Check if an aired-not-downloaded notification has already been sent for an episode"""
     try:
-        if not os.path.exists(AIRED_NOTIFICATION_STORAGE):
-            return False
+        return int(episode_id) in aired_notified([episode_id])
+    except (TypeError, ValueError):
+        return False
 
-        with open(AIRED_NOTIFICATION_STORAGE, 'r') as f:
-            notified = json.load(f)
 
-        return str(episode_id) in notified
+def store_aired_notifications(episode_ids):
+    """Record that an aired-not-downloaded notification was sent for these episodes"""
+    episode_ids = _ids(episode_ids)
+    try:
+        conn = _connect()
+        try:
+            now = time.time()
+            conn.executemany('INSERT OR REPLACE INTO aired_notifications (episode_id, notified_at) VALUES (?, ?)',
+                             [(episode_id, now) for episode_id in episode_ids])
+            conn.commit()
+        finally:
+            conn.close()
+        logger.debug(f"Stored aired notification for episode(s) {episode_ids}")
 
     except Exception as e:
-        logger.error(f"Failed to check aired notification existence: {e}")
-        return False
+        logger.error(f"Failed to store aired notification: {e}")
 
 
 def store_aired_notification(episode_id):
     """Record that an aired-not-downloaded notification was sent for an episode"""
-    try:
-        notified = {}
-        if os.path.exists(AIRED_NOTIFICATION_STORAGE):
-            with open(AIRED_NOTIFICATION_STORAGE, 'r') as f:
-                notified = json.load(f)
+    store_aired_notifications([episode_id])
 
-        notified[str(episode_id)] = datetime.utcnow().isoformat()
 
-        os.makedirs(os.path.dirname(AIRED_NOTIFICATION_STORAGE), exist_ok=True)
-        with open(AIRED_NOTIFICATION_STORAGE, 'w') as f:
-            json.dump(notified, f, indent=2)
-
-        logger.debug(f"Stored aired notification for episode {episode_id}")
+def cleanup_old_aired_notifications(days=AIRED_RETENTION_DAYS):
+    """Remove aired notification entries older than `days`"""
+    try:
+        conn = _connect()
+        try:
+            removed = conn.execute('DELETE FROM aired_notifications WHERE notified_at < ?',
+                                   (time.time() - days * 86400,)).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        if removed:
+            logger.info(f"Cleaned up {removed} old aired notification entries")
 
     except Exception as e:
-        logger.error(f"Failed to store aired notification: {e}")
+        logger.error(f"Failed to cleanup aired notifications: {e}")
 
 
-def cleanup_old_aired_notifications():
-    """Remove entries older than 30 days from the aired notifications file"""
-    try:
-        if not os.path.exists(AIRED_NOTIFICATION_STORAGE):
-            return
+# --- One-time migration ---
 
-        with open(AIRED_NOTIFICATION_STORAGE, 'r') as f:
-            notified = json.load(f)
-
-        cutoff = datetime.utcnow() - timedelta(days=30)
-        pruned = {
-            ep_id: ts for ep_id, ts in notified.items()
-            if datetime.fromisoformat(ts) > cutoff
-        }
+def _timestamp(value):
+    """The JSON files stored naive UTC isoformat() strings."""
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
 
-        removed = len(notified) - len(pruned)
-        if removed:
-            with open(AIRED_NOTIFICATION_STORAGE, 'w') as f:
-                json.dump(pruned, f, indent=2)
-            logger.info(f"Cleaned up {removed} old aired notification entries")
 
-    except Exception as e:
-        logger.error(f"Failed to cleanup aired notifications: {e}")
\ No newline at end of file
+def migrate_from_files():
+    """
+    One-time migration: import the pending/aired notification JSON files
+    into settings.db, then delete them. Safe to call on every startup.
+    Returns the number of entries migrated.
+    """
+    migrated = 0
+    for path, table in ((NOTIFICATION_STORAGE, 'search_notifications'),
+                        (AIRED_NOTIFICATION_STORAGE, 'aired_notifications')):
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'r') as f:
+                entries = json.load(f)
+            if table == 'search_notifications':
+                rows = [(int(episode_id), str(n['message_id']), _timestamp(n.get('timestamp')))
+                        for episode_id, n in entries.items() if n.get('message_id')]
+                sql = 'INSERT OR IGNORE INTO search_notifications (episode_id, message_id, created_at) VALUES (?, ?, ?)'
+            else:
+                rows = [(int(episode_id), _timestamp(ts)) for episode_id, ts in entries.items()]
+                sql = 'INSERT OR IGNORE INTO aired_notifications (episode_id, notified_at) VALUES (?, ?)'
+            conn = _connect()
+            try:
+                conn.executemany(sql, rows)
+                conn.commit()
+            finally:
+                conn.close()
+            os.remove(path)
+            migrated += len(rows)
+        except Exception as e:
+            logger.error(f"Failed to migrate {path}: {e}")  # leave the file for the next start
+    return migrated
@@ -1,13 +1,17 @@
 """
 Episeerr Notification System
 Handles Discord notifications for pending searches and selection requests
+
+Messages are built here and delivered by notification_queue.py's sender
+thread, which coalesces bursts through build_digest().
 """
 
-import requests
 import logging
 from sonarr_utils import get_episode
 from datetime import datetime
 
+import notification_queue
+
 from logging_config import main_logger as logger
 
 # Config will be passed in from episeerr.py
@@ -38,7 +42,9 @@ def send_notification(notification_type, **data):
         - selection_pending: New episeerr_select request
     
     Returns:
-        Discord message ID if sent successfully, None otherwise
+        Queue row id if queued, None otherwise. The Discord message id of an
+        episode_search_pending notification (data: episode_id) is stored
+        once it has gone out - see clear_search_pending().
     """
     if not NOTIFICATIONS_ENABLED:
         logger.debug(f"Notifications disabled, skipping {notification_type}")
@@ -74,33 +80,38 @@ def send_notification(notification_type, **data):
             logger.warning(f"Unknown notification type: {notification_type}")
             return None
         
-        # Send notification and get message ID
-        message_id = send_discord_webhook(message)
-        logger.info(f"Sent {notification_type} notification, message_id: {message_id}")
-        return message_id
+        row_id = notification_queue.enqueue_post(notification_type, message, data=data,
+                                                 episode_id=data.get('episode_id'))
+        logger.info(f"Queued {notification_type} notification")
+        return row_id
         
     except Exception as e:
         logger.error(f"Failed to send notification: {e}")
         return None
 
 
+def _format_air_date(air_date):
+    if not air_date:
+        return "Unknown"
+    try:
+        dt = datetime.fromisoformat(air_date.replace('Z', '+00:00'))
+        return dt.strftime("%B %d, %Y")
+    except:
+        return str(air_date)
+
+
+def _sonarr_season_link(series, season, series_id):
+    if not (series_id and SONARR_URL):
+        return ""
+    series_slug = series.lower().replace(' ', '-').replace("'", "")
+    return f"{SONARR_URL}/series/{series_slug}/season-{season}"
+
+
 def build_search_pending_message(series, season, episode, air_date=None, series_id=None):
     """Build Discord embed for pending episode search"""
     
-    # Format air date
-    air_date_str = "Unknown"
-    if air_date:
-        try:
-            dt = datetime.fromisoformat(air_date.replace('Z', '+00:00'))
-            air_date_str = dt.strftime("%B %d, %Y")
-        except:
-            air_date_str = str(air_date)
-    
-    # Build Sonarr link
-    sonarr_link = ""
-    if series_id and SONARR_URL:
-        series_slug = series.lower().replace(' ', '-').replace("'", "")
-        sonarr_link = f"{SONARR_URL}/series/{series_slug}/season-{season}"
+    air_date_str = _format_air_date(air_date)
+    sonarr_link = _sonarr_season_link(series, season, series_id)
     
     fields = [
         {
@@ -257,54 +268,98 @@ def build_aired_not_downloaded_message(episodes):
     }
 
 
-def send_discord_webhook(message):
-    """Send notification to Discord webhook and return message ID"""
-    if not DISCORD_WEBHOOK_URL:
-        return None
-    
-    try:
-        # Add ?wait=true to get the message back
-        url = DISCORD_WEBHOOK_URL
-        if '?' not in url:
-            url += '?wait=true'
-        else:
-            url += '&wait=true'
-        
-        response = requests.post(url, json=message, timeout=10)
-        response.raise_for_status()
-        
-        # Get message ID from response
-        message_data = response.json()
-        message_id = message_data.get('id')
-        
-        logger.info(f"📤 Sent Discord message ID: {message_id}")
-        return message_id
-        
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Discord webhook failed: {e}")
-        return None
+def build_search_pending_digest(items):
+    """One embed for a burst of pending episode searches (data dicts of
+    episode_search_pending notifications)."""
+    fields = []
+    for item in items:
+        value = f"Aired {_format_air_date(item.get('air_date'))}"
+        link = _sonarr_season_link(item['series'], item['season'], item.get('series_id'))
+        if link:
+            value += f" · [Open in Sonarr]({link})"
+        fields.append({
+            "name": f"{item['series']} S{item['season']:02d}E{item['episode']:02d}",
+            "value": value,
+            "inline": False
+        })
 
+    return {
+        "embeds": [{
+            "title": f"🔍 {len(items)} Episode Searches Pending",
+            "description": "Waiting for Sonarr to find and grab these episodes. "
+                           "This message will disappear once all of them are found.",
+            "color": 3447003,  # Blue - informational
+            "fields": fields,
+            "timestamp": datetime.utcnow().isoformat()
+        }]
+    }
 
-def delete_discord_message(message_id):
-    """Delete a Discord webhook message"""
-    if not DISCORD_WEBHOOK_URL or not message_id:
-        return False
-    
-    try:
-        # Extract webhook ID and token from URL
-        # Format: https://discord.com/api/webhooks/{webhook_id}/{webhook_token}
-        parts = DISCORD_WEBHOOK_URL.rstrip('/').split('/')
-        webhook_id = parts[-2]
-        webhook_token = parts[-1].split('?')[0]  # Remove query params if present
-        
-        delete_url = f"https://discord.com/api/webhooks/{webhook_id}/{webhook_token}/messages/{message_id}"
-        
-        response = requests.delete(delete_url)
-        response.raise_for_status()
-        
-        logger.info(f"🗑️ Deleted Discord message {message_id}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Failed to delete Discord message: {e}")
-        return False
\ No newline at end of file
+
+def build_selection_pending_digest(items):
+    """One embed for a burst of new selection requests."""
+    fields = [{
+        "name": "Series",
+        "value": '\n'.join(item['series'] for item in items)[:1024],
+        "inline": False
+    }]
+    if EPISEERR_URL:
+        fields.append({
+            "name": "🔗 Select Episodes",
+            "value": f"[Open Episeerr]({EPISEERR_URL}/episeerr)",
+            "inline": False
+        })
+
+    return {
+        "embeds": [{
+            "title": f"📋 {len(items)} New Episode Selection Requests",
+            "description": "Shows are waiting for episode selection",
+            "color": 3447003,  # Blue
+            "fields": fields,
+            "timestamp": datetime.utcnow().isoformat()
+        }]
+    }
+
+
+def build_digest(notification_type, entries):
+    """
+    Combine queued notifications of one type into a single Discord message
+    (called by notification_queue's sender).
+
+    Args:
+        entries: [{'data': send_notification kwargs, 'message': built message}]
+    """
+    items = [entry['data'] for entry in entries]
+    if notification_type == "episode_search_pending":
+        return build_search_pending_digest(items)
+    if notification_type == "selection_pending":
+        return build_selection_pending_digest(items)
+    if notification_type == "aired_not_downloaded":
+        return build_aired_not_downloaded_message(
+            episodes=[ep for item in items for ep in item.get('episodes', [])]
+        )
+    # Anything else: the messages' embeds side by side (Discord allows 10)
+    return {'embeds': [embed for entry in entries for embed in entry['message'].get('embeds', [])][:10]}
+
+
+def clear_search_pending(episode_id):
+    """
+    The episode was grabbed: remove its search-pending notification.
+
+    Returns:
+        'cancelled' if it was still queued, 'deleting' if deletion of the
+        Discord message was queued, 'kept' if the message is a digest other
+        pending episodes still share, None if there was nothing to remove
+    """
+    if not episode_id:
+        return None
+    if notification_queue.cancel_post(episode_id):
+        return 'cancelled'
+
+    from notification_storage import get_and_remove_notification, message_in_use
+    message_id = get_and_remove_notification(episode_id)
+    if not message_id:
+        return None
+    if message_in_use(message_id):
+        return 'kept'
+    notification_queue.enqueue_delete(message_id)
+    return 'deleting'
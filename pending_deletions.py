@@ -17,11 +17,14 @@ from datetime import datetime, timedelta
 from threading import Lock
 from collections import defaultdict
 
+import event_bus
+import sonarr_instances
+
 logger = logging.getLogger(__name__)
 
-# File paths
-PENDING_DELETIONS_FILE = os.path.join(os.getcwd(), 'data', 'pending_deletions.json')
-REJECTION_CACHE_FILE = os.path.join(os.getcwd(), 'data', 'deletion_rejections.json')
+# File paths - series ids are per Sonarr instance, so are these two files
+PENDING_DELETIONS_FILE = sonarr_instances.data_path('pending_deletions.json')
+REJECTION_CACHE_FILE = sonarr_instances.data_path('deletion_rejections.json')
 MOVIE_REJECTION_CACHE_FILE = os.path.join(os.getcwd(), 'data', 'movie_deletion_rejections.json')
 os.makedirs(os.path.dirname(PENDING_DELETIONS_FILE), exist_ok=True)
 
@@ -55,6 +58,12 @@ def _save_raw(data):
             json.dump(data, f, indent=2)
     except Exception as e:
         logger.error(f"Error saving pending deletions: {e}")
+        return
+    if not sonarr_instances.is_default():
+        return   # the badge counts the queue the UI approves from (default instance)
+    episodes = sum(len(season['episodes'])
+                   for series in data.get("episodes", []) for season in series.get('seasons', {}).values())
+    event_bus.publish('pending', {'deletions': episodes + len(data.get("movies", []))})
 
 
 def load_pending_deletions():
@@ -277,6 +286,7 @@ def approve_deletions(episode_ids, sonarr_delete_func):
             # grab the series_id off any one of them — they're all the same
             # series since we grouped by series_title above.
             series_id = None
+            rule_name = None
             episode_list = []
             for episode in episodes:
                 episode_data = episode['episode_data']
@@ -286,12 +296,14 @@ def approve_deletions(episode_ids, sonarr_delete_func):
                     continue
                 if series_id is None:
                     series_id = episode_data.get('seriesId')
+                rule_name = rule_name or episode.get('rule_name')
                 episode_list.append({
                     'id': episode_data.get('id'),
                     'episodeFileId': episode_file_id,
                     'seasonNumber': episode_data.get('seasonNumber'),
                     'episodeNumber': episode_data.get('episodeNumber'),
                     'title': episode_data.get('title'),
+                    'size': episode_data.get('episodeFile', {}).get('size'),
                 })
 
             if episode_list:
@@ -304,7 +316,8 @@ def approve_deletions(episode_ids, sonarr_delete_func):
                 logger.info(f"Deleting {len(episode_list)} episodes from {series_title} in batch")
                 sonarr_delete_func(episode_list, series_id, series_title,
                                     reason="Approved from pending deletions",
-                                    rule_dry_run=False, force=True)
+                                    rule_dry_run=False, rule_name=rule_name,
+                                    force=True, phase='approved')
                 deleted_count += len(episode_list)
 
                 # Log individual episodes
@@ -5,7 +5,12 @@ never acts on automatically (see reconcile.py for why). Same
 queue-for-human-approval shape as pending_deletions.py, for a different
 action: replay a watch event instead of delete a file.
 
-File format: {"items": [...], "last_checked": <unix ts or None>}
+File format: {"items": [...], "last_checked": <unix ts or None>,
+              "marks": {<source>: <unix ts>}}
+
+"marks" are reconcile.py's per-source high-water marks - the newest watch
+it has already swept from each source's history, so the next sweep only
+pages back that far.
 """
 import os
 import json
@@ -28,10 +33,11 @@ def _load_raw():
                 data = json.load(f)
             data.setdefault('items', [])
             data.setdefault('last_checked', None)
+            data.setdefault('marks', {})
             return data
     except Exception as e:
         logger.error(f"Error loading pending watch events: {e}")
-    return {'items': [], 'last_checked': None}
+    return {'items': [], 'last_checked': None, 'marks': {}}
 
 
 def _save_raw(data):
@@ -55,13 +61,31 @@ def get_last_checked():
 
 def mark_checked(timestamp=None):
     """Record when reconcile.check_for_missed_watch_events() last ran, for
-    UI display only - not used for gating what gets detected next time."""
+    UI display only - what the next sweep covers is gated by the per-source
+    marks, not this."""
     with _lock:
         data = _load_raw()
         data['last_checked'] = timestamp or int(time.time())
         _save_raw(data)
 
 
+def get_marks():
+    """Per-source high-water marks: {source: unix ts}."""
+    with _lock:
+        return dict(_load_raw()['marks'])
+
+
+def set_mark(source, timestamp):
+    """Move a source's high-water mark forward to timestamp. Never moves it
+    back, so an out-of-order or partial sweep can't re-open old history."""
+    with _lock:
+        data = _load_raw()
+        if timestamp <= (data['marks'].get(source) or 0):
+            return
+        data['marks'][source] = int(timestamp)
+        _save_raw(data)
+
+
 def add_or_update_pending(series_id, series_title, season, episode, source, user, watched_at):
     """Queue a detected watch event. If a pending item already exists for
     this series, bump it forward to the newer (season, episode) instead of
@@ -3,10 +3,23 @@ Missed watch-event detection.
 
 Webhooks are fire-and-forget: if Episeerr is down, restarting, or a webhook
 silently fails to fire, that watch event is lost and the affected series'
-rolling episode window just stalls until the next watch. This module runs
-once at startup and checks Plex/Jellyfin/Emby/Tautulli's own watch history
-for anything newer than what Episeerr's config has on record for that
-series.
+rolling episode window just stalls until the next watch. This module checks
+Plex/Jellyfin/Emby/Tautulli's own watch history for anything newer than
+what Episeerr's config has on record for that series - once at startup and
+then every reconcile_interval_minutes (0 = startup only), as the
+'watch_reconcile' job.
+
+Each source keeps a high-water mark in pending_watch_events.py: the newest
+history row already swept. A sweep pages back through that source's
+history, newest first, only until it reaches the mark (less
+MARK_OVERLAP_SECONDS for Tautulli, whose rows show up late), so a periodic
+sweep costs a page or two instead of re-reading the whole history. Events
+at or below the previous mark are never queued again, so a Cleared item
+stays cleared. A source's mark moves to the newest row seen once its sweep
+succeeds, whether or not anything was queued; while automation is held
+nothing is swept and the marks stay put, so the first sweep after
+releasing the hold covers the whole gap. Event titles are resolved to Sonarr series through one cached
+title map (SeriesTitleMap) rather than a Sonarr /series fetch per event.
 
 Deliberately does NOT auto-replay what it finds. Every source here has some
 gap between its own definition of "watched" and Episeerr's configured
@@ -15,30 +28,72 @@ resets once Played" dead end and the open Plex question) — silently
 replaying an inferred event risks doing the wrong thing with no one aware
 it happened. Instead, anything newer becomes a pending item in
 pending_watch_events.py for a human to Process (run it through the exact
-same path a live webhook would have) or Clear (ignore it). One run per
-startup, no periodic interval - de-duplication lives in
-pending_watch_events.add_or_update_pending(), keyed per series, not in a
-sweep watermark.
+same path a live webhook would have) or Clear (ignore it). De-duplication
+lives in pending_watch_events.add_or_update_pending(), keyed per series, so
+overlapping sweeps never queue the same watch twice.
 
 Gated behind reconcile_enabled (default off) and skipped entirely while
 automation_held is set.
 """
 
 import logging
+import re
+import threading
+import time
 from datetime import datetime, timezone
 
 from episeerr_utils import http
 
 logger = logging.getLogger(__name__)
 
+# History rows fetched per request, and the most pages one sweep reads
+PAGE_SIZE = 200
+MAX_PAGES = 25
+# How far back a source's first sweep (no mark yet) looks
+INITIAL_LOOKBACK_SECONDS = 30 * 24 * 3600
+# Re-read this much Tautulli history below the mark. Tautulli dates a
+# history row by when playback started but only writes it when playback
+# stops, so a row can appear behind a mark set in between. Its events and
+# mark use the stop time, so a re-read row already swept isn't queued again.
+MARK_OVERLAP_SECONDS = 6 * 3600
+# How long a SeriesTitleMap is reused before Sonarr's series list is re-read
+TITLE_MAP_TTL_SECONDS = 600
+DEFAULT_INTERVAL_MINUTES = 60
+
+
+def _page_until(fetch_page, since_ts, label):
+    """Read a newest-first history page by page until a row at or before
+    since_ts. fetch_page(start, size) returns [(ts, event or None)] - None
+    for rows that count toward the stop condition but aren't wanted (a
+    movie, a user outside allowed_users). Returns (wanted events, newest
+    timestamp seen - from any row or event, None if there were none)."""
+    events = []
+    newest = None
+    for page in range(MAX_PAGES):
+        rows = fetch_page(page * PAGE_SIZE, PAGE_SIZE)
+        for ts, event in rows:
+            if ts is None:
+                continue
+            if ts <= since_ts:
+                return events, newest
+            newest = max(ts, event[0] if event else ts, newest or 0)
+            if event is not None:
+                events.append(event)
+        if len(rows) < PAGE_SIZE:
+            return events, newest
+    logger.warning(f"[reconcile] {label}: stopped after {MAX_PAGES} pages of history "
+                   f"without reaching the last checkpoint - older watches were not checked")
+    return events, newest
+
 
 def _sweep_plex(since_ts=0):
-    """Episodes watched on Plex since since_ts -> [(ts, series, season, ep, user)]."""
+    """Episodes watched on Plex since since_ts -> ([(ts, series, season, ep,
+    user)], newest row ts) - see _page_until."""
     from integrations.plex import _get_plex_detection_cfg
 
     cfg = _get_plex_detection_cfg()
     if not cfg['url'] or not cfg['api_key']:
-        return []
+        return [], None
 
     headers = {'X-Plex-Token': cfg['api_key'], 'Accept': 'application/json'}
 
@@ -54,32 +109,34 @@ def _sweep_plex(since_ts=0):
         except Exception as exc:
             logger.warning(f"[reconcile] Plex account lookup failed: {exc}")
 
-    resp = http.get(
-        f"{cfg['url']}/status/sessions/history/all",
-        headers=headers,
-        params={'sort': 'viewedAt:desc', 'X-Plex-Container-Size': 500},
-        timeout=30,
-    )
-    resp.raise_for_status()
-    metadata = (resp.json().get('MediaContainer') or {}).get('Metadata') or []
-
-    events = []
-    for item in metadata:
-        if item.get('type') != 'episode':
-            continue
+    def parse(item):
         viewed = item.get('viewedAt')
-        if not viewed or int(viewed) <= since_ts:
-            continue
+        if not viewed:
+            return None, None
+        if item.get('type') != 'episode':
+            return int(viewed), None
         series = item.get('grandparentTitle')
         season = item.get('parentIndex')
         episode = item.get('index')
         if not series or season is None or episode is None:
-            continue
+            return int(viewed), None
         user = accounts_by_id.get(str(item.get('accountID')), 'Unknown')
         if cfg['allowed_users'] and user not in cfg['allowed_users']:
-            continue
-        events.append((int(viewed), series, int(season), int(episode), user))
-    return events
+            return int(viewed), None
+        return int(viewed), (int(viewed), series, int(season), int(episode), user)
+
+    def fetch_page(start, size):
+        resp = http.get(
+            f"{cfg['url']}/status/sessions/history/all",
+            headers=headers,
+            params={'sort': 'viewedAt:desc',
+                    'X-Plex-Container-Start': start, 'X-Plex-Container-Size': size},
+            timeout=30,
+        )
+        resp.raise_for_status()
+        return [parse(item) for item in (resp.json().get('MediaContainer') or {}).get('Metadata') or []]
+
+    return _page_until(fetch_page, since_ts, 'plex')
 
 
 def _parse_iso(value):
@@ -100,84 +157,160 @@ def _sweep_emby_api(service_name, since_ts=0):
 
     integration = get_integration(service_name)
     if integration is None:
-        return []
+        return [], None
     config = integration.get_config()
     if not config or not config.get('url') or not config.get('api_key'):
-        return []
+        return [], None
     user_id = integration._resolve_user_id(config)
     if not user_id:
         logger.warning(f"[reconcile] {service_name}: could not resolve user")
-        return []
-
-    resp = http.get(
-        f"{config['url'].rstrip('/')}/Users/{user_id}/Items",
-        headers={'X-Emby-Token': config['api_key']},
-        params={
-            'IncludeItemTypes': 'Episode', 'Recursive': 'true',
-            'Filters': 'IsPlayed', 'SortBy': 'DatePlayed', 'SortOrder': 'Descending',
-            'Limit': 500, 'Fields': 'SeriesName,ParentIndexNumber,IndexNumber,UserData',
-        },
-        timeout=30,
-    )
-    resp.raise_for_status()
+        return [], None
 
     user_name = config.get('user_id') or 'Unknown'
-    events = []
-    for item in resp.json().get('Items') or []:
+
+    def parse(item):
         played_at = _parse_iso((item.get('UserData') or {}).get('LastPlayedDate'))
-        if played_at is None or played_at <= since_ts:
-            continue
         series = item.get('SeriesName')
         season = item.get('ParentIndexNumber')
         episode = item.get('IndexNumber')
-        if not series or season is None or episode is None:
-            continue
-        events.append((played_at, series, int(season), int(episode), user_name))
-    return events
+        if played_at is None or not series or season is None or episode is None:
+            return played_at, None
+        return played_at, (played_at, series, int(season), int(episode), user_name)
+
+    def fetch_page(start, size):
+        resp = http.get(
+            f"{config['url'].rstrip('/')}/Users/{user_id}/Items",
+            headers={'X-Emby-Token': config['api_key']},
+            params={
+                'IncludeItemTypes': 'Episode', 'Recursive': 'true',
+                'Filters': 'IsPlayed', 'SortBy': 'DatePlayed', 'SortOrder': 'Descending',
+                'StartIndex': start, 'Limit': size,
+                'Fields': 'SeriesName,ParentIndexNumber,IndexNumber,UserData',
+            },
+            timeout=30,
+        )
+        resp.raise_for_status()
+        return [parse(item) for item in resp.json().get('Items') or []]
+
+    return _page_until(fetch_page, since_ts, service_name)
 
 
 def _sweep_tautulli(since_ts=0):
-    """Episodes watched per Tautulli's own history since since_ts."""
+    """Episodes watched per Tautulli's own history since since_ts. Paged by
+    start date; each event is timed by when its row was written (stopped)."""
     from episeerr_utils import get_tautulli_settings
 
     tautulli_url, api_key = get_tautulli_settings()
     if not tautulli_url or not api_key:
-        return []
-
-    resp = http.get(
-        f"{tautulli_url}/api/v2",
-        params={'apikey': api_key, 'cmd': 'get_history', 'media_type': 'episode',
-                'length': 500, 'start': 0},
-        timeout=30,
-    )
-    resp.raise_for_status()
-    data = resp.json()
-    if data.get('response', {}).get('result') != 'success':
-        return []
+        return [], None
 
-    events = []
-    for entry in data.get('response', {}).get('data', {}).get('data', []) or []:
+    def parse(entry):
         ts = entry.get('date')
-        if not ts or int(ts) <= since_ts:
-            continue
+        if not ts:
+            return None, None
         series = entry.get('grandparent_title')
         season = entry.get('parent_media_index')
         episode = entry.get('media_index')
         if not series or season is None or episode is None:
-            continue
+            return int(ts), None
         user = entry.get('friendly_name') or entry.get('user') or 'Unknown'
-        events.append((int(ts), series, int(season), int(episode), user))
-    return events
+        stopped = int(entry.get('stopped') or ts)
+        return int(ts), (stopped, series, int(season), int(episode), user)
+
+    def fetch_page(start, size):
+        resp = http.get(
+            f"{tautulli_url}/api/v2",
+            params={'apikey': api_key, 'cmd': 'get_history', 'media_type': 'episode',
+                    'order_column': 'date', 'order_dir': 'desc',
+                    'length': size, 'start': start},
+            timeout=30,
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        if data.get('response', {}).get('result') != 'success':
+            return []
+        return [parse(entry) for entry in data.get('response', {}).get('data', {}).get('data', []) or []]
+
+    return _page_until(fetch_page, since_ts, 'tautulli')
 
 
 _SWEEPERS = (
     ('plex', _sweep_plex),
-    ('jellyfin', lambda: _sweep_emby_api('jellyfin')),
-    ('emby', lambda: _sweep_emby_api('emby')),
+    ('jellyfin', lambda since_ts: _sweep_emby_api('jellyfin', since_ts)),
+    ('emby', lambda since_ts: _sweep_emby_api('emby', since_ts)),
     ('tautulli', _sweep_tautulli),
 )
 
 
+class SeriesTitleMap:
+    """Watch-history title -> Sonarr series id, from one /series listing.
+
+    Same precedence as media_processor.get_series_id() without the id
+    lookups (history only has a title): exact title, then title without a
+    "(YYYY)" suffix, then a normalized alternate title. Each title is
+    resolved once; repeats are a dict hit."""
+
+    _YEAR_SUFFIX = re.compile(r'\s*\(\d{4}\)$')
+
+    def __init__(self, series_list):
+        self.built_at = time.monotonic()
+        self._exact = {}
+        self._no_year = {}
+        self._alternate = {}
+        for series in series_list:
+            title = series.get('title') or ''
+            self._exact.setdefault(title.lower(), series['id'])
+            self._no_year.setdefault(self._strip_year(title), series['id'])
+            for alt in series.get('alternateTitles') or []:
+                self._alternate.setdefault(self._norm(alt.get('title', '')), series['id'])
+        self._resolved = {}
+
+    @classmethod
+    def _strip_year(cls, title):
+        return cls._YEAR_SUFFIX.sub('', title).strip().lower()
+
+    @staticmethod
+    def _norm(title):
+        title = re.sub(r'[^\w\s]', '', title.lower())
+        return re.sub(r'\s+', ' ', title).strip()
+
+    def resolve(self, title):
+        if title not in self._resolved:
+            self._resolved[title] = (self._exact.get(title.lower())
+                                     or self._no_year.get(self._strip_year(title))
+                                     or self._alternate.get(self._norm(title)))
+        return self._resolved[title]
+
+
+_title_map = None
+_title_map_lock = threading.Lock()
+
+
+def _series_title_map():
+    """The cached SeriesTitleMap, rebuilt from Sonarr once it's older than
+    TITLE_MAP_TTL_SECONDS. Raises if Sonarr can't be read."""
+    global _title_map
+    from episeerr_utils import SONARR_URL, get_sonarr_headers
+
+    with _title_map_lock:
+        if _title_map is None or time.monotonic() - _title_map.built_at > TITLE_MAP_TTL_SECONDS:
+            resp = http.get(f"{SONARR_URL}/api/v3/series", headers=get_sonarr_headers(), timeout=30)
+            resp.raise_for_status()
+            _title_map = SeriesTitleMap(resp.json())
+        return _title_map
+
+
+def interval_seconds():
+    """Seconds between periodic sweeps for the job scheduler - None while
+    reconcile is off or reconcile_interval_minutes is 0 (startup only)."""
+    from media_processor import load_global_settings
+
+    settings = load_global_settings()
+    if not settings.get('reconcile_enabled', False):
+        return None
+    minutes = settings.get('reconcile_interval_minutes', DEFAULT_INTERVAL_MINUTES)
+    return int(minutes) * 60 if minutes else None
+
 def replay_watch_event(source, series, season, episode, user):
     """Run one watch event through the source's normal processing path -
     the same thing a live webhook would have done. Used by the pending
@@ -236,14 +369,16 @@ def _is_newer_than_recorded(series_id, season, episode, config):
     return False
 
 
-def check_for_missed_watch_events():
-    """One-shot check across all configured sources, called once at startup.
-    Queues anything newer than Episeerr's own records as a pending item;
-    never replays automatically. Returns a summary dict; never raises."""
-    from media_processor import load_global_settings, get_series_id, load_config
+def check_for_missed_watch_events(ctx=None):
+    """Sweep every configured source from its high-water mark. Queues
+    anything newer than Episeerr's own records as a pending item; never
+    replays automatically. ctx is the job scheduler's JobContext when run
+    as the 'watch_reconcile' job. Returns a summary dict; never raises
+    except to stop a cancelled job run."""
+    from media_processor import load_global_settings, load_config
     import pending_watch_events
 
-    summary = {'ran': False, 'found': 0, 'errors': []}
+    summary = {'ran': False, 'found': 0, 'swept': {}, 'errors': []}
     try:
         settings = load_global_settings()
         if not settings.get('reconcile_enabled', False):
@@ -253,17 +388,32 @@ def check_for_missed_watch_events():
             return summary
 
         config = load_config()
+        marks = pending_watch_events.get_marks()
+        title_map = None
         found = 0
-        for label, sweep_fn in _SWEEPERS:
+        for index, (label, sweep_fn) in enumerate(_SWEEPERS):
+            if ctx is not None:
+                ctx.check()
+                ctx.progress(100 * index / len(_SWEEPERS), f"Checking {label} history")
+            mark = marks.get(label)
+            if mark:
+                since_ts = mark - (MARK_OVERLAP_SECONDS if label == 'tautulli' else 0)
+            else:
+                since_ts = time.time() - INITIAL_LOOKBACK_SECONDS
             try:
-                events = sweep_fn()
+                events, newest = sweep_fn(since_ts)
+                # Already swept once: queued then, or Cleared since
+                events = [event for event in events if not mark or event[0] > mark]
+                if events and title_map is None:
+                    title_map = _series_title_map()
             except Exception as exc:
                 logger.warning(f"[reconcile] {label} check failed: {exc}")
                 summary['errors'].append(f"{label}: {exc}")
                 continue
 
+            summary['swept'][label] = len(events)
             for ts, series, season, episode, user in events:
-                series_id = get_series_id(series)
+                series_id = title_map.resolve(series)
                 if not series_id:
                     continue
                 if not _is_newer_than_recorded(series_id, season, episode, config):
@@ -273,6 +423,8 @@ def check_for_missed_watch_events():
                     episode=episode, source=label, user=user, watched_at=ts,
                 )
                 found += 1
+            if newest:
+                pending_watch_events.set_mark(label, newest)
 
         if found:
             logger.info(f"[reconcile] Found {found} watch event(s) newer than Episeerr's records")
@@ -280,6 +432,8 @@ def check_for_missed_watch_events():
         summary.update(ran=True, found=found)
         return summary
     except Exception as exc:
+        if ctx is not None and ctx.cancelled:
+            raise
         logger.error(f"[reconcile] Unexpected error: {exc}", exc_info=True)
         summary['errors'].append(str(exc))
         return summary
@@ -0,0 +1,286 @@
+"""
+Request Timing - per-endpoint latency, upstream calls per request, slow log
+and an on-demand sampling profiler
+
+init_app(app) times every Flask request (episeerr routes, dashboard and
+integration blueprints alike) and keeps the last SAMPLES_PER_ENDPOINT
+durations per endpoint for p50/p95/p99. Every HTTP call made through
+requests on the request's thread - the shared http session and plain
+requests.get alike - is counted against that request. Requests slower than
+EPISEERR_SLOW_REQUEST_MS go to logs/slow_requests.log with their upstream
+breakdown.
+
+sample_stacks() samples every thread's stack (sys._current_frames) for a few
+seconds and returns collapsed stacks ("thread;outer;inner count" lines), the
+input format of flamegraph.pl and speedscope. It only sees this process:
+with several gunicorn workers each has its own stats and threads.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from flask import g, request
+
+from logging_config import slow_request_logger
+
+SLOW_REQUEST_MS = int(os.getenv('EPISEERR_SLOW_REQUEST_MS', '2000'))
+SAMPLES_PER_ENDPOINT = 500
+PROFILE_MAX_SECONDS = 120
+PROFILE_DEFAULT_INTERVAL = 0.01
+
+_lock = threading.Lock()
+_endpoints: Dict[str, '_EndpointStats'] = {}
+_local = threading.local()
+
+
+class ProfilerBusy(Exception):
+    """A profile is already being taken in this process."""
+
+
+class _EndpointStats:
+    __slots__ = ('durations', 'count', 'errors', 'slow', 'upstream_calls', 'upstream_seconds', 'max_seconds')
+
+    def __init__(self):
+        self.durations = deque(maxlen=SAMPLES_PER_ENDPOINT)
+        self.count = 0
+        self.errors = 0
+        self.slow = 0
+        self.upstream_calls = 0
+        self.upstream_seconds = 0.0
+        self.max_seconds = 0.0
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _safe_url(url: str) -> str:
+    """Drop the query string - Tautulli and TMDB take API keys there."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+
+# ---------------------------------------------------------------------------
+# Upstream calls
+# ---------------------------------------------------------------------------
+
+def begin_request() -> None:
+    _local.upstream = []
+
+
+def current_upstream_calls() -> Optional[List[Dict[str, Any]]]:
+    return getattr(_local, 'upstream', None)
+
+
+def end_request() -> List[Dict[str, Any]]:
+    calls = getattr(_local, 'upstream', None) or []
+    _local.upstream = None
+    return calls
+
+
+def record_upstream(method: str, url: str, seconds: float, status: Optional[int] = None,
+                    error: Optional[str] = None) -> None:
+    """Count an HTTP call against the Flask request running on this thread.
+    No-op on threads that aren't serving a request (scheduler, cleanup)."""
+    calls = getattr(_local, 'upstream', None)
+    if calls is None:
+        return
+    calls.append({'method': method, 'url': _safe_url(url), 'seconds': seconds,
+                  'status': status, 'error': error})
+
+
+_original_send = None
+
+
+def install_upstream_tracking() -> None:
+    """Wrap requests.Session.send so every session - including the throwaway
+    one behind requests.get - reports to record_upstream. Idempotent."""
+    global _original_send
+    if _original_send is not None:
+        return
+    _original_send = original = requests.Session.send
+
+    def send(self, prepared, **kwargs):
+        if getattr(_local, 'upstream', None) is None:
+            return original(self, prepared, **kwargs)
+        started = time.monotonic()
+        try:
+            response = original(self, prepared, **kwargs)
+        except Exception as e:
+            record_upstream(prepared.method, prepared.url, time.monotonic() - started,
+                            error=type(e).__name__)
+            raise
+        record_upstream(prepared.method, prepared.url, time.monotonic() - started,
+                        status=response.status_code)
+        return response
+
+    requests.Session.send = send
+
+
+# ---------------------------------------------------------------------------
+# Per-endpoint stats and the slow log
+# ---------------------------------------------------------------------------
+
+def record_request(endpoint: str, seconds: float, status: int,
+                   upstream: List[Dict[str, Any]]) -> bool:
+    """Fold one finished request into its endpoint's stats. Returns True when
+    it was over the slow threshold."""
+    slow = seconds * 1000 >= SLOW_REQUEST_MS
+    with _lock:
+        stats = _endpoints.get(endpoint)
+        if stats is None:
+            stats = _endpoints[endpoint] = _EndpointStats()
+        stats.durations.append(seconds)
+        stats.count += 1
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        stats.upstream_calls += len(upstream)
+        stats.upstream_seconds += sum(c['seconds'] for c in upstream)
+        if status >= 500:
+            stats.errors += 1
+        if slow:
+            stats.slow += 1
+    return slow
+
+
+def upstream_breakdown(upstream: List[Dict[str, Any]]) -> Dict[str, Any]:
+    hosts: Dict[str, Dict[str, Any]] = {}
+    for call in upstream:
+        host = urlsplit(call['url']).netloc
+        entry = hosts.setdefault(host, {'host': host, 'calls': 0, 'ms': 0.0, 'errors': 0})
+        entry['calls'] += 1
+        entry['ms'] += call['seconds'] * 1000
+        if call['error'] or (call['status'] or 0) >= 500:
+            entry['errors'] += 1
+    by_host = sorted(hosts.values(), key=lambda h: -h['ms'])
+    for entry in by_host:
+        entry['ms'] = round(entry['ms'], 1)
+    return {
+        'calls': len(upstream),
+        'ms': round(sum(c['seconds'] for c in upstream) * 1000, 1),
+        'by_host': by_host,
+        'slowest': sorted(upstream, key=lambda c: -c['seconds'])[:5],
+    }
+
+
+def log_slow_request(method: str, path: str, endpoint: str, status: int, seconds: float,
+                     upstream: List[Dict[str, Any]]) -> None:
+    breakdown = upstream_breakdown(upstream)
+    hosts = ', '.join(f"{h['host']} {h['calls']}x {h['ms']:.0f}ms" for h in breakdown['by_host'])
+    lines = [
+        f"SLOW {seconds * 1000:.0f}ms {method} {path} [{endpoint}] -> {status} | "
+        f"upstream {breakdown['calls']} calls {breakdown['ms']:.0f}ms" + (f" ({hosts})" if hosts else '')
+    ]
+    for call in breakdown['slowest']:
+        outcome = call['error'] or call['status']
+        lines.append(f"    {call['seconds'] * 1000:7.0f}ms {call['method']} {call['url']} -> {outcome}")
+    slow_request_logger.info('\n'.join(lines))
+
+
+def endpoint_stats() -> List[Dict[str, Any]]:
+    with _lock:
+        snapshot = [(name, sorted(s.durations), s.count, s.errors, s.slow,
+                     s.upstream_calls, s.upstream_seconds, s.max_seconds)
+                    for name, s in _endpoints.items()]
+    result = []
+    for name, ordered, count, errors, slow, up_calls, up_seconds, max_seconds in snapshot:
+        result.append({
+            'endpoint': name,
+            'count': count,
+            'errors': errors,
+            'slow': slow,
+            'p50_ms': round(_percentile(ordered, 50) * 1000, 1),
+            'p95_ms': round(_percentile(ordered, 95) * 1000, 1),
+            'p99_ms': round(_percentile(ordered, 99) * 1000, 1),
+            'max_ms': round(max_seconds * 1000, 1),
+            'avg_upstream_calls': round(up_calls / count, 2),
+            'avg_upstream_ms': round(up_seconds * 1000 / count, 1),
+        })
+    return sorted(result, key=lambda e: -e['p95_ms'])
+
+
+def reset() -> None:
+    with _lock:
+        _endpoints.clear()
+
+
+def init_app(app) -> None:
+    """Register the timing hooks. Call before any other before_request hook
+    (the auth gate) so rejected requests are timed too."""
+    install_upstream_tracking()
+
+    @app.before_request
+    def _start_request_timer():
+        g._request_started = time.monotonic()
+        begin_request()
+
+    @app.after_request
+    def _finish_request_timer(response):
+        started = g.pop('_request_started', None)
+        upstream = end_request()
+        if started is None:
+            return response
+        seconds = time.monotonic() - started
+        endpoint = request.endpoint or '<unmatched>'
+        if endpoint == 'static':
+            return response
+        slow = record_request(endpoint, seconds, response.status_code, upstream)
+        if slow and not g.get('skip_slow_log'):
+            log_slow_request(request.method, request.path, endpoint,
+                             response.status_code, seconds, upstream)
+        response.headers['Server-Timing'] = (
+            f"app;dur={seconds * 1000:.1f}, upstream;dur={sum(c['seconds'] for c in upstream) * 1000:.1f}"
+        )
+        return response
+
+
+# ---------------------------------------------------------------------------
+# Sampling profiler
+# ---------------------------------------------------------------------------
+
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})".replace(';', ':')
+
+
+def sample_stacks(seconds: float, interval: float = PROFILE_DEFAULT_INTERVAL) -> Dict[str, Any]:
+    """Sample every other thread's stack every `interval` seconds for
+    `seconds`. Raises ProfilerBusy if a profile is already running."""
+    seconds = max(0.1, min(float(seconds), PROFILE_MAX_SECONDS))
+    interval = max(0.001, float(interval))
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        started = time.monotonic()
+        deadline = started + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}").replace(';', ':'))
+                stacks[';'.join(reversed(labels))] += 1
+            samples += 1
+            time.sleep(interval)
+        return {'samples': samples, 'seconds': round(time.monotonic() - started, 2), 'stacks': stacks}
+    finally:
+        _profile_lock.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,244 @@
+"""
+Rule Stats - per-rule numbers kept up to date instead of rebuilt per request
+
+The rules sidebar, series stats, quick stats and assignment endpoints used
+to walk every rule's series in config.json, several of them after a full
+GET /api/v3/series, on every page load - for numbers that only change when
+a webhook, an assignment or a cleanup runs.
+
+Two settings.db tables hold them instead:
+
+    rule_series_stats  one row per Sonarr series: its rule (NULL when
+                       unassigned), episodes on disk, bytes, last activity
+    rule_stats         per rule: series count, episodes on disk, bytes,
+                       latest activity, and how many series are past the
+                       rule's grace / dormant thresholds
+
+The code paths that change the inputs update them incrementally:
+save_config() calls sync_config() (assignments, activity dates, rule
+thresholds - only the rules that changed are re-aggregated), live cleanup
+deletions and Sonarr imports call adjust_files(). refresh() rebuilds
+everything from one Sonarr series list on a slow schedule
+(FULL_REFRESH_SECONDS), which also moves series across the time-based
+grace / dormant thresholds and drops series deleted from Sonarr.
+
+Rows are per Sonarr instance (sonarr_instances.py). Updates never raise:
+a database problem leaves the numbers stale until the next refresh.
+"""
+import sqlite3
+import time
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import settings_db
+
+logger = logging.getLogger(__name__)
+
+FULL_REFRESH_SECONDS = 6 * 3600
+
+_REFRESHED_SETTING = 'rule_stats_refreshed_at'
+
+
+def _connect():
+    return sqlite3.connect(settings_db.DB_PATH, timeout=10)
+
+
+def _instance(instance: Optional[str] = None) -> str:
+    if instance:
+        return instance
+    import sonarr_instances
+    return sonarr_instances.active_instance()
+
+
+def _thresholds(rule_details: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
+    """(grace days, dormant days) - grace is the shorter of the two grace
+    settings, since either one makes a series a cleanup candidate."""
+    graces = [d for d in (rule_details.get('grace_watched'), rule_details.get('grace_unwatched')) if d]
+    return (min(graces) if graces else None), (rule_details.get('dormant_days') or None)
+
+
+def _assignments(config: Dict[str, Any]) -> Dict[int, Tuple[str, Optional[float]]]:
+    """{series_id: (rule, activity_date)} from the config."""
+    assigned = {}
+    for rule_name, rule_details in config.get('rules', {}).items():
+        for series_id, series_data in rule_details.get('series', {}).items():
+            try:
+                activity = series_data.get('activity_date') if isinstance(series_data, dict) else None
+                assigned[int(series_id)] = (rule_name, activity)
+            except (TypeError, ValueError):
+                continue
+    return assigned
+
+
+def _aggregate(conn, instance: str, rules: Dict[str, Any], rule_names: Iterable[str]) -> None:
+    """Recompute the rule_stats rows of the given rules from rule_series_stats."""
+    now = time.time()
+    for rule_name in rule_names:
+        rule_details = rules.get(rule_name)
+        if rule_details is None:
+            conn.execute('DELETE FROM rule_stats WHERE instance = ? AND rule = ?', (instance, rule_name))
+            continue
+        grace, dormant = _thresholds(rule_details)
+        grace_cutoff = now - grace * 86400 if grace else None
+        dormant_cutoff = now - dormant * 86400 if dormant else None
+        count, episodes, size, last_activity, past_grace, past_dormant = conn.execute(
+            '''SELECT COUNT(*), COALESCE(SUM(episodes_on_disk), 0), COALESCE(SUM(bytes), 0),
+                      MAX(last_activity),
+                      COALESCE(SUM(CASE WHEN ? IS NOT NULL AND last_activity < ? THEN 1 ELSE 0 END), 0),
+                      COALESCE(SUM(CASE WHEN ? IS NOT NULL AND last_activity < ? THEN 1 ELSE 0 END), 0)
+               FROM rule_series_stats WHERE instance = ? AND rule = ?''',
+            (grace_cutoff, grace_cutoff, dormant_cutoff, dormant_cutoff, instance, rule_name)
+        ).fetchone()
+        conn.execute(
+            '''INSERT OR REPLACE INTO rule_stats
+               (instance, rule, series_count, episodes_on_disk, bytes, last_activity,
+                past_grace, past_dormant, grace_days, dormant_days, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            (instance, rule_name, count, episodes, size, last_activity,
+             past_grace, past_dormant, grace, dormant, now)
+        )
+
+
+# ── Updates ─────────────────────────────────────────────────────
+
+def refresh(series_list: List[Dict[str, Any]], config: Dict[str, Any],
+            instance: Optional[str] = None) -> bool:
+    """Rebuild every row from a Sonarr series list (with its statistics) and
+    the config. An empty list is taken as Sonarr being unreachable and
+    leaves the stored numbers alone. Returns True if rebuilt."""
+    if not series_list:
+        return False
+    instance = _instance(instance)
+    assigned = _assignments(config)
+    rows = []
+    for series in series_list:
+        statistics = series.get('statistics') or {}
+        rule_name, activity = assigned.get(series['id'], (None, None))
+        rows.append((instance, series['id'], rule_name, statistics.get('episodeFileCount', 0),
+                     statistics.get('sizeOnDisk', 0), activity))
+    conn = _connect()
+    try:
+        conn.execute('DELETE FROM rule_series_stats WHERE instance = ?', (instance,))
+        conn.executemany(
+            '''INSERT INTO rule_series_stats (instance, series_id, rule, episodes_on_disk, bytes, last_activity)
+               VALUES (?, ?, ?, ?, ?, ?)''', rows
+        )
+        conn.execute('DELETE FROM rule_stats WHERE instance = ?', (instance,))
+        _aggregate(conn, instance, config.get('rules', {}), config.get('rules', {}).keys())
+        conn.commit()
+    finally:
+        conn.close()
+    settings_db.set_setting(f"{_REFRESHED_SETTING}:{instance}", time.time(), category='internal')
+    return True
+
+
+def sync_config(config: Dict[str, Any], instance: Optional[str] = None) -> None:
+    """Apply a saved config: moved / new / unassigned series, activity dates
+    and rule thresholds. Only the rules that changed are re-aggregated."""
+    instance = _instance(instance)
+    assigned = _assignments(config)
+    rules = config.get('rules', {})
+    try:
+        conn = _connect()
+        try:
+            existing = {series_id: (rule_name, activity) for series_id, rule_name, activity in conn.execute(
+                'SELECT series_id, rule, last_activity FROM rule_series_stats WHERE instance = ?', (instance,))}
+            touched = set()
+            for series_id, (rule_name, activity) in assigned.items():
+                old = existing.get(series_id)
+                if old is None:
+                    # Assigned before the next refresh saw it - files are counted then
+                    conn.execute('''INSERT INTO rule_series_stats (instance, series_id, rule, last_activity)
+                                    VALUES (?, ?, ?, ?)''', (instance, series_id, rule_name, activity))
+                    touched.add(rule_name)
+                elif old != (rule_name, activity):
+                    conn.execute('''UPDATE rule_series_stats SET rule = ?, last_activity = ?
+                                    WHERE instance = ? AND series_id = ?''',
+                                 (rule_name, activity, instance, series_id))
+                    touched.update((old[0], rule_name))
+            for series_id, (rule_name, _) in existing.items():
+                if rule_name is not None and series_id not in assigned:
+                    conn.execute('''UPDATE rule_series_stats SET rule = NULL
+                                    WHERE instance = ? AND series_id = ?''', (instance, series_id))
+                    touched.add(rule_name)
+            stored = {rule_name: (grace, dormant) for rule_name, grace, dormant in conn.execute(
+                'SELECT rule, grace_days, dormant_days FROM rule_stats WHERE instance = ?', (instance,))}
+            touched.update(name for name, details in rules.items() if stored.get(name) != _thresholds(details))
+            touched.update(set(stored) - set(rules))
+            _aggregate(conn, instance, rules, touched - {None})
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.debug(f"Could not sync rule stats with config: {e}")
+
+
+def adjust_files(series_id, episodes: int = 0, bytes_: int = 0, instance: Optional[str] = None) -> None:
+    """Add (or with negative numbers remove) episode files for a series and
+    its rule - after a cleanup deletion or a Sonarr import."""
+    if series_id is None or not (episodes or bytes_):
+        return
+    instance = _instance(instance)
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute('SELECT rule FROM rule_series_stats WHERE instance = ? AND series_id = ?',
+                               (instance, int(series_id))).fetchone()
+            if row is None:
+                return  # not seen yet - the next refresh counts it
+            conn.execute('''UPDATE rule_series_stats
+                            SET episodes_on_disk = MAX(0, episodes_on_disk + ?), bytes = MAX(0, bytes + ?)
+                            WHERE instance = ? AND series_id = ?''',
+                         (episodes, bytes_, instance, int(series_id)))
+            if row[0] is not None:
+                conn.execute('''UPDATE rule_stats
+                                SET episodes_on_disk = MAX(0, episodes_on_disk + ?), bytes = MAX(0, bytes + ?),
+                                    updated_at = ?
+                                WHERE instance = ? AND rule = ?''',
+                             (episodes, bytes_, time.time(), instance, row[0]))
+            conn.commit()
+        finally:
+            conn.close()
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        logger.debug(f"Could not adjust rule stats for series {series_id}: {e}")
+
+
+# ── Reads ───────────────────────────────────────────────────────
+
+def refreshed_at(instance: Optional[str] = None) -> Optional[float]:
+    value = settings_db.get_setting(f"{_REFRESHED_SETTING}:{_instance(instance)}")
+    return float(value) if value is not None else None
+
+
+def get_rule_stats(instance: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """{rule: {series_count, episodes_on_disk, bytes, last_activity,
+    past_grace, past_dormant, grace_days, dormant_days, updated_at}}"""
+    conn = _connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute('SELECT * FROM rule_stats WHERE instance = ?', (_instance(instance),)).fetchall()
+    finally:
+        conn.close()
+    return {row['rule']: {k: row[k] for k in row.keys() if k not in ('instance', 'rule')} for row in rows}
+
+
+def series_totals(instance: Optional[str] = None) -> Dict[str, int]:
+    conn = _connect()
+    try:
+        total, assigned = conn.execute(
+            'SELECT COUNT(*), COUNT(rule) FROM rule_series_stats WHERE instance = ?', (_instance(instance),)
+        ).fetchone()
+    finally:
+        conn.close()
+    return {'total_series': total, 'assigned_series': assigned, 'unassigned_series': total - assigned}
+
+
+def assignments(instance: Optional[str] = None) -> Dict[str, str]:
+    """{series_id: rule} for every known series, 'None' when unassigned."""
+    conn = _connect()
+    try:
+        rows = conn.execute('SELECT series_id, rule FROM rule_series_stats WHERE instance = ?',
+                            (_instance(instance),)).fetchall()
+    finally:
+        conn.close()
+    return {str(series_id): rule_name or 'None' for series_id, rule_name in rows}
@@ -0,0 +1,193 @@
+"""
+Selection Prefetch - TMDB data for a pending selection request, fetched once
+
+The season and episode selection pages used to fetch TMDB's show details
+when they rendered, and the episode page then asked /api/tmdb/season/<id>/<n>
+for every season as its tab was opened - one TMDB round trip after another,
+many seconds for a show with 20+ seasons.
+
+When a selection request is created (Send to Selection, Search's deferred
+add, the episeerr_select webhook) prefetch_async() fetches the show and
+then every season in the background. Seasons go APPEND_LIMIT at a time
+through TMDB's append_to_response, and those chunks are fetched
+concurrently. The trimmed results are stored in settings.db
+(selection_prefetch) next to the pending request and removed with the last
+request for that show. The pages and the season API read from there, and
+fall back to a live fetch - stored for next time - for anything missing or
+older than PREFETCH_TTL_SECONDS.
+
+Sonarr's episode list is deliberately not cached: processing a selection
+reads it live, because episode ids and monitored state must be current.
+"""
+import json
+import sqlite3
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import settings_db
+
+logger = logging.getLogger(__name__)
+
+# TMDB accepts at most 20 append_to_response entries per request
+APPEND_LIMIT = 20
+# Concurrent TMDB requests for one show
+PREFETCH_WORKERS = 4
+# Cached details older than this are re-fetched (new episodes get listed)
+PREFETCH_TTL_SECONDS = 24 * 3600
+# season_number row holding the show itself
+SHOW = -1
+
+_EPISODE_FIELDS = ('id', 'episode_number', 'name', 'overview', 'air_date', 'runtime', 'still_path')
+
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def _connect():
+    return sqlite3.connect(settings_db.DB_PATH, timeout=10)
+
+
+def _tmdb_get(endpoint: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    from episeerr import get_tmdb_endpoint  # episeerr imports this module
+    return get_tmdb_endpoint(endpoint, params)
+
+
+# ── Trimming ────────────────────────────────────────────────────
+
+def trim_show(show: Dict[str, Any]) -> Dict[str, Any]:
+    """What the selection pages use of TMDB's tv/<id>."""
+    return {
+        'id': show.get('id'),
+        'name': show.get('name'),
+        'overview': show.get('overview', ''),
+        'poster_path': show.get('poster_path'),
+        'seasons': [{'season_number': s.get('season_number'),
+                     'episode_count': s.get('episode_count'),
+                     'name': s.get('name')}
+                    for s in show.get('seasons') or []],
+    }
+
+
+def trim_season(season: Dict[str, Any]) -> Dict[str, Any]:
+    """TMDB's tv/<id>/season/<n> without per-episode crew and guest stars."""
+    return {
+        'id': season.get('id'),
+        'name': season.get('name'),
+        'overview': season.get('overview', ''),
+        'season_number': season.get('season_number'),
+        'air_date': season.get('air_date'),
+        'poster_path': season.get('poster_path'),
+        'episodes': [{k: ep.get(k) for k in _EPISODE_FIELDS} for ep in season.get('episodes') or []],
+    }
+
+
+# ── Storage ─────────────────────────────────────────────────────
+
+def _store(tmdb_id, entries: Dict[int, Dict[str, Any]]) -> None:
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.executemany(
+            'INSERT OR REPLACE INTO selection_prefetch (tmdb_id, season_number, data, fetched_at) '
+            'VALUES (?, ?, ?, ?)',
+            [(str(tmdb_id), number, json.dumps(data), now) for number, data in entries.items()]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def cached(tmdb_id, season_numbers: Optional[List[int]] = None) -> Dict[int, Dict[str, Any]]:
+    """Fresh stored entries for a show: {season_number: data}, SHOW for the
+    show itself. Only the given season numbers (plus SHOW) when given."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            'SELECT season_number, data FROM selection_prefetch WHERE tmdb_id = ? AND fetched_at > ?',
+            (str(tmdb_id), time.time() - PREFETCH_TTL_SECONDS)
+        ).fetchall()
+    finally:
+        conn.close()
+    wanted = None if season_numbers is None else set(season_numbers) | {SHOW}
+    return {number: json.loads(data) for number, data in rows if wanted is None or number in wanted}
+
+
+# ── Fetching ────────────────────────────────────────────────────
+
+def _fetch_seasons(tmdb_id, numbers: List[int]) -> Dict[int, Dict[str, Any]]:
+    """One TMDB request for up to APPEND_LIMIT seasons."""
+    data = _tmdb_get(f"tv/{tmdb_id}",
+                     {'append_to_response': ','.join(f"season/{n}" for n in numbers)})
+    return {n: trim_season(data[f"season/{n}"]) for n in numbers
+            if data and isinstance(data.get(f"season/{n}"), dict)}
+
+
+def prefetch(tmdb_id) -> int:
+    """Fetch and store a show and all of its seasons (specials excluded).
+    Returns the number of seasons stored."""
+    show = _tmdb_get(f"tv/{tmdb_id}")
+    if not show:
+        return 0
+    entries: Dict[int, Dict[str, Any]] = {SHOW: trim_show(show)}
+    numbers = [s['season_number'] for s in show.get('seasons') or [] if (s.get('season_number') or 0) > 0]
+    chunks = [numbers[i:i + APPEND_LIMIT] for i in range(0, len(numbers), APPEND_LIMIT)]
+    if chunks:
+        with ThreadPoolExecutor(max_workers=min(PREFETCH_WORKERS, len(chunks)),
+                                thread_name_prefix='selection-prefetch') as pool:
+            for seasons in pool.map(lambda chunk: _fetch_seasons(tmdb_id, chunk), chunks):
+                entries.update(seasons)
+    _store(tmdb_id, entries)
+    return len(entries) - 1
+
+
+def prefetch_async(tmdb_id) -> bool:
+    """prefetch() in a background thread, unless one is already running for
+    this show in this process. Returns True if a thread was started."""
+    if not tmdb_id:
+        return False
+    key = str(tmdb_id)
+    with _in_flight_lock:
+        if key in _in_flight:
+            return False
+        _in_flight.add(key)
+
+    def _run():
+        started = time.monotonic()
+        try:
+            count = prefetch(key)
+            logger.info(f"Prefetched {count} season(s) for TMDB {key} in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            logger.warning(f"Selection prefetch for TMDB {key} failed: {e}")
+        finally:
+            with _in_flight_lock:
+                _in_flight.discard(key)
+
+    threading.Thread(target=_run, daemon=True, name=f'selection-prefetch-{key}').start()
+    return True
+
+
+def show_details(tmdb_id) -> Optional[Dict[str, Any]]:
+    """Trimmed show details - stored, or fetched and stored now."""
+    entry = cached(tmdb_id, []).get(SHOW)
+    if entry is None:
+        show = _tmdb_get(f"tv/{tmdb_id}")
+        if not show:
+            return None
+        entry = trim_show(show)
+        _store(tmdb_id, {SHOW: entry})
+    return entry
+
+
+def season_details(tmdb_id, season_number: int) -> Optional[Dict[str, Any]]:
+    """Trimmed season details - stored, or fetched and stored now."""
+    entry = cached(tmdb_id, [season_number]).get(season_number)
+    if entry is None:
+        season = _tmdb_get(f"tv/{tmdb_id}/season/{season_number}")
+        if not season:
+            return None
+        entry = trim_season(season)
+        _store(tmdb_id, {season_number: entry})
+    return entry
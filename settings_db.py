@@ -6,6 +6,7 @@ Replaces env vars with database storage for easier management
 import sqlite3
 import json
 import os
+import time
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 
@@ -107,9 +108,277 @@ def init_settings_db():
         )
     ''')
 
+    # Job runs table - history for every job run through job_scheduler.py
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_name TEXT NOT NULL,
+            trigger TEXT,                -- 'schedule' or 'manual'
+            status TEXT NOT NULL,        -- 'running', 'success', 'failed', 'cancelled', 'timeout', 'interrupted'
+            started_at REAL NOT NULL,
+            finished_at REAL,
+            duration REAL,
+            message TEXT
+        )
+    ''')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_job_runs_name_started ON job_runs (job_name, started_at)'
+    )
+    # Migration: cross-worker job control (progress, queued runs, cancel requests)
+    for column, ddl in (('progress_percent', 'REAL'), ('progress_message', 'TEXT'),
+                        ('cancel_requested', 'INTEGER DEFAULT 0')):
+        try:
+            cursor.execute(f'ALTER TABLE job_runs ADD COLUMN {column} {ddl}')
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+
+    # Shared state tables (shared_state.py) - lets several gunicorn workers
+    # agree on cache freshness, polled sessions and dedup markers
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cache_generations (
+            name TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS active_sessions (
+            source TEXT NOT NULL,        -- 'plex', 'jellyfin', 'emby'
+            session_key TEXT NOT NULL,
+            token TEXT,                  -- changes on every claim of the same session
+            owner_pid INTEGER,
+            data JSON,
+            started_at REAL,
+            updated_at REAL,
+            PRIMARY KEY (source, session_key)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS processed_keys (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            processed_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        )
+    ''')
+
+    # Watch-to-download traces (watch_trace.py) - one row per watch event,
+    # a timestamp per pipeline stage
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS watch_traces (
+            trace_id TEXT PRIMARY KEY,
+            source TEXT,                 -- 'plex', 'tautulli', 'jellyfin', 'emby', 'webhook'
+            series_id INTEGER,
+            series_title TEXT,
+            season INTEGER,
+            episode INTEGER,
+            rule TEXT,
+            user TEXT,
+            prefetch_only INTEGER DEFAULT 0,
+            watched_at REAL NOT NULL,
+            processed_at REAL,
+            searched_at REAL,
+            grabbed_at REAL,
+            imported_at REAL
+        )
+    ''')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_watch_traces_watched ON watch_traces (watched_at)'
+    )
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS watch_trace_episodes (
+            episode_id INTEGER NOT NULL,
+            trace_id TEXT NOT NULL,
+            PRIMARY KEY (episode_id, trace_id)
+        )
+    ''')
+
+    # Sonos UPnP event subscriptions (integrations/_sonos_events.py) and the
+    # transport state their NOTIFYs keep current - shared so any worker can
+    # take a NOTIFY
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sonos_subscriptions (
+            service TEXT NOT NULL,       -- 'topology', 'transport'
+            speaker TEXT NOT NULL,       -- http://host:1400
+            sid TEXT NOT NULL,
+            callback_url TEXT,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (service, speaker)
+        )
+    ''')
+    cursor.execute(
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_sonos_subscriptions_sid ON sonos_subscriptions (sid)'
+    )
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sonos_transport (
+            speaker TEXT PRIMARY KEY,
+            state JSON NOT NULL,
+            updated_at REAL
+        )
+    ''')
+
+    # Dashboard push events (event_bus.py) - short-lived, the id is the SSE
+    # event id browsers resume from
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS event_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic TEXT NOT NULL,
+            data JSON,
+            created_at REAL NOT NULL
+        )
+    ''')
+
+    # Series waiting for a bulk rule-tag sync (tag_sync.py); always_have
+    # marks newly assigned series whose rule's always_have should run too
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tag_sync_queue (
+            series_id TEXT PRIMARY KEY,
+            always_have INTEGER NOT NULL DEFAULT 0,
+            queued_at REAL NOT NULL
+        )
+    ''')
+    # Migration: failed syncs stay queued for a retry (tag_sync.retry_later)
+    try:
+        cursor.execute('ALTER TABLE tag_sync_queue ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+
+    # Cleanup decisions and actions (cleanup_audit.py) - one row per delete
+    # batch (queued on dry run, deleted, failed) plus one per cleanup phase
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cleanup_audit (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            at REAL NOT NULL,
+            run_id TEXT,
+            instance TEXT,
+            phase TEXT NOT NULL,         -- 'dormant', 'grace_watched', 'grace_unwatched', 'movie', 'keep', 'finale', 'approved'
+            outcome TEXT NOT NULL,       -- 'queued', 'deleted', 'failed', 'completed' (phase finished)
+            dry_run INTEGER DEFAULT 0,
+            rule TEXT,
+            series_id INTEGER,
+            series_title TEXT,
+            episode_ids JSON,
+            episodes INTEGER DEFAULT 0,
+            bytes INTEGER DEFAULT 0,
+            reason TEXT,
+            duration REAL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cleanup_audit_at ON cleanup_audit (at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cleanup_audit_phase_at ON cleanup_audit (phase, at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cleanup_audit_rule_at ON cleanup_audit (rule, at)')
+
+    # Materialized per-rule statistics (rule_stats.py) - per series, and
+    # aggregated per rule; kept current by the code paths that change them
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rule_series_stats (
+            instance TEXT NOT NULL,
+            series_id INTEGER NOT NULL,
+            rule TEXT,                   -- NULL when unassigned
+            episodes_on_disk INTEGER DEFAULT 0,
+            bytes INTEGER DEFAULT 0,
+            last_activity REAL,
+            PRIMARY KEY (instance, series_id)
+        )
+    ''')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_rule_series_stats_rule ON rule_series_stats (instance, rule)'
+    )
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rule_stats (
+            instance TEXT NOT NULL,
+            rule TEXT NOT NULL,
+            series_count INTEGER DEFAULT 0,
+            episodes_on_disk INTEGER DEFAULT 0,
+            bytes INTEGER DEFAULT 0,
+            last_activity REAL,
+            past_grace INTEGER DEFAULT 0,
+            past_dormant INTEGER DEFAULT 0,
+            grace_days INTEGER,          -- thresholds the past_* counts were computed with
+            dormant_days INTEGER,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (instance, rule)
+        )
+    ''')
+
+    # Free-space samples per Sonarr instance (disk_forecast.py) - raw for
+    # two days, then one per hour
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS disk_samples (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            instance TEXT NOT NULL,
+            at REAL NOT NULL,
+            free_gb REAL NOT NULL,
+            total_gb REAL,
+            source TEXT                  -- job trigger: 'schedule', 'import', 'startup', 'manual'
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_disk_samples_instance_at ON disk_samples (instance, at)')
+
+    # Outbound Discord posts and message deletes, delivered by the sender
+    # thread in the leader worker (notification_queue.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notification_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,              -- 'post' or 'delete'
+            notification_type TEXT,          -- posts: episode_search_pending, selection_pending, aired_not_downloaded
+            message TEXT,                    -- posts: Discord message JSON
+            data TEXT,                       -- posts: the notification's data, for digests
+            episode_id INTEGER,              -- search-pending posts: the episode the message id is stored for
+            message_id TEXT,                 -- deletes: the Discord message
+            created_at REAL NOT NULL,
+            next_attempt_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_notification_queue_due ON notification_queue (next_attempt_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_notification_queue_episode ON notification_queue (episode_id)')
+
+    # Discord message of each pending episode search (several episodes share
+    # one for a digest) and episodes already in an aired-not-downloaded
+    # notification (notification_storage.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS search_notifications (
+            episode_id INTEGER PRIMARY KEY,
+            message_id TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_search_notifications_message ON search_notifications (message_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_search_notifications_created ON search_notifications (created_at)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS aired_notifications (
+            episode_id INTEGER PRIMARY KEY,
+            notified_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_aired_notifications_notified ON aired_notifications (notified_at)')
+
+    # TMDB show/season details prefetched for pending selection requests
+    # (selection_prefetch.py); season_number -1 is the show itself
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS selection_prefetch (
+            tmdb_id TEXT NOT NULL,
+            season_number INTEGER NOT NULL,
+            data JSON NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (tmdb_id, season_number)
+        )
+    ''')
+
     conn.commit()
     conn.close()
 
+    # WAL lets readers in one worker proceed while another worker writes
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+    except sqlite3.OperationalError:
+        pass
+    finally:
+        conn.close()
+
 
 def migrate_pending_requests_from_files(requests_dir: str) -> int:
     """
@@ -158,6 +427,7 @@ def add_pending_request(data: Dict[str, Any], request_id: str = None) -> str:
         )
     )
     conn.commit()
+    _publish_request_count(conn)
     conn.close()
     return rid
 
@@ -229,11 +499,200 @@ def delete_pending_request(request_id: str) -> bool:
     cursor = conn.cursor()
     cursor.execute('DELETE FROM pending_requests WHERE id = ?', (request_id,))
     deleted = cursor.rowcount > 0
+    if deleted:
+        # Prefetched selection data goes with the last request that needed it
+        cursor.execute('DELETE FROM selection_prefetch WHERE tmdb_id NOT IN '
+                       '(SELECT tmdb_id FROM pending_requests)')
     conn.commit()
+    if deleted:
+        _publish_request_count(conn)
     conn.close()
     return deleted
 
 
+def _publish_request_count(conn) -> None:
+    import event_bus  # event_bus imports this module
+    count = conn.execute('SELECT COUNT(*) FROM pending_requests').fetchone()[0]
+    event_bus.publish('pending', {'requests': count})
+
+
+def record_job_start(job_name: str, trigger: str = 'schedule', started_at: float = None) -> int:
+    """Insert a 'running' job_runs row. Returns the run id."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        'INSERT INTO job_runs (job_name, trigger, status, started_at) VALUES (?, ?, ?, ?)',
+        (job_name, trigger, 'running', started_at or time.time())
+    )
+    run_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    return run_id
+
+
+def record_job_finish(run_id: int, status: str, message: str = None,
+                      finished_at: float = None):
+    """Close out a job_runs row with its final status and duration."""
+    finished_at = finished_at or time.time()
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        '''UPDATE job_runs
+           SET status = ?, message = ?, finished_at = ?, duration = ? - started_at
+           WHERE id = ?''',
+        (status, message, finished_at, finished_at, run_id)
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_last_job_run(job_name: str) -> Optional[Dict[str, Any]]:
+    """Most recent run of a job (any status), or None if it never ran."""
+    runs = get_job_runs(job_name, limit=1)
+    return runs[0] if runs else None
+
+
+def get_job_runs(job_name: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Run history for a job, newest first."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(
+        'SELECT * FROM job_runs WHERE job_name = ? ORDER BY started_at DESC LIMIT ?',
+        (job_name, limit)
+    )
+    rows = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return rows
+
+
+def mark_interrupted_job_runs() -> int:
+    """Close out 'running' rows left behind by a process that died mid-run.
+    Called once when the scheduler starts. Returns the number of rows fixed."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE job_runs SET status = 'interrupted' WHERE status = 'running'"
+    )
+    fixed = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return fixed
+
+
+def queue_job_run(job_name: str, trigger: str = 'manual') -> int:
+    """Insert a 'queued' run for the leader worker's scheduler to pick up.
+    Returns the run id."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        'INSERT INTO job_runs (job_name, trigger, status, started_at) VALUES (?, ?, ?, ?)',
+        (job_name, trigger, 'queued', time.time())
+    )
+    run_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    return run_id
+
+
+def claim_queued_job_runs() -> List[Dict[str, Any]]:
+    """Flip every 'queued' row to 'running' and return them (oldest first)."""
+    conn = sqlite3.connect(DB_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute("SELECT * FROM job_runs WHERE status = 'queued' ORDER BY started_at")
+    rows = [dict(row) for row in cursor.fetchall()]
+    now = time.time()
+    for row in rows:
+        cursor.execute(
+            "UPDATE job_runs SET status = 'running', started_at = ? WHERE id = ?",
+            (now, row['id'])
+        )
+        row['started_at'] = now
+    conn.commit()
+    conn.close()
+    return rows
+
+
+def get_active_job_runs(job_name: str) -> List[Dict[str, Any]]:
+    """Queued and running rows for a job, oldest first."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(
+        """SELECT * FROM job_runs WHERE job_name = ? AND status IN ('queued', 'running')
+           ORDER BY started_at""",
+        (job_name,)
+    )
+    rows = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return rows
+
+
+def update_job_progress(run_id: int, percent: Optional[float], message: Optional[str]):
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(
+        'UPDATE job_runs SET progress_percent = ?, progress_message = ? WHERE id = ?',
+        (percent, message, run_id)
+    )
+    conn.commit()
+    conn.close()
+
+
+def request_job_cancel(job_name: str) -> int:
+    """Flag every queued/running run of a job for cancellation. Queued runs
+    are closed out immediately; running ones are cancelled by whichever
+    worker owns them. Returns the number of rows flagged."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    now = time.time()
+    cursor.execute(
+        """UPDATE job_runs SET status = 'cancelled', finished_at = ?, duration = 0
+           WHERE job_name = ? AND status = 'queued'""",
+        (now, job_name)
+    )
+    flagged = cursor.rowcount
+    cursor.execute(
+        "UPDATE job_runs SET cancel_requested = 1 WHERE job_name = ? AND status = 'running'",
+        (job_name,)
+    )
+    flagged += cursor.rowcount
+    conn.commit()
+    conn.close()
+    return flagged
+
+
+def get_cancel_requested_run_ids(run_ids: List[int]) -> List[int]:
+    if not run_ids:
+        return []
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    placeholders = ','.join('?' * len(run_ids))
+    cursor.execute(
+        f'SELECT id FROM job_runs WHERE cancel_requested = 1 AND id IN ({placeholders})',
+        list(run_ids)
+    )
+    ids = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return ids
+
+
+def prune_job_runs(job_name: str, keep: int = 200):
+    """Keep only the newest `keep` runs for a job."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        '''DELETE FROM job_runs WHERE job_name = ? AND id NOT IN (
+               SELECT id FROM job_runs WHERE job_name = ?
+               ORDER BY started_at DESC LIMIT ?
+           )''',
+        (job_name, job_name, keep)
+    )
+    conn.commit()
+    conn.close()
+
+
 def get_service(service_type: str, name: str = 'default') -> Optional[Dict[str, Any]]:
     """Get a service configuration by type and name"""
     conn = sqlite3.connect(DB_PATH)
@@ -385,9 +844,15 @@ def is_service_disabled(service_type: str, name: str = 'default') -> bool:
 
 
 # Configuration getters with env fallback
-def get_sonarr_config() -> Dict[str, str]:
-    """Get Sonarr config from DB or env"""
-    service = get_service('sonarr', 'default')
+def get_sonarr_config(name: Optional[str] = None) -> Dict[str, str]:
+    """Get Sonarr config from DB or env - for the named instance, by default
+    the one this process is bound to (see sonarr_instances.py). Only the
+    'default' instance falls back to env."""
+    import sonarr_instances
+    name = name or sonarr_instances.active_instance()
+    service = get_service('sonarr', name)
+    if name != sonarr_instances.DEFAULT:
+        service = service or {'url': None, 'api_key': None}
     if service:
         cfg = service.get('config') or {}
         return {
@@ -0,0 +1,389 @@
+"""
+Shared State - cross-process coherence for running more than one gunicorn worker
+
+Everything here lives in settings.db (or a lock file next to it) instead of a
+module-level dict, so every worker process sees the same thing:
+
+- Generation counters: a per-process cache stays valid only while the
+  shared generation for its name is unchanged. Invalidating bumps the
+  counter, which every other worker notices on its next read.
+- Session registry: media-server playback sessions being polled (Plex,
+  Jellyfin, Emby). A PlaybackStart webhook can land on one worker and the
+  matching PlaybackStop on another; claiming/releasing the session row here
+  keeps exactly one poller per session and lets any worker stop it.
+- Processed keys: short-lived "already handled this episode" markers used
+  for dedup between webhook events that may hit different workers.
+- Leader election: a non-blocking flock on a lock file. Only the worker that
+  holds it runs the job scheduler; if that worker dies the OS drops the lock
+  and another worker takes over on its next retry.
+"""
+import os
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from typing import Any, Callable, Dict, Optional
+
+import settings_db
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX dev box - single process, always leader
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LEADER_LOCK_PATH = os.getenv(
+    'EPISEERR_LEADER_LOCK',
+    os.path.join(os.path.dirname(settings_db.DB_PATH) or '.', 'episeerr-leader.lock')
+)
+LEADER_RETRY_SECONDS = 30
+
+# A claimed session whose owner hasn't refreshed it in this long is treated
+# as abandoned (owner crashed without releasing) and can be re-claimed.
+SESSION_STALE_SECONDS = 6 * 3600
+
+
+def _connect():
+    return sqlite3.connect(settings_db.DB_PATH, timeout=10)
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# ── Generation counters ──────────────────────────────────────────
+
+def get_generation(name: str) -> int:
+    conn = _connect()
+    try:
+        row = conn.execute(
+            'SELECT generation FROM cache_generations WHERE name = ?', (name,)
+        ).fetchone()
+        return row[0] if row else 0
+    finally:
+        conn.close()
+
+
+def bump_generation(name: str) -> int:
+    """Invalidate `name` in every worker. Returns the new generation."""
+    conn = _connect()
+    try:
+        conn.execute(
+            '''INSERT INTO cache_generations (name, generation, updated_at)
+               VALUES (?, 1, ?)
+               ON CONFLICT(name) DO UPDATE SET
+                   generation = generation + 1, updated_at = excluded.updated_at''',
+            (name, time.time())
+        )
+        conn.commit()
+        row = conn.execute(
+            'SELECT generation FROM cache_generations WHERE name = ?', (name,)
+        ).fetchone()
+        return row[0]
+    finally:
+        conn.close()
+
+
+class SharedCache:
+    """Per-process cached value that is dropped when its TTL expires or when
+    any worker calls invalidate() (which bumps the shared generation).
+
+    Reading the generation is one indexed SQLite lookup - far cheaper than
+    the upstream call or file parse being cached.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+        self._value = None
+        self._loaded_at = 0.0
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def get(self, loader: Callable[[], Any]) -> Any:
+        """Return the cached value, calling loader() to refresh it when stale.
+        A loader returning None is not cached."""
+        try:
+            generation = get_generation(self.name)
+        except sqlite3.Error as e:
+            logger.debug(f"Cache generation lookup failed for {self.name}: {e}")
+            generation = None
+        with self._lock:
+            fresh = (
+                self._value is not None
+                and (time.time() - self._loaded_at) < self.ttl
+                and generation is not None
+                and generation == self._generation
+            )
+            if fresh:
+                return self._value
+        value = loader()
+        if value is not None:
+            with self._lock:
+                self._value = value
+                self._loaded_at = time.time()
+                self._generation = generation
+        return value
+
+    def peek(self) -> Any:
+        """Last loaded value regardless of freshness (for error fallbacks)."""
+        return self._value
+
+    def invalidate(self, local_only: bool = False) -> None:
+        with self._lock:
+            self._value = None
+            self._loaded_at = 0.0
+        if not local_only:
+            try:
+                bump_generation(self.name)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not bump cache generation for {self.name}: {e}")
+
+
+# ── Session registry ─────────────────────────────────────────────
+
+def claim_session(source: str, session_key: str, data: Optional[Dict] = None) -> Optional[str]:
+    """Claim a playback session for polling. Returns a claim token, or None
+    if another live poller (in this or any other worker) already owns it.
+
+    Media servers reuse session ids per device, so a poller passes its token
+    to is_session_active()/release_session() to make sure it only ever sees
+    and drops its own claim, not a newer one for the same session id."""
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute(
+            'SELECT owner_pid, updated_at FROM active_sessions WHERE source = ? AND session_key = ?',
+            (source, str(session_key))
+        ).fetchone()
+        if row and _pid_alive(row[0]) and (now - row[1]) < SESSION_STALE_SECONDS:
+            conn.rollback()
+            return None
+        token = uuid.uuid4().hex
+        conn.execute(
+            '''INSERT OR REPLACE INTO active_sessions
+               (source, session_key, token, owner_pid, data, started_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            (source, str(session_key), token, os.getpid(),
+             json.dumps(data or {}, default=str), now, now)
+        )
+        conn.commit()
+        return token
+    finally:
+        conn.close()
+
+
+def _claim_filter(source: str, session_key: str, token: Optional[str]):
+    sql = 'source = ? AND session_key = ?'
+    params = [source, str(session_key)]
+    if token is not None:
+        sql += ' AND token = ?'
+        params.append(token)
+    return sql, params
+
+
+def release_session(source: str, session_key: str, token: Optional[str] = None) -> bool:
+    """Drop a session claim (stop polling it) - only the claim matching
+    `token` when given. Returns True if a claim was dropped."""
+    where, params = _claim_filter(source, session_key, token)
+    conn = _connect()
+    try:
+        cur = conn.execute(f'DELETE FROM active_sessions WHERE {where}', params)
+        conn.commit()
+        return cur.rowcount > 0
+    finally:
+        conn.close()
+
+
+def is_session_active(source: str, session_key: str, token: Optional[str] = None) -> bool:
+    where, params = _claim_filter(source, session_key, token)
+    conn = _connect()
+    try:
+        row = conn.execute(f'SELECT 1 FROM active_sessions WHERE {where}', params).fetchone()
+        return row is not None
+    finally:
+        conn.close()
+
+
+def get_sessions(source: str) -> Dict[str, Dict]:
+    """Every claimed session for a source, keyed by session key."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            'SELECT session_key, owner_pid, data, started_at FROM active_sessions WHERE source = ?',
+            (source,)
+        ).fetchall()
+    finally:
+        conn.close()
+    sessions = {}
+    for key, pid, data, started_at in rows:
+        try:
+            info = json.loads(data) if data else {}
+        except ValueError:
+            info = {}
+        info['_owner_pid'] = pid
+        info['_started_at'] = started_at
+        sessions[key] = info
+    return sessions
+
+
+# ── Processed-key dedup ──────────────────────────────────────────
+
+def mark_processed(namespace: str, key: str) -> None:
+    conn = _connect()
+    try:
+        conn.execute(
+            'INSERT OR REPLACE INTO processed_keys (namespace, key, processed_at) VALUES (?, ?, ?)',
+            (namespace, key, time.time())
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def was_processed(namespace: str, key: str, ttl: float) -> bool:
+    """True if mark_processed(namespace, key) was called within `ttl`
+    seconds. Expired markers for the namespace are pruned on the way."""
+    cutoff = time.time() - ttl
+    conn = _connect()
+    try:
+        conn.execute(
+            'DELETE FROM processed_keys WHERE namespace = ? AND processed_at < ?',
+            (namespace, cutoff)
+        )
+        conn.commit()
+        row = conn.execute(
+            'SELECT 1 FROM processed_keys WHERE namespace = ? AND key = ?',
+            (namespace, key)
+        ).fetchone()
+        return row is not None
+    finally:
+        conn.close()
+
+
+class ProcessedSet:
+    """Set-like view over processed_keys for code written against a plain
+    in-memory set: `key in s` / `s.add(key)`, shared by every worker, with
+    entries expiring after `ttl` seconds."""
+
+    def __init__(self, namespace: str, ttl: float):
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def __contains__(self, key: str) -> bool:
+        return was_processed(self.namespace, key, self.ttl)
+
+    def add(self, key: str) -> None:
+        mark_processed(self.namespace, key)
+
+
+# ── Leader election ──────────────────────────────────────────────
+
+_leader_lock = threading.Lock()
+_leader_fd = None
+_leader_waiter: Optional[threading.Thread] = None
+_leader_callbacks = []
+
+
+def is_leader() -> bool:
+    return fcntl is None or _leader_fd is not None
+
+
+def try_become_leader() -> bool:
+    """Take the leader lock if nobody holds it. Held for the life of the
+    process - the OS releases it if the worker exits or is killed."""
+    global _leader_fd
+    if fcntl is None:
+        return True
+    with _leader_lock:
+        if _leader_fd is not None:
+            return True
+        try:
+            os.makedirs(os.path.dirname(LEADER_LOCK_PATH) or '.', exist_ok=True)
+            fd = os.open(LEADER_LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            logger.warning(f"Could not open leader lock {LEADER_LOCK_PATH}: {e}")
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        _leader_fd = fd
+    logger.info(f"Worker {os.getpid()} is now the leader (runs schedulers)")
+    return True
+
+
+def run_as_leader(callback: Callable[[], None]) -> bool:
+    """Run callback now if this worker is (or becomes) the leader, otherwise
+    as soon as it takes over from a leader that exits. Returns True if the
+    callback ran immediately."""
+    if try_become_leader():
+        callback()
+        return True
+
+    global _leader_waiter
+    with _leader_lock:
+        _leader_callbacks.append(callback)
+        if _leader_waiter is None:
+            _leader_waiter = threading.Thread(target=_wait_for_leadership, daemon=True,
+                                              name='leader-election')
+            _leader_waiter.start()
+    logger.info(f"Worker {os.getpid()} is a follower - schedulers run in the leader worker")
+    return False
+
+
+def _wait_for_leadership():
+    while not try_become_leader():
+        time.sleep(LEADER_RETRY_SECONDS)
+    with _leader_lock:
+        callbacks = list(_leader_callbacks)
+        _leader_callbacks.clear()
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Leader start callback failed: {e}", exc_info=True)
+
+
+# ── Shared secret ────────────────────────────────────────────────
+
+SECRET_PATH = os.path.join(os.path.dirname(settings_db.DB_PATH) or '.', '.secret_key')
+
+
+def get_shared_secret() -> str:
+    """A random secret generated once and persisted next to settings.db, so
+    every worker signs session cookies with the same key when SECRET_KEY
+    isn't set. The first worker to get here creates it (O_EXCL); the rest
+    read it."""
+    try:
+        os.makedirs(os.path.dirname(SECRET_PATH) or '.', exist_ok=True)
+        fd = os.open(SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        for _ in range(50):
+            with open(SECRET_PATH) as f:
+                secret = f.read().strip()
+            if secret:
+                return secret
+            time.sleep(0.1)  # creator is still writing it
+        raise RuntimeError(f"{SECRET_PATH} exists but is empty")
+    secret = os.urandom(24).hex()
+    with os.fdopen(fd, 'w') as f:
+        f.write(secret)
+    return secret
@@ -0,0 +1,215 @@
+"""
+Sonarr Instances - several Sonarrs behind one Episeerr
+
+The services table already holds named rows per service type; every enabled
+'sonarr' row is an instance. 'default' is the one the web UI and the
+in-process webhook handlers work on; the rules pages and rules API take
+?instance=<name>. Every other instance has its own config file (rules and
+series state), its own pending-deletion files and its own webhook URL
+(/sonarr-webhook/<name>).
+
+Work for another instance runs in a media_processor.py subprocess bound to it
+through EPISEERR_SONARR_INSTANCE and CONFIG_PATH, so every module-level
+SONARR_URL, connection pool and circuit breaker in that process points at the
+right Sonarr without threading an instance argument through every helper:
+
+    cleanup      the cleanup job runs one subprocess per instance in parallel
+                 (at most CLEANUP_PARALLEL at a time), each with its own
+                 connection budget; movie cleanup runs in the default one only
+    webhooks     /sonarr-webhook/<name> hands the payload to a subprocess
+                 (media_processor.py --sonarr-webhook <file>)
+    watch events a watch processed for the default instance is replayed
+                 against the others (media_processor.py --watch-event
+                 <file>, all at once, not waited for), so a show kept in
+                 both a 1080p and a 4K Sonarr advances in both
+    rule tags    rule and assignment changes made for another instance
+                 tag its Sonarr from a subprocess
+                 (media_processor.py --rule-tags <file>)
+
+The dashboard combines stats and the upcoming calendar across instances.
+"""
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import logging
+from typing import Any, Dict, List, Optional
+
+import settings_db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT = 'default'
+ENV_VAR = 'EPISEERR_SONARR_INSTANCE'
+# Instance cleanup subprocesses running at once (0 = all of them)
+CLEANUP_PARALLEL = int(os.getenv('EPISEERR_CLEANUP_PARALLEL', '0'))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.join(BASE_DIR, 'config')
+PROCESSOR = os.path.join(os.getcwd(), 'media_processor.py')
+
+_NAME_RE = re.compile(r'^[a-z0-9][a-z0-9_-]{0,31}$')
+
+
+def active_instance() -> str:
+    """The instance this process is bound to."""
+    return os.getenv(ENV_VAR) or DEFAULT
+
+
+def is_default(name: Optional[str] = None) -> bool:
+    return (name or active_instance()) == DEFAULT
+
+
+def valid_name(name: str) -> bool:
+    """Lowercase letters, digits, '-' and '_' - the name ends up in file
+    names and the webhook URL."""
+    return bool(name and _NAME_RE.match(name))
+
+
+def list_instances() -> List[str]:
+    """Instance names, 'default' first. 'default' is always listed (it may
+    still come from SONARR_URL in the environment)."""
+    conn = sqlite3.connect(settings_db.DB_PATH, timeout=10)
+    try:
+        rows = conn.execute(
+            "SELECT name FROM services WHERE service_type = 'sonarr' AND enabled = 1 ORDER BY name"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [DEFAULT] + [row[0] for row in rows if row[0] != DEFAULT and valid_name(row[0])]
+
+
+# ── Per-instance state ──────────────────────────────────────────
+
+def config_path(name: Optional[str] = None) -> str:
+    """Rules + series state file of an instance."""
+    name = name or active_instance()
+    if name == DEFAULT:
+        return os.path.join(CONFIG_DIR, 'config.json')
+    return os.path.join(CONFIG_DIR, f'config.{name}.json')
+
+
+def data_path(filename: str, name: Optional[str] = None) -> str:
+    """Per-instance file under data/ - data/<filename> for the default
+    instance, data/instances/<name>/<filename> for the others."""
+    name = name or active_instance()
+    if name == DEFAULT:
+        return os.path.join(os.getcwd(), 'data', filename)
+    return os.path.join(os.getcwd(), 'data', 'instances', name, filename)
+
+
+def ensure_instance_config(name: str) -> str:
+    """Create an instance's config from the default one - same rules, no
+    series - if it doesn't exist yet. Returns its path."""
+    path = config_path(name)
+    if name == DEFAULT or os.path.exists(path):
+        return path
+    try:
+        with open(config_path(DEFAULT), 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        config = {'rules': {}, 'default_rule': 'default'}
+    for rule in config.get('rules', {}).values():
+        rule['series'] = {}
+    config.pop('movie_rules', None)
+    config.pop('default_movie_rule', None)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(config, f, indent=4)
+    os.replace(tmp_path, path)
+    logger.info(f"Created config for Sonarr instance '{name}' from the default rules")
+    return path
+
+
+def load_instance_config(name: str) -> Dict[str, Any]:
+    """An instance's config, or an empty one if it has none yet."""
+    try:
+        with open(config_path(name), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'rules': {}}
+
+
+def save_instance_config(name: str, config: Dict[str, Any]) -> None:
+    """Write a non-default instance's config (the default one is saved
+    through episeerr.save_config)."""
+    path = config_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(config, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+# ── Instance subprocesses ───────────────────────────────────────
+
+def instance_env(name: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env[ENV_VAR] = name
+    if name != DEFAULT:
+        env['CONFIG_PATH'] = config_path(name)
+    return env
+
+
+def spawn_processor(name: str, args: List[str], **popen_kwargs) -> subprocess.Popen:
+    """Start media_processor.py bound to an instance."""
+    ensure_instance_config(name)
+    return subprocess.Popen(['python3', PROCESSOR, *args], env=instance_env(name), **popen_kwargs)
+
+
+def _temp_path(prefix: str, name: str) -> str:
+    temp_dir = os.path.join(os.getcwd(), 'temp')
+    os.makedirs(temp_dir, exist_ok=True)
+    return os.path.join(temp_dir, f'{prefix}_{name}_{os.urandom(4).hex()}.json')
+
+
+def dispatch_webhook(name: str, payload: Dict[str, Any]) -> subprocess.Popen:
+    """Hand a Sonarr webhook for another instance to a subprocess bound to
+    it; the subprocess deletes the payload file when it has read it."""
+    temp_path = _temp_path('sonarr_webhook', name)
+    with open(temp_path, 'w') as f:
+        json.dump(payload, f)
+    return spawn_processor(name, ['--sonarr-webhook', temp_path],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def dispatch_rule_tags(name: str, work: Dict[str, Any]) -> subprocess.Popen:
+    """Hand rule tag work for another instance to a subprocess bound to it.
+    work may hold 'ensure_rules' / 'remove_rules' (rule names whose tag is
+    created / cleaned up), 'assign' ({series id: rule}), 'always_have'
+    (newly assigned series ids) and 'unassign' (series ids to untag)."""
+    temp_path = _temp_path('rule_tags', name)
+    with open(temp_path, 'w') as f:
+        json.dump(work, f)
+    return spawn_processor(name, ['--rule-tags', temp_path],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def replay_watch_event(webhook_file: str) -> List[subprocess.Popen]:
+    """Run a watch event the default instance has processed against every
+    other instance (each looks the series up in its own Sonarr), all at
+    once and without waiting for them. Each subprocess gets its own copy of
+    the event file - the integration deletes the original as soon as the
+    default instance is done - and deletes it when it has read it. Only the
+    default instance fans out, so this never recurses."""
+    if not is_default():
+        return []
+    started = []
+    for name in list_instances()[1:]:
+        temp_path = _temp_path('watch_event', name)
+        try:
+            shutil.copyfile(webhook_file, temp_path)
+            # Not the caller's stdout/stderr: the integration reading them
+            # would wait for these to finish too
+            started.append(spawn_processor(name, ['--watch-event', temp_path],
+                                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        except OSError as e:
+            logger.error(f"Could not replay watch event for Sonarr instance '{name}': {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    return started
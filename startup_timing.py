@@ -0,0 +1,89 @@
+"""
+Startup Timing - where the time between process start and "ready" went
+
+Startup steps wrap themselves in phase('name'); steps that run after the app
+is serving (the background warm-up) pass background=True. mark_ready() is
+called once the app can answer requests. report() returns the breakdown for
+/api/startup-report and log_report() writes it to the log once warm-up is
+done.
+"""
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_process_start = time.monotonic()
+_lock = threading.Lock()
+_phases: List[Dict[str, Any]] = []
+_ready_seconds: Optional[float] = None
+_warmup_seconds: Optional[float] = None
+
+
+def _elapsed() -> float:
+    return time.monotonic() - _process_start
+
+
+@contextmanager
+def phase(name: str, background: bool = False):
+    """Time a startup step. A step that raises is still recorded (with its
+    error) and the exception propagates."""
+    started = time.monotonic()
+    entry = {'name': name, 'background': background, 'started_at': round(_elapsed(), 3)}
+    try:
+        yield
+    except Exception as e:
+        entry['error'] = str(e)
+        raise
+    finally:
+        entry['seconds'] = round(time.monotonic() - started, 3)
+        with _lock:
+            _phases.append(entry)
+
+
+def record(name: str, seconds: float, background: bool = False) -> None:
+    """Record a step that was timed elsewhere."""
+    with _lock:
+        _phases.append({'name': name, 'background': background,
+                        'started_at': round(_elapsed() - seconds, 3), 'seconds': round(seconds, 3)})
+
+
+def mark_ready() -> None:
+    global _ready_seconds
+    if _ready_seconds is None:
+        _ready_seconds = round(_elapsed(), 3)
+
+
+def mark_warmup_done() -> None:
+    global _warmup_seconds
+    if _warmup_seconds is None:
+        _warmup_seconds = round(_elapsed(), 3)
+
+
+def is_ready() -> bool:
+    return _ready_seconds is not None
+
+
+def report() -> Dict[str, Any]:
+    with _lock:
+        phases = sorted(_phases, key=lambda p: p['started_at'])
+    return {
+        'ready_seconds': _ready_seconds,
+        'warmup_done_seconds': _warmup_seconds,
+        'uptime_seconds': round(_elapsed(), 1),
+        'phases': phases,
+    }
+
+
+def log_report(log: logging.Logger = logger) -> None:
+    data = report()
+    log.info(
+        f"⏱️  Startup: ready in {data['ready_seconds']}s, "
+        f"warm-up finished at {data['warmup_done_seconds']}s"
+    )
+    for p in sorted(data['phases'], key=lambda p: -p['seconds'])[:15]:
+        suffix = ' (background)' if p['background'] else ''
+        error = f" - failed: {p['error']}" if p.get('error') else ''
+        log.info(f"   {p['seconds']:7.3f}s  {p['name']}{suffix}{error}")
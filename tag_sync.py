@@ -0,0 +1,252 @@
+"""
+Tag Sync - rule tags applied in bulk through Sonarr's series editor
+
+Assigning series to a rule and "Sync all tags" used to GET and PUT the full
+series object once per series - minutes for a few hundred series, long
+enough to time out the request that started it. Now the wanted tag changes
+are computed up front from one /series listing as add/remove sets per tag,
+and each set goes to PUT /api/v3/series/editor in chunks of EDITOR_CHUNK.
+
+The tag semantics are sync_rule_tag_to_sonarr's: a series keeps its user
+tags and episeerr_select, loses every other episeerr_* tag, and gains
+episeerr_<rule>.
+
+Assignments don't wait for Sonarr: the series are queued in settings.db
+(tag_sync_queue) and the 'rule_tag_sync' job drains the queue in the
+background, reporting progress on the Scheduler page. Queue rows outlive a
+restart, so nothing is lost if the job is interrupted. A series whose
+editor request failed stays queued for the next run, and is dropped after
+MAX_ATTEMPTS.
+"""
+import sqlite3
+import time
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import requests
+
+import episeerr_utils
+import settings_db
+
+logger = logging.getLogger(__name__)
+
+# Series per /series/editor request
+EDITOR_CHUNK = 100
+# Concurrent process_always_have calls for newly assigned series
+ALWAYS_HAVE_WORKERS = 4
+# Failed syncs of a queued series before it's dropped from the queue
+MAX_ATTEMPTS = 5
+# The rule_tag_sync job runs this often while series are still queued
+RETRY_INTERVAL_SECONDS = 15 * 60
+
+
+def _connect():
+    return sqlite3.connect(settings_db.DB_PATH, timeout=10)
+
+
+# ── Work queue ──────────────────────────────────────────────────
+
+def queue_series(series_ids: Iterable, always_have: bool = False) -> int:
+    """Queue series for a tag sync against their rule in config. always_have
+    marks them newly assigned (their rule's always_have runs too); it sticks
+    until the series has been synced. Queueing again starts the attempt
+    count over. Returns the number queued."""
+    now = time.time()
+    rows = [(str(sid), int(always_have), now) for sid in series_ids]
+    conn = _connect()
+    try:
+        conn.executemany(
+            '''INSERT INTO tag_sync_queue (series_id, always_have, queued_at) VALUES (?, ?, ?)
+               ON CONFLICT(series_id) DO UPDATE SET
+                   always_have = MAX(always_have, excluded.always_have),
+                   queued_at = excluded.queued_at,
+                   attempts = 0''',
+            rows
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def queued() -> Dict[str, bool]:
+    """Queued series id -> always_have flag."""
+    conn = _connect()
+    try:
+        return {row[0]: bool(row[1])
+                for row in conn.execute('SELECT series_id, always_have FROM tag_sync_queue')}
+    finally:
+        conn.close()
+
+
+def retry_interval_seconds() -> Optional[int]:
+    """The rule_tag_sync job's schedule: RETRY_INTERVAL_SECONDS while series
+    are left queued (failed, or interrupted by a restart), else None."""
+    conn = _connect()
+    try:
+        waiting = conn.execute('SELECT 1 FROM tag_sync_queue LIMIT 1').fetchone()
+    finally:
+        conn.close()
+    return RETRY_INTERVAL_SECONDS if waiting else None
+
+
+def dequeue(series_ids: Iterable[str], claimed_at: float) -> None:
+    """Drop synced series - unless they were queued again after claimed_at."""
+    conn = _connect()
+    try:
+        conn.executemany(
+            'DELETE FROM tag_sync_queue WHERE series_id = ? AND queued_at <= ?',
+            [(str(sid), claimed_at) for sid in series_ids]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def retry_later(series_ids: Iterable[str], claimed_at: float) -> int:
+    """Keep series whose sync failed queued for the next run, counting the
+    attempt; their always_have has run, so the flag is cleared. Series on
+    their MAX_ATTEMPTS-th failure are dropped. Rows queued again after
+    claimed_at are left alone. Returns the number dropped."""
+    rows = [(str(sid), claimed_at) for sid in series_ids]
+    conn = _connect()
+    try:
+        conn.executemany(
+            '''UPDATE tag_sync_queue SET attempts = attempts + 1, always_have = 0
+               WHERE series_id = ? AND queued_at <= ?''',
+            rows
+        )
+        dropped = [row[0] for row in conn.execute(
+            'SELECT series_id FROM tag_sync_queue WHERE attempts >= ?', (MAX_ATTEMPTS,))]
+        conn.execute('DELETE FROM tag_sync_queue WHERE attempts >= ?', (MAX_ATTEMPTS,))
+        conn.commit()
+    finally:
+        conn.close()
+    if dropped:
+        logger.error(f"Rule tag sync failed {MAX_ATTEMPTS} times for series {sorted(dropped)} - "
+                     f"dropped from the queue")
+    return len(dropped)
+
+
+# ── Planning ────────────────────────────────────────────────────
+
+def plan_rule_tags(series_list: List[dict], assignments: Dict[int, str],
+                   tag_mapping: Dict[int, str], rule_tag_ids: Dict[str, int]
+                   ) -> Tuple[Dict[Tuple[str, int], List[int]], List[int]]:
+    """
+    Tag changes that give each assigned series exactly its rule's tag.
+
+    assignments maps series id -> rule name; rule_tag_ids maps rule name ->
+    episeerr_<rule> tag id (rules missing from it are skipped). Returns
+    ({('remove' | 'add', tag_id): [series ids]}, [assigned ids not in
+    series_list]). Series that are already right appear nowhere.
+    """
+    by_id = {s['id']: s for s in series_list}
+    changes: Dict[Tuple[str, int], Set[int]] = defaultdict(set)
+    not_found = []
+    for series_id, rule_name in assignments.items():
+        series = by_id.get(series_id)
+        if series is None:
+            not_found.append(series_id)
+            continue
+        target = rule_tag_ids.get(rule_name)
+        if target is None:
+            continue
+        tags = series.get('tags', [])
+        for tag_id in tags:
+            tag_name = tag_mapping.get(tag_id, '').lower()
+            if tag_id != target and tag_name.startswith('episeerr_') and tag_name != 'episeerr_select':
+                changes[('remove', tag_id)].add(series_id)
+        if target not in tags:
+            changes[('add', target)].add(series_id)
+    return {key: sorted(ids) for key, ids in changes.items()}, not_found
+
+
+# ── Applying ────────────────────────────────────────────────────
+
+def apply_tag_changes(changes: Dict[Tuple[str, int], List[int]],
+                      progress: Optional[Callable[[int, int], None]] = None,
+                      check: Optional[Callable[[], None]] = None,
+                      chunk_size: int = EDITOR_CHUNK) -> Set[int]:
+    """
+    PUT each change set to /api/v3/series/editor, chunk_size series at a
+    time - removals first, so a series never carries two rule tags. Calls
+    progress(done, total) after each request and check() before each (to
+    stop a cancelled job). Returns the ids of series in failed requests.
+    """
+    batches = [
+        (mode, tag_id, ids[i:i + chunk_size])
+        for (mode, tag_id), ids in sorted(changes.items(), key=lambda item: (item[0][0] != 'remove', item[0][1]))
+        for i in range(0, len(ids), chunk_size)
+    ]
+    headers = episeerr_utils.get_sonarr_headers()
+    failed: Set[int] = set()
+    for done, (mode, tag_id, chunk) in enumerate(batches, 1):
+        if check:
+            check()
+        try:
+            resp = episeerr_utils.http.put(
+                f"{episeerr_utils.SONARR_URL}/api/v3/series/editor",
+                headers=headers,
+                json={'seriesIds': chunk, 'tags': [tag_id], 'applyTags': mode},
+                timeout=60
+            )
+            if not resp.ok:
+                logger.warning(f"Series editor {mode} tag {tag_id} for {len(chunk)} series "
+                               f"failed: {resp.status_code}")
+                failed.update(chunk)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Series editor {mode} tag {tag_id} for {len(chunk)} series failed: {e}")
+            failed.update(chunk)
+        if progress:
+            progress(done, len(batches))
+    return failed
+
+
+def _all_series() -> List[dict]:
+    resp = episeerr_utils.http.get(f"{episeerr_utils.SONARR_URL}/api/v3/series",
+                                   headers=episeerr_utils.get_sonarr_headers(), timeout=60)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def sync_rule_tags(assignments: Dict[int, str],
+                   progress: Optional[Callable[[int, int], None]] = None,
+                   check: Optional[Callable[[], None]] = None
+                   ) -> Tuple[List[int], List[int], List[int]]:
+    """
+    Bring the episeerr rule tag of every series in assignments (series id ->
+    rule name) in line with its rule. Returns the series ids (synced,
+    failed, not_found); series that were already right count as synced.
+    Raises if Sonarr's series list can't be fetched.
+    """
+    if not assignments:
+        return [], [], []
+    rule_tag_ids = {}
+    for rule_name in set(assignments.values()):
+        tag_id = episeerr_utils.get_or_create_rule_tag_id(rule_name)
+        if tag_id:
+            rule_tag_ids[rule_name] = tag_id
+        else:
+            logger.error(f"Failed to get/create tag for rule '{rule_name}'")
+
+    changes, not_found = plan_rule_tags(_all_series(), assignments,
+                                        episeerr_utils.get_tag_mapping(), rule_tag_ids)
+    failed = apply_tag_changes(changes, progress=progress, check=check)
+    failed.update(sid for sid, rule in assignments.items()
+                  if rule not in rule_tag_ids and sid not in not_found)
+    synced = sorted(set(assignments) - set(not_found) - failed)
+    logger.info(f"Rule tag sync: {len(synced)} synced, {len(failed)} failed, {len(not_found)} not in Sonarr "
+                f"({sum(len(ids) for ids in changes.values())} tag changes)")
+    return synced, sorted(failed), sorted(not_found)
+
+
+def remove_tag_from_all_series(tag_id: int) -> int:
+    """Strip one tag from every series that has it. Returns how many series
+    it was removed from (raises if the series list can't be fetched)."""
+    tagged = sorted(s['id'] for s in _all_series() if tag_id in s.get('tags', []))
+    if not tagged:
+        return 0
+    failed = apply_tag_changes({('remove', tag_id): tagged})
+    return len(tagged) - len(failed)
@@ -29,6 +29,7 @@ def _load_media_processor():
                  post=mock.MagicMock(), delete=mock.MagicMock(),
                  Session=mock.MagicMock())
     _stub_module('pending_deletions', PendingDeletions=mock.MagicMock())
+    _stub_module('shared_state', ProcessedSet=lambda *a, **k: set())
     _stub_module('servarr_utils')
     _stub_module('episeerr',
                  normalize_url=lambda u: (u or '').rstrip('/'),
@@ -37,6 +38,7 @@ def _load_media_processor():
                  load_global_settings=lambda: {})
     _stub_module('episeerr_utils',
                  reconcile_series_drift=lambda sid, cfg, series_data=None: (None, False),
+                 is_upstream_available=lambda url: True,
                  http=mock.MagicMock())
     _stub_module('logging_config', main_logger=mock.MagicMock())
     _stub_module('settings_db',
@@ -0,0 +1,141 @@
+"""
+Tests for media_processor's compiled always_have / anchor protection -
+expression matching (ranges, wildcards, pilot alias), +/- activation
+semantics, sequential mode and per-series compilation from config.
+Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_anchor_protection -v
+
+media_processor imports normalize_url from episeerr (and through it the
+whole Flask app); a fake 'episeerr' module is installed just for that
+import.
+"""
+
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_anchor_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+_fake_episeerr = types.ModuleType('episeerr')
+_fake_episeerr.normalize_url = lambda url: (url or '').rstrip('/')
+
+with patch.dict(sys.modules, {'episeerr': _fake_episeerr}):
+    import media_processor
+
+
+def ep(season, episode):
+    return {'seasonNumber': season, 'episodeNumber': episode}
+
+
+def config_for(rule, series_data=None):
+    rule = dict(rule, series={'42': series_data or {}})
+    return {'rules': {'test': rule}}
+
+
+class ExpressionMatchTest(unittest.TestCase):
+    def assertMatches(self, expression, season, episode, expected=True):
+        self.assertEqual(
+            media_processor.is_protected_by_expression(season, episode, expression), expected,
+            f"{expression!r} S{season}E{episode}"
+        )
+
+    def test_syntax(self):
+        self.assertMatches('all', 7, 3)
+        self.assertMatches('s2', 2, 9)
+        self.assertMatches('s2', 3, 1, False)
+        self.assertMatches('s1e1-5', 1, 5)
+        self.assertMatches('s1e1-5', 1, 6, False)
+        self.assertMatches('s1e1-5', 2, 3, False)
+        self.assertMatches('s1-3', 3, 12)
+        self.assertMatches('s1-3', 4, 1, False)
+        self.assertMatches('s*e1', 9, 1)
+        self.assertMatches('e2', 4, 2)
+        self.assertMatches('pilot', 1, 1)
+        self.assertMatches('S1E2+-, s3', 1, 2)
+        self.assertMatches('s3, s1e2+-', 3, 4)
+
+    def test_invalid_parts_are_ignored(self):
+        self.assertMatches('s1e, sx, s1e1-x, foo', 1, 1, False)
+        self.assertMatches('', 1, 1, False)
+
+    def test_huge_ranges_are_bounds_not_sets(self):
+        self.assertMatches('s1e1-1000000000', 1, 999999999)
+        self.assertMatches('s1e1-1000000000', 2, 5, False)
+        self.assertMatches('s2-1000000000', 123456789, 1)
+        self.assertMatches('s2-1000000000', 1, 1, False)
+
+    def test_expression_compiled_once(self):
+        media_processor.compile_always_have.cache_clear()
+        for n in range(1, 50):
+            media_processor.is_protected_by_expression(1, n, 's1e1-10')
+        self.assertEqual(media_processor.compile_always_have.cache_info().misses, 1)
+
+
+class AnchorProtectionTest(unittest.TestCase):
+    def protection(self, rule, series_data=None, **kwargs):
+        return media_processor.get_anchor_protection(42, config_for(rule, series_data), **kwargs)
+
+    def test_series_without_rule_has_no_anchors(self):
+        protection = media_processor.get_anchor_protection(7, config_for({'keep_pilot': True}))
+        self.assertFalse(protection.is_anchor(ep(1, 1)))
+
+    def test_keep_pilot_survives_dormant_bypass(self):
+        protection = self.protection({'keep_pilot': True, 'always_have': 's2'},
+                                     check_always_have=False)
+        self.assertTrue(protection.is_anchor(ep(1, 1)))
+        self.assertFalse(protection.is_anchor(ep(2, 1)))
+
+    def test_no_modifier_and_plus_always_anchor(self):
+        for expression in ('s1e1-3', 's1e1-3+'):
+            protection = self.protection({'always_have': expression})
+            self.assertTrue(protection.is_anchor(ep(1, 2)), expression)
+            self.assertFalse(protection.is_anchor(ep(1, 4)), expression)
+
+    def test_minus_only_never_anchors(self):
+        protection = self.protection({'always_have': 's1-'})
+        self.assertFalse(protection.is_anchor(ep(1, 1)))
+
+    def test_plus_minus_anchors_only_held_seasons(self):
+        protection = self.protection(
+            {'always_have': 's*e1+-'},
+            {'activation_seasons': {'1': 'active', '2': 'held'}}
+        )
+        self.assertFalse(protection.is_anchor(ep(1, 1)))
+        self.assertTrue(protection.is_anchor(ep(2, 1)))
+        self.assertFalse(protection.is_anchor(ep(3, 1)))
+
+    def test_sequential_anchors_activation_ep_of_grabbed_seasons(self):
+        protection = self.protection(
+            {'always_have': 'e1+'},
+            {'activation_seasons': {'1': 'active', '2': 'held'}}
+        )
+        self.assertTrue(protection.is_anchor(ep(1, 1)))
+        self.assertTrue(protection.is_anchor(ep(2, 1)))
+        self.assertFalse(protection.is_anchor(ep(2, 2)))
+        self.assertFalse(protection.is_anchor(ep(3, 1)))
+
+    def test_cached_per_rule_and_activation_state(self):
+        rule = {'always_have': 's1+-'}
+        held = self.protection(rule, {'activation_seasons': {'1': 'held'}})
+        self.assertIs(held, self.protection(rule, {'activation_seasons': {'1': 'held'}}))
+        active = self.protection(rule, {'activation_seasons': {'1': 'active'}})
+        self.assertIsNot(held, active)
+        self.assertFalse(active.is_anchor(ep(1, 1)))
+
+    def test_is_anchor_episode_uses_given_protection(self):
+        protection = self.protection({'keep_pilot': True})
+        with patch.object(media_processor, 'load_config', side_effect=AssertionError('config read')):
+            self.assertTrue(media_processor.is_anchor_episode(ep(1, 1), 42, protection=protection))
+            self.assertFalse(media_processor.is_anchor_episode(ep(1, 2), 42, protection=protection))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Tests for episeerr_utils' per-host circuit breakers on the shared HTTP
+session - opening after consecutive failures, failing fast while open, the
+half-open probe and its backoff. Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_circuit_breaker -v
+
+No network: HTTPAdapter.send is patched underneath the breaker adapter.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_circuit_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import episeerr_utils
+from episeerr_utils import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _response(status):
+    response = requests.Response()
+    response.status_code = status
+    return response
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('tautulli:8181', failure_threshold=2,
+                                      reset_timeout=30, max_reset_timeout=100, clock=self.clock)
+
+    def _trip(self):
+        for _ in range(2):
+            self.assertTrue(self.breaker.allow_request())
+            self.breaker.record_failure('timeout')
+
+    def test_opens_after_consecutive_failures_only(self):
+        self.breaker.record_failure('timeout')
+        self.breaker.record_success()
+        self.breaker.record_failure('timeout')
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.record_failure('timeout')
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        self.assertFalse(self.breaker.is_available())
+
+    def test_single_probe_after_reset_timeout(self):
+        self._trip()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.is_available())
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_failed_probe_reopens_with_longer_timeout(self):
+        self._trip()
+        for expected in (60, 100, 100):
+            self.clock.now += self.breaker.reset_timeout
+            self.assertTrue(self.breaker.allow_request())
+            self.breaker.record_failure('timeout')
+            self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+            self.assertEqual(self.breaker.reset_timeout, expected)
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.reset_timeout, 30)
+
+
+class SessionCircuitTest(unittest.TestCase):
+    URL = 'http://tautulli-test:8181/api/v2'
+
+    def setUp(self):
+        episeerr_utils._circuit_breakers.clear()
+        self.addCleanup(episeerr_utils._circuit_breakers.clear)
+
+    def test_dead_host_fails_fast_once_open(self):
+        with patch.object(HTTPAdapter, 'send',
+                          side_effect=requests.exceptions.ConnectTimeout('timed out')) as send:
+            for _ in range(episeerr_utils.CIRCUIT_FAILURE_THRESHOLD):
+                with self.assertRaises(requests.exceptions.ConnectTimeout):
+                    episeerr_utils.http.get(self.URL)
+            with self.assertRaises(CircuitOpenError):
+                episeerr_utils.http.get(self.URL)
+            # Still a ConnectionError for existing handlers
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                episeerr_utils.http.get(self.URL)
+        self.assertEqual(send.call_count, episeerr_utils.CIRCUIT_FAILURE_THRESHOLD)
+        self.assertFalse(episeerr_utils.is_upstream_available(self.URL))
+        self.assertTrue(episeerr_utils.is_upstream_available('http://sonarr-test:8989/api/v3'))
+
+        states = {s['host']: s for s in episeerr_utils.get_circuit_states()}
+        self.assertEqual(states['tautulli-test:8181']['state'], 'open')
+        self.assertEqual(states['tautulli-test:8181']['rejected_requests'], 2)
+
+    def test_gateway_errors_count_but_client_errors_do_not(self):
+        threshold = episeerr_utils.CIRCUIT_FAILURE_THRESHOLD
+        with patch.object(HTTPAdapter, 'send', return_value=_response(404)):
+            for _ in range(threshold + 1):
+                episeerr_utils.http.get(self.URL)
+        self.assertTrue(episeerr_utils.is_upstream_available(self.URL))
+
+        with patch.object(HTTPAdapter, 'send', return_value=_response(503)):
+            for _ in range(threshold):
+                self.assertEqual(episeerr_utils.http.get(self.URL).status_code, 503)
+        self.assertFalse(episeerr_utils.is_upstream_available(self.URL))
+
+
+if __name__ == '__main__':
+    unittest.main()
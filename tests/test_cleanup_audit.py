@@ -0,0 +1,143 @@
+"""
+Tests for cleanup_audit.py and the media_processor delete paths that feed
+it - dry-run queueing, live deletions and failures become rows with phase,
+rule, episode ids and bytes, old rows are pruned, and the aggregates sum
+bytes per rule per day and episodes per phase. Self-contained stdlib
+unittest, run with:
+
+    python3 -m unittest tests.test_cleanup_audit -v
+
+media_processor imports normalize_url from episeerr (and through it the
+whole Flask app); a fake 'episeerr' module is installed just for that
+import.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_cleanup_audit_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+# Imported first: patch.dict drops modules first imported inside it
+import cleanup_audit
+import pending_deletions
+import settings_db
+
+_fake_episeerr = types.ModuleType('episeerr')
+_fake_episeerr.normalize_url = lambda url: (url or '').rstrip('/')
+
+with patch.dict(sys.modules, {'episeerr': _fake_episeerr}):
+    import media_processor
+
+
+def episodes(*ids, size=1000):
+    return [{'id': i, 'episodeFileId': i + 500, 'seasonNumber': 1, 'episodeNumber': i,
+             'title': f'Ep {i}', 'size': size} for i in ids]
+
+
+class CleanupAuditTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_cleanup_audit_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+
+    def test_live_deletion_records_deleted_and_failed_batches(self):
+        def delete(url, headers=None):
+            response = MagicMock()
+            response.raise_for_status.side_effect = Exception('404') if url.endswith('/503') else None
+            return response
+
+        with patch.object(media_processor, 'load_global_settings', return_value={'dry_run_mode': False}), \
+                patch.object(media_processor.http, 'delete', side_effect=delete):
+            media_processor.delete_episodes_in_sonarr_with_logging(
+                episodes(1, 2, 3), 42, False, 'Andor', reason='Grace Unwatched (14d)',
+                rule_name='binge', phase='grace_unwatched')
+
+        rows = {row['outcome']: row for row in cleanup_audit.recent()}
+        self.assertEqual(sorted(rows), ['deleted', 'failed'])
+        self.assertEqual(rows['deleted']['episode_ids'], [1, 2])
+        self.assertEqual(rows['deleted']['bytes'], 2000)
+        self.assertEqual(rows['deleted']['rule'], 'binge')
+        self.assertEqual(rows['deleted']['phase'], 'grace_unwatched')
+        self.assertEqual(rows['failed']['episode_ids'], [3])
+        self.assertIsNotNone(rows['deleted']['duration'])
+
+    def test_dry_run_records_queued_batch_with_sonarr_sizes(self):
+        eps = [{k: v for k, v in ep.items() if k != 'size'} for ep in episodes(4, 5)]
+        with patch.object(media_processor, 'load_global_settings', return_value={'dry_run_mode': True}), \
+                patch.object(media_processor, '_get_episode_file_sizes', return_value={504: 10, 505: 20}), \
+                patch.object(pending_deletions, 'queue_deletion'), \
+                patch.object(media_processor.http, 'delete', side_effect=AssertionError('no delete')):
+            media_processor.delete_episodes_immediately(eps, 42, 'Andor', rule_name='keep2')
+
+        (row,) = cleanup_audit.recent()
+        self.assertEqual((row['phase'], row['outcome'], row['dry_run']), ('keep', 'queued', 1))
+        self.assertEqual(row['bytes'], 30)
+
+    def test_multi_episode_file_counted_once(self):
+        eps = episodes(6, 7)
+        eps[1]['episodeFileId'] = eps[0]['episodeFileId']   # S01E06-E07 in one file
+        with patch.object(media_processor, 'load_global_settings', return_value={'dry_run_mode': True}), \
+                patch.object(pending_deletions, 'queue_deletion'):
+            media_processor.delete_episodes_immediately(eps, 42, 'Andor', rule_name='keep2')
+
+        (row,) = cleanup_audit.recent()
+        self.assertEqual(row['episode_ids'], [6, 7])
+        self.assertEqual(row['bytes'], 1000)
+
+    def test_multi_episode_file_subtracted_once_from_rule_stats(self):
+        eps = episodes(6, 7)
+        eps[1]['episodeFileId'] = eps[0]['episodeFileId']
+        with patch.object(media_processor, 'load_global_settings', return_value={'dry_run_mode': False}), \
+                patch.object(media_processor.http, 'delete'), \
+                patch.object(media_processor.rule_stats, 'adjust_files') as adjust_files:
+            media_processor.delete_episodes_immediately(eps, 42, 'Andor', rule_name='keep2')
+            media_processor.delete_episodes_in_sonarr_with_logging(eps, 42, False, 'Andor', rule_name='binge')
+
+        self.assertEqual([c.kwargs['bytes_'] for c in adjust_files.call_args_list], [-1000, -1000])
+
+    def test_phase_rows_and_aggregates(self):
+        cleanup_audit.start_run()
+        with cleanup_audit.phase('grace_unwatched'):
+            cleanup_audit.record('grace_unwatched', 'deleted', rule='binge', episode_ids=[1, 2], bytes_=300)
+            cleanup_audit.record('grace_unwatched', 'deleted', rule='slow', episode_ids=[3], bytes_=50)
+        cleanup_audit.record('dormant', 'queued', rule='binge', episode_ids=[4], bytes_=70, dry_run=True)
+
+        per_phase = cleanup_audit.deletions_per_phase(30)
+        self.assertEqual(per_phase['grace_unwatched']['deleted'], {'batches': 2, 'episodes': 3, 'bytes': 350})
+        self.assertEqual(per_phase['grace_unwatched']['runs']['count'], 1)
+        self.assertEqual(per_phase['dormant']['queued']['bytes'], 70)
+
+        per_rule = cleanup_audit.bytes_per_rule_per_day(30)
+        self.assertEqual({(r['rule'], r['bytes']) for r in per_rule}, {('binge', 300), ('slow', 50)})
+
+        summary = cleanup_audit.summary(30)
+        self.assertEqual((summary['deleted_bytes'], summary['queued_bytes']), (350, 70))
+        self.assertEqual(len({row['run_id'] for row in cleanup_audit.recent()}), 1)
+
+    def test_old_rows_pruned_on_insert(self):
+        old = time.time() - (cleanup_audit.RETENTION_DAYS + 1) * 86400
+        with patch.object(cleanup_audit.time, 'time', return_value=old):
+            cleanup_audit.record('dormant', 'deleted', episode_ids=[1], bytes_=5)
+        cleanup_audit.record('dormant', 'deleted', episode_ids=[2], bytes_=5)
+        self.assertEqual([row['episode_ids'] for row in cleanup_audit.recent()], [[2]])
+
+    def test_recording_never_raises(self):
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'missing', 'settings.db')
+        cleanup_audit.record('dormant', 'deleted', episode_ids=[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
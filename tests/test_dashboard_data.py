@@ -0,0 +1,116 @@
+"""
+Tests for dashboard_data.py - synchronous first build, stale-while-revalidate
+rebuilds, keeping the last snapshot when a rebuild fails, and only refreshing
+sources someone is looking at. Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_dashboard_data -v
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dashboard_data
+
+
+class Builder:
+    """Returns 1, 2, 3... per call; can be made to block or fail."""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.release = threading.Event()
+        self.release.set()
+        self.done = threading.Event()
+
+    def __call__(self):
+        self.release.wait(5)
+        self.calls += 1
+        self.done.set()
+        if self.fail:
+            raise RuntimeError('Sonarr down')
+        return self.calls
+
+
+class DashboardDataServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.service = dashboard_data.DashboardDataService()
+        patcher = patch.object(self.service, '_ensure_refresher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.builder = Builder()
+        self.service.register('calendar', self.builder, interval=60)
+
+    def _make_stale(self):
+        self.service._sources['calendar'].built_at -= 120
+
+    def _wait_for_rebuild(self):
+        self.assertTrue(self.builder.done.wait(5))
+        deadline = time.time() + 5
+        while self.service._sources['calendar'].refreshing and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_first_get_builds_then_serves_snapshot(self):
+        self.assertEqual(self.service.get('calendar')[0], 1)
+        value, age = self.service.get('calendar')
+        self.assertEqual(value, 1)
+        self.assertLess(age, 60)
+        self.assertEqual(self.builder.calls, 1)
+
+    def test_first_build_failure_is_raised(self):
+        self.builder.fail = True
+        with self.assertRaises(RuntimeError):
+            self.service.get('calendar')
+
+    def test_stale_snapshot_served_while_rebuilding(self):
+        self.service.get('calendar')
+        self._make_stale()
+        self.builder.release.clear()
+        self.builder.done.clear()
+
+        value, age = self.service.get('calendar')
+        self.assertEqual(value, 1)
+        self.assertGreaterEqual(age, 120)
+
+        self.builder.release.set()
+        self._wait_for_rebuild()
+        self.assertEqual(self.service.get('calendar')[0], 2)
+
+    def test_failed_rebuild_keeps_previous_snapshot(self):
+        self.service.get('calendar')
+        self._make_stale()
+        self.builder.fail = True
+        self.builder.done.clear()
+
+        self.service.get('calendar')
+        self._wait_for_rebuild()
+        value, age = self.service.get('calendar')
+        self.assertEqual(value, 1)
+        self.assertGreaterEqual(age, 120)
+
+    def test_refresh_due_skips_idle_sources(self):
+        self.service.get('calendar')
+        self._make_stale()
+        self.service._sources['calendar'].last_requested -= dashboard_data.IDLE_SECONDS + 1
+        self.service.refresh_due()
+        self.assertFalse(self.service._sources['calendar'].refreshing)
+        self.assertEqual(self.builder.calls, 1)
+
+    def test_invalidate_triggers_rebuild_on_next_get(self):
+        self.service.get('calendar')
+        self.builder.release.clear()
+        self.builder.done.clear()
+        self.service.invalidate('calendar')
+        self.assertEqual(self.service.get('calendar')[0], 1)
+        self.builder.release.set()
+        self._wait_for_rebuild()
+        self.assertEqual(self.builder.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Tests for disk_forecast.py - samples thinned to one per hour after
+RAW_HOURS and pruned after RETENTION_DAYS, the ingest rate counting only
+drops, the crossing forecast with queued downloads, the bring-forward
+cooldown and the forecast-raised storage gate. Self-contained stdlib
+unittest, run with:
+
+    python3 -m unittest tests.test_disk_forecast -v
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_disk_forecast_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import disk_forecast
+import settings_db
+
+HOUR = 3600
+
+
+class DiskForecastTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_disk_forecast_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+        # On an hour boundary so the per-hour thinning is predictable
+        self.now = (time.time() // HOUR) * HOUR
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+
+    def sample(self, hours_ago, free_gb):
+        disk_forecast.record_sample(free_gb, 1000, at=self.now - hours_ago * HOUR, instance='default')
+
+    def test_old_samples_thinned_and_pruned(self):
+        self.sample(disk_forecast.RETENTION_DAYS * 24 + 1, 900)     # past retention
+        for minutes in (0, 15, 30, 45):                            # one hour, 72h ago
+            disk_forecast.record_sample(800, 1000, at=self.now - 72 * HOUR + minutes * 60, instance='default')
+        self.sample(1, 700)
+        self.sample(0.5, 690)
+        self.sample(0, 680)
+
+        samples = disk_forecast.get_samples(disk_forecast.RETENTION_DAYS * 24, 'default', self.now)
+        self.assertEqual([s['free_gb'] for s in samples], [800, 700, 690, 680])
+        self.assertEqual(samples[0]['at'], self.now - 72 * HOUR)
+        self.assertEqual(disk_forecast.last_sample_at('default'), self.now)
+
+    def test_ingest_rate_counts_drops_only(self):
+        samples = [{'at': 0, 'free_gb': 100}, {'at': HOUR, 'free_gb': 90},
+                   {'at': 2 * HOUR, 'free_gb': 150},                   # a cleanup freed space
+                   {'at': 4 * HOUR, 'free_gb': 130}]
+        self.assertAlmostEqual(disk_forecast.ingest_rate(samples), 30 / 4)
+        self.assertIsNone(disk_forecast.ingest_rate(samples[:1]))
+        self.assertIsNone(disk_forecast.ingest_rate([{'at': 0, 'free_gb': 5}, {'at': 600, 'free_gb': 4}]))
+
+    def test_forecast_with_rate_and_queue(self):
+        for hours_ago, free in ((4, 140), (2, 130), (0, 120)):           # 5 GB/h
+            self.sample(hours_ago, free)
+        fc = disk_forecast.forecast(120, 100, queued_gb=10, horizon_hours=3, interval_hours=6,
+                                    instance='default', now=self.now)
+        self.assertEqual(fc['rate_gb_per_hour'], 5)
+        self.assertEqual(fc['hours_to_threshold'], 2)
+        self.assertTrue(fc['within_horizon'])
+        self.assertEqual(fc['headroom_gb'], 10 + 5 * 6)
+
+        later = disk_forecast.forecast(120, 100, queued_gb=0, horizon_hours=3, instance='default', now=self.now)
+        self.assertEqual(later['hours_to_threshold'], 4)
+        self.assertFalse(later['within_horizon'])
+
+        # Queued downloads alone take it below; no history needed
+        queue_only = disk_forecast.forecast(120, 100, queued_gb=25, instance='other', now=self.now)
+        self.assertEqual(queue_only['hours_to_threshold'], 0)
+        self.assertIsNone(queue_only['rate_gb_per_hour'])
+        self.assertIsNone(disk_forecast.forecast(120, 100, instance='other', now=self.now)['hours_to_threshold'])
+
+    def test_bring_forward_cooldown(self):
+        fc = {'within_horizon': True}
+        self.assertTrue(disk_forecast.should_bring_forward(fc, None, self.now))
+        self.assertFalse(disk_forecast.should_bring_forward(fc, self.now - 60, self.now))
+        self.assertTrue(disk_forecast.should_bring_forward(
+            fc, self.now - disk_forecast.BRING_FORWARD_COOLDOWN_SECONDS, self.now))
+        self.assertFalse(disk_forecast.should_bring_forward({'within_horizon': False}, None, self.now))
+
+    def test_gate_raised_only_by_fresh_matching_forecast(self):
+        self.assertEqual(disk_forecast.gate_threshold_gb(100, 'default', self.now), 100)
+        disk_forecast.save_forecast({'at': self.now, 'min_gb': 100, 'within_horizon': True,
+                                     'headroom_gb': 25}, 'default')
+        self.assertEqual(disk_forecast.gate_threshold_gb(100, 'default', self.now), 125)
+        self.assertEqual(disk_forecast.gate_threshold_gb(150, 'default', self.now), 150)   # gate changed
+        self.assertIsNone(disk_forecast.gate_threshold_gb(None, 'default', self.now))
+        stale = self.now + disk_forecast.FORECAST_MAX_AGE_SECONDS + 1
+        self.assertEqual(disk_forecast.gate_threshold_gb(100, 'default', stale), 100)
+        self.assertEqual(disk_forecast.gate_threshold_gb(100, 'other', self.now), 100)
+
+    def test_recording_never_raises(self):
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'missing', 'settings.db')
+        disk_forecast.record_sample(10, 100, instance='default')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+Tests for integrations/_docker_events.py - a full listing seeds the map,
+events refresh only the container they name, the stream window ends in a
+resync, and an unreachable Docker reads as not live. Self-contained stdlib
+unittest, run with:
+
+    python3 -m unittest tests.test_docker_events -v
+
+integrations/__init__ discovers (and so imports) every integration, which
+loads the whole Flask app; a bare 'integrations' package is installed just
+for the import of the monitor module.
+"""
+
+import os
+import sys
+import threading
+import time
+import types
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_bare_integrations = types.ModuleType('integrations')
+_bare_integrations.__path__ = [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                            'integrations')]
+
+with patch.dict(sys.modules, {'integrations': _bare_integrations}):
+    from integrations._docker_events import ContainerStateMonitor
+
+HOST = 'unix:///var/run/docker.sock'
+
+
+def container(cid, name, state='running', port=None):
+    return {'Id': cid, 'Names': [f'/{name}'], 'State': state, 'Image': f'lscr.io/{name}',
+            'Ports': [{'PublicPort': port}] if port else []}
+
+
+class FakeDocker:
+    """Container listing plus a scripted event stream."""
+
+    def __init__(self, containers):
+        self.state = {c['Id']: c for c in containers}
+        self.list_calls = []
+        self.streams = []          # one list of events per stream opened
+        self.stream_params = []
+        self.exhausted = threading.Event()
+
+    def list_containers(self, host, filters=None):
+        self.list_calls.append(filters)
+        if filters:
+            return [dict(self.state[i]) for i in filters['id'] if i in self.state]
+        return [dict(c) for c in self.state.values()]
+
+    def stream_events(self, host, params, timeout):
+        self.stream_params.append(params)
+        if not self.streams:
+            self.exhausted.set()
+            raise ConnectionError('docker went away')
+        for change, event in self.streams.pop(0):
+            change(self.state)
+            yield event
+
+
+def event(cid, action):
+    return {'Type': 'container', 'Action': action, 'Actor': {'ID': cid, 'Attributes': {}}}
+
+
+class ContainerStateMonitorTest(unittest.TestCase):
+    def setUp(self):
+        self.docker = FakeDocker([container('a1', 'sonarr', port=8989),
+                                  container('b2', 'radarr', state='exited')])
+        self.monitor = ContainerStateMonitor(lambda: HOST, self.docker.list_containers,
+                                             self.docker.stream_events, retry_seconds=60)
+
+    def tearDown(self):
+        self.monitor.stop()
+
+    def test_resync_seeds_map(self):
+        self.monitor.resync(HOST)
+        self.assertEqual({c['Id'] for c in self.monitor.containers()}, {'a1', 'b2'})
+        self.assertEqual([c['Id'] for c in self.monitor.containers(running_only=True)], ['a1'])
+        self.assertEqual(self.monitor.status()['resyncs'], 1)
+
+    def test_event_refreshes_only_that_container(self):
+        self.monitor.resync(HOST)
+        self.docker.state['b2']['State'] = 'running'
+        self.docker.state['a1']['State'] = 'exited'   # not reported yet: no event
+        self.monitor.apply_event(HOST, event('b2', 'start'))
+        self.assertEqual(self.docker.list_calls[-1], {'id': ['b2']})
+        states = {c['Id']: c['State'] for c in self.monitor.containers()}
+        self.assertEqual(states, {'a1': 'running', 'b2': 'running'})
+
+    def test_destroy_and_unknown_events(self):
+        self.monitor.resync(HOST)
+        calls = len(self.docker.list_calls)
+        self.monitor.apply_event(HOST, event('b2', 'destroy'))
+        self.monitor.apply_event(HOST, {'Type': 'network', 'Action': 'connect', 'Actor': {'ID': 'n1'}})
+        self.assertEqual(len(self.docker.list_calls), calls)
+        self.assertEqual([c['Id'] for c in self.monitor.containers()], ['a1'])
+
+    def test_readers_get_copies(self):
+        self.monitor.resync(HOST)
+        self.monitor.containers()[0]['State'] = 'mutated'
+        self.assertNotIn('mutated', {c['State'] for c in self.monitor.containers()})
+
+    def test_stream_loop_applies_events_then_goes_stale(self):
+        def add_bazarr(state):
+            state['c3'] = container('c3', 'bazarr')
+        self.docker.streams = [[(add_bazarr, event('c3', 'create'))]]
+        self.monitor.ensure_started()
+        self.assertTrue(self.docker.exhausted.wait(5))
+        deadline = time.monotonic() + 5
+        while self.monitor.status()['live'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # Two full listings (start, then after the window closed) and one per-event fetch
+        self.assertEqual(self.docker.list_calls, [None, {'id': ['c3']}, None])
+        params = self.docker.stream_params[0]
+        self.assertEqual(params['until'] - params['since'], self.monitor.resync_seconds)
+        self.assertIn('"container"', params['filters'])
+        self.assertIn('c3', {c['Id'] for c in self.monitor.containers()})
+        # The second stream failed: the map is kept but no longer trusted
+        self.assertFalse(self.monitor.is_live())
+        self.assertEqual(self.monitor.status()['last_error'], 'docker went away')
+
+    def test_not_live_until_started_or_for_other_host(self):
+        self.monitor.resync(HOST)
+        self.assertFalse(self.monitor.is_live())   # no subscriber thread yet
+
+        opened, release = threading.Event(), threading.Event()
+        self.addCleanup(release.set)
+
+        def held_open_stream(host, params, timeout):
+            opened.set()
+            release.wait(5)
+            return iter(())
+
+        self.monitor._stream_events = held_open_stream
+        self.monitor.ensure_started()
+        self.assertTrue(opened.wait(5))
+        self.assertTrue(self.monitor.is_live())
+        self.assertTrue(self.monitor.is_live(HOST))
+        self.assertFalse(self.monitor.is_live('tcp://10.0.0.5:2375'))
+
+
+if __name__ == '__main__':
+    unittest.main()
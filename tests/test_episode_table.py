@@ -0,0 +1,143 @@
+"""
+Tests for episode_table.py and the media_processor keep-window / next-N
+logic built on it - bisect queries, dict-compatible records, and the same
+decisions the list-scanning code made. Self-contained stdlib unittest, run
+with:
+
+    python3 -m unittest tests.test_episode_table -v
+
+media_processor imports normalize_url from episeerr (and through it the
+whole Flask app); a fake 'episeerr' module is installed just for that
+import.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_table_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+_fake_episeerr = types.ModuleType('episeerr')
+_fake_episeerr.normalize_url = lambda url: (url or '').rstrip('/')
+
+with patch.dict(sys.modules, {'episeerr': _fake_episeerr}):
+    import media_processor
+
+from episode_table import EpisodeTable
+
+
+def sonarr_episodes(layout, with_files=(), air_dates=None):
+    """Sonarr-style dicts for {season: episode_count}, shuffled like an API
+    response. `with_files` is a set of (season, episode)."""
+    episodes = []
+    for season, count in layout.items():
+        for number in range(1, count + 1):
+            episode_id = season * 1000 + number
+            has_file = (season, number) in with_files
+            episodes.append({
+                'id': episode_id, 'seriesId': 42, 'seasonNumber': season, 'episodeNumber': number,
+                'hasFile': has_file, 'episodeFileId': episode_id + 500000 if has_file else 0,
+                'monitored': True, 'title': f'Episode {number}', 'overview': 'x' * 500,
+                'airDateUtc': (air_dates or {}).get((season, number), '2020-01-01T00:00:00Z'),
+                'images': [{'url': 'http://example/img.jpg'}],
+            })
+    random.Random(7).shuffle(episodes)
+    return episodes
+
+
+def ids(episodes):
+    return [ep['id'] for ep in episodes]
+
+
+class EpisodeTableTest(unittest.TestCase):
+    def setUp(self):
+        self.table = EpisodeTable(sonarr_episodes({0: 2, 1: 3, 2: 2}, with_files={(1, 2)}))
+
+    def test_sorted_once_and_queried_by_position(self):
+        self.assertEqual([(ep.seasonNumber, ep.episodeNumber) for ep in self.table][:3],
+                         [(0, 1), (0, 2), (1, 1)])
+        self.assertEqual(ids(self.table.season(1)), [1001, 1002, 1003])
+        self.assertEqual(ids(self.table.through(1, 2)), [1, 2, 1001, 1002])
+        self.assertEqual(ids(self.table.after(1, 3)), [2001, 2002])
+        self.assertEqual(self.table.last_in_season(2).id, 2002)
+        self.assertIsNone(self.table.last_in_season(5))
+        self.assertIsNone(self.table.find(1, 9))
+
+    def test_records_read_like_sonarr_dicts(self):
+        ep = self.table.find(1, 2)
+        self.assertEqual((ep['seasonNumber'], ep.get('episodeFileId'), ep.get('hasFile')), (1, 501002, True))
+        self.assertIsNone(ep.get('overview'))
+        with self.assertRaises(KeyError):
+            ep['overview']
+        self.assertFalse(hasattr(ep, '__dict__'))
+
+
+class KeepWindowTest(unittest.TestCase):
+    ALL_FILES = {(s, e) for s in (1, 2, 3) for e in range(1, 5)}
+
+    def setUp(self):
+        self.episodes = sonarr_episodes({1: 4, 2: 4, 3: 4}, with_files=self.ALL_FILES)
+
+    def test_episodes_leaving_keep_block(self):
+        leaving = media_processor.find_episodes_leaving_keep_block(self.episodes, 'episodes', 3, 2, 2)
+        self.assertEqual(ids(leaving), [1001, 1002, 1003])
+        self.assertEqual(media_processor.find_episodes_leaving_keep_block(self.episodes, 'episodes', 3, 9, 9), [])
+
+    def test_seasons_leaving_keep_block(self):
+        leaving = media_processor.find_episodes_leaving_keep_block(self.episodes, 'seasons', 2, 3, 1)
+        self.assertEqual(ids(leaving), [1001, 1002, 1003, 1004])
+        self.assertEqual(media_processor.find_episodes_leaving_keep_block(self.episodes, 'all', 1, 3, 1), [])
+
+    def test_keep_window(self):
+        kept = media_processor._find_episodes_in_keep_window(self.episodes, 'episodes', 3, 2, 2)
+        self.assertEqual(ids(kept), [1004, 2001, 2002])
+
+    def test_next_season_available(self):
+        future = {(4, 1): '2999-01-01T00:00:00Z'}
+        episodes = sonarr_episodes({1: 2, 4: 1}, air_dates=future)
+        self.assertTrue(media_processor._has_next_season_available(episodes, 1))
+        self.assertFalse(media_processor._has_next_season_available(episodes, 4))
+        aired = sonarr_episodes({1: 2, 2: 1})
+        self.assertFalse(media_processor._has_next_season_available(aired, 1))
+
+
+class NextEpisodesTest(unittest.TestCase):
+    def setUp(self):
+        # Season 4 is missing: the episodes mode stops at the gap
+        self.table = EpisodeTable(sonarr_episodes({1: 3, 2: 2, 3: 2, 5: 2}))
+
+    def next_ids(self, get_type, get_count, season=1, episode=2):
+        with patch.object(media_processor, 'fetch_all_episodes', side_effect=AssertionError('refetched')):
+            return media_processor.fetch_next_episodes_dropdown(42, season, episode, get_type, get_count,
+                                                                 episodes=self.table)
+
+    def test_episodes_mode(self):
+        self.assertEqual(self.next_ids('episodes', 1), [1003])
+        self.assertEqual(self.next_ids('episodes', 4), [1003, 2001, 2002, 3001])
+        self.assertEqual(self.next_ids('episodes', 20), [1003, 2001, 2002, 3001, 3002])
+        self.assertEqual(self.next_ids('episodes', 0), [])
+
+    def test_seasons_mode(self):
+        self.assertEqual(self.next_ids('seasons', 1), [1003])
+        self.assertEqual(self.next_ids('seasons', 2), [1003, 2001, 2002])
+        self.assertEqual(self.next_ids('seasons', 2, episode=3), [2001, 2002, 3001, 3002])
+
+    def test_all_mode(self):
+        self.assertEqual(self.next_ids('all', 0, season=3, episode=1), [3002, 5001, 5002])
+
+    def test_fetches_once_without_a_table(self):
+        with patch.object(media_processor, 'fetch_all_episodes', return_value=self.table) as fetch:
+            media_processor.fetch_next_episodes_dropdown(42, 1, 2, 'seasons', 3)
+        self.assertEqual(fetch.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
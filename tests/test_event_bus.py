@@ -0,0 +1,143 @@
+"""
+Tests for event_bus.py - events published anywhere reach open streams,
+reconnecting streams resume from Last-Event-ID (or are told to resync once
+the gap has been pruned), topic filters apply, and the per-process stream
+cap holds. Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_event_bus -v
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_event_bus_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import settings_db
+import event_bus
+
+
+def read_events(gen, count):
+    """Next `count` SSE messages from a stream as (id, event, data), skipping
+    the retry hint and keep-alive comments."""
+    events = []
+    while len(events) < count:
+        chunk = next(gen)
+        if chunk.startswith(':') or chunk.startswith('retry:'):
+            continue
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+        events.append((int(fields['id']) if 'id' in fields else None,
+                       fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class EventBusTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_event_bus_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+        event_bus._pump._last_id = None
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+
+    def open_stream(self, **kwargs):
+        kwargs.setdefault('max_seconds', 5)
+        kwargs.setdefault('heartbeat', 0.2)
+        gen = event_bus.stream(**kwargs)
+        self.addCleanup(gen.close)
+        return gen
+
+    def test_publish_records_events_in_order(self):
+        first = event_bus.publish('queue', {'event': 'grabbed'})
+        second = event_bus.publish('pending', {'requests': 2})
+        self.assertGreater(second, first)
+        self.assertEqual(event_bus.events_since(0), [(first, 'queue', {'event': 'grabbed'}),
+                                                     (second, 'pending', {'requests': 2})])
+        self.assertEqual(event_bus.bounds(), (first, second))
+        with self.assertRaises(ValueError):
+            event_bus.publish('nonsense', {})
+
+    def test_live_events_reach_open_stream(self):
+        event_bus.publish('activity', {'kind': 'watch'})   # before the stream: not sent
+        gen = self.open_stream()
+        (hello_id, hello, data), = read_events(gen, 1)
+        self.assertEqual(hello, 'hello')
+        self.assertEqual(data['topics'], sorted(event_bus.TOPICS))
+
+        event_id = event_bus.publish('queue', {'event': 'imported', 'series_id': 7})
+        self.assertEqual(read_events(gen, 1),
+                         [(event_id, 'queue', {'event': 'imported', 'series_id': 7})])
+        self.assertGreater(event_id, hello_id)
+        self.assertEqual(event_bus.status()['subscribers'], 1)
+
+        gen.close()
+        self.assertEqual(event_bus.status()['subscribers'], 0)
+
+    def test_topic_filter(self):
+        gen = self.open_stream(topics=['pending'])
+        read_events(gen, 1)   # hello
+        event_bus.publish('activity', {'kind': 'search'})
+        pending_id = event_bus.publish('pending', {'deletions': 3})
+        self.assertEqual(read_events(gen, 1), [(pending_id, 'pending', {'deletions': 3})])
+
+    def test_reconnect_replays_missed_events_once(self):
+        seen = event_bus.publish('activity', {'n': 1})
+        missed = [event_bus.publish('activity', {'n': n}) for n in (2, 3)]
+
+        gen = self.open_stream(last_event_id=seen)
+        self.assertEqual([e[0] for e in read_events(gen, 2)], missed)
+        live = event_bus.publish('activity', {'n': 4})
+        # Replayed events aren't delivered a second time by the pump
+        self.assertEqual(read_events(gen, 1), [(live, 'activity', {'n': 4})])
+
+    def test_pruned_gap_asks_for_resync(self):
+        ids = [event_bus.publish('widget', {'service': 'docker'}) for _ in range(3)]
+        conn = sqlite3.connect(settings_db.DB_PATH)
+        conn.execute('DELETE FROM event_log WHERE id < ?', (ids[2],))
+        conn.commit()
+        conn.close()
+
+        gen = self.open_stream(last_event_id=ids[0] - 1)
+        (_, name, _), = read_events(gen, 1)
+        self.assertEqual(name, 'resync')
+
+    def test_publish_polling_payload(self):
+        event_bus.publish_polling('plex', 42, {'series_name': 'Severance', 'season_number': 2,
+                                              'episode_number': 3}, 'polling', 51.26)
+        (_, topic, data), = event_bus.events_since(0)
+        self.assertEqual(topic, 'polling')
+        self.assertEqual(data, {'source': 'plex', 'session': '42', 'series_title': 'Severance',
+                                'season': 2, 'episode': 3, 'state': 'polling', 'progress': 51.3})
+
+    def test_pending_request_changes_publish_count(self):
+        rid = settings_db.add_pending_request({'title': 'Andor', 'tmdb_id': 1})
+        settings_db.delete_pending_request(rid)
+        settings_db.delete_pending_request(rid)   # nothing deleted: no event
+        counts = [data for _, topic, data in event_bus.events_since(0) if topic == 'pending']
+        self.assertEqual(counts, [{'requests': 1}, {'requests': 0}])
+
+    def test_stream_slots_are_capped(self):
+        acquired = 0
+        try:
+            while acquired <= event_bus.MAX_STREAMS and event_bus.acquire_stream():
+                acquired += 1
+            self.assertEqual(acquired, event_bus.MAX_STREAMS)
+        finally:
+            for _ in range(acquired):
+                event_bus.release_stream()
+        self.assertTrue(event_bus.acquire_stream())
+        event_bus.release_stream()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+Tests for episeerr_utils.CoalescingSession - identical concurrent GETs share
+one request, the optional micro-TTL, writes dropping reused responses, and
+which requests never coalesce. Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_http_coalescing -v
+
+No network: HTTPAdapter.send is patched underneath the session's adapters.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_coalesce_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import episeerr_utils
+
+URL = 'http://sonarr-coalesce:8989/api/v3/series'
+HEADERS = {'X-Api-Key': 'abc'}
+
+
+class FakeSend:
+    """Stands in for HTTPAdapter.send; can block until released."""
+
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.error = None
+
+    def __call__(self, request, **kwargs):
+        with self.lock:
+            self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'[]'
+        response.request = request
+        response.url = request.url
+        return response
+
+
+class CoalescingSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.session = episeerr_utils.CoalescingSession()
+        self.session.mount('http://', episeerr_utils.TimeoutHTTPAdapter())
+        self.send = FakeSend()
+        patcher = patch.object(HTTPAdapter, 'send', side_effect=self.send)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _concurrent_gets(self, count, **kwargs):
+        self.send.release.clear()
+        results = []
+        errors = []
+
+        def _get():
+            try:
+                results.append(self.session.get(URL, headers=HEADERS, **kwargs))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=_get) for _ in range(count)]
+        threads[0].start()
+        self.assertTrue(self.send.started.wait(5))
+        for t in threads[1:]:
+            t.start()
+        # Followers register against the in-flight request before it finishes
+        while self.session.coalescing_stats()['get_requests'] < count:
+            time.sleep(0.001)
+        self.send.release.set()
+        for t in threads:
+            t.join(5)
+        return results, errors
+
+    def test_concurrent_identical_gets_share_one_request(self):
+        results, errors = self._concurrent_gets(5)
+        self.assertEqual(errors, [])
+        self.assertEqual(self.send.calls, 1)
+        self.assertEqual(len({id(r) for r in results}), 1)
+        stats = self.session.coalescing_stats()
+        self.assertEqual(stats['shared_in_flight'], 4)
+        self.assertEqual(stats['requests_saved'], 4)
+
+    def test_errors_are_shared(self):
+        self.send.error = requests.exceptions.ConnectTimeout('timed out')
+        results, errors = self._concurrent_gets(3)
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(self.send.calls, 1)
+
+    def test_different_auth_or_params_are_not_shared(self):
+        self.session.get(URL, headers=HEADERS)
+        self.session.get(URL, headers={'X-Api-Key': 'other'})
+        self.session.get(URL, headers=HEADERS, params={'seriesId': 1})
+        self.assertEqual(self.send.calls, 3)
+
+    def test_different_timeout_or_verify_are_not_shared(self):
+        # A caller with a short timeout never waits on a request sent with a longer one
+        self.session.get(URL, headers=HEADERS, timeout=60, coalesce_ttl=60)
+        self.session.get(URL, headers=HEADERS, timeout=5, coalesce_ttl=60)
+        self.session.get(URL, headers=HEADERS, timeout=5, verify=False, coalesce_ttl=60)
+        self.assertEqual(self.send.calls, 3)
+        self.session.get(URL, headers=HEADERS, timeout=5, coalesce_ttl=60)
+        self.assertEqual(self.send.calls, 3)
+
+    def test_micro_ttl_reuses_until_a_write(self):
+        self.session.get(URL, headers=HEADERS, coalesce_ttl=60)
+        self.session.get(URL, headers=HEADERS, coalesce_ttl=60)
+        self.assertEqual(self.send.calls, 1)
+        self.assertEqual(self.session.coalescing_stats()['shared_recent'], 1)
+
+        self.session.put(URL + '/1', headers=HEADERS, json={'monitored': True})
+        self.session.get(URL, headers=HEADERS, coalesce_ttl=60)
+        self.assertEqual(self.send.calls, 3)
+
+    def test_no_ttl_by_default(self):
+        self.session.get(URL, headers=HEADERS)
+        self.session.get(URL, headers=HEADERS)
+        self.assertEqual(self.send.calls, 2)
+
+    def test_streams_and_opt_out_bypass(self):
+        self.session.get(URL, headers=HEADERS, stream=True, coalesce_ttl=60)
+        self.session.get(URL, headers=HEADERS, stream=True, coalesce_ttl=60)
+        self.session.get(URL, headers=HEADERS, coalesce=False)
+        self.assertEqual(self.send.calls, 3)
+        self.assertEqual(self.session.coalescing_stats()['get_requests'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
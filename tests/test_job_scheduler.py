@@ -0,0 +1,182 @@
+"""
+Tests for job_scheduler.py - due-time calculation, overlap skipping,
+cancellation/timeouts and persisted run history. Self-contained stdlib
+unittest, run with:
+
+    python3 -m unittest tests.test_job_scheduler -v
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_sched_import_')
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import settings_db
+import job_scheduler
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class JobSchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_sched_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+        self.sched = job_scheduler.Scheduler()
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+
+    def test_job_is_not_due_before_initial_delay(self):
+        self.sched.register('j', lambda ctx: None, interval=60, initial_delay=300)
+        self.assertEqual(self.sched.tick(), [])
+
+    def test_due_job_runs_and_history_is_persisted(self):
+        done = threading.Event()
+        self.sched.register('j', lambda ctx: done.set() or 'ok', interval=60)
+        self.assertEqual(self.sched.tick(), ['j'])
+        self.assertTrue(done.wait(2))
+        self.assertTrue(_wait_until(lambda: settings_db.get_job_runs('j')[0]['status'] == 'success'))
+        runs = settings_db.get_job_runs('j')
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(runs[0]['message'], 'ok')
+        self.assertIsNotNone(runs[0]['duration'])
+
+    def test_last_run_restored_from_history_on_register(self):
+        run_id = settings_db.record_job_start('j', 'schedule', started_at=time.time() - 30)
+        settings_db.record_job_finish(run_id, 'success')
+        job = self.sched.register('j', lambda ctx: None, interval=3600)
+        # Ran 30s ago with a 1h interval -> not due yet despite no initial delay
+        self.assertGreater(job.next_due(), time.time() + 3000)
+        self.assertEqual(self.sched.tick(), [])
+
+    def test_overlapping_run_is_skipped(self):
+        release = threading.Event()
+        self.sched.register('j', lambda ctx: release.wait(5), interval=60)
+        self.assertIsNotNone(self.sched.run_now('j'))
+        self.assertIsNone(self.sched.run_now('j'))
+        release.set()
+
+    def test_cancel_marks_run_cancelled(self):
+        def _job(ctx):
+            while True:
+                ctx.check()
+                time.sleep(0.01)
+        self.sched.register('j', _job, interval=None)
+        run_id = self.sched.run_now('j')
+        self.assertTrue(self.sched.cancel('j'))
+        self.assertTrue(_wait_until(lambda: settings_db.get_job_runs('j')[0]['status'] != 'running'))
+        run = settings_db.get_job_runs('j')[0]
+        self.assertEqual((run['id'], run['status']), (run_id, 'cancelled'))
+
+    def test_timeout_cancels_with_timeout_status(self):
+        self.sched.register('j', lambda ctx: ctx.sleep(5), interval=None, timeout=0.05)
+        self.sched.run_now('j')
+        self.assertTrue(_wait_until(lambda: settings_db.get_job_runs('j')[0]['status'] != 'running'))
+        self.assertEqual(settings_db.get_job_runs('j')[0]['status'], 'timeout')
+
+    def test_failed_job_records_error_message(self):
+        def _boom(ctx):
+            raise ValueError('upstream down')
+        self.sched.register('j', _boom, interval=None)
+        self.sched.run_now('j')
+        self.assertTrue(_wait_until(lambda: settings_db.get_job_runs('j')[0]['status'] != 'running'))
+        run = settings_db.get_job_runs('j')[0]
+        self.assertEqual(run['status'], 'failed')
+        self.assertIn('upstream down', run['message'])
+
+    def test_manual_only_job_never_due(self):
+        self.sched.register('j', lambda ctx: None, interval=None)
+        self.assertEqual(self.sched.tick(), [])
+
+    def test_on_cancel_callback_fires(self):
+        fired = threading.Event()
+        self.sched.register('j', lambda ctx: (ctx.on_cancel(fired.set), ctx.sleep(5)), interval=None)
+        self.sched.run_now('j')
+        self.assertTrue(_wait_until(lambda: self.sched.is_job_running('j')))
+        self.sched.cancel('j')
+        self.assertTrue(fired.wait(2))
+
+    def test_follower_queues_run_for_leader(self):
+        ran = threading.Event()
+        leader = self.sched
+        leader.register('j', lambda ctx: ran.set(), interval=None)
+        follower = job_scheduler.Scheduler()
+        follower._follower = True
+        follower.register('j', lambda ctx: self.fail('follower must not run jobs'), interval=None)
+
+        run_id = follower.run_now('j')
+        self.assertIsNotNone(run_id)
+        self.assertEqual(settings_db.get_job_runs('j')[0]['status'], 'queued')
+        self.assertIsNone(follower.run_now('j'))  # already queued, no overlap
+
+        self.assertEqual(leader.tick(), ['j'])
+        self.assertTrue(ran.wait(2))
+        self.assertTrue(_wait_until(lambda: settings_db.get_job_runs('j')[0]['status'] == 'success'))
+        self.assertEqual(settings_db.get_job_runs('j')[0]['id'], run_id)
+
+    def test_follower_cancel_reaches_leader(self):
+        def _job(ctx):
+            while True:
+                ctx.check()
+                time.sleep(0.01)
+        self.sched.register('j', _job, interval=None)
+        follower = job_scheduler.Scheduler()
+        follower._follower = True
+        follower.register('j', _job, interval=None)
+
+        self.sched.run_now('j')
+        self.assertTrue(follower.is_job_running('j'))
+        self.assertTrue(follower.cancel('j'))
+        self.sched.tick()
+        self.assertTrue(_wait_until(lambda: settings_db.get_job_runs('j')[0]['status'] == 'cancelled'))
+
+    def test_progress_visible_to_follower(self):
+        release = threading.Event()
+        def _job(ctx):
+            ctx.progress(40, 'halfway-ish')
+            release.wait(2)
+        self.sched.register('j', _job, interval=None)
+        follower = job_scheduler.Scheduler()
+        follower._follower = True
+        follower.register('j', _job, interval=None)
+
+        self.sched.run_now('j')
+        self.assertTrue(_wait_until(lambda: follower.get_job_status('j')['active_runs']))
+        active = follower.get_job_status('j')['active_runs'][0]
+        self.assertTrue(_wait_until(
+            lambda: follower.get_job_status('j')['active_runs'][0]['progress_message'] == 'halfway-ish'))
+        self.assertEqual(active['trigger'], 'manual')
+        release.set()
+
+    def test_stale_running_rows_marked_interrupted(self):
+        settings_db.record_job_start('j', 'schedule')
+        self.assertEqual(settings_db.mark_interrupted_job_runs(), 1)
+        self.assertEqual(settings_db.get_job_runs('j')[0]['status'], 'interrupted')
+
+    def test_prune_keeps_newest_runs(self):
+        for i in range(5):
+            run_id = settings_db.record_job_start('j', 'schedule', started_at=1000 + i)
+            settings_db.record_job_finish(run_id, 'success', finished_at=1001 + i)
+        settings_db.prune_job_runs('j', keep=2)
+        runs = settings_db.get_job_runs('j')
+        self.assertEqual([r['started_at'] for r in runs], [1004, 1003])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Tests for integrations/_library_index.py and its use by the Trakt watchlist
+sync - O(1) existence lookups, the series -> rule map, memoized add lookups
+and concurrent adds. Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_library_index -v
+
+Importing the integrations package loads every integration, and the
+Jellyfin/Emby ones import media_processor (and through it the whole Flask
+app, which writes config files into the repo); a fake 'media_processor'
+module is installed just for that import.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_library_index_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import settings_db
+settings_db.init_settings_db()
+
+_fake_media_processor = types.ModuleType('media_processor')
+_fake_media_processor.processed_jellyfin_episodes = set()
+_fake_media_processor.get_episode_tracking_key = lambda *args: ':'.join(map(str, args))
+
+with patch.dict(sys.modules, {'media_processor': _fake_media_processor}):
+    from integrations._library_index import LibraryIndex
+    from integrations import trakt
+
+
+SERIES = [{'id': 1, 'title': 'Show A', 'tmdbId': 100, 'tvdbId': 1000},
+          {'id': 2, 'title': 'Show B', 'tmdbId': 0, 'tvdbId': 2000}]
+MOVIES = [{'id': 7, 'title': 'Movie A', 'tmdbId': 500, 'hasFile': True}]
+RULES = {'default': {'series': {'1': {}}}, 'other': {'series': {}}}
+
+
+class LibraryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = LibraryIndex(SERIES, MOVIES, RULES)
+
+    def test_series_found_by_tmdb_or_tvdb(self):
+        self.assertEqual(self.index.find_series(tmdb_id='100')['id'], 1)
+        self.assertEqual(self.index.find_series(tvdb_id=2000)['id'], 2)
+        self.assertEqual(self.index.find_series(tmdb_id=999, tvdb_id=2000)['id'], 2)
+        self.assertIsNone(self.index.find_series(tmdb_id=999))
+
+    def test_movie_lookup(self):
+        self.assertEqual(self.index.find_movie(500)['id'], 7)
+        self.assertIsNone(self.index.find_movie(None))
+
+    def test_rule_for_series(self):
+        self.assertEqual(self.index.rule_for_series(1), 'default')
+        self.assertIsNone(self.index.rule_for_series(2))
+
+    def test_memo_loads_once_across_threads(self):
+        calls = []
+
+        def _loader():
+            calls.append(1)
+            time.sleep(0.02)
+            return 42
+
+        threads = [threading.Thread(target=self.index.memo, args=('profile', _loader))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.index.memo('profile', _loader), 42)
+        self.assertEqual(len(calls), 1)
+
+
+class TraktSyncWithIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.integration = trakt.TraktIntegration()
+        self.added = []
+        self.lock = threading.Lock()
+
+        def _add_tv(item, index=None):
+            self.assertIsNotNone(index)
+            with self.lock:
+                self.added.append(item['tmdb_id'])
+            return {'success': True, 'status': 'added', 'series_id': 9}
+
+        patches = [
+            patch.object(self.integration, '_get_trakt_config', return_value={'access_token': 't'}),
+            patch.object(self.integration, 'fetch_watchlist_shows', return_value=[
+                {'title': 'Show A', 'tmdb_id': 100, 'media_type': 'show'},
+                {'title': 'Show New', 'tmdb_id': 101, 'media_type': 'show'},
+                {'title': 'Show New 2', 'tmdb_id': 102, 'media_type': 'show'},
+            ]),
+            patch.object(self.integration, 'fetch_watchlist_movies', return_value=[
+                {'title': 'Movie A', 'tmdb_id': 500, 'media_type': 'movie'},
+            ]),
+            patch.object(self.integration, '_add_tv_to_sonarr', side_effect=_add_tv),
+            patch.object(self.integration, '_check_sonarr', side_effect=AssertionError('per-item lookup')),
+            patch.object(self.integration, '_check_radarr', side_effect=AssertionError('per-item lookup')),
+            patch.object(trakt.LibraryIndex, 'build', return_value=LibraryIndex(SERIES, MOVIES)),
+            patch.object(trakt, '_load_sync_data', return_value={
+                'synced_items': {}, 'stats': {'total_synced_tv': 0, 'total_synced_movies': 0}}),
+            patch.object(trakt, '_save_sync_data'),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_existing_items_resolved_from_index_and_new_ones_added(self):
+        results = self.integration.sync_watchlist()
+        self.assertEqual(results['already_exists'], 2)
+        self.assertEqual(results['added_tv'], 2)
+        self.assertEqual(sorted(self.added), [101, 102])
+        self.assertEqual([i['title'] for i in results['items']],
+                         ['Show A', 'Show New', 'Show New 2', 'Movie A'])
+
+
+if __name__ == '__main__':
+    unittest.main()
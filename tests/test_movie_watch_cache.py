@@ -0,0 +1,145 @@
+"""
+Tests for movie_processor.build_movie_watch_cache() - persisted per-source
+entries, incremental refresh from the high-water mark, periodic full
+rebuilds and keeping old entries when a source fails. Self-contained stdlib
+unittest, run with:
+
+    python3 -m unittest tests.test_movie_watch_cache -v
+
+movie_processor imports a few helpers from media_processor (and through it
+the whole Flask app); a fake 'media_processor' module is installed just for
+that import. The per-source builders are patched, so no server is contacted.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_movie_cache_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+_global_settings = {}
+_fake_media_processor = types.ModuleType('media_processor')
+_fake_media_processor.setup_cleanup_logging = lambda: logging.getLogger('test_cleanup')
+_fake_media_processor.load_config = lambda: {}
+_fake_media_processor.load_global_settings = lambda: _global_settings
+_fake_media_processor.parse_date_fixed = lambda value: value
+
+with patch.dict(sys.modules, {'media_processor': _fake_media_processor}):
+    import movie_processor
+
+_real_build_plex_watch_cache = movie_processor._build_plex_watch_cache
+
+
+class FakeSource:
+    """Stands in for one _build_*_watch_cache function; records each `since`."""
+
+    def __init__(self, result=None):
+        self.result = result
+        self.calls = []
+
+    def __call__(self, *args):
+        since = args[-1] if args else None
+        self.calls.append(since)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class BuildMovieWatchCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_movie_cache_test_')
+        _global_settings.clear()
+        self.plex = FakeSource({'100': 1_000_000})
+        self.jellyfin = FakeSource(None)   # not configured
+        self.tautulli = FakeSource({'some movie': 900_000})
+        patches = [
+            patch.object(movie_processor, 'MOVIE_WATCH_CACHE_FILE',
+                         os.path.join(self.tmpdir, 'movie_watch_cache.json')),
+            patch.object(movie_processor, 'MOVIE_WATCH_EVENTS_FILE',
+                         os.path.join(self.tmpdir, 'movie_watch_events.json')),
+            patch.object(movie_processor, '_build_plex_watch_cache', self.plex),
+            patch.object(movie_processor, '_build_jellyfin_emby_watch_cache', self.jellyfin),
+            patch.object(movie_processor, '_build_tautulli_watch_cache', self.tautulli),
+            # movie_processor may already have been imported with the real
+            # media_processor by another test module
+            patch.object(movie_processor, 'load_global_settings', lambda: _global_settings),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_first_build_is_full_and_persisted(self):
+        tmdb, titles, sources = movie_processor.build_movie_watch_cache()
+        self.assertEqual(tmdb, {'100': 1_000_000})
+        self.assertEqual(titles, {'some movie': 900_000})
+        self.assertEqual(sources, ['Plex', 'Tautulli'])
+        self.assertEqual(self.plex.calls, [None])
+        state = movie_processor._load_watch_cache_state()
+        self.assertEqual(state['sources']['Plex']['high_water'], 1_000_000)
+        self.assertNotIn('Jellyfin', state['sources'])
+
+    def test_next_build_is_incremental_from_high_water(self):
+        movie_processor.build_movie_watch_cache()
+        self.plex.result = {'200': 1_000_500}
+        tmdb, _, _ = movie_processor.build_movie_watch_cache()
+        self.assertEqual(self.plex.calls[-1], 1_000_000 - movie_processor._HIGH_WATER_OVERLAP)
+        self.assertEqual(tmdb, {'100': 1_000_000, '200': 1_000_500})
+
+    def test_full_rebuild_when_due_replaces_entries(self):
+        movie_processor.build_movie_watch_cache()
+        _global_settings['movie_watch_full_rebuild_hours'] = 0
+        self.plex.result = {'200': 1_000_500}
+        tmdb, _, _ = movie_processor.build_movie_watch_cache()
+        self.assertIsNone(self.plex.calls[-1])
+        self.assertEqual(tmdb, {'200': 1_000_500})
+
+    def test_failed_source_keeps_previous_entries(self):
+        movie_processor.build_movie_watch_cache()
+        self.plex.result = RuntimeError('Plex down')
+        tmdb, _, sources = movie_processor.build_movie_watch_cache()
+        self.assertEqual(tmdb, {'100': 1_000_000})
+        self.assertIn('Plex', sources)
+
+    def test_failed_plex_section_keeps_previous_entries_on_full_rebuild(self):
+        movie_processor.build_movie_watch_cache()
+        _global_settings['movie_watch_full_rebuild_hours'] = 0
+
+        def get(url, **kwargs):
+            resp = types.SimpleNamespace(ok=True, raise_for_status=lambda: None)
+            if url.endswith('/library/sections'):
+                resp.json = lambda: {'MediaContainer': {'Directory': [
+                    {'key': '1', 'type': 'movie'}, {'key': '2', 'type': 'movie'}]}}
+            elif '/sections/1/' in url:
+                resp.json = lambda: {'MediaContainer': {'Metadata': [
+                    {'lastViewedAt': 1_000_500, 'Guid': [{'id': 'tmdb://200'}]}]}}
+            else:
+                def raise_for_status():
+                    raise RuntimeError('500 Server Error')
+                resp.ok, resp.raise_for_status = False, raise_for_status
+            return resp
+
+        with patch.object(movie_processor, '_build_plex_watch_cache', _real_build_plex_watch_cache), \
+                patch.object(movie_processor, 'get_plex_settings', lambda: ('http://plex', 'token')), \
+                patch.object(movie_processor.http, 'get', get):
+            tmdb, _, _ = movie_processor.build_movie_watch_cache()
+        self.assertEqual(tmdb, {'100': 1_000_000})
+        state = movie_processor._load_watch_cache_state()
+        self.assertEqual(state['sources']['Plex']['high_water'], 1_000_000)
+
+    def test_webhook_events_still_win(self):
+        movie_processor.record_movie_watched('100', 'Some Movie')
+        tmdb, _, sources = movie_processor.build_movie_watch_cache()
+        self.assertGreater(tmdb['100'], 1_000_000)
+        self.assertEqual(sources[-1], 'Webhook')
+
+
+if __name__ == '__main__':
+    unittest.main()
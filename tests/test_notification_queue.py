@@ -0,0 +1,190 @@
+"""
+Tests for notification_queue.py and the notifications.py paths that feed
+it - posts wait out the coalescing window and go out as one digest, the
+Discord message id is stored per episode, Discord's rate-limit headers and
+429s hold the queue, failures back off and are dropped, and a grab cancels
+or deletes the search-pending message. Self-contained stdlib unittest, run
+with:
+
+    python3 -m unittest tests.test_notification_queue -v
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_notification_queue_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import notification_queue
+import notification_storage
+import notifications
+import settings_db
+
+WEBHOOK = 'https://discord.com/api/webhooks/123/token'
+
+
+def response(status=200, body=None, headers=None):
+    r = MagicMock()
+    r.status_code = status
+    r.ok = 200 <= status < 300
+    r.json.return_value = body or {}
+    r.headers = headers or {}
+    r.text = json.dumps(body or {})
+    return r
+
+
+class NotificationQueueTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Importing episeerr elsewhere in the suite starts the real sender
+        notification_queue.stop_sender()
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_notification_queue_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+        notification_queue._blocked_until = 0.0
+        patches = [patch.object(notifications, 'NOTIFICATIONS_ENABLED', True),
+                   patch.object(notifications, 'DISCORD_WEBHOOK_URL', WEBHOOK),
+                   patch.object(notifications, 'SONARR_URL', '')]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+
+    def make_due(self):
+        conn = sqlite3.connect(settings_db.DB_PATH)
+        conn.execute('UPDATE notification_queue SET next_attempt_at = 0')
+        conn.commit()
+        conn.close()
+
+    def search_pending(self, *episode_ids):
+        for episode_id in episode_ids:
+            notifications.send_notification('episode_search_pending', series='Andor', season=1,
+                                            episode=episode_id, air_date='2026-10-01T00:00:00Z',
+                                            series_id=7, episode_id=episode_id)
+
+    def test_burst_goes_out_as_one_digest(self):
+        self.search_pending(101, 102, 103)
+        with patch.object(notification_queue.http, 'post', return_value=response(body={'id': 'm1'})) as post:
+            self.assertEqual(notification_queue.process_due(), 0)      # still in the coalescing window
+            self.make_due()
+            self.assertEqual(notification_queue.process_due(), 3)
+
+        post.assert_called_once()
+        self.assertTrue(post.call_args.args[0].endswith('?wait=true'))
+        embed = post.call_args.kwargs['json']['embeds'][0]
+        self.assertEqual(embed['title'], '🔍 3 Episode Searches Pending')
+        self.assertEqual([f['name'] for f in embed['fields']], ['Andor S01E101', 'Andor S01E102', 'Andor S01E103'])
+        self.assertEqual(notification_queue.pending(), [])
+
+        # Grabs: the digest stays until its last episode is found
+        self.assertEqual(notifications.clear_search_pending(101), 'kept')
+        self.assertEqual(notifications.clear_search_pending(102), 'kept')
+        self.assertEqual(notifications.clear_search_pending(103), 'deleting')
+        (delete,) = notification_queue.pending()
+        self.assertEqual((delete['kind'], delete['message_id']), ('delete', 'm1'))
+        with patch.object(notification_queue.http, 'delete', return_value=response(404)) as http_delete:
+            notification_queue.process_due()
+        self.assertEqual(http_delete.call_args.args[0], f'{WEBHOOK}/messages/m1')
+        self.assertEqual(notification_queue.pending(), [])
+
+    def test_grab_before_send_cancels_the_post(self):
+        self.search_pending(201)
+        self.assertEqual(notifications.clear_search_pending(201), 'cancelled')
+        self.assertEqual(notification_queue.pending(), [])
+        self.assertIsNone(notifications.clear_search_pending(201))
+
+    def test_post_cancelled_while_sending_is_deleted(self):
+        self.search_pending(301)
+        self.make_due()
+
+        def post(url, json=None, timeout=None):
+            notification_queue.cancel_post(301)
+            return response(body={'id': 'm3'})
+
+        with patch.object(notification_queue.http, 'post', side_effect=post), \
+                patch.object(notification_queue.http, 'delete', return_value=response(204)) as http_delete:
+            notification_queue.process_due()
+        http_delete.assert_called_once_with(f'{WEBHOOK}/messages/m3', timeout=notification_queue.REQUEST_TIMEOUT)
+        self.assertEqual(notification_queue.pending(), [])
+        self.assertFalse(notification_storage.notification_exists(301))
+
+    def test_rate_limit_holds_the_queue(self):
+        notifications.send_notification('selection_pending', series='Severance', series_id=1)
+        self.make_due()
+        limited = response(429, body={'retry_after': 30})
+        with patch.object(notification_queue.http, 'post', return_value=limited) as post:
+            notification_queue.process_due()
+            self.make_due()
+            notification_queue.process_due()                           # still blocked
+        post.assert_called_once()
+        (row,) = notification_queue.pending()
+        self.assertEqual(row['attempts'], 0)                          # a 429 doesn't use up an attempt
+
+        notification_queue._blocked_until = 0.0
+        notifications.send_notification('selection_pending', series='Silo', series_id=2)
+        self.make_due()
+        exhausted = response(body={'id': 'm2'}, headers={'X-RateLimit-Remaining': '0',
+                                                          'X-RateLimit-Reset-After': '5'})
+        with patch.object(notification_queue.http, 'post', return_value=exhausted) as post:
+            notification_queue.process_due()
+        embed = post.call_args.kwargs['json']['embeds'][0]
+        self.assertEqual(embed['title'], '📋 2 New Episode Selection Requests')
+        self.assertGreater(notification_queue._blocked_until, 0)
+
+    def test_failures_back_off_then_drop(self):
+        notifications.send_notification('selection_pending', series='Severance', series_id=1)
+        with patch.object(notification_queue.http, 'post', return_value=response(500)):
+            for attempt in range(1, notification_queue.MAX_ATTEMPTS):
+                self.make_due()
+                notification_queue.process_due()
+                (row,) = notification_queue.pending()
+                self.assertEqual(row['attempts'], attempt)
+                self.assertIn('HTTP 500', row['last_error'])
+            self.make_due()
+            notification_queue.process_due()
+        self.assertEqual(notification_queue.pending(), [])
+
+    def test_nothing_sent_without_a_webhook(self):
+        notifications.send_notification('selection_pending', series='Severance', series_id=1)
+        self.make_due()
+        with patch.object(notifications, 'DISCORD_WEBHOOK_URL', ''), \
+                patch.object(notification_queue.http, 'post', side_effect=AssertionError('no post')):
+            self.assertEqual(notification_queue.process_due(), 0)
+        self.assertEqual(len(notification_queue.pending()), 1)
+
+    def test_stop_sender_keeps_state_until_thread_exits(self):
+        release = threading.Event()
+        busy = threading.Thread(target=release.wait, daemon=True)    # stuck mid-request
+        busy.start()
+        with patch.object(notification_queue, '_thread', busy):
+            notification_queue.stop_sender(timeout=0.05)
+            self.assertIs(notification_queue._thread, busy)
+            self.assertTrue(notification_queue._stop.is_set())
+
+            release.set()
+            notification_queue.stop_sender()
+            self.assertIsNone(notification_queue._thread)
+            self.assertFalse(notification_queue._stop.is_set())
+
+    def test_enqueue_never_raises(self):
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'missing', 'settings.db')
+        self.assertIsNone(notification_queue.enqueue_delete('m1'))
+        self.assertFalse(notification_queue.cancel_post(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
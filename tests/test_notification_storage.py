@@ -0,0 +1,101 @@
+"""
+Tests for notification_storage.py - search-pending message ids stored and
+popped in batches (a digest's message shared by several episodes),
+"which of these episodes were already notified" for the aired check, the
+single-delete retention pruning, and the one-time import of the old JSON
+files. Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_notification_storage -v
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_notification_storage_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import notification_storage
+import settings_db
+
+DAY = 86400
+
+
+class NotificationStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_notification_storage_test_')
+        self._orig = (settings_db.DB_PATH, notification_storage.NOTIFICATION_STORAGE,
+                      notification_storage.AIRED_NOTIFICATION_STORAGE)
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        notification_storage.NOTIFICATION_STORAGE = os.path.join(self.tmpdir, 'pending_notifications.json')
+        notification_storage.AIRED_NOTIFICATION_STORAGE = os.path.join(self.tmpdir, 'aired_notifications.json')
+        settings_db.init_settings_db()
+
+    def tearDown(self):
+        (settings_db.DB_PATH, notification_storage.NOTIFICATION_STORAGE,
+         notification_storage.AIRED_NOTIFICATION_STORAGE) = self._orig
+
+    def test_search_notifications_batch_store_and_pop(self):
+        notification_storage.store_notifications([1, 2, 3], 'digest')
+        notification_storage.store_notification(4, 'single')
+        self.assertTrue(notification_storage.notification_exists(2))
+
+        self.assertEqual(notification_storage.pop_notifications([1, 4, 99]), {1: 'digest', 4: 'single'})
+        self.assertFalse(notification_storage.notification_exists(1))
+        self.assertTrue(notification_storage.message_in_use('digest'))
+        self.assertFalse(notification_storage.message_in_use('single'))
+
+        self.assertEqual(notification_storage.get_and_remove_notification('2'), 'digest')
+        self.assertEqual(notification_storage.get_and_remove_notification(3), 'digest')
+        self.assertIsNone(notification_storage.get_and_remove_notification(3))
+        self.assertFalse(notification_storage.message_in_use('digest'))
+
+    def test_stale_search_notifications_pruned_on_insert(self):
+        with patch.object(notification_storage.time, 'time',
+                          return_value=time.time() - (notification_storage.SEARCH_RETENTION_DAYS + 1) * DAY):
+            notification_storage.store_notification(1, 'old')
+        notification_storage.store_notification(2, 'new')
+        self.assertFalse(notification_storage.notification_exists(1))
+        self.assertTrue(notification_storage.notification_exists(2))
+
+    def test_aired_notified_batch_and_retention(self):
+        notification_storage.store_aired_notifications([10, 11])
+        with patch.object(notification_storage.time, 'time',
+                          return_value=time.time() - (notification_storage.AIRED_RETENTION_DAYS + 1) * DAY):
+            notification_storage.store_aired_notification(12)
+        ids = list(range(1000, 1700)) + [10, 12]       # more than one IN (...) batch
+        self.assertEqual(notification_storage.aired_notified(ids), {10, 12})
+        self.assertTrue(notification_storage.aired_notification_exists(11))
+
+        notification_storage.cleanup_old_aired_notifications()
+        self.assertEqual(notification_storage.aired_notified([10, 11, 12]), {10, 11})
+
+    def test_json_files_migrated_once(self):
+        with open(notification_storage.NOTIFICATION_STORAGE, 'w') as f:
+            json.dump({'5': {'message_id': 'm5', 'timestamp': '2026-10-01T12:00:00'}}, f)
+        with open(notification_storage.AIRED_NOTIFICATION_STORAGE, 'w') as f:
+            json.dump({'6': '2026-10-01T12:00:00', '7': '2026-10-02T12:00:00'}, f)
+
+        self.assertEqual(notification_storage.migrate_from_files(), 3)
+        self.assertFalse(os.path.exists(notification_storage.NOTIFICATION_STORAGE))
+        self.assertFalse(os.path.exists(notification_storage.AIRED_NOTIFICATION_STORAGE))
+        self.assertEqual(notification_storage.aired_notified([6, 7, 8]), {6, 7})
+        self.assertEqual(notification_storage.get_and_remove_notification(5), 'm5')
+        self.assertEqual(notification_storage.migrate_from_files(), 0)
+
+    def test_lookups_never_raise(self):
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'missing', 'settings.db')
+        self.assertEqual(notification_storage.aired_notified([1]), set())
+        self.assertEqual(notification_storage.pop_notifications([1]), {})
+        notification_storage.store_aired_notifications([1])
+
+
+if __name__ == '__main__':
+    unittest.main()
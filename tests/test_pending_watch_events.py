@@ -95,6 +95,14 @@ class PendingWatchEventsTestCase(unittest.TestCase):
         pwe.mark_checked()
         self.assertGreaterEqual(pwe.get_last_checked(), before)
 
+    def test_marks_only_move_forward_and_survive_clearing(self):
+        self.assertEqual(pwe.get_marks(), {})
+        pwe.set_mark('plex', 2000)
+        pwe.set_mark('plex', 1500)
+        pwe.set_mark('tautulli', 1800)
+        pwe.clear_all_pending()
+        self.assertEqual(pwe.get_marks(), {'plex': 2000, 'tautulli': 1800})
+
     def test_get_pending_summary_shape(self):
         pwe.add_or_update_pending(series_id=10, series_title='Show', season=1,
                                    episode=2, source='plex', user='alice', watched_at=1000)
@@ -9,6 +9,8 @@ reconcile.check_for_missed_watch_events() only imports it lazily inside the
 function, so tests install a fake 'media_processor' module and a fake
 'pending_watch_events' module in sys.modules instead of pulling in the real
 Flask app / real file-backed queue just to exercise the detection logic.
+Sonarr lookups go through reconcile._series_title_map(), patched with a
+SeriesTitleMap built from a literal series list.
 """
 
 import os
@@ -32,14 +34,19 @@ import reconcile
 import episeerr_utils
 
 
-def _fake_media_processor(settings, get_series_id=None, config=None):
+def _fake_media_processor(settings, config=None):
     module = types.ModuleType('media_processor')
     module.load_global_settings = lambda: settings
-    module.get_series_id = get_series_id or (lambda title: None)
     module.load_config = lambda: config or {'rules': {}}
     return module
 
 
+def _title_map(*series):
+    """Patch reconcile's Sonarr title map with these series dicts."""
+    return patch.object(reconcile, '_series_title_map',
+                        return_value=reconcile.SeriesTitleMap(list(series)))
+
+
 class IsNewerThanRecordedTestCase(unittest.TestCase):
     def test_series_untracked_by_any_rule_is_not_our_concern(self):
         config = {'rules': {'Standard': {'series': {}}}}
@@ -82,11 +89,13 @@ class CheckForMissedWatchEventsTestCase(unittest.TestCase):
             else:
                 sys.modules.pop(name, None)
 
-    def _install_fake_pending_module(self):
+    def _install_fake_pending_module(self, marks=None):
         calls = []
         module = types.ModuleType('pending_watch_events')
         module.add_or_update_pending = lambda **kwargs: calls.append(kwargs)
         module.mark_checked = lambda: calls.append({'marked_checked': True})
+        module.get_marks = lambda: dict(marks or {})
+        module.set_mark = lambda source, ts: calls.append({'mark': (source, ts)})
         sys.modules['pending_watch_events'] = module
         return calls
 
@@ -108,15 +117,13 @@ class CheckForMissedWatchEventsTestCase(unittest.TestCase):
     def test_finds_newer_event_and_queues_it(self):
         config = {'rules': {'Standard': {'series': {'42': {'last_season': 1, 'last_episode': 1}}}}}
         sys.modules['media_processor'] = _fake_media_processor(
-            {'reconcile_enabled': True},
-            get_series_id=lambda title: 42,
-            config=config,
+            {'reconcile_enabled': True}, config=config,
         )
         calls = self._install_fake_pending_module()
 
         with patch.object(reconcile, '_SWEEPERS', (
-            ('plex', lambda: [(2000, 'Show', 1, 2, 'alice')]),
-        )):
+            ('plex', lambda since_ts: ([(2000, 'Show', 1, 2, 'alice')], 2000)),
+        )), _title_map({'id': 42, 'title': 'Show'}):
             summary = reconcile.check_for_missed_watch_events()
 
         self.assertTrue(summary['ran'])
@@ -130,29 +137,25 @@ class CheckForMissedWatchEventsTestCase(unittest.TestCase):
     def test_event_not_newer_than_recorded_is_skipped(self):
         config = {'rules': {'Standard': {'series': {'42': {'last_season': 2, 'last_episode': 5}}}}}
         sys.modules['media_processor'] = _fake_media_processor(
-            {'reconcile_enabled': True},
-            get_series_id=lambda title: 42,
-            config=config,
+            {'reconcile_enabled': True}, config=config,
         )
         calls = self._install_fake_pending_module()
 
         with patch.object(reconcile, '_SWEEPERS', (
-            ('plex', lambda: [(2000, 'Show', 1, 1, 'alice')]),
-        )):
+            ('plex', lambda since_ts: ([(2000, 'Show', 1, 1, 'alice')], 2000)),
+        )), _title_map({'id': 42, 'title': 'Show'}):
             summary = reconcile.check_for_missed_watch_events()
 
         self.assertEqual(summary['found'], 0)
         self.assertEqual([c for c in calls if 'series_id' in c], [])
 
     def test_series_not_managed_by_sonarr_is_skipped(self):
-        sys.modules['media_processor'] = _fake_media_processor(
-            {'reconcile_enabled': True}, get_series_id=lambda title: None,
-        )
+        sys.modules['media_processor'] = _fake_media_processor({'reconcile_enabled': True})
         calls = self._install_fake_pending_module()
 
         with patch.object(reconcile, '_SWEEPERS', (
-            ('plex', lambda: [(2000, 'Unmanaged Show', 1, 1, 'alice')]),
-        )):
+            ('plex', lambda since_ts: ([(2000, 'Unmanaged Show', 1, 1, 'alice')], 2000)),
+        )), _title_map({'id': 42, 'title': 'Show'}):
             summary = reconcile.check_for_missed_watch_events()
 
         self.assertEqual(summary['found'], 0)
@@ -161,7 +164,7 @@ class CheckForMissedWatchEventsTestCase(unittest.TestCase):
     def test_one_source_failing_does_not_block_the_others(self):
         config = {'rules': {'Standard': {'series': {'42': {'last_season': 1, 'last_episode': 1}}}}}
         sys.modules['media_processor'] = _fake_media_processor(
-            {'reconcile_enabled': True}, get_series_id=lambda title: 42, config=config,
+            {'reconcile_enabled': True}, config=config,
         )
         calls = self._install_fake_pending_module()
 
@@ -170,17 +173,81 @@ class CheckForMissedWatchEventsTestCase(unittest.TestCase):
 
         with patch.object(reconcile, '_SWEEPERS', (
             ('plex', broken),
-            ('jellyfin', lambda: [(2000, 'Show', 1, 2, 'bob')]),
-        )):
+            ('jellyfin', lambda since_ts: ([(2000, 'Show', 1, 2, 'bob')], 2000)),
+        )), _title_map({'id': 42, 'title': 'Show'}):
+            summary = reconcile.check_for_missed_watch_events()
+
+        self.assertEqual(summary['found'], 1)
+        self.assertTrue(summary['errors'])
+        # Only the source that swept successfully moves its mark
+        self.assertEqual([c['mark'] for c in calls if 'mark' in c], [('jellyfin', 2000)])
+
+    def test_sweeps_start_from_each_sources_mark(self):
+        sys.modules['media_processor'] = _fake_media_processor({'reconcile_enabled': True})
+        calls = self._install_fake_pending_module(marks={'plex': 100000, 'tautulli': 200000})
+        seen = {}
+
+        def sweeper(label, events, newest=None):
+            def sweep(since_ts):
+                seen[label] = since_ts
+                return events, newest
+            return sweep
+
+        with patch.object(reconcile, '_SWEEPERS', (
+            ('plex', sweeper('plex', [(100500, 'Show', 1, 1, 'a'), (100900, 'Show', 1, 2, 'a')], 100900)),
+            ('tautulli', sweeper('tautulli', [])),
+            ('emby', sweeper('emby', [])),
+        )), _title_map({'id': 42, 'title': 'Show'}), \
+                patch.object(reconcile.time, 'time', return_value=5000000):
+            reconcile.check_for_missed_watch_events()
+
+        # Only Tautulli re-reads below its mark
+        self.assertEqual(seen['plex'], 100000)
+        self.assertEqual(seen['tautulli'], 200000 - reconcile.MARK_OVERLAP_SECONDS)
+        self.assertEqual(seen['emby'], 5000000 - reconcile.INITIAL_LOOKBACK_SECONDS)
+        self.assertEqual([c['mark'] for c in calls if 'mark' in c], [('plex', 100900)])
+
+    def test_overlap_does_not_requeue_events_at_or_below_the_mark(self):
+        config = {'rules': {'Standard': {'series': {'42': {'last_season': 1, 'last_episode': 1}}}}}
+        sys.modules['media_processor'] = _fake_media_processor({'reconcile_enabled': True}, config=config)
+        calls = self._install_fake_pending_module(marks={'tautulli': 100000})
+
+        with patch.object(reconcile, '_SWEEPERS', (
+            ('tautulli', lambda since_ts: ([(100000, 'Show', 1, 2, 'a'),     # swept and Cleared before
+                                            (100300, 'Show', 1, 3, 'a')],    # a late row
+                                           100300)),
+        )), _title_map({'id': 42, 'title': 'Show'}):
             summary = reconcile.check_for_missed_watch_events()
 
         self.assertEqual(summary['found'], 1)
+        self.assertEqual([c['episode'] for c in calls if 'series_id' in c], [3])
+        self.assertEqual([c['mark'] for c in calls if 'mark' in c], [('tautulli', 100300)])
+
+    def test_mark_advances_without_wanted_events(self):
+        sys.modules['media_processor'] = _fake_media_processor({'reconcile_enabled': True})
+        calls = self._install_fake_pending_module(marks={'plex': 100000})
+
+        with patch.object(reconcile, '_SWEEPERS', (
+            ('plex', lambda since_ts: ([], 100700)),      # only movies / other users' watches
+        )):
+            reconcile.check_for_missed_watch_events()
+
+        self.assertEqual([c['mark'] for c in calls if 'mark' in c], [('plex', 100700)])
+
+    def test_title_map_failure_keeps_the_mark(self):
+        sys.modules['media_processor'] = _fake_media_processor({'reconcile_enabled': True})
+        calls = self._install_fake_pending_module()
+
+        with patch.object(reconcile, '_SWEEPERS', (
+            ('plex', lambda since_ts: ([(2000, 'Show', 1, 2, 'alice')], 2000)),
+        )), patch.object(reconcile, '_series_title_map', side_effect=RuntimeError('sonarr down')):
+            summary = reconcile.check_for_missed_watch_events()
+
         self.assertTrue(summary['errors'])
+        self.assertEqual([c for c in calls if 'mark' in c], [])
 
     def test_always_marks_checked_even_when_nothing_found(self):
-        sys.modules['media_processor'] = _fake_media_processor(
-            {'reconcile_enabled': True}, get_series_id=lambda title: None,
-        )
+        sys.modules['media_processor'] = _fake_media_processor({'reconcile_enabled': True})
         calls = self._install_fake_pending_module()
 
         with patch.object(reconcile, '_SWEEPERS', ()):
@@ -189,6 +256,60 @@ class CheckForMissedWatchEventsTestCase(unittest.TestCase):
         self.assertIn({'marked_checked': True}, calls)
 
 
+class SeriesTitleMapTestCase(unittest.TestCase):
+    def test_same_precedence_as_get_series_id(self):
+        title_map = reconcile.SeriesTitleMap([
+            {'id': 1, 'title': 'The Office (US)'},
+            {'id': 2, 'title': 'Doctor Who (2005)'},
+            {'id': 3, 'title': 'Doctor Who'},
+            {'id': 4, 'title': 'Welcome to Derry',
+             'alternateTitles': [{'title': 'Es - Welcome to Derry'}]},
+        ])
+        self.assertEqual(title_map.resolve('the office (us)'), 1)
+        # exact title wins over a year-stripped match
+        self.assertEqual(title_map.resolve('Doctor Who'), 3)
+        self.assertEqual(title_map.resolve('Doctor Who (2023)'), 2)
+        self.assertEqual(title_map.resolve('Es: Welcome to Derry'), 4)
+        self.assertIsNone(title_map.resolve('Unknown Show'))
+
+
+class PageUntilTestCase(unittest.TestCase):
+    def test_stops_at_the_first_row_at_or_before_since(self):
+        history = [(ts, (ts, 'ev') if ts % 2 else None) for ts in range(1000, 0, -1)]
+        pages = []
+
+        def fetch_page(start, size):
+            pages.append(start)
+            return history[start:start + size]
+
+        events, newest = reconcile._page_until(fetch_page, 550, 'test')
+        self.assertEqual(pages, [0, reconcile.PAGE_SIZE, 2 * reconcile.PAGE_SIZE])
+        self.assertEqual(events[0], (999, 'ev'))
+        self.assertEqual(events[-1], (551, 'ev'))
+        self.assertEqual(newest, 1000)      # an unwanted row still counts
+
+    def test_short_page_ends_the_sweep(self):
+        pages = []
+
+        def fetch_page(start, size):
+            pages.append(start)
+            return [(10, (10, 'ev'))]
+
+        self.assertEqual(reconcile._page_until(fetch_page, 0, 'test'), ([(10, 'ev')], 10))
+        self.assertEqual(pages, [0])
+
+    def test_page_limit_bounds_a_sweep(self):
+        pages = []
+
+        def fetch_page(start, size):
+            pages.append(start)
+            return [(10 ** 9 - start - i, None) for i in range(size)]
+
+        with patch.object(reconcile, 'MAX_PAGES', 3):
+            reconcile._page_until(fetch_page, 0, 'test')
+        self.assertEqual(len(pages), 3)
+
+
 class ReplayWatchEventTestCase(unittest.TestCase):
     def setUp(self):
         self._orig_tautulli = sys.modules.get('integrations.tautulli')
@@ -0,0 +1,123 @@
+"""
+Tests for request_timing.py - per-endpoint percentiles, upstream calls
+counted per request, the slow log (without query strings) and the sampling
+profiler. Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_request_timing -v
+
+No network: HTTPAdapter.send is patched underneath requests.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_timing_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+
+import requests
+from flask import Flask, jsonify
+from requests.adapters import HTTPAdapter
+
+import request_timing
+
+
+def _response(request, **kwargs):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b'{}'
+    response.request = request
+    response.url = request.url
+    return response
+
+
+def _make_app():
+    app = Flask(__name__)
+    request_timing.init_app(app)
+
+    @app.route('/fast')
+    def fast():
+        return jsonify({})
+
+    @app.route('/upstream')
+    def upstream():
+        requests.get('http://tautulli-timing:8181/api/v2?apikey=secret&cmd=get_history')
+        requests.get('http://sonarr-timing:8989/api/v3/series')
+        return jsonify({})
+
+    return app
+
+
+class RequestTimingTest(unittest.TestCase):
+    def setUp(self):
+        request_timing.reset()
+        self.addCleanup(request_timing.reset)
+        patcher = patch.object(HTTPAdapter, 'send', side_effect=_response)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = _make_app().test_client()
+
+    def test_percentiles_and_upstream_per_endpoint(self):
+        for _ in range(20):
+            self.client.get('/fast')
+        response = self.client.get('/upstream')
+        self.assertIn('upstream;dur=', response.headers['Server-Timing'])
+
+        stats = {e['endpoint']: e for e in request_timing.endpoint_stats()}
+        self.assertEqual(stats['fast']['count'], 20)
+        self.assertLessEqual(stats['fast']['p50_ms'], stats['fast']['p99_ms'])
+        self.assertEqual(stats['fast']['avg_upstream_calls'], 0)
+        self.assertEqual(stats['upstream']['avg_upstream_calls'], 2)
+
+    def test_slow_request_logged_with_breakdown_and_no_query(self):
+        with patch.object(request_timing, 'SLOW_REQUEST_MS', 0), \
+                patch.object(request_timing.slow_request_logger, 'info') as log:
+            self.client.get('/upstream')
+        message = log.call_args[0][0]
+        self.assertIn('GET /upstream [upstream]', message)
+        self.assertIn('upstream 2 calls', message)
+        self.assertIn('tautulli-timing:8181 1x', message)
+        self.assertIn('http://tautulli-timing:8181/api/v2 ', message)
+        self.assertNotIn('secret', message)
+
+    def test_calls_outside_a_request_are_not_counted(self):
+        requests.get('http://sonarr-timing:8989/api/v3/series')
+        self.assertIsNone(request_timing.current_upstream_calls())
+        self.assertEqual(request_timing.endpoint_stats(), [])
+
+
+class SamplingProfilerTest(unittest.TestCase):
+    def test_collapsed_stacks_include_named_threads(self):
+        stop = threading.Event()
+
+        def cleanup_loop():
+            stop.wait(5)
+
+        worker = threading.Thread(target=cleanup_loop, name='cleanup-worker')
+        worker.start()
+        try:
+            result = request_timing.sample_stacks(0.1, interval=0.01)
+        finally:
+            stop.set()
+            worker.join()
+
+        self.assertGreater(result['samples'], 1)
+        text = request_timing.collapsed(result['stacks'])
+        lines = [line for line in text.splitlines() if line.startswith('cleanup-worker;')]
+        self.assertTrue(lines)
+        self.assertIn('cleanup_loop (test_request_timing.py)', lines[0])
+        self.assertTrue(lines[0].rsplit(' ', 1)[1].isdigit())
+
+    def test_one_profile_at_a_time(self):
+        with request_timing._profile_lock:
+            with self.assertRaises(request_timing.ProfilerBusy):
+                request_timing.sample_stacks(0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Tests for rule_stats.py - a full refresh from a Sonarr series list, config
+saves applied incrementally (only the changed rules re-aggregated),
+deletions / imports adjusting file counts, and the time-based grace /
+dormant counts. Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_rule_stats -v
+"""
+
+import copy
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_rule_stats_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import rule_stats
+import settings_db
+
+DAY = 86400
+GB = 1024 ** 3
+
+
+def series(series_id, files, size_gb):
+    return {'id': series_id, 'title': f'Show {series_id}',
+            'statistics': {'episodeFileCount': files, 'sizeOnDisk': size_gb * GB}}
+
+
+def make_config(now):
+    return {'rules': {
+        'binge': {'grace_watched': 10, 'grace_unwatched': 30, 'dormant_days': 90, 'series': {
+            '1': {'activity_date': now - 5 * DAY},
+            '2': {'activity_date': now - 20 * DAY},
+        }},
+        'slow': {'series': {'3': {'activity_date': now - 200 * DAY}}},
+        'empty': {'dormant_days': 60, 'series': {}},
+    }}
+
+
+class RuleStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_rule_stats_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+        self.now = time.time()
+        self.config = make_config(self.now)
+        self.assertTrue(rule_stats.refresh(
+            [series(1, 10, 5), series(2, 4, 2), series(3, 1, 1), series(4, 7, 3)], self.config))
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+
+    def test_refresh_builds_per_rule_numbers(self):
+        stats = rule_stats.get_rule_stats()
+        self.assertEqual(sorted(stats), ['binge', 'empty', 'slow'])
+        binge = stats['binge']
+        self.assertEqual((binge['series_count'], binge['episodes_on_disk'], binge['bytes']), (2, 14, 7 * GB))
+        self.assertAlmostEqual(binge['last_activity'], self.now - 5 * DAY)
+        # Grace is the shorter grace setting (10d): only series 2 is past it
+        self.assertEqual((binge['past_grace'], binge['past_dormant']), (1, 0))
+        self.assertEqual((stats['slow']['past_grace'], stats['slow']['past_dormant']), (0, 0))
+        self.assertEqual(stats['empty']['series_count'], 0)
+        self.assertEqual(rule_stats.series_totals(),
+                         {'total_series': 4, 'assigned_series': 3, 'unassigned_series': 1})
+        self.assertEqual(rule_stats.assignments()['4'], 'None')
+        self.assertIsNotNone(rule_stats.refreshed_at())
+
+    def test_empty_series_list_keeps_stored_numbers(self):
+        self.assertFalse(rule_stats.refresh([], self.config))
+        self.assertEqual(rule_stats.get_rule_stats()['binge']['series_count'], 2)
+
+    def test_config_save_reaggregates_only_changed_rules(self):
+        before = rule_stats.get_rule_stats()
+        config = copy.deepcopy(self.config)
+        config['rules']['slow']['series']['4'] = {'activity_date': self.now}      # assign
+        config['rules']['slow']['series']['2'] = config['rules']['binge']['series'].pop('2')  # move
+        config['rules']['slow']['dormant_days'] = 100                              # threshold
+        with patch.object(rule_stats.time, 'time', return_value=self.now + 1):
+            rule_stats.sync_config(config)
+
+        stats = rule_stats.get_rule_stats()
+        self.assertEqual((stats['binge']['series_count'], stats['binge']['bytes']), (1, 5 * GB))
+        self.assertEqual((stats['slow']['series_count'], stats['slow']['episodes_on_disk']), (3, 12))
+        self.assertEqual(stats['slow']['past_dormant'], 1)
+        self.assertEqual(rule_stats.assignments()['4'], 'slow')
+        # 'empty' didn't change, so its row wasn't rewritten
+        self.assertEqual(stats['empty']['updated_at'], before['empty']['updated_at'])
+
+        del config['rules']['empty']
+        config['rules']['slow']['series'].pop('3')
+        rule_stats.sync_config(config)
+        stats = rule_stats.get_rule_stats()
+        self.assertNotIn('empty', stats)
+        self.assertEqual(rule_stats.assignments()['3'], 'None')
+
+    def test_adjust_files_after_delete_and_import(self):
+        rule_stats.adjust_files(1, episodes=-3, bytes_=-2 * GB)
+        rule_stats.adjust_files(4, episodes=2, bytes_=GB)       # unassigned: series row only
+        rule_stats.adjust_files(99, episodes=1, bytes_=GB)      # unknown series: ignored
+        binge = rule_stats.get_rule_stats()['binge']
+        self.assertEqual((binge['episodes_on_disk'], binge['bytes']), (11, 5 * GB))
+        self.assertEqual(rule_stats.series_totals()['total_series'], 4)
+
+    def test_updates_never_raise(self):
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'missing', 'settings.db')
+        rule_stats.sync_config(self.config)
+        rule_stats.adjust_files(1, episodes=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
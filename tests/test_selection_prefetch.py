@@ -0,0 +1,143 @@
+"""
+Tests for selection_prefetch.py - a pending selection request's show and
+every season are fetched in append_to_response chunks, stored trimmed in
+settings.db, read back by the selection pages, and dropped with the last
+request for the show. Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_selection_prefetch -v
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_selection_prefetch_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import settings_db
+import selection_prefetch
+
+
+def _season(n):
+    return {'id': 1000 + n, 'name': f'Season {n}', 'season_number': n,
+            'episodes': [{'id': n * 100 + e, 'episode_number': e, 'name': f'Ep {e}',
+                          'overview': '', 'crew': [{'name': 'x'}], 'guest_stars': [{'name': 'y'}]}
+                         for e in (1, 2)]}
+
+
+class FakeTmdb:
+    """tv/<id> with optional append_to_response, and tv/<id>/season/<n>."""
+
+    def __init__(self, seasons):
+        self.seasons = seasons
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, endpoint, params=None):
+        with self.lock:
+            self.calls.append((endpoint, (params or {}).get('append_to_response')))
+        if '/season/' in endpoint:
+            return _season(int(endpoint.rsplit('/', 1)[1]))
+        show = {'id': 7, 'name': 'Long Show', 'poster_path': '/p.jpg', 'credits': {'cast': []},
+                'seasons': [{'season_number': n, 'episode_count': 2, 'name': f'Season {n}'}
+                            for n in range(0, self.seasons + 1)]}
+        for entry in ((params or {}).get('append_to_response') or '').split(','):
+            if entry:
+                show[entry] = _season(int(entry.split('/')[1]))
+        return show
+
+
+class SelectionPrefetchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_selection_prefetch_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+
+    def test_prefetch_fetches_every_season_in_append_chunks(self):
+        tmdb = FakeTmdb(seasons=45)
+        with patch.object(selection_prefetch, '_tmdb_get', tmdb):
+            self.assertEqual(selection_prefetch.prefetch(7), 45)
+
+        appended = sorted(len(a.split(',')) for _, a in tmdb.calls if a)
+        self.assertEqual(appended, [5, 20, 20])
+        self.assertEqual(len(tmdb.calls), 4)
+
+        stored = selection_prefetch.cached(7)
+        self.assertEqual(sorted(stored), [selection_prefetch.SHOW] + list(range(1, 46)))
+        self.assertEqual(stored[selection_prefetch.SHOW]['name'], 'Long Show')
+        self.assertNotIn('credits', stored[selection_prefetch.SHOW])
+        self.assertEqual([ep['episode_number'] for ep in stored[33]['episodes']], [1, 2])
+        self.assertNotIn('crew', stored[33]['episodes'][0])
+
+    def test_pages_read_stored_data_without_calling_tmdb(self):
+        with patch.object(selection_prefetch, '_tmdb_get', FakeTmdb(seasons=3)):
+            selection_prefetch.prefetch(7)
+        with patch.object(selection_prefetch, '_tmdb_get', side_effect=AssertionError('no TMDB')):
+            self.assertEqual(sorted(selection_prefetch.cached(7, [2])), [selection_prefetch.SHOW, 2])
+            self.assertEqual(selection_prefetch.show_details(7)['name'], 'Long Show')
+            self.assertEqual(selection_prefetch.season_details(7, 3)['season_number'], 3)
+
+    def test_missing_or_stale_season_is_fetched_and_stored(self):
+        tmdb = FakeTmdb(seasons=3)
+        with patch.object(selection_prefetch, '_tmdb_get', tmdb):
+            self.assertEqual(selection_prefetch.season_details(9, 2)['name'], 'Season 2')
+            selection_prefetch.season_details(9, 2)
+        self.assertEqual(tmdb.calls, [('tv/9/season/2', None)])
+
+        with patch.object(selection_prefetch.time, 'time',
+                          return_value=time.time() + selection_prefetch.PREFETCH_TTL_SECONDS + 1), \
+                patch.object(selection_prefetch, '_tmdb_get', tmdb):
+            self.assertEqual(selection_prefetch.cached(9), {})
+            selection_prefetch.season_details(9, 2)
+        self.assertEqual(len(tmdb.calls), 2)
+
+    def test_stored_data_goes_with_the_last_request_for_the_show(self):
+        with patch.object(settings_db, '_publish_request_count'), \
+                patch.object(selection_prefetch, '_tmdb_get', FakeTmdb(seasons=2)):
+            settings_db.add_pending_request({'id': 'a', 'tmdb_id': 7})
+            settings_db.add_pending_request({'id': 'b', 'tmdb_id': 7})
+            selection_prefetch.prefetch(7)
+            settings_db.delete_pending_request('a')
+            self.assertEqual(len(selection_prefetch.cached(7)), 3)
+            settings_db.delete_pending_request('b')
+            self.assertEqual(selection_prefetch.cached(7), {})
+
+    def test_prefetch_async_runs_once_per_show_at_a_time(self):
+        release = threading.Event()
+        started = []
+
+        def slow_prefetch(tmdb_id):
+            started.append(tmdb_id)
+            release.wait(5)
+            return 0
+
+        def wait_idle():
+            for _ in range(500):
+                if not selection_prefetch._in_flight:
+                    return
+                time.sleep(0.01)
+
+        with patch.object(selection_prefetch, 'prefetch', slow_prefetch):
+            self.assertTrue(selection_prefetch.prefetch_async(7))
+            self.assertFalse(selection_prefetch.prefetch_async('7'))
+            self.assertFalse(selection_prefetch.prefetch_async(None))
+            release.set()
+            wait_idle()
+            self.assertTrue(selection_prefetch.prefetch_async(7))
+            wait_idle()
+        self.assertEqual(started, ['7', '7'])
+
+
+if __name__ == '__main__':
+    unittest.main()
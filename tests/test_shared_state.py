@@ -0,0 +1,133 @@
+"""
+Tests for shared_state.py - generation-invalidated caches, the playback
+session registry, processed-key dedup and leader election. Self-contained
+stdlib unittest, run with:
+
+    python3 -m unittest tests.test_shared_state -v
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_shared_import_')
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import settings_db
+import shared_state
+
+
+class SharedStateTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_shared_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+
+
+class TestSharedCache(SharedStateTestCase):
+    def test_value_cached_until_ttl(self):
+        cache = shared_state.SharedCache('t', ttl=60)
+        calls = []
+        loader = lambda: calls.append(1) or len(calls)
+        self.assertEqual(cache.get(loader), 1)
+        self.assertEqual(cache.get(loader), 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_invalidate_in_one_instance_refreshes_another(self):
+        # Two instances with the same name stand in for two workers
+        worker_a = shared_state.SharedCache('tags', ttl=60)
+        worker_b = shared_state.SharedCache('tags', ttl=60)
+        self.assertEqual(worker_a.get(lambda: 'old'), 'old')
+        worker_b.invalidate()
+        self.assertEqual(worker_a.get(lambda: 'new'), 'new')
+
+    def test_none_is_not_cached(self):
+        cache = shared_state.SharedCache('t', ttl=60)
+        self.assertIsNone(cache.get(lambda: None))
+        self.assertEqual(cache.get(lambda: 'loaded'), 'loaded')
+
+
+class TestSessions(SharedStateTestCase):
+    def test_second_claim_is_refused_until_released(self):
+        token = shared_state.claim_session('plex', '42', {'series_name': 'Show'})
+        self.assertIsNotNone(token)
+        self.assertIsNone(shared_state.claim_session('plex', '42'))
+        self.assertEqual(shared_state.get_sessions('plex')['42']['series_name'], 'Show')
+        self.assertTrue(shared_state.release_session('plex', '42'))
+        self.assertIsNotNone(shared_state.claim_session('plex', '42'))
+
+    def test_stale_token_does_not_see_or_release_newer_claim(self):
+        old = shared_state.claim_session('jellyfin', 'abc')
+        shared_state.release_session('jellyfin', 'abc')
+        new = shared_state.claim_session('jellyfin', 'abc')
+        self.assertFalse(shared_state.is_session_active('jellyfin', 'abc', old))
+        self.assertFalse(shared_state.release_session('jellyfin', 'abc', old))
+        self.assertTrue(shared_state.is_session_active('jellyfin', 'abc', new))
+
+    def test_claim_owned_by_dead_process_can_be_taken_over(self):
+        proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+        proc.wait()
+        shared_state.claim_session('emby', 's1')
+        conn = shared_state._connect()
+        conn.execute('UPDATE active_sessions SET owner_pid = ?', (proc.pid,))
+        conn.commit()
+        conn.close()
+        self.assertIsNotNone(shared_state.claim_session('emby', 's1'))
+
+
+class TestProcessedKeys(SharedStateTestCase):
+    def test_marker_expires_after_ttl(self):
+        shared_state.mark_processed('ns', 'Show:S1E1')
+        self.assertTrue(shared_state.was_processed('ns', 'Show:S1E1', ttl=60))
+        self.assertFalse(shared_state.was_processed('other', 'Show:S1E1', ttl=60))
+        time.sleep(0.02)
+        self.assertFalse(shared_state.was_processed('ns', 'Show:S1E1', ttl=0.01))
+
+    def test_processed_set_behaves_like_a_set(self):
+        processed = shared_state.ProcessedSet('ns', ttl=60)
+        self.assertNotIn('k', processed)
+        processed.add('k')
+        self.assertIn('k', shared_state.ProcessedSet('ns', ttl=60))
+
+
+@unittest.skipIf(shared_state.fcntl is None, 'flock not available')
+class TestLeaderElection(SharedStateTestCase):
+    def test_only_one_process_holds_the_lock(self):
+        lock_path = os.path.join(self.tmpdir, 'leader.lock')
+        holder = subprocess.Popen(
+            [sys.executable, '-c',
+             'import fcntl, os, sys, time\n'
+             f'fd = os.open({lock_path!r}, os.O_RDWR | os.O_CREAT)\n'
+             'fcntl.flock(fd, fcntl.LOCK_EX)\n'
+             'print("locked", flush=True)\n'
+             'time.sleep(30)\n'],
+            stdout=subprocess.PIPE, text=True
+        )
+        self.addCleanup(holder.kill)
+        self.assertEqual(holder.stdout.readline().strip(), 'locked')
+
+        orig = (shared_state.LEADER_LOCK_PATH, shared_state._leader_fd)
+        shared_state.LEADER_LOCK_PATH, shared_state._leader_fd = lock_path, None
+        try:
+            self.assertFalse(shared_state.try_become_leader())
+            holder.kill()
+            holder.wait()
+            self.assertTrue(shared_state.try_become_leader())
+            self.assertTrue(shared_state.is_leader())
+        finally:
+            if shared_state._leader_fd is not None:
+                os.close(shared_state._leader_fd)
+            shared_state.LEADER_LOCK_PATH, shared_state._leader_fd = orig
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+"""
+Tests for sonarr_instances.py - instances come from the services table
+(default first), each instance resolves its own Sonarr and config file, new
+instances start from the default rules with no series, watch events fan
+out from the default instance only, as --watch-event subprocesses that never
+fall through to a cleanup run, and rule tag work for another instance runs
+in a --rule-tags subprocess. Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_sonarr_instances -v
+
+media_processor imports normalize_url from episeerr (and through it the
+whole Flask app); a fake 'episeerr' module is installed just for that
+import.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_sonarr_instances_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import settings_db
+import sonarr_instances
+
+_fake_episeerr = types.ModuleType('episeerr')
+_fake_episeerr.normalize_url = lambda url: (url or '').rstrip('/')
+
+with patch.dict(sys.modules, {'episeerr': _fake_episeerr}):
+    import media_processor
+
+
+class SonarrInstancesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_sonarr_instances_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+        for patcher in (patch.object(sonarr_instances, 'CONFIG_DIR', os.path.join(self.tmpdir, 'config')),
+                        patch.dict(os.environ, {'SONARR_URL': 'http://env-sonarr:8989',
+                                                'SONARR_API_KEY': 'envkey'})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        os.environ.pop(sonarr_instances.ENV_VAR, None)
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+
+    def test_instances_listed_default_first(self):
+        settings_db.save_service('sonarr', 'anime', 'http://anime:8989', 'a')
+        settings_db.save_service('sonarr', '4k', 'http://4k:8989', 'b')
+        settings_db.save_service('sonarr', 'old', 'http://old:8989', 'c', enabled=False)
+        settings_db.save_service('sonarr', 'Bad Name', 'http://bad:8989', 'd')
+        settings_db.save_service('radarr', 'other', 'http://radarr:7878', 'e')
+        self.assertEqual(sonarr_instances.list_instances(), ['default', '4k', 'anime'])
+
+    def test_sonarr_config_follows_bound_instance(self):
+        settings_db.save_service('sonarr', '4k', 'http://4k:8989', 'fourk')
+        self.assertEqual(settings_db.get_sonarr_config()['url'], 'http://env-sonarr:8989')
+        self.assertEqual(settings_db.get_sonarr_config('4k')['api_key'], 'fourk')
+        with patch.dict(os.environ, {sonarr_instances.ENV_VAR: '4k'}):
+            self.assertEqual(settings_db.get_sonarr_config()['url'], 'http://4k:8989')
+            self.assertFalse(sonarr_instances.is_default())
+        # Only the default instance falls back to env
+        self.assertIsNone(settings_db.get_sonarr_config('gone')['url'])
+
+    def test_paths_and_env_per_instance(self):
+        config_dir = sonarr_instances.CONFIG_DIR
+        self.assertEqual(sonarr_instances.config_path('default'), os.path.join(config_dir, 'config.json'))
+        self.assertEqual(sonarr_instances.config_path('4k'), os.path.join(config_dir, 'config.4k.json'))
+        self.assertTrue(sonarr_instances.data_path('pending_deletions.json', '4k')
+                        .endswith(os.path.join('data', 'instances', '4k', 'pending_deletions.json')))
+
+        env = sonarr_instances.instance_env('4k')
+        self.assertEqual(env[sonarr_instances.ENV_VAR], '4k')
+        self.assertEqual(env['CONFIG_PATH'], os.path.join(config_dir, 'config.4k.json'))
+        with patch.dict(os.environ, {'CONFIG_PATH': '/custom/config.json'}):
+            self.assertEqual(sonarr_instances.instance_env('default')['CONFIG_PATH'], '/custom/config.json')
+
+    def test_new_instance_config_starts_from_default_rules(self):
+        os.makedirs(sonarr_instances.CONFIG_DIR)
+        with open(sonarr_instances.config_path('default'), 'w') as f:
+            json.dump({'rules': {'default': {'get_type': 'episodes', 'series': {'1': {}}}},
+                       'default_rule': 'default',
+                       'movie_rules': {'m': {}}, 'default_movie_rule': 'm'}, f)
+
+        sonarr_instances.ensure_instance_config('4k')
+        config = sonarr_instances.load_instance_config('4k')
+        self.assertEqual(config, {'rules': {'default': {'get_type': 'episodes', 'series': {}}},
+                                  'default_rule': 'default'})
+
+        # An existing instance config is never overwritten
+        config['rules']['default']['series'] = {'7': {}}
+        with open(sonarr_instances.config_path('4k'), 'w') as f:
+            json.dump(config, f)
+        sonarr_instances.ensure_instance_config('4k')
+        self.assertEqual(sonarr_instances.load_instance_config('4k')['rules']['default']['series'], {'7': {}})
+
+    def test_watch_events_fan_out_from_default_only(self):
+        settings_db.save_service('sonarr', 'anime', 'http://anime:8989', 'a')
+        settings_db.save_service('sonarr', '4k', 'http://4k:8989', 'b')
+        watch_file = os.path.join(self.tmpdir, 'watch.json')
+        with open(watch_file, 'w') as f:
+            json.dump({'server_title': 'Andor'}, f)
+
+        with patch.object(sonarr_instances, 'spawn_processor') as spawn, \
+                patch.object(sonarr_instances.os, 'getcwd', return_value=self.tmpdir):
+            self.assertEqual(len(sonarr_instances.replay_watch_event(watch_file)), 2)
+            self.assertEqual([c.args[0] for c in spawn.call_args_list], ['4k', 'anime'])
+            # Each instance gets its own copy - the original goes once the default is done
+            copies = [c.args[1][1] for c in spawn.call_args_list]
+            self.assertEqual([c.args[1][0] for c in spawn.call_args_list], ['--watch-event'] * 2)
+            self.assertEqual(len(set(copies)), 2)
+            for copy in copies:
+                with open(copy) as f:
+                    self.assertEqual(json.load(f), {'server_title': 'Andor'})
+            spawn.reset_mock()
+            with patch.dict(os.environ, {sonarr_instances.ENV_VAR: '4k'}):
+                self.assertEqual(sonarr_instances.replay_watch_event(watch_file), [])
+            spawn.assert_not_called()
+
+    def test_rule_tag_work_goes_to_the_instance(self):
+        sonarr_instances.save_instance_config('4k', {'rules': {'uhd': {'series': {'7': {}}}}})
+        self.assertEqual(sonarr_instances.load_instance_config('4k'), {'rules': {'uhd': {'series': {'7': {}}}}})
+
+        with patch.object(sonarr_instances, 'spawn_processor') as spawn, \
+                patch.object(sonarr_instances.os, 'getcwd', return_value=self.tmpdir):
+            sonarr_instances.dispatch_rule_tags('4k', {'assign': {'7': 'uhd'}})
+        name, (flag, path) = spawn.call_args.args
+        self.assertEqual((name, flag), ('4k', '--rule-tags'))
+        with open(path) as f:
+            self.assertEqual(json.load(f), {'assign': {'7': 'uhd'}})
+
+
+class RuleTagsModeTest(unittest.TestCase):
+    def test_applies_the_work_and_removes_the_file(self):
+        path = os.path.join(tempfile.mkdtemp(prefix='episeerr_rule_tags_test_'), 'work.json')
+        with open(path, 'w') as f:
+            json.dump({'ensure_rules': ['uhd'], 'remove_rules': ['old'], 'unassign': ['9'],
+                       'assign': {'7': 'uhd', '8': 'plain'}, 'always_have': ['7', '8']}, f)
+        fake_episeerr = types.ModuleType('episeerr')
+        fake_episeerr._ensure_rule_tag = MagicMock()
+        fake_episeerr._cleanup_rule_tag_from_sonarr = MagicMock()
+        config = {'rules': {'uhd': {'always_have': 's1'}, 'plain': {}}}
+
+        with patch.dict(sys.modules, {'episeerr': fake_episeerr}), \
+                patch.object(sys, 'argv', ['media_processor.py', '--rule-tags', path]), \
+                patch('tag_sync.sync_rule_tags', return_value=([7, 8], [], [])) as sync, \
+                patch('episeerr_utils.remove_all_episeerr_tags') as untag, \
+                patch.object(media_processor, 'load_config', return_value=config), \
+                patch.object(media_processor, 'process_always_have') as always_have:
+            self.assertTrue(media_processor.main())
+
+        fake_episeerr._ensure_rule_tag.assert_called_once_with('uhd')
+        fake_episeerr._cleanup_rule_tag_from_sonarr.assert_called_once_with('old')
+        untag.assert_called_once_with(9)
+        sync.assert_called_once_with({7: 'uhd', 8: 'plain'})
+        always_have.assert_called_once_with(7, 's1')
+        self.assertFalse(os.path.exists(path))
+
+
+class WatchEventModeTest(unittest.TestCase):
+    def run_main(self, *args):
+        with patch.object(sys, 'argv', ['media_processor.py', *args]), \
+                patch.object(media_processor, 'load_global_settings', return_value={}), \
+                patch.object(media_processor, 'process_watch_event', return_value=True) as process, \
+                patch.object(media_processor, 'run_unified_cleanup') as cleanup:
+            result = media_processor.main()
+        cleanup.assert_not_called()
+        return result, process
+
+    def test_replayed_event_is_never_a_cleanup_run(self):
+        path = os.path.join(tempfile.mkdtemp(prefix='episeerr_watch_event_test_'), 'watch.json')
+        with open(path, 'w') as f:
+            json.dump({'server_title': 'Andor', 'server_season_num': 1, 'server_ep_num': 2}, f)
+        os.utime(path, (0, 0))          # waited long enough to look like a stale file
+
+        result, process = self.run_main('--watch-event', path)
+        self.assertTrue(result)
+        process.assert_called_once_with(path)
+        self.assertFalse(os.path.exists(path))
+
+        result, process = self.run_main('--watch-event', path)        # copy already gone
+        self.assertFalse(result)
+        process.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,262 @@
+"""
+Tests for the Sonos topology cache, UPnP event subscriptions and concurrent
+polling fallback (integrations/sonos.py + integrations/_sonos_events.py),
+against a local fake Sonos speaker pair. Self-contained stdlib unittest, run
+with:
+
+    python3 -m unittest tests.test_sonos_events -v
+
+integrations/__init__ discovers (and so imports) every integration, which
+loads the whole Flask app; a bare 'integrations' package is installed just
+for the import of the Sonos modules.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from xml.sax.saxutils import escape
+
+from flask import Flask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_sonos_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import settings_db
+
+_bare_integrations = types.ModuleType('integrations')
+_bare_integrations.__path__ = [os.path.join(ROOT, 'integrations')]
+
+with patch.dict(sys.modules, {'integrations': _bare_integrations}):
+    from integrations import sonos, _sonos_events
+    # Blueprint() looks its module up by name - build it while that resolves
+    _blueprint = sonos.integration.create_blueprint()
+
+SPEAKERS = ('127.0.0.1', '127.0.0.2')
+
+TOPOLOGY = (
+    '<ZoneGroupState><ZoneGroups>'
+    '<ZoneGroup Coordinator="RINCON_1"><ZoneGroupMember UUID="RINCON_1" ZoneName="Living Room" '
+    'Location="http://127.0.0.1:1400/xml/device_description.xml"/></ZoneGroup>'
+    '<ZoneGroup Coordinator="RINCON_2"><ZoneGroupMember UUID="RINCON_2" ZoneName="Kitchen" '
+    'Location="http://127.0.0.2:1400/xml/device_description.xml"/></ZoneGroup>'
+    '</ZoneGroups></ZoneGroupState>'
+)
+
+
+def didl(title, artist):
+    return ('<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" '
+            'xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/">'
+            f'<item><dc:title>{title}</dc:title><dc:creator>{artist}</dc:creator>'
+            '<upnp:albumArtURI>/getaa?s=1</upnp:albumArtURI></item></DIDL-Lite>')
+
+
+def soap_response(action, inner):
+    return ('<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>'
+            f'<u:{action}Response xmlns:u="urn:schemas-upnp-org:service:AVTransport:1">'
+            f'{inner}</u:{action}Response></s:Body></s:Envelope>')
+
+
+def last_change_notify(state, title=None, artist=None):
+    inner = f'<TransportState val="{state}"/>'
+    if title:
+        inner += f'<CurrentTrackMetaData val="{escape(didl(title, artist), {chr(34): "&quot;"})}"/>'
+    event = f'<Event xmlns="urn:schemas-upnp-org:metadata-1-0/AVT/"><InstanceID val="0">{inner}</InstanceID></Event>'
+    return ('<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0"><e:property>'
+            f'<LastChange>{escape(event)}</LastChange></e:property></e:propertyset>').encode()
+
+
+class FakeSonos(BaseHTTPRequestHandler):
+    """Answers as whichever speaker the Host header names."""
+    protocol_version = 'HTTP/1.1'
+    world = None   # set per test
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        world, host = self.world, self.headers['Host'].split(':')[0]
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        action = self.headers['SOAPACTION'].strip('"').split('#')[1]
+        world.calls[(host, action)] += 1
+        if action == 'GetZoneGroupState':
+            body = ('<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>'
+                    '<u:GetZoneGroupStateResponse xmlns:u="urn:schemas-upnp-org:service:ZoneGroupTopology:1">'
+                    f'<ZoneGroupState>{escape(TOPOLOGY)}</ZoneGroupState>'
+                    '</u:GetZoneGroupStateResponse></s:Body></s:Envelope>')
+            return self._reply(200, body.encode())
+        with world.lock:
+            world.in_flight += 1
+            world.max_in_flight = max(world.max_in_flight, world.in_flight)
+        time.sleep(world.soap_delay)
+        with world.lock:
+            world.in_flight -= 1
+        speaker = world.speakers[host]
+        if action == 'GetTransportInfo':
+            inner = f'<CurrentTransportState>{speaker["state"]}</CurrentTransportState>'
+        else:
+            inner = f'<TrackMetaData>{escape(didl(speaker["title"], "Artist"))}</TrackMetaData>'
+        self._reply(200, soap_response(action, inner).encode())
+
+    def do_SUBSCRIBE(self):
+        world, host = self.world, self.headers['Host'].split(':')[0]
+        world.calls[(host, 'SUBSCRIBE ' + self.path)] += 1
+        if not world.subscribe_ok:
+            return self._reply(500)
+        sid = self.headers.get('SID') or f'uuid:sub-{host}-{self.path}'
+        world.subscriptions[sid] = (host, self.path, self.headers.get('CALLBACK'))
+        self._reply(200, headers={'SID': sid, 'TIMEOUT': 'Second-1800'})
+
+
+class World:
+    def __init__(self):
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.in_flight = self.max_in_flight = 0
+        self.soap_delay = 0.0
+        self.subscribe_ok = True
+        self.subscriptions = {}
+        self.speakers = {'127.0.0.1': {'state': 'PLAYING', 'title': 'Song A'},
+                         '127.0.0.2': {'state': 'STOPPED', 'title': 'Song B'}}
+
+    def count(self, action):
+        return sum(n for (_, a), n in self.calls.items() if a.startswith(action))
+
+    def sid(self, host, path):
+        return next(sid for sid, sub in self.subscriptions.items() if sub[:2] == (host, path))
+
+
+class SonosEventsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('', 0), FakeSonos)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_sonos_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+        self.world = FakeSonos.world = World()
+        for patcher in (patch.object(sonos, '_SONOS_PORT', self.server.server_port),
+                        patch.dict(os.environ, {'SONOS_EVENT_CALLBACK_URL': ''})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        sonos._topology_cache.invalidate(local_only=True)
+        _sonos_events._failed_at.clear()
+        app = Flask(__name__)
+        app.register_blueprint(_blueprint)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+
+    def stats(self):
+        return sonos.integration.get_dashboard_stats('http://127.0.0.1', '')
+
+    def enable_events(self):
+        os.environ['SONOS_EVENT_CALLBACK_URL'] = 'http://10.0.0.5:5002'
+
+    def notify(self, sid, body):
+        return self.client.open('/api/integration/sonos/notify', method='NOTIFY', data=body,
+                                headers={'SID': sid, 'NT': 'upnp:event', 'NTS': 'upnp:propchange'})
+
+    def test_polling_caches_topology_and_polls_coordinators_concurrently(self):
+        self.world.soap_delay = 0.2
+        first = self.stats()
+        self.assertEqual(first['state_source'], 'polling')
+        self.assertEqual([z['name'] for z in first['zones']], ['Living Room', 'Kitchen'])
+        self.assertEqual((first['playing_count'], first['active_zone']['track']), (1, 'Song A'))
+        self.assertEqual(self.world.max_in_flight, 2)
+
+        self.stats()
+        self.assertEqual(self.world.count('GetZoneGroupState'), 1)
+        self.assertEqual(self.world.count('GetTransportInfo'), 4)
+        self.assertEqual(self.world.count('SUBSCRIBE'), 0)
+
+    def test_events_replace_polling(self):
+        self.enable_events()
+        self.assertEqual(self.stats()['state_source'], 'polling')   # seeds from one poll
+        self.assertEqual(self.world.count('SUBSCRIBE'), 3)
+        callbacks = {sub[2] for sub in self.world.subscriptions.values()}
+        self.assertEqual(callbacks, {'<http://10.0.0.5:5002/api/integration/sonos/notify>'})
+
+        polls = self.world.count('GetTransportInfo')
+        second = self.stats()
+        self.assertEqual(second['state_source'], 'events')
+        self.assertEqual(self.world.count('GetTransportInfo'), polls)
+        self.assertEqual(self.world.count('SUBSCRIBE'), 3)
+
+        kitchen = self.world.sid('127.0.0.2', _sonos_events.TRANSPORT_EVENT_PATH)
+        self.assertEqual(self.notify(kitchen, last_change_notify('PLAYING', 'Song C', 'Band')).status_code, 200)
+        zones = {z['name']: z for z in self.stats()['zones']}
+        self.assertEqual((zones['Kitchen']['is_playing'], zones['Kitchen']['track'], zones['Kitchen']['artist']),
+                         (True, 'Song C', 'Band'))
+        self.assertTrue(zones['Kitchen']['album_art_url'].endswith('/getaa?s=1'))
+        self.notify(kitchen, last_change_notify('PAUSED_PLAYBACK'))
+        zones = {z['name']: z for z in self.stats()['zones']}
+        self.assertEqual((zones['Kitchen']['is_playing'], zones['Kitchen']['track']), (False, 'Song C'))
+        self.assertEqual(self.world.count('GetTransportInfo'), polls)
+
+    def test_topology_event_invalidates_cache(self):
+        self.enable_events()
+        self.stats()
+        self.stats()
+        self.assertEqual(self.world.count('GetZoneGroupState'), 1)
+        self.assertEqual(sonos._topology_cache.ttl, sonos.TOPOLOGY_EVENT_TTL)
+        self.notify(self.world.sid('127.0.0.1', _sonos_events.TOPOLOGY_EVENT_PATH),
+                    b'<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0"/>')
+        self.stats()
+        self.assertEqual(self.world.count('GetZoneGroupState'), 2)
+
+    def test_renewal_keeps_sid(self):
+        self.enable_events()
+        self.stats()
+        with patch.object(_sonos_events.time, 'time',
+                          return_value=time.time() + _sonos_events.SUBSCRIPTION_SECONDS - 60):
+            self.assertTrue(_sonos_events.ensure_subscriptions(
+                'http://127.0.0.1:%d' % self.server.server_port,
+                ['http://%s:%d' % (h, self.server.server_port) for h in SPEAKERS],
+                'http://10.0.0.5:5002/api/integration/sonos/notify'))
+        self.assertEqual(self.world.count('SUBSCRIBE'), 6)
+        self.assertEqual(len(self.world.subscriptions), 3)
+
+    def test_failed_subscribe_falls_back_to_polling_without_retrying(self):
+        self.enable_events()
+        self.world.subscribe_ok = False
+        self.assertEqual(self.stats()['state_source'], 'polling')
+        attempts = self.world.count('SUBSCRIBE')
+        self.assertEqual(self.stats()['state_source'], 'polling')
+        self.assertEqual(self.world.count('SUBSCRIBE'), attempts)
+        self.assertEqual(self.world.count('GetTransportInfo'), 4)
+
+    def test_unknown_sid_is_ignored(self):
+        self.assertEqual(self.notify('uuid:not-ours', last_change_notify('PLAYING')).status_code, 200)
+        self.assertIsNone(_sonos_events.get_transport('http://127.0.0.1:1400'))
+
+
+if __name__ == '__main__':
+    unittest.main()
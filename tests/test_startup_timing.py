@@ -0,0 +1,61 @@
+"""
+Tests for startup_timing.py - timed phases (including failed ones), ready /
+warm-up markers and the report. Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_startup_timing -v
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import startup_timing
+
+
+class StartupTimingTest(unittest.TestCase):
+    def setUp(self):
+        patches = [
+            patch.object(startup_timing, '_phases', []),
+            patch.object(startup_timing, '_ready_seconds', None),
+            patch.object(startup_timing, '_warmup_seconds', None),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_phases_recorded_in_start_order(self):
+        with startup_timing.phase('settings database'):
+            pass
+        startup_timing.record('integration plex', 0.25)
+        with startup_timing.phase('tag reconciliation', background=True):
+            pass
+        phases = startup_timing.report()['phases']
+        self.assertEqual([p['name'] for p in phases],
+                         ['integration plex', 'settings database', 'tag reconciliation'])
+        self.assertEqual(phases[0]['seconds'], 0.25)
+        self.assertTrue(phases[2]['background'])
+
+    def test_failed_phase_is_recorded_and_raises(self):
+        with self.assertRaises(RuntimeError):
+            with startup_timing.phase('delay profile control tags', background=True):
+                raise RuntimeError('Sonarr down')
+        (entry,) = startup_timing.report()['phases']
+        self.assertEqual(entry['error'], 'Sonarr down')
+
+    def test_ready_and_warmup_are_set_once(self):
+        self.assertFalse(startup_timing.is_ready())
+        startup_timing.mark_ready()
+        first = startup_timing.report()['ready_seconds']
+        startup_timing.mark_ready()
+        startup_timing.mark_warmup_done()
+        data = startup_timing.report()
+        self.assertTrue(startup_timing.is_ready())
+        self.assertEqual(data['ready_seconds'], first)
+        self.assertGreaterEqual(data['warmup_done_seconds'], first)
+
+
+if __name__ == '__main__':
+    unittest.main()
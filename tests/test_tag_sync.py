@@ -0,0 +1,185 @@
+"""
+Tests for tag_sync.py - rule tag changes are planned as add/remove sets
+with sync_rule_tag_to_sonarr's semantics, sent to Sonarr's series editor in
+chunks (removals first), and queued assignments survive until synced.
+Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_tag_sync -v
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_tag_sync_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import settings_db
+import tag_sync
+
+TAG_MAPPING = {1: 'episeerr_default', 2: 'episeerr_one_at_a_time', 3: 'episeerr_select',
+               4: 'anime', 5: 'episeerr_delay', 6: 'episeerr_keep_all'}
+RULE_TAGS = {'default': 1, 'one_at_a_time': 2, 'keep_all': 6}
+
+
+class FakeResponse:
+    def __init__(self, status=200, payload=None):
+        self.status_code = status
+        self.ok = status < 400
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise tag_sync.requests.exceptions.HTTPError(str(self.status_code))
+
+
+class FakeSonarr:
+    """Just enough of Sonarr: /series listing and the series editor."""
+
+    def __init__(self, series, fail_tags=()):
+        self.series = {s['id']: dict(s, tags=list(s['tags'])) for s in series}
+        self.editor_calls = []
+        self.fail_tags = set(fail_tags)
+
+    def get(self, url, **kwargs):
+        assert url.endswith('/api/v3/series'), url
+        return FakeResponse(payload=[dict(s, tags=list(s['tags'])) for s in self.series.values()])
+
+    def put(self, url, json=None, **kwargs):
+        assert url.endswith('/api/v3/series/editor'), url
+        self.editor_calls.append(json)
+        (tag_id,) = json['tags']
+        if tag_id in self.fail_tags:
+            return FakeResponse(500)
+        for series_id in json['seriesIds']:
+            tags = self.series[series_id]['tags']
+            if json['applyTags'] == 'add' and tag_id not in tags:
+                tags.append(tag_id)
+            elif json['applyTags'] == 'remove' and tag_id in tags:
+                tags.remove(tag_id)
+        return FakeResponse()
+
+
+class PlanRuleTagsTest(unittest.TestCase):
+    def test_swaps_rule_tag_and_keeps_user_and_select_tags(self):
+        series = [{'id': 10, 'tags': [1, 3, 4, 5]},     # default -> one_at_a_time
+                  {'id': 11, 'tags': [2, 4]},           # already right
+                  {'id': 12, 'tags': []}]               # untagged
+        changes, not_found = tag_sync.plan_rule_tags(
+            series, {10: 'one_at_a_time', 11: 'one_at_a_time', 12: 'keep_all', 99: 'default'},
+            TAG_MAPPING, RULE_TAGS)
+        self.assertEqual(changes, {('remove', 1): [10], ('remove', 5): [10],
+                                   ('add', 2): [10], ('add', 6): [12]})
+        self.assertEqual(not_found, [99])
+
+    def test_rule_without_tag_is_skipped(self):
+        changes, _ = tag_sync.plan_rule_tags([{'id': 10, 'tags': [1]}], {10: 'missing'},
+                                             TAG_MAPPING, RULE_TAGS)
+        self.assertEqual(changes, {})
+
+
+class SonarrEditorTest(unittest.TestCase):
+    def setUp(self):
+        self.sonarr = FakeSonarr([{'id': i, 'tags': [1, 4]} for i in range(1, 251)])
+        for patcher in (patch.object(tag_sync.episeerr_utils, 'http', self.sonarr),
+                        patch.object(tag_sync.episeerr_utils, 'get_tag_mapping', return_value=TAG_MAPPING),
+                        patch.object(tag_sync.episeerr_utils, 'get_or_create_rule_tag_id',
+                                     side_effect=lambda rule: RULE_TAGS.get(rule))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_bulk_move_uses_chunked_editor_requests(self):
+        progress = []
+        result = tag_sync.sync_rule_tags({i: 'one_at_a_time' for i in range(1, 251)},
+                                         progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(result, (list(range(1, 251)), [], []))
+        # 250 series, 100 per request: three removals of tag 1, then three adds of tag 2
+        self.assertEqual([(c['applyTags'], c['tags'], len(c['seriesIds'])) for c in self.sonarr.editor_calls],
+                         [('remove', [1], 100), ('remove', [1], 100), ('remove', [1], 50),
+                          ('add', [2], 100), ('add', [2], 100), ('add', [2], 50)])
+        self.assertEqual(progress[-1], (6, 6))
+        self.assertTrue(all(s['tags'] == [4, 2] for s in self.sonarr.series.values()))
+
+    def test_failed_chunks_and_unknown_series_are_counted(self):
+        self.sonarr.fail_tags = {6}
+        result = tag_sync.sync_rule_tags({1: 'keep_all', 2: 'default', 999: 'default', 3: 'nope'})
+        # 1: add failed; 2: already right; 999: not in Sonarr; 3: rule has no tag
+        self.assertEqual(result, ([2], [1, 3], [999]))
+
+    def test_cancel_stops_between_requests(self):
+        class Cancelled(Exception):
+            pass
+        calls = []
+
+        def check():
+            if calls:
+                raise Cancelled()
+            calls.append(1)
+
+        with self.assertRaises(Cancelled):
+            tag_sync.sync_rule_tags({i: 'one_at_a_time' for i in range(1, 251)}, check=check)
+        self.assertEqual(len(self.sonarr.editor_calls), 1)
+
+    def test_remove_tag_from_all_series(self):
+        self.sonarr.series[7]['tags'] = [4]
+        self.assertEqual(tag_sync.remove_tag_from_all_series(1), 249)
+        self.assertFalse(any(1 in s['tags'] for s in self.sonarr.series.values()))
+
+
+class QueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_tag_sync_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+
+    def test_always_have_flag_sticks_until_synced(self):
+        tag_sync.queue_series(['10', '11'], always_have=True)
+        tag_sync.queue_series(['10', '12'])
+        self.assertEqual(tag_sync.queued(), {'10': True, '11': True, '12': False})
+
+    def test_requeued_after_claim_survives_dequeue(self):
+        tag_sync.queue_series(['10', '11'])
+        claimed_at = sqlite3.connect(settings_db.DB_PATH).execute(
+            'SELECT MAX(queued_at) FROM tag_sync_queue').fetchone()[0]
+        work = tag_sync.queued()
+        with patch.object(tag_sync.time, 'time', return_value=claimed_at + 5):
+            tag_sync.queue_series(['11'], always_have=True)
+        tag_sync.dequeue(work, claimed_at)
+        self.assertEqual(tag_sync.queued(), {'11': True})
+
+    def test_failed_series_stay_queued_until_max_attempts(self):
+        self.assertIsNone(tag_sync.retry_interval_seconds())
+        tag_sync.queue_series(['10', '11'], always_have=True)
+        self.assertEqual(tag_sync.retry_interval_seconds(), tag_sync.RETRY_INTERVAL_SECONDS)
+        for attempt in range(1, tag_sync.MAX_ATTEMPTS):
+            self.assertEqual(tag_sync.retry_later(['10'], time.time()), 0)
+            # always_have already ran for it
+            self.assertEqual(tag_sync.queued(), {'10': False, '11': True})
+        self.assertEqual(tag_sync.retry_later(['10'], time.time()), 1)
+        self.assertEqual(tag_sync.queued(), {'11': True})
+
+        # Queueing again starts over
+        tag_sync.queue_series(['11'])
+        for attempt in range(1, tag_sync.MAX_ATTEMPTS):
+            tag_sync.retry_later(['11'], time.time())
+        tag_sync.queue_series(['11'])
+        tag_sync.retry_later(['11'], time.time())
+        self.assertEqual(tag_sync.queued(), {'11': False})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests for watch_trace.py - a trace carried from ingest through processing,
+search, grab and import, matching grabs back by episode id, and the p50/p95
+report per source and rule. Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_watch_trace -v
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_trace_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+import settings_db
+import watch_trace
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class WatchTraceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_trace_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+        self.clock = FakeClock()
+        patcher = patch.object(watch_trace.time, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        watch_trace.set_current(None)
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+        watch_trace.set_current(None)
+
+    def _watch(self, source, rule, episode_ids, search_after=None, grab_after=None, import_after=None):
+        """Run one watch event through every stage, `*_after` seconds apart
+        from the watch (None = stage never happens)."""
+        watched = self.clock.now
+        trace_id = watch_trace.start_trace(source, 'Show', 1, 2, 'alice')
+        watch_trace.set_current(trace_id)
+        watch_trace.mark_stage('processed', series_id=42, rule=rule)
+        watch_trace.link_episodes(episode_ids)
+        if search_after is not None:
+            self.clock.now = watched + search_after
+            watch_trace.mark_stage('searched')
+        watch_trace.set_current(None)
+        if grab_after is not None:
+            self.clock.now = watched + grab_after
+            watch_trace.mark_episodes('grabbed', episode_ids)
+        if import_after is not None:
+            self.clock.now = watched + import_after
+            watch_trace.mark_episodes('imported', episode_ids)
+        self.clock.now = watched + 3600
+        return trace_id
+
+    def test_trace_carries_through_every_stage(self):
+        trace_id = self._watch('plex', 'binge', [101, 102], search_after=2, grab_after=40, import_after=300)
+        (trace,) = watch_trace.get_traces()
+        self.assertEqual(trace['trace_id'], trace_id)
+        self.assertEqual((trace['series_id'], trace['rule'], trace['source']), (42, 'binge', 'plex'))
+        self.assertEqual(trace['searched_at'] - trace['watched_at'], 2)
+        self.assertEqual(trace['grabbed_at'] - trace['watched_at'], 40)
+        self.assertEqual(trace['imported_at'] - trace['watched_at'], 300)
+
+    def test_first_stamp_wins(self):
+        trace_id = watch_trace.start_trace('jellyfin', 'Show', 1, 1)
+        watch_trace.set_current(trace_id)
+        watch_trace.mark_stage('searched')
+        first = self.clock.now
+        self.clock.now += 60
+        watch_trace.mark_stage('searched')
+        self.assertEqual(watch_trace.get_traces()[0]['searched_at'], first)
+
+    def test_grab_credits_most_recent_open_trace_only(self):
+        older = self._watch('plex', 'binge', [7], grab_after=10)
+        newer = self._watch('tautulli', 'binge', [7])
+        self.assertEqual(watch_trace.mark_episodes('grabbed', [7, 8]), [newer])
+        self.assertEqual(watch_trace.mark_episodes('grabbed', [7]), [])
+        traces = {t['trace_id']: t for t in watch_trace.get_traces()}
+        self.assertEqual(traces[older]['grabbed_at'] - traces[older]['watched_at'], 10)
+
+    def test_stages_without_a_trace_are_ignored(self):
+        watch_trace.mark_stage('searched')
+        watch_trace.link_episodes([1])
+        self.assertEqual(watch_trace.mark_episodes('grabbed', [1]), [])
+        self.assertEqual(watch_trace.get_traces(), [])
+
+    def test_report_percentiles_by_source_and_rule(self):
+        for grab_after in (10, 20, 30, 40, 1000):
+            self._watch('plex', 'binge', [grab_after], search_after=1, grab_after=grab_after)
+        self._watch('emby', 'slow', [5000], search_after=5)
+
+        report = watch_trace.latency_report()
+        self.assertEqual(report['overall']['events'], 6)
+        self.assertEqual(report['overall']['searched']['count'], 6)
+        plex = report['by_source']['plex']['grabbed']
+        self.assertEqual((plex['count'], plex['p50_seconds'], plex['p95_seconds']), (5, 30, 1000))
+        self.assertEqual(report['by_rule']['slow']['grabbed']['count'], 0)
+        self.assertIsNone(report['by_rule']['slow']['imported']['p50_seconds'])
+
+    def test_old_traces_are_pruned_on_ingest(self):
+        self._watch('plex', 'binge', [1])
+        self.clock.now += (watch_trace.RETENTION_DAYS + 1) * 86400
+        watch_trace.start_trace('plex', 'Show', 1, 3)
+        self.assertEqual(len(watch_trace.get_traces(days=365 * 10)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
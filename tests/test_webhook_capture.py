@@ -0,0 +1,193 @@
+"""
+Tests for webhook_capture.py and webhook_replay.py - webhook requests are
+recorded with secrets redacted (JSON, Plex-style multipart forms, headers,
+query strings, tokens inside URLs), other routes aren't, and a capture
+replays against a stand-in server with per-endpoint latency and errors.
+Self-contained stdlib unittest, run with:
+
+    python3 -m unittest tests.test_webhook_capture -v
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_IMPORT_TMPDIR = tempfile.mkdtemp(prefix='episeerr_webhook_capture_import_')
+os.environ.setdefault('LOG_DIR', _IMPORT_TMPDIR)
+os.environ.setdefault('SETTINGS_DB_PATH', os.path.join(_IMPORT_TMPDIR, 'settings.db'))
+
+from flask import Flask, request, jsonify
+
+import settings_db
+import webhook_capture
+import webhook_replay
+
+
+def make_app():
+    app = Flask(__name__)
+    webhook_capture.init_app(app)
+    seen = []
+
+    @app.route('/sonarr-webhook', methods=['POST'])
+    def sonarr():
+        seen.append(request.json)
+        return jsonify({'ok': True})
+
+    @app.route('/api/integration/plex/webhook', methods=['POST'])
+    def plex():
+        seen.append((json.loads(request.form['payload']), sorted(request.files)))
+        return jsonify({'ok': True})
+
+    @app.route('/api/dashboard/stats')
+    def stats():
+        return jsonify({})
+
+    return app, seen
+
+
+class CaptureTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='episeerr_webhook_capture_test_')
+        self._orig_db = settings_db.DB_PATH
+        settings_db.DB_PATH = os.path.join(self.tmpdir, 'settings.db')
+        settings_db.init_settings_db()
+        self.capture = os.path.join(self.tmpdir, 'capture.jsonl')
+        webhook_capture._target_cache.update(path=None, checked=0.0)
+        self.app, self.seen = make_app()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        settings_db.DB_PATH = self._orig_db
+
+    def records(self):
+        with open(self.capture) as f:
+            return [json.loads(line) for line in f]
+
+    def test_off_by_default(self):
+        self.client.post('/sonarr-webhook', json={'eventType': 'Grab'})
+        self.assertFalse(os.path.exists(self.capture))
+        self.assertFalse(webhook_capture.status()['enabled'])
+
+    def test_json_webhook_recorded_with_secrets_redacted(self):
+        webhook_capture.set_enabled(True, self.capture)
+        payload = {'eventType': 'Grab', 'series': {'id': 7, 'title': 'Andor'},
+                   'apiKey': 'abc', 'images': [{'url': 'http://sonarr/img.jpg?apikey=abc&w=200'}]}
+        self.client.post('/sonarr-webhook?token=xyz&source=rss', json=payload,
+                         headers={'X-Api-Key': 'abc', 'User-Agent': 'Sonarr/4'})
+        self.client.get('/api/dashboard/stats')   # not a webhook route
+
+        (record,) = self.records()
+        self.assertEqual(record['path'], '/sonarr-webhook')
+        self.assertEqual(record['query'], {'token': 'REDACTED', 'source': 'rss'})
+        self.assertEqual(record['headers']['X-Api-Key'], 'REDACTED')
+        self.assertEqual(record['headers']['User-Agent'], 'Sonarr/4')
+        self.assertEqual(record['json']['apiKey'], 'REDACTED')
+        self.assertEqual(record['json']['series'], {'id': 7, 'title': 'Andor'})
+        self.assertEqual(record['json']['images'][0]['url'], 'http://sonarr/img.jpg?apikey=REDACTED&w=200')
+        # The handler still got the untouched payload
+        self.assertEqual(self.seen, [payload])
+
+    def test_multipart_form_recorded_without_files(self):
+        webhook_capture.set_enabled(True, self.capture)
+        payload = {'event': 'media.scrobble', 'Metadata': {'thumb': '/library/1?X-Plex-Token=tok'}}
+        self.client.post('/api/integration/plex/webhook', content_type='multipart/form-data',
+                         data={'payload': json.dumps(payload), 'thumb': (io.BytesIO(b'jpeg'), 'thumb.jpg')})
+
+        (record,) = self.records()
+        self.assertEqual(record['files'], ['thumb'])
+        self.assertEqual(json.loads(record['form']['payload'])['Metadata']['thumb'],
+                         '/library/1?X-Plex-Token=REDACTED')
+        self.assertEqual(self.seen, [(payload, ['thumb'])])
+
+    def test_turning_off(self):
+        webhook_capture.set_enabled(True, self.capture)
+        webhook_capture.set_enabled(False)
+        self.client.post('/sonarr-webhook', json={'eventType': 'Grab'})
+        self.assertFalse(os.path.exists(self.capture))
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    """Answers 200, or 500 on /radarr-webhook; records what it got."""
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        _StandIn.received.append((self.path, self.headers.get('Content-Type'), body))
+        self.send_response(500 if self.path.startswith('/radarr-webhook') else 200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        _StandIn.received = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StandIn)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.target = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def test_replay_reports_per_endpoint_latency_and_errors(self):
+        records = [
+            {'t': 100.0, 'method': 'POST', 'path': '/sonarr-webhook', 'query': {},
+             'headers': {'Content-Type': 'application/json', 'X-Api-Key': 'REDACTED'},
+             'json': {'eventType': 'Grab', 'url': 'http://sonarr.lan:8989'}},
+            {'t': 100.1, 'method': 'POST', 'path': '/api/integration/plex/webhook', 'query': {},
+             'headers': {'Content-Type': 'multipart/form-data; boundary=old'},
+             'form': {'payload': json.dumps({'event': 'media.scrobble'})}, 'files': ['thumb']},
+            {'t': 100.2, 'method': 'POST', 'path': '/radarr-webhook', 'query': {},
+             'headers': {'Content-Type': 'application/json'}, 'json': {'eventType': 'Test'}},
+        ]
+        records = [webhook_replay.rewrite(r, [('sonarr.lan:8989', 'localhost:18989')]) for r in records]
+        results = webhook_replay.replay(records, self.target, speed=0, workers=4,
+                                        extra_headers={'X-Api-Key': 'local'})
+
+        summary = webhook_replay.summarize(results, send_seconds=0.5, drain_seconds=0.5)
+        by_path = {e['path']: e for e in summary['endpoints']}
+        self.assertEqual(by_path['/radarr-webhook']['error_rate'], 1.0)
+        self.assertEqual(by_path['/sonarr-webhook']['errors'], 0)
+        self.assertEqual(summary['total']['requests'], 3)
+        self.assertEqual(summary['requests_per_second'], 6.0)
+        self.assertEqual(summary['end_to_end_per_second'], 3.0)
+        self.assertIn('TOTAL', webhook_replay.format_report(summary))
+
+        received = {path: (ctype, body) for path, ctype, body in _StandIn.received}
+        self.assertEqual(json.loads(received['/sonarr-webhook'][1]),
+                         {'eventType': 'Grab', 'url': 'http://localhost:18989'})
+        self.assertEqual(received['/api/integration/plex/webhook'][0], 'application/x-www-form-urlencoded')
+
+    def test_original_spacing_scaled_by_speed(self):
+        records = [{'t': t, 'method': 'POST', 'path': '/webhook', 'json': {}} for t in (0.0, 0.4, 0.8)]
+        sleeps = []
+        with patch.object(webhook_replay.time, 'sleep', side_effect=sleeps.append):
+            webhook_replay.replay(records, self.target, speed=4, workers=2)
+        # 0.1s and 0.2s after the start, minus whatever sending took
+        self.assertEqual(len(sleeps), 2)
+        self.assertTrue(0.05 < sleeps[0] <= 0.1 and 0.15 < sleeps[1] <= 0.2, sleeps)
+
+    def test_load_capture_sorts_and_filters(self):
+        path = os.path.join(tempfile.mkdtemp(prefix='episeerr_replay_test_'), 'capture.jsonl')
+        with open(path, 'w') as f:
+            for record in ({'t': 2, 'path': '/sonarr-webhook'}, {'t': 1, 'path': '/radarr-webhook'},
+                           {'t': 0, 'path': '/sonarr-webhook/4k'}):
+                f.write(json.dumps(record) + '\n')
+            f.write('not json\n')
+        with patch('sys.stderr', new_callable=io.StringIO):
+            self.assertEqual([r['t'] for r in webhook_replay.load_capture(path)], [0, 1, 2])
+            self.assertEqual([r['path'] for r in webhook_replay.load_capture(path, ['/sonarr-webhook'])],
+                             ['/sonarr-webhook/4k', '/sonarr-webhook'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+"""
+Watch Trace - how long "next episode ready when you watch" actually takes
+
+A trace starts when an integration hands a watch event to media_processor
+(start_trace) and its id travels in the temp payload into the subprocess,
+where set_current() makes it the active trace. Each hop stamps its stage:
+
+    watched    integration process_episode / Tautulli handler (ingest)
+    processed  media_processor picked the event up and resolved the rule
+    searched   trigger_episode_search_in_sonarr sent the search command
+    grabbed    Sonarr Grab webhook for one of the trace's episodes
+    imported   Sonarr Download (import) webhook for one of them
+
+monitor_or_search_episodes links the episodes it requested to the trace so
+the Grab/Download webhooks - which only know episode ids - can find it.
+Tracing never raises: a database problem loses a timestamp, not a watch
+event.
+"""
+import math
+import sqlite3
+import time
+import uuid
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+import settings_db
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('watched', 'processed', 'searched', 'grabbed', 'imported')
+RETENTION_DAYS = 30
+# Grabs/imports more than this long after the watch aren't credited to it
+MATCH_WINDOW_SECONDS = 14 * 86400
+
+_current: ContextVar[Optional[str]] = ContextVar('watch_trace', default=None)
+
+
+def _connect():
+    return sqlite3.connect(settings_db.DB_PATH, timeout=10)
+
+
+def _column(stage: str) -> str:
+    if stage not in STAGES:
+        raise ValueError(f"Unknown trace stage: {stage}")
+    return f"{stage}_at"
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def set_current(trace_id: Optional[str]) -> None:
+    _current.set(trace_id or None)
+
+
+def current() -> Optional[str]:
+    return _current.get()
+
+
+def start_trace(source: str, series_title: Optional[str] = None, season=None, episode=None,
+                user: Optional[str] = None, prefetch_only: bool = False) -> Optional[str]:
+    """Record the ingest of a watch event. Returns the trace id to put in the
+    media_processor payload (None if it couldn't be stored). Series id and
+    rule are filled in when media_processor resolves them."""
+    trace_id = new_trace_id()
+    now = time.time()
+    try:
+        conn = _connect()
+        try:
+            conn.execute(
+                '''INSERT INTO watch_traces
+                   (trace_id, source, series_title, season, episode, user, prefetch_only, watched_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                (trace_id, source, series_title, season, episode, user, int(bool(prefetch_only)), now)
+            )
+            cutoff = now - RETENTION_DAYS * 86400
+            conn.execute('DELETE FROM watch_trace_episodes WHERE trace_id IN '
+                         '(SELECT trace_id FROM watch_traces WHERE watched_at < ?)', (cutoff,))
+            conn.execute('DELETE FROM watch_traces WHERE watched_at < ?', (cutoff,))
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.debug(f"Could not start watch trace: {e}")
+        return None
+    return trace_id
+
+
+def mark_stage(stage: str, trace_id: Optional[str] = None, series_id=None,
+               rule: Optional[str] = None) -> None:
+    """Stamp a stage on the given (or current) trace. The first stamp wins, so
+    a second search for the same watch doesn't move the timestamp."""
+    trace_id = trace_id or current()
+    if not trace_id:
+        return
+    column = _column(stage)
+    try:
+        conn = _connect()
+        try:
+            conn.execute(f'UPDATE watch_traces SET {column} = COALESCE({column}, ?) WHERE trace_id = ?',
+                         (time.time(), trace_id))
+            if series_id is not None:
+                conn.execute('UPDATE watch_traces SET series_id = ? WHERE trace_id = ?', (series_id, trace_id))
+            if rule:
+                conn.execute('UPDATE watch_traces SET rule = ? WHERE trace_id = ?', (rule, trace_id))
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.debug(f"Could not mark trace {trace_id} {stage}: {e}")
+
+
+def link_episodes(episode_ids: Iterable[int], trace_id: Optional[str] = None) -> None:
+    """Remember which Sonarr episodes the (current) trace asked for."""
+    trace_id = trace_id or current()
+    episode_ids = [int(e) for e in episode_ids or []]
+    if not trace_id or not episode_ids:
+        return
+    try:
+        conn = _connect()
+        try:
+            conn.executemany(
+                'INSERT OR IGNORE INTO watch_trace_episodes (episode_id, trace_id) VALUES (?, ?)',
+                [(episode_id, trace_id) for episode_id in episode_ids]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.debug(f"Could not link episodes to trace {trace_id}: {e}")
+
+
+def mark_episodes(stage: str, episode_ids: Iterable[int], at: Optional[float] = None) -> List[str]:
+    """Stamp a stage on the most recent open trace of each episode - used by
+    the Sonarr Grab/Download webhooks. Returns the trace ids stamped."""
+    column = _column(stage)
+    episode_ids = [int(e) for e in episode_ids or [] if e is not None]
+    if not episode_ids:
+        return []
+    at = at or time.time()
+    stamped = []
+    try:
+        conn = _connect()
+        try:
+            for episode_id in episode_ids:
+                row = conn.execute(
+                    f'''SELECT t.trace_id FROM watch_traces t
+                        JOIN watch_trace_episodes e ON e.trace_id = t.trace_id
+                        WHERE e.episode_id = ? AND t.{column} IS NULL AND t.watched_at >= ?
+                        ORDER BY t.watched_at DESC LIMIT 1''',
+                    (episode_id, at - MATCH_WINDOW_SECONDS)
+                ).fetchone()
+                if row and row[0] not in stamped:
+                    conn.execute(f'UPDATE watch_traces SET {column} = ? WHERE trace_id = ?', (at, row[0]))
+                    stamped.append(row[0])
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.debug(f"Could not mark episodes {episode_ids} {stage}: {e}")
+    return stamped
+
+
+def get_traces(days: int = RETENTION_DAYS) -> List[Dict[str, Any]]:
+    conn = _connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute('SELECT * FROM watch_traces WHERE watched_at >= ? ORDER BY watched_at',
+                            (time.time() - days * 86400,)).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _summarize(traces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary = {'events': len(traces)}
+    for stage in ('searched', 'grabbed', 'imported'):
+        column = _column(stage)
+        ordered = sorted(t[column] - t['watched_at'] for t in traces if t[column] is not None)
+        summary[stage] = {
+            'count': len(ordered),
+            'p50_seconds': round(_percentile(ordered, 50), 1) if ordered else None,
+            'p95_seconds': round(_percentile(ordered, 95), 1) if ordered else None,
+        }
+    return summary
+
+
+def latency_report(days: int = RETENTION_DAYS) -> Dict[str, Any]:
+    """p50/p95 time from the watch event to search, grab and import - overall,
+    per source and per rule. Prefetch-only (playback start) events count
+    like any other: they are the ones that should win the race."""
+    traces = get_traces(days)
+    by_source: Dict[str, List[Dict[str, Any]]] = {}
+    by_rule: Dict[str, List[Dict[str, Any]]] = {}
+    for trace in traces:
+        by_source.setdefault(trace['source'] or 'unknown', []).append(trace)
+        by_rule.setdefault(trace['rule'] or 'none', []).append(trace)
+    return {
+        'days': days,
+        'overall': _summarize(traces),
+        'by_source': {name: _summarize(items) for name, items in sorted(by_source.items())},
+        'by_rule': {name: _summarize(items) for name, items in sorted(by_rule.items())},
+    }
@@ -0,0 +1,215 @@
+"""
+Webhook Capture - record incoming webhooks for replay load tests
+
+Event bursts (a Plex media.scrobble storm after a binge, Sonarr Grabs after
+an RSS sync, a wave of Jellyseerr requests) can't be reproduced by hand.
+While capture is on, every request to a webhook route
+
+    /sonarr-webhook[/<instance>]   /radarr-webhook   /webhook
+    /api/integration/<name>/webhook
+
+is appended to a JSON-lines file before it is handled: arrival time,
+method, path, query, headers and the body (JSON, form fields or text).
+Attached files (Plex's thumbnail) are left out. Anything that looks like a
+secret - API-key / token / password / cookie headers, query parameters and
+JSON keys, and token parameters inside URLs in the payload - is replaced
+with REDACTED, so a capture can be shared.
+
+Capture is opt-in: EPISEERR_WEBHOOK_CAPTURE=<file> turns it on at start,
+or POST /api/webhook-capture {"enabled": true} turns it on for every worker
+(data/webhook_capture.jsonl). webhook_replay.py replays a capture against
+a running instance and reports latency, error rate and throughput.
+"""
+import json
+import os
+import re
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+from flask import request
+
+import settings_db
+
+logger = logging.getLogger(__name__)
+
+SETTING_KEY = 'webhook_capture_file'
+DEFAULT_CAPTURE_FILE = os.path.join(os.getcwd(), 'data', 'webhook_capture.jsonl')
+REDACTED = 'REDACTED'
+# Bodies bigger than this are recorded without their content
+MAX_BODY_BYTES = 1024 * 1024
+# How long a worker trusts its cached on/off state
+_TARGET_TTL = 5.0
+
+WEBHOOK_PATH_RE = re.compile(
+    r'^/(?:sonarr-webhook(?:/[^/]+)?|radarr-webhook|webhook|api/integration/[^/]+/webhook)$'
+)
+_SECRET_NAME_RE = re.compile(
+    r'api[-_]?key|token|passw|secret|authorization|cookie|signature', re.IGNORECASE
+)
+_URL_SECRET_RE = re.compile(
+    r'([?&][^=&\s"]*(?:token|api[-_]?key|apikey|passw|secret|signature)[^=&\s"]*=)[^&\s"]+',
+    re.IGNORECASE
+)
+# Set by the HTTP client or server, not part of what the sender chose
+_SKIP_HEADERS = {'host', 'content-length', 'connection', 'accept-encoding', 'transfer-encoding'}
+
+_write_lock = threading.Lock()
+_target_cache = {'path': None, 'checked': 0.0}
+
+
+# ── Redaction ───────────────────────────────────────────────────
+
+def redact(value: Any, name: str = '') -> Any:
+    """Copy of a JSON-like value with secrets replaced. A value is a secret
+    when its key name looks like one; strings are also scrubbed of token
+    query parameters in URLs."""
+    if name and _SECRET_NAME_RE.search(name) and not isinstance(value, (dict, list)):
+        return REDACTED if value not in (None, '') else value
+    if isinstance(value, dict):
+        return {k: redact(v, str(k)) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v, name) for v in value]
+    if isinstance(value, str) and '=' in value:
+        return _URL_SECRET_RE.sub(lambda m: m.group(1) + REDACTED, value)
+    return value
+
+
+def _redact_json_text(text: str) -> str:
+    """Redact a form field that carries JSON (Plex's 'payload')."""
+    try:
+        return json.dumps(redact(json.loads(text)))
+    except ValueError:
+        return redact(text)
+
+
+# ── On / off ────────────────────────────────────────────────────
+
+def capture_target() -> Optional[str]:
+    """File captures go to, or None when capture is off."""
+    env_path = os.getenv('EPISEERR_WEBHOOK_CAPTURE')
+    if env_path:
+        return env_path
+    now = time.monotonic()
+    if now - _target_cache['checked'] > _TARGET_TTL:
+        try:
+            _target_cache['path'] = settings_db.get_setting(SETTING_KEY) or None
+        except Exception as e:
+            logger.debug(f"Webhook capture setting unavailable: {e}")
+            _target_cache['path'] = None
+        _target_cache['checked'] = now
+    return _target_cache['path']
+
+
+def set_enabled(enabled: bool, path: Optional[str] = None) -> Optional[str]:
+    """Turn capture on (to path, default DEFAULT_CAPTURE_FILE) or off for
+    every worker. Returns the capture file, None when turned off."""
+    target = (path or DEFAULT_CAPTURE_FILE) if enabled else ''
+    settings_db.set_setting(SETTING_KEY, target, category='diagnostics',
+                            description='Webhook capture file (empty = off)')
+    _target_cache['path'] = target or None
+    _target_cache['checked'] = time.monotonic()
+    return target or None
+
+
+# ── Recording ───────────────────────────────────────────────────
+
+def build_record() -> Dict[str, Any]:
+    """The current request as a redacted capture record."""
+    record: Dict[str, Any] = {
+        't': round(time.time(), 4),
+        'method': request.method,
+        'path': request.path,
+        'query': {k: (REDACTED if _SECRET_NAME_RE.search(k) else redact(v))
+                  for k, v in request.args.items()},
+        'headers': {k: (REDACTED if _SECRET_NAME_RE.search(k) else v)
+                    for k, v in request.headers.items() if k.lower() not in _SKIP_HEADERS},
+    }
+    if (request.content_length or 0) > MAX_BODY_BYTES:
+        record['truncated'] = True
+        return record
+
+    raw = request.get_data(cache=True)
+    if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        record['form'] = {k: (REDACTED if _SECRET_NAME_RE.search(k) else _redact_json_text(v))
+                          for k, v in request.form.items()}
+        if request.files:
+            record['files'] = sorted(request.files.keys())
+        return record
+    text = raw.decode('utf-8', errors='replace')
+    try:
+        record['json'] = redact(json.loads(text)) if text.strip() else None
+    except ValueError:
+        record['body'] = redact(text)
+    return record
+
+
+def write_record(path: str, record: Dict[str, Any]) -> None:
+    """Append one line. A single O_APPEND write per record keeps lines from
+    several workers from interleaving."""
+    line = (json.dumps(record, default=str) + '\n').encode('utf-8')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with _write_lock:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+
+def init_app(app) -> None:
+    """Register the capture hook (ahead of the auth gate, so a webhook the
+    gate rejects is still recorded)."""
+
+    @app.before_request
+    def _capture_webhook():
+        if not WEBHOOK_PATH_RE.match(request.path):
+            return None
+        path = capture_target()
+        if not path:
+            return None
+        try:
+            write_record(path, build_record())
+        except Exception as e:
+            # Never let the recorder cost a webhook
+            logger.warning(f"Webhook capture failed for {request.path}: {e}")
+        return None
+
+
+# ── Status ──────────────────────────────────────────────────────
+
+def processor_count() -> Optional[int]:
+    """media_processor.py processes running on this host (None where /proc
+    isn't available). Webhook work that outlives its HTTP response runs
+    there, so webhook_replay.py waits for this to reach 0 to measure
+    end-to-end throughput."""
+    if not os.path.isdir('/proc'):
+        return None
+    count = 0
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                argv = f.read().split(b'\0')
+        except OSError:
+            continue
+        if any(os.path.basename(arg) == b'media_processor.py' for arg in argv[:3]):
+            count += 1
+    return count
+
+
+def status() -> Dict[str, Any]:
+    path = capture_target()
+    events = 0
+    if path and os.path.exists(path):
+        with open(path, 'rb') as f:
+            events = sum(1 for _ in f)
+    return {
+        'enabled': bool(path),
+        'file': path,
+        'from_env': bool(os.getenv('EPISEERR_WEBHOOK_CAPTURE')),
+        'events': events,
+        'processors': processor_count(),
+    }
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Webhook Replay - replay a webhook capture against a running Episeerr
+
+    python3 webhook_replay.py data/webhook_capture.jsonl --target http://localhost:5002
+    python3 webhook_replay.py capture.jsonl --speed 10          # 10x faster
+    python3 webhook_replay.py capture.jsonl --speed 0           # as fast as possible
+    python3 webhook_replay.py capture.jsonl --rewrite sonarr.lan:8989=localhost:18989
+
+Reads a capture written by webhook_capture.py and sends every request with
+its original spacing divided by --speed, from a pool of --workers threads
+(a request that can't go out on time is sent late, and the lag is
+reported). Redacted headers are dropped unless --header supplies a value;
+--rewrite swaps strings in the payloads, e.g. real upstream hosts for local
+stand-ins, so the target can run against stand-in Sonarr / Plex servers.
+
+The report gives, per endpoint, requests, error rate (status >= 400 or no
+response) and p50/p95/p99/max latency, plus request throughput over the
+send phase. Webhook work that outlives its response runs in
+media_processor.py subprocesses; unless --no-drain is given, the replay
+then polls /api/webhook-capture until none are running and reports
+end-to-end throughput over sending plus that drain.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+REDACTED = 'REDACTED'
+# Consecutive idle polls before the target counts as drained (a burst can
+# leave short gaps between one subprocess ending and the next starting)
+DRAIN_IDLE_POLLS = 3
+
+
+def load_capture(path: str, only: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Capture records in arrival order, optionally only paths starting with
+    one of `only`."""
+    records = []
+    with open(path, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"Skipping unreadable line {line_no}", file=sys.stderr)
+                continue
+            if only and not any(record.get('path', '').startswith(prefix) for prefix in only):
+                continue
+            records.append(record)
+    records.sort(key=lambda r: r.get('t', 0))
+    return records
+
+
+def rewrite(record: Dict[str, Any], replacements: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Copy of a record with each (old, new) string replaced in its query and
+    body."""
+    if not replacements:
+        return record
+    text = json.dumps({k: record.get(k) for k in ('query', 'json', 'form', 'body')})
+    for old, new in replacements:
+        text = text.replace(json.dumps(old)[1:-1], json.dumps(new)[1:-1])
+    return {**record, **{k: v for k, v in json.loads(text).items() if k in record}}
+
+
+def build_request(record: Dict[str, Any], extra_headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """requests.request() keyword arguments for a capture record."""
+    headers = {k: v for k, v in (record.get('headers') or {}).items() if v != REDACTED}
+    kwargs: Dict[str, Any] = {'method': record.get('method', 'POST'),
+                              'params': {k: v for k, v in (record.get('query') or {}).items() if v != REDACTED}}
+    if 'form' in record:
+        # requests sets the form content type (and a multipart boundary would be stale)
+        headers = {k: v for k, v in headers.items() if k.lower() != 'content-type'}
+        kwargs['data'] = record['form']
+    elif 'json' in record:
+        kwargs['data'] = json.dumps(record['json']).encode('utf-8') if record['json'] is not None else b''
+    elif 'body' in record:
+        kwargs['data'] = record['body'].encode('utf-8')
+    headers.update(extra_headers or {})
+    kwargs['headers'] = headers
+    return kwargs
+
+
+def replay(records: List[Dict[str, Any]], target: str, speed: float = 1.0, workers: int = 32,
+           extra_headers: Optional[Dict[str, str]] = None, timeout: float = 30,
+           send: Optional[Callable[..., Any]] = None) -> List[Dict[str, Any]]:
+    """Send every record to target, spaced by its original arrival gaps
+    divided by speed (speed <= 0: no spacing). Returns one result per record:
+    path, status (None on a transport error), seconds, error, lag."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    send = send or session.request
+    target = target.rstrip('/')
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def _send(record, due, started):
+        sent = time.monotonic()
+        result = {'path': record.get('path'), 'status': None, 'error': None,
+                  'lag': max(0.0, sent - started - due)}
+        try:
+            response = send(url=target + record['path'], timeout=timeout,
+                            **build_request(record, extra_headers))
+            result['status'] = response.status_code
+        except Exception as e:
+            result['error'] = type(e).__name__
+        result['seconds'] = time.monotonic() - sent
+        with lock:
+            results.append(result)
+
+    if not records:
+        return results
+    first = records[0].get('t', 0)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='replay') as pool:
+        for record in records:
+            due = (record.get('t', first) - first) / speed if speed > 0 else 0.0
+            wait = started + due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            pool.submit(_send, record, due, started)
+    return results
+
+
+def wait_for_drain(target: str, timeout: float = 600, poll: float = 0.5,
+                   headers: Optional[Dict[str, str]] = None) -> Optional[float]:
+    """Seconds until the target has no media_processor.py running (None if
+    it can't tell, or still busy at timeout)."""
+    started = time.monotonic()
+    idle = 0
+    while time.monotonic() - started < timeout:
+        try:
+            response = requests.get(f"{target.rstrip('/')}/api/webhook-capture", headers=headers, timeout=10)
+            response.raise_for_status()
+            processors = response.json().get('processors')
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Drain check failed: {e}", file=sys.stderr)
+            return None
+        if processors is None:
+            return None
+        idle = idle + 1 if processors == 0 else 0
+        if idle >= DRAIN_IDLE_POLLS:
+            return max(0.0, time.monotonic() - started - (DRAIN_IDLE_POLLS - 1) * poll)
+        time.sleep(poll)
+    return None
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _latency(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    ordered = sorted(r['seconds'] for r in results)
+    errors = sum(1 for r in results if r['status'] is None or r['status'] >= 400)
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'error_rate': round(errors / len(results), 4),
+        'p50_ms': round(_percentile(ordered, 50) * 1000, 1),
+        'p95_ms': round(_percentile(ordered, 95) * 1000, 1),
+        'p99_ms': round(_percentile(ordered, 99) * 1000, 1),
+        'max_ms': round(ordered[-1] * 1000, 1),
+    }
+
+
+def summarize(results: List[Dict[str, Any]], send_seconds: float,
+              drain_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """Per-endpoint and overall latency / errors, and throughput."""
+    by_path: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for result in results:
+        by_path[result['path']].append(result)
+    summary: Dict[str, Any] = {
+        'endpoints': [{'path': path, **_latency(items)} for path, items in sorted(by_path.items())],
+        'total': _latency(results) if results else {'requests': 0},
+        'send_seconds': round(send_seconds, 3),
+        'max_lag_ms': round(max((r['lag'] for r in results), default=0.0) * 1000, 1),
+        'requests_per_second': round(len(results) / send_seconds, 2) if send_seconds > 0 else None,
+        'drain_seconds': None,
+        'end_to_end_per_second': None,
+    }
+    if drain_seconds is not None:
+        summary['drain_seconds'] = round(drain_seconds, 3)
+        summary['end_to_end_per_second'] = round(len(results) / (send_seconds + drain_seconds), 2)
+    return summary
+
+
+def format_report(summary: Dict[str, Any]) -> str:
+    columns = f"{'endpoint':<42} {'reqs':>6} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    lines = [columns, '-' * len(columns)]
+    rows = summary['endpoints'] + ([{'path': 'TOTAL', **summary['total']}] if summary['endpoints'] else [])
+    for row in rows:
+        lines.append(f"{row['path']:<42} {row['requests']:>6} {row['error_rate'] * 100:>5.1f}% "
+                     f"{row['p50_ms']:>6.0f}ms {row['p95_ms']:>6.0f}ms {row['p99_ms']:>6.0f}ms {row['max_ms']:>6.0f}ms")
+    lines.append('')
+    lines.append(f"Sent in {summary['send_seconds']:.1f}s ({summary['requests_per_second']} req/s, "
+                 f"max send lag {summary['max_lag_ms']:.0f}ms)")
+    if summary['drain_seconds'] is not None:
+        lines.append(f"Processing drained {summary['drain_seconds']:.1f}s later: "
+                     f"{summary['end_to_end_per_second']} events/s end to end")
+    return '\n'.join(lines)
+
+
+def _pairs(values: List[str], separator: str, flag: str) -> List[Tuple[str, str]]:
+    pairs = []
+    for value in values or []:
+        if separator not in value:
+            raise SystemExit(f"{flag} expects OLD{separator}NEW, got {value!r}")
+        pairs.append(tuple(value.split(separator, 1)))
+    return pairs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Replay a webhook capture against a running Episeerr.')
+    parser.add_argument('capture', help='capture file written by webhook_capture.py')
+    parser.add_argument('--target', default='http://localhost:5002', help='Episeerr base URL')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='time scale: 1 = original spacing, 10 = ten times faster, 0 = no spacing')
+    parser.add_argument('--workers', type=int, default=32, help='concurrent requests at most')
+    parser.add_argument('--only', action='append', metavar='PATH_PREFIX', help='replay only these paths')
+    parser.add_argument('--header', action='append', metavar='NAME:VALUE',
+                        help='header to add to every request (e.g. for a redacted one)')
+    parser.add_argument('--rewrite', action='append', metavar='OLD=NEW', help='replace a string in payloads')
+    parser.add_argument('--timeout', type=float, default=30, help='per-request timeout (seconds)')
+    parser.add_argument('--no-drain', action='store_true', help="don't wait for processing to finish")
+    parser.add_argument('--drain-timeout', type=float, default=600)
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args(argv)
+
+    headers = {k.strip(): v.strip() for k, v in _pairs(args.header, ':', '--header')}
+    replacements = _pairs(args.rewrite, '=', '--rewrite')
+    records = [rewrite(r, replacements) for r in load_capture(args.capture, args.only)]
+    if not records:
+        print('Nothing to replay', file=sys.stderr)
+        return 1
+    span = records[-1].get('t', 0) - records[0].get('t', 0)
+    print(f"Replaying {len(records)} webhooks (captured over {span:.1f}s) to {args.target} "
+          f"at speed {args.speed:g}", file=sys.stderr)
+
+    started = time.monotonic()
+    results = replay(records, args.target, speed=args.speed, workers=args.workers,
+                     extra_headers=headers, timeout=args.timeout)
+    send_seconds = time.monotonic() - started
+    drain_seconds = None if args.no_drain else wait_for_drain(args.target, args.drain_timeout, headers=headers)
+
+    summary = summarize(results, send_seconds, drain_seconds)
+    print(json.dumps(summary, indent=2) if args.json else format_report(summary))
+    return 0 if summary['total'].get('errors', 0) == 0 else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
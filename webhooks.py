@@ -15,7 +15,13 @@ import subprocess
 from flask import Blueprint, request, jsonify, current_app
 
 import episeerr_utils
+import sonarr_instances
 import sonarr_utils
+import watch_trace
+import event_bus
+import selection_prefetch
+import rule_stats
+from job_scheduler import scheduler as job_scheduler
 from episeerr_utils import http
 from settings_db import add_pending_request
 
@@ -43,6 +49,8 @@ def process_sonarr_webhook():
 
         if event_type == 'Grab':
             return handle_episode_grab(json_data)
+        if event_type == 'Download':
+            return handle_episode_import(json_data)
 
         series = json_data.get('series', {})
         series_id = series.get('id')
@@ -118,6 +126,12 @@ def process_sonarr_webhook():
         current_app.logger.info(f"=== TAG DETECTION SUMMARY ===")
         current_app.logger.info(f"assigned_rule: {assigned_rule}")
         current_app.logger.info(f"is_select_request: {is_select_request}")
+        if is_select_request and not sonarr_instances.is_default():
+            # Selection requests are answered in the UI, which works on the default instance
+            current_app.logger.warning(f"episeerr_select ignored for {series_title}: episode selection only "
+                                       f"works on the default Sonarr instance")
+            return jsonify({"status": "success",
+                            "message": "Episode selection is only available for the default Sonarr instance"}), 200
         if not assigned_rule and not is_select_request:
             import media_processor
             global_settings = media_processor.load_global_settings()
@@ -258,6 +272,7 @@ def process_sonarr_webhook():
             }
 
             add_pending_request(pending_request)
+            selection_prefetch.prefetch_async(tmdb_id)
             current_app.logger.info(f"✓ Created episode selection request for {series_title}")
 
             try:
@@ -308,6 +323,24 @@ def process_sonarr_webhook():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@sonarr_webhooks_bp.route('/sonarr-webhook/<instance>', methods=['POST'])
+def process_instance_sonarr_webhook(instance):
+    """Sonarr webhook for a named Sonarr instance (see sonarr_instances.py).
+    The default instance is handled here; any other is replayed by a
+    media_processor.py subprocess bound to it."""
+    if instance == sonarr_instances.active_instance():
+        return process_sonarr_webhook()
+    if instance not in sonarr_instances.list_instances():
+        return jsonify({"status": "error", "message": f"Unknown Sonarr instance: {instance}"}), 404
+    payload = request.get_json(silent=True)
+    if not payload:
+        return jsonify({"status": "error", "message": "No data received"}), 400
+    current_app.logger.info(f"Sonarr webhook for instance '{instance}' ({payload.get('eventType')}) "
+                            f"handed to its processor")
+    sonarr_instances.dispatch_webhook(instance, payload)
+    return jsonify({"status": "accepted", "instance": instance}), 202
+
+
 # ============================================================================
 # GRAB HANDLER (called from process_sonarr_webhook, not a route)
 # ============================================================================
@@ -335,6 +368,9 @@ def handle_episode_grab(json_data):
         episode_id = episode_info.get('id')
 
         current_app.logger.info(f"✅ Episode grabbed: {series_title} S{season_num}E{episode_num}")
+        watch_trace.mark_episodes('grabbed', [e.get('id') for e in episodes])
+        event_bus.publish('queue', {'event': 'grabbed', 'series_id': series_id, 'series_title': series_title,
+                                    'episodes': [[e.get('seasonNumber'), e.get('episodeNumber')] for e in episodes]})
 
         # ──────────────────────────────────────────────────────
         # 1. MARK AS CLEANED (stops grace checking)
@@ -405,20 +441,18 @@ def handle_episode_grab(json_data):
             current_app.logger.error(f"Error logging download for dashboard: {e}")
 
         # ──────────────────────────────────────────────────────
-        # 3. DELETE PENDING DISCORD NOTIFICATION
+        # 3. DELETE PENDING DISCORD NOTIFICATION (queued - see notification_queue.py)
         # ──────────────────────────────────────────────────────
         try:
-            from notification_storage import get_and_remove_notification
-            from notifications import delete_discord_message
-
-            message_id = get_and_remove_notification(episode_id)
-
-            if message_id:
-                current_app.logger.info(f"🗑️ Deleting pending search notification for episode {episode_id}")
-                if delete_discord_message(message_id):
-                    current_app.logger.info(f"✅ Successfully deleted notification message {message_id}")
-                else:
-                    current_app.logger.warning(f"⚠️ Failed to delete notification message {message_id}")
+            from notifications import clear_search_pending
+
+            outcome = clear_search_pending(episode_id)
+            if outcome == 'cancelled':
+                current_app.logger.info(f"🗑️ Cancelled queued search notification for episode {episode_id}")
+            elif outcome == 'deleting':
+                current_app.logger.info(f"🗑️ Queued deletion of pending search notification for episode {episode_id}")
+            elif outcome == 'kept':
+                current_app.logger.info(f"📋 Episode {episode_id} found - digest notification kept for the others")
         except ImportError:
             # Notification modules not available, skip
             pass
@@ -434,6 +468,31 @@ def handle_episode_grab(json_data):
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+def handle_episode_import(json_data):
+    """
+    Handle Sonarr's Download (On Import) event: close out the watch traces
+    waiting on these episodes, count the new file in the rule stats and
+    take a free-space sample for the disk forecast. Nothing else to do -
+    the grab already did the bookkeeping.
+    """
+    series_title = (json_data.get('series') or {}).get('title', 'Unknown')
+    episodes = json_data.get('episodes') or []
+    traced = watch_trace.mark_episodes('imported', [e.get('id') for e in episodes])
+    # An upgrade replaces files already counted; deletedFiles are what it replaced
+    replaced = sum((f or {}).get('size') or 0 for f in json_data.get('deletedFiles') or [])
+    rule_stats.adjust_files((json_data.get('series') or {}).get('id'),
+                            episodes=0 if json_data.get('isUpgrade') else len(episodes),
+                            bytes_=((json_data.get('episodeFile') or {}).get('size') or 0) - replaced)
+    event_bus.publish('queue', {'event': 'imported', 'series_id': (json_data.get('series') or {}).get('id'),
+                                'series_title': series_title,
+                                'episodes': [[e.get('seasonNumber'), e.get('episodeNumber')] for e in episodes]})
+    job_scheduler.run_now('disk_forecast', trigger='import')
+    current_app.logger.info(
+        f"📦 Imported: {series_title} ({len(episodes)} episode(s), {len(traced)} watch trace(s) completed)"
+    )
+    return jsonify({"status": "success", "message": "Import processed"}), 200
+
+
 # ============================================================================
 # LEGACY TAUTULLI WEBHOOK
 # ============================================================================